@@ -13,6 +13,7 @@ from app.models.user import User
 from app.models.restaurant import Restaurant, Branch
 from app.models.menu import Menu, Category, MenuItem
 from app.models.order import Order, OrderItem
+from app.models.catalog import CatalogVersion
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
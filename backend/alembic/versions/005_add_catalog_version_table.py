@@ -0,0 +1,33 @@
+"""Add catalog_version table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Per-restaurant catalog version (0 = all restaurants)
+    op.create_table(
+        'catalog_version',
+        sa.Column('restaurant_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('restaurant_id')
+    )
+    op.create_index('ix_catalog_version_updated_at', 'catalog_version', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_catalog_version_updated_at', table_name='catalog_version')
+    op.drop_table('catalog_version')
@@ -0,0 +1,49 @@
+"""Add restaurant slug
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def _slugify(text: str) -> str:
+    # Same as app.services.restaurant_slugs.slugify at the time of this revision
+    return text.lower().replace(" ", "-").replace("&", "and")
+
+
+def upgrade() -> None:
+    op.add_column('restaurant', sa.Column('slug', sa.String(), nullable=True))
+
+    # Backfill in id order so the oldest restaurant keeps the plain slug;
+    # later ones with the same name get -2, -3, ...
+    conn = op.get_bind()
+    restaurants = conn.execute(sa.text('SELECT id, name FROM restaurant ORDER BY id')).fetchall()
+    taken = set()
+    for restaurant_id, name in restaurants:
+        base = _slugify(name or '') or 'restaurant'
+        slug, n = base, 1
+        while slug in taken:
+            n += 1
+            slug = f"{base}-{n}"
+        taken.add(slug)
+        conn.execute(
+            sa.text('UPDATE restaurant SET slug = :slug WHERE id = :id'),
+            {'slug': slug, 'id': restaurant_id},
+        )
+
+    op.create_index('ix_restaurant_slug', 'restaurant', ['slug'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_restaurant_slug', table_name='restaurant')
+    op.drop_column('restaurant', 'slug')
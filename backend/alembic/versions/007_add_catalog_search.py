@@ -0,0 +1,56 @@
+"""Add catalog search columns (tsvector + pg_trgm)
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+SEARCH_TABLES = ('restaurant', 'menuitem')
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # SQL twin of app.core.text_normalize.normalize_arabic
+    op.execute("""
+        CREATE OR REPLACE FUNCTION lionbot_normalize(input text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT lower(btrim(translate(
+                regexp_replace(coalesce(input, ''), '[\u064b-\u0652]', '', 'g'),
+                'أإآىة٠١٢٣٤٥٦٧٨٩', 'ااايه0123456789'
+            )))
+        $$
+    """)
+
+    for table in SEARCH_TABLES:
+        op.execute(f"""
+            ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_name text
+            GENERATED ALWAYS AS (lionbot_normalize(coalesce(name, '') || ' ' || coalesce(name_ar, ''))) STORED
+        """)
+        op.execute(f"""
+            ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', lionbot_normalize(coalesce(name, '') || ' ' || coalesce(name_ar, ''))), 'A') ||
+                setweight(to_tsvector('simple', lionbot_normalize(coalesce(description, '') || ' ' || coalesce(description_ar, ''))), 'B')
+            ) STORED
+        """)
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING gin (search_vector)")
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_name_trgm ON {table} USING gin (search_name gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    for table in SEARCH_TABLES:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_name_trgm")
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_name")
+    op.execute("DROP FUNCTION IF EXISTS lionbot_normalize(text)")
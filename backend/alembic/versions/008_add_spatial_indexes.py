@@ -0,0 +1,61 @@
+"""Add spatial indexes for driver and branch coordinates
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+# table -> (latitude column, longitude column)
+GEO_COLUMNS = {'user': ('last_latitude', 'last_longitude'), 'branch': ('latitude', 'longitude')}
+
+
+def _postgis_statements():
+    yield "CREATE EXTENSION IF NOT EXISTS postgis"
+    for table, (lat, lng) in GEO_COLUMNS.items():
+        yield (
+            f'CREATE INDEX IF NOT EXISTS ix_{table}_location_geog ON "{table}" '
+            f"USING gist ((ST_SetSRID(ST_MakePoint({lng}, {lat}), 4326)::geography)) "
+            f"WHERE {lat} IS NOT NULL AND {lng} IS NOT NULL"
+        )
+
+
+def _earthdistance_statements():
+    yield "CREATE EXTENSION IF NOT EXISTS cube"
+    yield "CREATE EXTENSION IF NOT EXISTS earthdistance"
+    for table, (lat, lng) in GEO_COLUMNS.items():
+        yield (
+            f'CREATE INDEX IF NOT EXISTS ix_{table}_location_earth ON "{table}" '
+            f"USING gist (ll_to_earth({lat}, {lng})) "
+            f"WHERE {lat} IS NOT NULL AND {lng} IS NOT NULL"
+        )
+
+
+def upgrade() -> None:
+    # PostGIS when it is installed on the server, otherwise cube + earthdistance
+    # (contrib); each attempt runs in a savepoint so a missing extension is not fatal
+    conn = op.get_bind()
+    for statements in (_postgis_statements, _earthdistance_statements):
+        try:
+            with conn.begin_nested():
+                for statement in statements():
+                    conn.execute(sa.text(statement))
+            return
+        except Exception:
+            continue
+    # Neither extension: nearby queries fall back to a bounding-box prefilter
+
+
+def downgrade() -> None:
+    for table in GEO_COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_location_geog")
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_location_earth")
@@ -11,6 +11,7 @@ from datetime import datetime
 from app.db.session import get_db
 from app.models.user import User
 from app.api import deps
+from app.services.catalog_events import bump_catalog_version, restaurant_id_for_item
 
 # Models
 from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
@@ -141,8 +142,7 @@ async def create_customization_group(
         max_selections=group_in.max_selections,
     )
     db.add(group)
-    await db.commit()
-    await db.refresh(group)
+    await db.flush()
     
     # Create options
     for i, opt in enumerate(group_in.options):
@@ -156,6 +156,8 @@ async def create_customization_group(
         )
         db.add(option)
     
+    # Group, options and catalog version commit together
+    await bump_catalog_version(db, await restaurant_id_for_item(db, group_in.menu_item_id))
     await db.commit()
     
     return {"message": "Customization group created", "group_id": group.id}
@@ -175,7 +177,8 @@ async def add_option(
     result = await db.execute(
         select(CustomizationGroup).where(CustomizationGroup.id == group_id)
     )
-    if not result.scalars().first():
+    group = result.scalars().first()
+    if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
     option = CustomizationOption(
@@ -186,6 +189,7 @@ async def add_option(
         is_default=option_in.is_default,
     )
     db.add(option)
+    await bump_catalog_version(db, await restaurant_id_for_item(db, group.menu_item_id))
     await db.commit()
     await db.refresh(option)
     
@@ -217,6 +221,7 @@ async def delete_group(
     )
     
     await db.delete(group)
+    await bump_catalog_version(db, await restaurant_id_for_item(db, group.menu_item_id))
     await db.commit()
     
     return {"message": "Group deleted"}
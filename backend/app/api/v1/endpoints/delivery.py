@@ -9,6 +9,7 @@ from math import radians, sin, cos, sqrt, atan2
 
 from app.db.session import get_db
 from app.models.restaurant import Restaurant
+from app.services.geo_index import geo_index
 
 router = APIRouter()
 
@@ -159,34 +160,28 @@ async def get_nearby_restaurants(
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
-    Get restaurants within delivery radius.
+    Get restaurants within delivery radius (distance to their nearest branch).
     """
-    result = await db.execute(
-        select(Restaurant).where(Restaurant.is_active == True)
-    )
-    restaurants = result.scalars().all()
+    # Branches inside the radius, nearest first; keep each restaurant's closest
+    branches = await geo_index.nearby_branches(db, lat, lon, radius_km)
     
     nearby = []
-    for r in restaurants:
-        # Use restaurant location or default
-        rest_lat = getattr(r, 'latitude', 33.8938)
-        rest_lon = getattr(r, 'longitude', 35.5018)
-        
-        distance = calculate_distance(rest_lat, rest_lon, lat, lon)
-        
-        if distance <= radius_km:
-            time_estimate = estimate_delivery_time(distance)
-            nearby.append({
-                "id": r.id,
-                "name": r.name,
-                "category": r.category,
-                "distance_km": round(distance, 2),
-                "delivery_time": time_estimate["display"],
-                "delivery_fee": calculate_delivery_fee(distance)["fee"],
-            })
-    
-    # Sort by distance
-    nearby.sort(key=lambda x: x["distance_km"])
+    seen = set()
+    for branch, distance in branches:
+        r = branch.restaurant
+        if r.id in seen:
+            continue
+        seen.add(r.id)
+        time_estimate = estimate_delivery_time(distance)
+        nearby.append({
+            "id": r.id,
+            "name": r.name,
+            "category": r.category.name if r.category else None,
+            "branch_id": branch.id,
+            "distance_km": round(distance, 2),
+            "delivery_time": time_estimate["display"],
+            "delivery_fee": calculate_delivery_fee(distance)["fee"],
+        })
     
     return {
         "location": {"lat": lat, "lon": lon},
@@ -51,7 +51,7 @@ async def auto_assign_driver(
     Only accessible by super admins.
     """
     service = DriverAssignmentService(db)
-    driver = await service.auto_assign_order(request.order_id)
+    driver = await service.auto_assign_order(request.order_id, user=current_user)
     
     if not driver:
         return AutoAssignResponse(
@@ -90,40 +90,23 @@ async def get_nearby_drivers(
     current_user: User = Depends(deps.get_current_active_superuser),
 ):
     """Get list of nearby available drivers."""
-    from sqlalchemy import select
-    from app.models.user import User
-    
-    result = await db.execute(
-        select(User)
-        .where(User.role == "driver")
-        .where(User.is_active == True)
-        .where(User.last_latitude != None)
-    )
-    drivers = result.scalars().all()
-    
     service = DriverAssignmentService(db)
-    nearby = []
     
-    for driver in drivers:
-        distance = service._haversine_distance(
-            request.latitude, request.longitude,
-            driver.last_latitude, driver.last_longitude
-        )
-        
-        if distance <= request.radius_km:
-            active_orders = await service._get_driver_active_orders_count(driver.id)
-            nearby.append({
-                "id": driver.id,
-                "name": driver.full_name,
-                "distance_km": round(distance, 2),
-                "rating": driver.average_rating,
-                "active_orders": active_orders,
-                "latitude": driver.last_latitude,
-                "longitude": driver.last_longitude,
-            })
-    
-    # Sort by distance
-    nearby.sort(key=lambda x: x["distance_km"])
+    # Drivers inside the radius with their active orders, nearest first (one query)
+    candidates = await service.get_candidates(request.latitude, request.longitude, request.radius_km)
+    
+    nearby = [
+        {
+            "id": driver.id,
+            "name": driver.full_name,
+            "distance_km": round(distance, 2),
+            "rating": getattr(driver, "average_rating", None),
+            "active_orders": active_orders,
+            "latitude": driver.last_latitude,
+            "longitude": driver.last_longitude,
+        }
+        for driver, active_orders, _, distance in candidates
+    ]
     
     return {
         "count": len(nearby),
@@ -144,8 +127,8 @@ async def manual_assign_driver(
     from app.models.order import Order, OrderStatus
     from app.models.user import User
     
-    # Verify order exists
-    order_result = await db.execute(select(Order).where(Order.id == order_id))
+    # Verify order exists (row-locked against a concurrent dispatch round)
+    order_result = await db.execute(select(Order).where(Order.id == order_id).with_for_update())
     order = order_result.scalars().first()
     
     if not order:
@@ -164,8 +147,7 @@ async def manual_assign_driver(
         raise HTTPException(status_code=404, detail="Driver not found or inactive")
     
     # Assign
-    order.driver_id = driver.id
-    order.status = OrderStatus.OUT_FOR_DELIVERY
+    await DriverAssignmentService(db).assign(order, driver.id, OrderStatus.OUT_FOR_DELIVERY, user=current_user)
     await db.commit()
     
     # Notify driver
@@ -12,6 +12,7 @@ from app.models.user import User, UserRole
 from app.models.order import Order, OrderStatus
 from app.api import deps
 from app.services.redis_service import redis_service
+from app.services.geo_index import geo_index
 import json
 
 router = APIRouter()
@@ -107,17 +108,8 @@ async def update_driver_location(
     if current_user.role != UserRole.DRIVER:
         raise HTTPException(status_code=403, detail="Drivers only")
     
-    # Store in Redis for real-time access
-    location_key = f"driver_location:{current_user.id}"
-    location_data = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "heading": heading,
-        "speed": speed,
-        "updated_at": datetime.utcnow().isoformat(),
-    }
-    
-    await redis_service.set(location_key, json.dumps(location_data), ex=300)  # 5 min expiry
+    # Store in Redis for real-time access (tracking key + GEO set for nearby search)
+    await geo_index.update_driver_position(current_user.id, latitude, longitude, heading, speed)
     
     # Also update database occasionally
     current_user.last_latitude = latitude
@@ -139,42 +131,19 @@ async def get_nearby_drivers(
     """
     Get nearby available drivers (Admin only).
     """
-    result = await db.execute(
-        select(User).where(
-            User.role == UserRole.DRIVER,
-            User.is_active == True
-        )
-    )
-    drivers = result.scalars().all()
-    
-    from math import radians, sin, cos, sqrt, atan2
-    
-    def calculate_distance(lat1, lon1, lat2, lon2):
-        R = 6371
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1-a))
-        return R * c
-    
-    nearby = []
-    for driver in drivers:
-        if driver.last_latitude and driver.last_longitude:
-            distance = calculate_distance(
-                latitude, longitude,
-                driver.last_latitude, driver.last_longitude
-            )
-            if distance <= radius_km:
-                nearby.append({
-                    "id": driver.id,
-                    "name": driver.full_name,
-                    "distance_km": round(distance, 2),
-                    "latitude": driver.last_latitude,
-                    "longitude": driver.last_longitude,
-                })
-    
-    nearby.sort(key=lambda x: x["distance_km"])
+    # Only drivers inside the radius, nearest first
+    candidates = await geo_index.driver_candidates(db, latitude, longitude, radius_km)
+    
+    nearby = [
+        {
+            "id": driver.id,
+            "name": driver.full_name,
+            "distance_km": round(distance, 2),
+            "latitude": driver.last_latitude,
+            "longitude": driver.last_longitude,
+        }
+        for driver, distance in candidates
+    ]
     
     return {
         "count": len(nearby),
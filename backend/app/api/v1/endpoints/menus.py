@@ -8,6 +8,7 @@ from app.api import deps
 from app.db.session import get_db
 from app.models.menu import Menu, Category, MenuItem
 from app.models.user import User, UserRole
+from app.services.catalog_events import bump_catalog_version
 from app.schemas.menu import (
     Menu as MenuSchema, MenuCreate, MenuUpdate,
     Category as CategorySchema, CategoryCreate, CategoryUpdate,
@@ -99,6 +100,7 @@ async def create_menu(
     
     menu = Menu(**menu_in.model_dump())
     db.add(menu)
+    await bump_catalog_version(db, menu.restaurant_id)
     await db.commit()
     await db.refresh(menu)
     
@@ -158,6 +160,7 @@ async def update_menu(
         setattr(menu, field, value)
     
     db.add(menu)
+    await bump_catalog_version(db, menu.restaurant_id)
     await db.commit()
     await db.refresh(menu)
     return menu
@@ -171,7 +174,9 @@ async def delete_menu(
     """Delete a menu."""
     menu = await verify_menu_access(db, current_user, menu_id)
     
+    restaurant_id = menu.restaurant_id
     await db.delete(menu)
+    await bump_catalog_version(db, restaurant_id)
     await db.commit()
     return {"message": "Menu deleted successfully"}
 
@@ -212,10 +217,11 @@ async def create_category(
 ) -> Any:
     """Create a new category."""
     # Verify access to the menu
-    await verify_menu_access(db, current_user, category_in.menu_id)
+    menu = await verify_menu_access(db, current_user, category_in.menu_id)
     
     category = Category(**category_in.model_dump())
     db.add(category)
+    await bump_catalog_version(db, menu.restaurant_id)
     await db.commit()
     await db.refresh(category)
     
@@ -257,7 +263,9 @@ async def update_category(
     for field, value in update_data.items():
         setattr(category, field, value)
     
+    restaurant_id = category.menu.restaurant_id
     db.add(category)
+    await bump_catalog_version(db, restaurant_id)
     await db.commit()
     await db.refresh(category)
     return category
@@ -271,7 +279,9 @@ async def delete_category(
     """Delete a category."""
     category = await verify_category_access(db, current_user, category_id)
     
+    restaurant_id = category.menu.restaurant_id
     await db.delete(category)
+    await bump_catalog_version(db, restaurant_id)
     await db.commit()
     return {"message": "Category deleted successfully"}
 
@@ -326,10 +336,12 @@ async def create_item(
 ) -> Any:
     """Create a new menu item."""
     # Verify access to the category
-    await verify_category_access(db, current_user, item_in.category_id)
+    category = await verify_category_access(db, current_user, item_in.category_id)
+    restaurant_id = category.menu.restaurant_id
     
     item = MenuItem(**item_in.model_dump())
     db.add(item)
+    await bump_catalog_version(db, restaurant_id)
     await db.commit()
     await db.refresh(item)
     return item
@@ -358,7 +370,9 @@ async def update_menu_item(
     for field, value in update_data.items():
         setattr(item, field, value)
     
+    restaurant_id = item.category.menu.restaurant_id
     db.add(item)
+    await bump_catalog_version(db, restaurant_id)
     await db.commit()
     await db.refresh(item)
     return item
@@ -372,6 +386,8 @@ async def delete_menu_item(
     """Delete a menu item."""
     item = await verify_menu_item_access(db, current_user, item_id)
     
+    restaurant_id = item.category.menu.restaurant_id
     await db.delete(item)
+    await bump_catalog_version(db, restaurant_id)
     await db.commit()
     return {"message": "Menu item deleted successfully"}
@@ -254,9 +254,9 @@ async def assign_driver(
     """
     Assign a driver to an order.
     """
-    # Check if order exists
+    # Check if order exists (row-locked against a concurrent dispatch round)
     order_result = await db.execute(
-        select(Order).where(Order.id == order_id)
+        select(Order).where(Order.id == order_id).with_for_update()
     )
     order = order_result.scalars().first()
 
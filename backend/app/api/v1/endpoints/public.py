@@ -3,7 +3,7 @@ Public API endpoints - No authentication required
 For the customer-facing website: liondelivery-saida.com
 """
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
@@ -18,6 +18,10 @@ from app.models.menu import Menu, Category, MenuItem, MenuItemVariant
 from app.models.order import Order, OrderItem, OrderStatus
 from app.models.user import User
 from app.core.websocket_manager import ws_manager
+from app.core.http_cache import public_response_cache
+from app.services.restaurant_slugs import slugify, restaurant_slug_cache
+from app.services import catalog_search
+from app.services.autocomplete import autocomplete_service
 
 logger = logging.getLogger(__name__)
 
@@ -53,15 +57,11 @@ class CreatePublicOrder(BaseModel):
     scheduled_time: Optional[datetime] = None  # For order scheduling
 
 
-def slugify(text: str) -> str:
-    """Generate a slug from text"""
-    return text.lower().replace(" ", "-").replace("&", "and")
-
-
 # ==================== PUBLIC RESTAURANT ENDPOINTS ====================
 
 @router.get("/restaurants/")
 async def get_public_restaurants(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     category_id: Optional[int] = Query(None, description="Filter by category ID"),
     search: Optional[str] = Query(None, description="Search by name"),
@@ -73,57 +73,61 @@ async def get_public_restaurants(
     Get all active restaurants for the public website.
     No authentication required.
     """
-    query = select(Restaurant).options(selectinload(Restaurant.category)).where(Restaurant.is_active == True)
-
-    # Filter by category
-    if category_id:
-        query = query.where(Restaurant.category_id == category_id)
-
-    # Search
-    if search:
-        search_term = f"%{search}%"
-        query = query.where(
-            (Restaurant.name.ilike(search_term)) |
-            (Restaurant.name_ar.ilike(search_term))
-        )
-
-    # Sort
-    if sort == "name":
-        query = query.order_by(Restaurant.name)
-    else:  # newest (default) - use id as proxy for creation time
-        query = query.order_by(Restaurant.id.desc())
+    async def render():
+        query = select(Restaurant).options(selectinload(Restaurant.category)).where(Restaurant.is_active == True)
+
+        # Filter by category
+        if category_id:
+            query = query.where(Restaurant.category_id == category_id)
+
+        # Search
+        if search:
+            search_term = f"%{search}%"
+            query = query.where(
+                (Restaurant.name.ilike(search_term)) |
+                (Restaurant.name_ar.ilike(search_term))
+            )
+
+        # Sort
+        if sort == "name":
+            query = query.order_by(Restaurant.name)
+        else:  # newest (default) - use id as proxy for creation time
+            query = query.order_by(Restaurant.id.desc())
+
+        # Pagination
+        query = query.offset(offset).limit(limit)
+
+        result = await db.execute(query)
+        restaurants = result.scalars().all()
+
+        # Format response
+        return {
+            "restaurants": [
+                {
+                    "id": r.id,
+                    "name": r.name,
+                    "name_ar": r.name_ar,
+                    "slug": r.slug or slugify(r.name),
+                    "description": r.description,
+                    "description_ar": r.description_ar,
+                    "image": r.logo_url,
+                    "category": r.category.name if r.category else None,
+                    "category_ar": r.category.name_ar if r.category else None,
+                    "category_id": r.category_id,
+                    "phone": r.phone_number,
+                }
+                for r in restaurants
+            ],
+            "total": len(restaurants),
+            "has_more": len(restaurants) == limit,
+        }
 
-    # Pagination
-    query = query.offset(offset).limit(limit)
-
-    result = await db.execute(query)
-    restaurants = result.scalars().all()
-
-    # Format response
-    return {
-        "restaurants": [
-            {
-                "id": r.id,
-                "name": r.name,
-                "name_ar": r.name_ar,
-                "slug": slugify(r.name),
-                "description": r.description,
-                "description_ar": r.description_ar,
-                "image": r.logo_url,
-                "category": r.category.name if r.category else None,
-                "category_ar": r.category.name_ar if r.category else None,
-                "category_id": r.category_id,
-                "phone": r.phone_number,
-            }
-            for r in restaurants
-        ],
-        "total": len(restaurants),
-        "has_more": len(restaurants) == limit,
-    }
+    return await public_response_cache.respond(request, render)
 
 
 @router.get("/restaurants/{restaurant_id}")
 async def get_public_restaurant(
+    request: Request,
     restaurant_id: int,
     db: AsyncSession = Depends(get_db),
 ) -> Any:
@@ -131,33 +135,37 @@ async def get_public_restaurant(
     Get a single restaurant by ID for the public website.
     No authentication required.
     """
-    result = await db.execute(
-        select(Restaurant)
-        .options(selectinload(Restaurant.category))
-        .where(Restaurant.id == restaurant_id, Restaurant.is_active == True)
-    )
-    restaurant = result.scalars().first()
-
-    if not restaurant:
-        raise HTTPException(status_code=404, detail="Restaurant not found")
+    async def render():
+        result = await db.execute(
+            select(Restaurant)
+            .options(selectinload(Restaurant.category))
+            .where(Restaurant.id == restaurant_id, Restaurant.is_active == True)
+        )
+        restaurant = result.scalars().first()
+
+        if not restaurant:
+            raise HTTPException(status_code=404, detail="Restaurant not found")
+
+        return {
+            "id": restaurant.id,
+            "name": restaurant.name,
+            "name_ar": restaurant.name_ar,
+            "slug": restaurant.slug or slugify(restaurant.name),
+            "description": restaurant.description,
+            "description_ar": restaurant.description_ar,
+            "image": restaurant.logo_url,
+            "category": restaurant.category.name if restaurant.category else None,
+            "category_ar": restaurant.category.name_ar if restaurant.category else None,
+            "category_id": restaurant.category_id,
+            "phone": restaurant.phone_number,
+        }
 
-    return {
-        "id": restaurant.id,
-        "name": restaurant.name,
-        "name_ar": restaurant.name_ar,
-        "slug": slugify(restaurant.name),
-        "description": restaurant.description,
-        "description_ar": restaurant.description_ar,
-        "image": restaurant.logo_url,
-        "category": restaurant.category.name if restaurant.category else None,
-        "category_ar": restaurant.category.name_ar if restaurant.category else None,
-        "category_id": restaurant.category_id,
-        "phone": restaurant.phone_number,
-    }
+    return await public_response_cache.respond(request, render, restaurant_id)
 
 
 @router.get("/restaurants/slug/{slug}")
 async def get_public_restaurant_by_slug(
+    request: Request,
     slug: str,
     db: AsyncSession = Depends(get_db),
 ) -> Any:
@@ -165,72 +173,50 @@ async def get_public_restaurant_by_slug(
     Get a single restaurant by slug for the public website.
     No authentication required.
     """
-    # Since we don't have a slug column, we search by name matching the slug pattern
-    result = await db.execute(
-        select(Restaurant)
-        .options(selectinload(Restaurant.category))
-        .where(Restaurant.is_active == True)
-    )
-    restaurants = result.scalars().all()
-
-    # Find restaurant whose slugified name matches the slug
-    restaurant = None
-    for r in restaurants:
-        if slugify(r.name) == slug:
-            restaurant = r
-            break
-
-    if not restaurant:
+    restaurant_id = await restaurant_slug_cache.get_id(db, slug)
+    if restaurant_id is None:
         raise HTTPException(status_code=404, detail="Restaurant not found")
-
-    return {
-        "id": restaurant.id,
-        "name": restaurant.name,
-        "name_ar": restaurant.name_ar,
-        "slug": slugify(restaurant.name),
-        "description": restaurant.description,
-        "description_ar": restaurant.description_ar,
-        "image": restaurant.logo_url,
-        "category": restaurant.category.name if restaurant.category else None,
-        "category_ar": restaurant.category.name_ar if restaurant.category else None,
-        "category_id": restaurant.category_id,
-        "phone": restaurant.phone_number,
-    }
+    return await get_public_restaurant(request, restaurant_id, db)
 
 
 # ==================== PUBLIC CATEGORIES ENDPOINTS ====================
 
 @router.get("/categories/")
 async def get_public_categories(
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Get all restaurant categories for the public website.
     No authentication required.
     """
-    result = await db.execute(
-        select(RestaurantCategory)
-        .where(RestaurantCategory.is_active == True)
-        .order_by(RestaurantCategory.order)
-    )
-    categories = result.scalars().all()
-
-    return [
-        {
-            "id": c.id,
-            "name": c.name,
-            "name_ar": c.name_ar,
-            "icon": c.icon,
-            "slug": slugify(c.name),
-        }
-        for c in categories
-    ]
+    async def render():
+        result = await db.execute(
+            select(RestaurantCategory)
+            .where(RestaurantCategory.is_active == True)
+            .order_by(RestaurantCategory.order)
+        )
+        categories = result.scalars().all()
+
+        return [
+            {
+                "id": c.id,
+                "name": c.name,
+                "name_ar": c.name_ar,
+                "icon": c.icon,
+                "slug": slugify(c.name),
+            }
+            for c in categories
+        ]
+
+    return await public_response_cache.respond(request, render)
 
 
 # ==================== PUBLIC MENU ENDPOINTS ====================
 
 @router.get("/restaurants/{restaurant_id}/menu")
 async def get_public_restaurant_menu(
+    request: Request,
     restaurant_id: int,
     db: AsyncSession = Depends(get_db),
 ) -> Any:
@@ -238,73 +224,77 @@ async def get_public_restaurant_menu(
     Get the menu for a restaurant for the public website.
     No authentication required.
     """
-    # Verify restaurant exists and is active
-    rest_result = await db.execute(
-        select(Restaurant).where(Restaurant.id == restaurant_id, Restaurant.is_active == True)
-    )
-    restaurant = rest_result.scalars().first()
-    if not restaurant:
-        raise HTTPException(status_code=404, detail="Restaurant not found")
-
-    # Get menu with categories and items
-    result = await db.execute(
-        select(Menu)
-        .options(
-            selectinload(Menu.categories)
-            .selectinload(Category.items)
-            .selectinload(MenuItem.variants)
+    async def render():
+        # Verify restaurant exists and is active
+        rest_result = await db.execute(
+            select(Restaurant).where(Restaurant.id == restaurant_id, Restaurant.is_active == True)
         )
-        .where(Menu.restaurant_id == restaurant_id, Menu.is_active == True)
-    )
-    menu = result.scalars().first()
+        restaurant = rest_result.scalars().first()
+        if not restaurant:
+            raise HTTPException(status_code=404, detail="Restaurant not found")
+
+        # Get menu with categories and items
+        result = await db.execute(
+            select(Menu)
+            .options(
+                selectinload(Menu.categories)
+                .selectinload(Category.items)
+                .selectinload(MenuItem.variants)
+            )
+            .where(Menu.restaurant_id == restaurant_id, Menu.is_active == True)
+        )
+        menu = result.scalars().first()
+
+        if not menu:
+            return {"restaurant_id": restaurant_id, "categories": []}
+
+        return {
+            "restaurant_id": restaurant_id,
+            "categories": [
+                {
+                    "id": cat.id,
+                    "name": cat.name,
+                    "name_ar": cat.name_ar,
+                    "order": cat.order,
+                    "items": [
+                        {
+                            "id": item.id,
+                            "name": item.name,
+                            "name_ar": item.name_ar,
+                            "description": item.description,
+                            "description_ar": item.description_ar,
+                            "price": float(item.price) if item.price is not None else None,
+                            "price_min": float(item.price_min) if item.price_min is not None else None,
+                            "price_max": float(item.price_max) if item.price_max is not None else None,
+                            "image": item.image_url,
+                            "is_available": item.is_available,
+                            "has_variants": item.has_variants,
+                            "variants": [
+                                {
+                                    "id": v.id,
+                                    "name": v.name,
+                                    "name_ar": v.name_ar,
+                                    "price": float(v.price) if v.price is not None else 0,
+                                }
+                                for v in sorted(item.variants, key=lambda x: x.order or 0)
+                            ] if item.variants else [],
+                        }
+                        for item in sorted(cat.items, key=lambda x: x.order or 0)
+                        if item.is_available
+                    ]
+                }
+                for cat in sorted(menu.categories, key=lambda x: x.order or 0)
+            ]
+        }
 
-    if not menu:
-        return {"restaurant_id": restaurant_id, "categories": []}
-
-    return {
-        "restaurant_id": restaurant_id,
-        "categories": [
-            {
-                "id": cat.id,
-                "name": cat.name,
-                "name_ar": cat.name_ar,
-                "order": cat.order,
-                "items": [
-                    {
-                        "id": item.id,
-                        "name": item.name,
-                        "name_ar": item.name_ar,
-                        "description": item.description,
-                        "description_ar": item.description_ar,
-                        "price": float(item.price) if item.price is not None else None,
-                        "price_min": float(item.price_min) if item.price_min is not None else None,
-                        "price_max": float(item.price_max) if item.price_max is not None else None,
-                        "image": item.image_url,
-                        "is_available": item.is_available,
-                        "has_variants": item.has_variants,
-                        "variants": [
-                            {
-                                "id": v.id,
-                                "name": v.name,
-                                "name_ar": v.name_ar,
-                                "price": float(v.price) if v.price is not None else 0,
-                            }
-                            for v in sorted(item.variants, key=lambda x: x.order or 0)
-                        ] if item.variants else [],
-                    }
-                    for item in sorted(cat.items, key=lambda x: x.order or 0)
-                    if item.is_available
-                ]
-            }
-            for cat in sorted(menu.categories, key=lambda x: x.order or 0)
-        ]
-    }
+    return await public_response_cache.respond(request, render, restaurant_id)
 
 
 # ==================== PUBLIC FEATURED ENDPOINTS ====================
 
 @router.get("/featured/restaurants/")
 async def get_featured_restaurants(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     limit: int = Query(6, le=20),
 ) -> Any:
@@ -313,28 +303,31 @@ async def get_featured_restaurants(
     No authentication required.
     Since we don't have is_featured column, return the first N restaurants.
     """
-    result = await db.execute(
-        select(Restaurant)
-        .options(selectinload(Restaurant.category))
-        .where(Restaurant.is_active == True)
-        .order_by(Restaurant.id)
-        .limit(limit)
-    )
-    restaurants = result.scalars().all()
-
-    return [
-        {
-            "id": r.id,
-            "name": r.name,
-            "name_ar": r.name_ar,
-            "slug": slugify(r.name),
-            "image": r.logo_url,
-            "category": r.category.name if r.category else None,
-            "category_ar": r.category.name_ar if r.category else None,
-            "phone": r.phone_number,
-        }
-        for r in restaurants
-    ]
+    async def render():
+        result = await db.execute(
+            select(Restaurant)
+            .options(selectinload(Restaurant.category))
+            .where(Restaurant.is_active == True)
+            .order_by(Restaurant.id)
+            .limit(limit)
+        )
+        restaurants = result.scalars().all()
+
+        return [
+            {
+                "id": r.id,
+                "name": r.name,
+                "name_ar": r.name_ar,
+                "slug": r.slug or slugify(r.name),
+                "image": r.logo_url,
+                "category": r.category.name if r.category else None,
+                "category_ar": r.category.name_ar if r.category else None,
+                "phone": r.phone_number,
+            }
+            for r in restaurants
+        ]
+
+    return await public_response_cache.respond(request, render)
 
 
 # ==================== PUBLIC SEARCH ENDPOINT ====================
@@ -346,34 +339,11 @@ async def public_search(
     limit: int = Query(20, le=50),
 ) -> Any:
     """
-    Search restaurants and menu items.
+    Search restaurants and menu items (Arabic and English, best match first).
     No authentication required.
     """
-    search_term = f"%{q}%"
-
-    # Search restaurants
-    rest_result = await db.execute(
-        select(Restaurant)
-        .options(selectinload(Restaurant.category))
-        .where(
-            Restaurant.is_active == True,
-            (Restaurant.name.ilike(search_term)) | (Restaurant.name_ar.ilike(search_term))
-        )
-        .limit(limit)
-    )
-    restaurants = rest_result.scalars().all()
-
-    # Search menu items
-    items_result = await db.execute(
-        select(MenuItem)
-        .options(selectinload(MenuItem.category).selectinload(Category.menu))
-        .where(
-            MenuItem.is_available == True,
-            (MenuItem.name.ilike(search_term)) | (MenuItem.name_ar.ilike(search_term))
-        )
-        .limit(limit)
-    )
-    items = items_result.scalars().all()
+    restaurants, _ = await catalog_search.search_restaurants(db, q, limit=limit)
+    items, _ = await catalog_search.search_menu_items(db, q, limit=limit)
 
     return {
         "restaurants": [
@@ -381,28 +351,42 @@ async def public_search(
                 "id": r.id,
                 "name": r.name,
                 "name_ar": r.name_ar,
-                "slug": slugify(r.name),
+                "slug": r.slug or slugify(r.name),
                 "image": r.logo_url,
                 "category": r.category.name if r.category else None,
                 "category_ar": r.category.name_ar if r.category else None,
             }
-            for r in restaurants
+            for r, _rank in restaurants
         ],
         "items": [
             {
-                "id": item.id,
-                "name": item.name,
-                "name_ar": item.name_ar,
-                "price": float(item.price) if item.price else None,
-                "image": item.image_url,
-                "restaurant_id": item.category.menu.restaurant_id if item.category and item.category.menu else None,
+                "id": row.MenuItem.id,
+                "name": row.MenuItem.name,
+                "name_ar": row.MenuItem.name_ar,
+                "price": float(row.MenuItem.price) if row.MenuItem.price else None,
+                "image": row.MenuItem.image_url,
+                "restaurant_id": row.restaurant_id,
             }
-            for item in items
-            if item.category and item.category.menu
+            for row in items
         ],
     }
 
 
+@router.get("/autocomplete")
+async def public_autocomplete(
+    q: str = Query(..., min_length=1, max_length=100, description="Typed prefix"),
+    limit: int = Query(10, ge=1, le=20),
+) -> Any:
+    """
+    Restaurant and menu item suggestions for a typed prefix (per keystroke).
+    Answered from memory, most ordered first. No authentication required.
+    """
+    return {
+        "query": q,
+        "suggestions": await autocomplete_service.complete(q, limit),
+    }
+
+
 # ==================== PUBLIC SCHEDULING ENDPOINT ====================
 
 @router.get("/restaurants/{restaurant_id}/delivery-slots")
@@ -2,6 +2,7 @@ from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
 
 from app.api import deps
 from app.db.session import get_db
@@ -9,6 +10,8 @@ from app.models.restaurant import Restaurant, RestaurantCategory
 from app.models.user import User
 from app.schemas.restaurant import Restaurant as RestaurantSchema, RestaurantCreate, RestaurantUpdate
 from app.services.audit_service import get_audit_service
+from app.services.catalog_events import bump_catalog_version
+from app.services.restaurant_slugs import assign_slug, slug_derived_from
 
 router = APIRouter()
 
@@ -31,6 +34,7 @@ async def cleanup_all_restaurants(
     await db.execute(text("DELETE FROM menu"))
     await db.execute(text("DELETE FROM branch"))
     await db.execute(text("DELETE FROM restaurant"))
+    await bump_catalog_version(db, None)
     await db.commit()
 
     return {"message": "All restaurants and related data deleted successfully"}
@@ -77,9 +81,15 @@ async def create_restaurant(
     """
     Create new restaurant.
     """
-    restaurant = Restaurant(**restaurant_in.model_dump())
+    restaurant = Restaurant(**restaurant_in.model_dump(exclude={"slug"}))
+    await assign_slug(db, restaurant, restaurant_in.slug)
     db.add(restaurant)
-    await db.flush()
+    try:
+        await db.flush()
+    except IntegrityError:
+        # Another request took the same slug between the check and the INSERT
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"Slug '{restaurant.slug}' was just taken, please retry")
 
     # Audit log
     audit = get_audit_service(db)
@@ -91,6 +101,7 @@ async def create_restaurant(
         request=request,
     )
 
+    await bump_catalog_version(db, restaurant.id)
     await db.commit()
     await db.refresh(restaurant)
     return restaurant
@@ -132,14 +143,24 @@ async def update_restaurant(
     old_values = {
         "name": restaurant.name,
         "name_ar": restaurant.name_ar,
+        "slug": restaurant.slug,
         "description": restaurant.description,
         "is_active": restaurant.is_active,
         "commission_rate": float(restaurant.commission_rate) if restaurant.commission_rate else None,
     }
 
     update_data = restaurant_in.model_dump(exclude_unset=True)
+    requested_slug = update_data.pop("slug", None)
     for field, value in update_data.items():
         setattr(restaurant, field, value)
+    # Keep a derived slug in step with a renamed restaurant; custom slugs (and
+    # full-object PUTs repeating the same name) leave published URLs alone
+    renamed = (
+        restaurant.name != old_values["name"] and slug_derived_from(restaurant.slug, old_values["name"])
+    )
+    if requested_slug or renamed or not restaurant.slug:
+        await assign_slug(db, restaurant, requested_slug)
+        update_data["slug"] = restaurant.slug
 
     # Audit log
     audit = get_audit_service(db)
@@ -153,7 +174,13 @@ async def update_restaurant(
     )
 
     db.add(restaurant)
-    await db.commit()
+    await bump_catalog_version(db, restaurant_id)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another request took the same slug between the check and the UPDATE
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"Slug '{update_data.get('slug')}' was just taken, please retry")
     await db.refresh(restaurant)
     return restaurant
 
@@ -192,6 +219,7 @@ async def delete_restaurant(
     )
 
     await db.delete(restaurant)
+    await bump_catalog_version(db, restaurant_id)
     await db.commit()
     return {"message": "Restaurant deleted successfully"}
 
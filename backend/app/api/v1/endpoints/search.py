@@ -2,14 +2,15 @@
 Advanced Search API with filters
 """
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, func
+from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 
 from app.db.session import get_db
 from app.models.restaurant import Restaurant
 from app.models.menu import MenuItem
+from app.services import catalog_search
 
 router = APIRouter()
 
@@ -23,21 +24,45 @@ async def search_restaurants(
     min_rating: Optional[float] = Query(None, ge=0, le=5),
     free_delivery: Optional[bool] = Query(None),
     sort_by: Optional[str] = Query("popular", description="Sort: popular, rating, distance, newest"),
+    category_id: Optional[int] = Query(None, description="Restaurant category ID"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (text search)"),
     skip: int = 0,
-    limit: int = 20,
+    limit: int = Query(20, le=100),
 ) -> Any:
     """
     Search restaurants with multiple filters.
+    A text query is ranked by relevance (sort_by is ignored) and paged with
+    `cursor` or `skip`.
     """
-    query = select(Restaurant).where(Restaurant.is_active == True)
-    
-    # Text search
+    # Text search (full-text + trigram, Arabic and English)
     if q:
-        search_filter = or_(
-            Restaurant.name.ilike(f"%{q}%"),
-            Restaurant.description.ilike(f"%{q}%"),
-        )
-        query = query.where(search_filter)
+        try:
+            rows, next_cursor = await catalog_search.search_restaurants(
+                db, q, limit=limit, cursor=cursor, category_id=category_id, category=category,
+                is_active=is_open if is_open is not None else True, offset=skip,
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return {
+            "count": len(rows),
+            "next_cursor": next_cursor,
+            "restaurants": [
+                {
+                    "id": r.id,
+                    "name": r.name,
+                    "name_ar": r.name_ar,
+                    "description": r.description,
+                    "category": r.category.name if r.category else None,
+                    "is_active": r.is_active,
+                    "delivery_time": "30-45 min",
+                    "delivery_fee": 2.0,
+                    "score": round(rank, 4),
+                }
+                for r, rank in rows
+            ]
+        }
+
+    query = select(Restaurant).where(Restaurant.is_active == True)
     
     # Category filter
     if category:
@@ -89,20 +114,45 @@ async def search_menu_items(
     min_price: Optional[float] = Query(None),
     max_price: Optional[float] = Query(None),
     is_available: bool = True,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (text search)"),
     skip: int = 0,
-    limit: int = 30,
+    limit: int = Query(30, le=100),
 ) -> Any:
     """
     Search menu items across restaurants.
+    A text query is ranked by relevance and paged with `cursor` or `skip`.
     """
-    query = select(MenuItem).where(MenuItem.is_available == is_available)
-    
+    # Text search (full-text + trigram, Arabic and English)
     if q:
-        search_filter = or_(
-            MenuItem.name.ilike(f"%{q}%"),
-            MenuItem.description.ilike(f"%{q}%"),
-        )
-        query = query.where(search_filter)
+        try:
+            rows, next_cursor = await catalog_search.search_menu_items(
+                db, q, limit=limit, cursor=cursor,
+                restaurant_id=restaurant_id, min_price=min_price, max_price=max_price,
+                is_available=is_available, offset=skip, category=category,
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return {
+            "count": len(rows),
+            "next_cursor": next_cursor,
+            "items": [
+                {
+                    "id": row.MenuItem.id,
+                    "name": row.MenuItem.name,
+                    "name_ar": row.MenuItem.name_ar,
+                    "description": row.MenuItem.description,
+                    "price": float(row.MenuItem.price) if row.MenuItem.price is not None else None,
+                    "restaurant_id": row.restaurant_id,
+                    "restaurant_name": row.restaurant_name,
+                    "restaurant_name_ar": row.restaurant_name_ar,
+                    "is_available": row.MenuItem.is_available,
+                    "score": round(row.rank, 4),
+                }
+                for row in rows
+            ]
+        }
+
+    query = select(MenuItem).where(MenuItem.is_available == is_available)
     
     if restaurant_id:
         query = query.where(MenuItem.restaurant_id == restaurant_id)
@@ -8,6 +8,7 @@ from app.db.session import get_db
 from app.models.user import User, UserRole
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate, DriverLocationUpdate, DriverStatusUpdate
 from app.core.security import get_password_hash
+from app.services.geo_index import geo_index
 from app.core.validators import (
     validate_phone_number, validate_email, validate_name,
     validate_coordinates, validate_positive_integer, sanitize_text
@@ -255,6 +256,8 @@ async def update_driver_location(
     db.add(driver)
     await db.commit()
 
+    await geo_index.update_driver_position(driver_id, location_in.latitude, location_in.longitude)
+
     return {"message": "Location updated"}
 
 @router.patch("/drivers/{driver_id}/status")
@@ -279,5 +282,9 @@ async def update_driver_status(
     driver.is_active = status_in.is_active
     db.add(driver)
     await db.commit()
+
+    if not driver.is_active:
+        # Offline drivers drop out of nearby searches right away
+        await geo_index.remove_driver(driver_id)
     
     return {"status": "success", "is_active": driver.is_active}
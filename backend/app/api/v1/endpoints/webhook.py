@@ -51,7 +51,7 @@ async def verify_webhook(
     
     raise HTTPException(status_code=400, detail="Missing parameters")
 
-from app.controllers.bot_controller import bot_controller
+from app.services.webhook_queue import webhook_queue
 
 @router.post("/webhook")
 @limiter.limit("100/minute")
@@ -76,25 +76,9 @@ async def handle_webhook(
         if settings.DEBUG:
             logger.debug(f"Received webhook payload: {body}")
         
-        entries = body.get("entry", [])
-        if not entries:
-            return {"status": "received", "detail": "no entries"}
-            
-        entry = entries[0]
-        changes = entry.get("changes", [])
-        if not changes:
-            return {"status": "received", "detail": "no changes"}
-            
-        change = changes[0]
-        value = change.get("value", {})
-        messages = value.get("messages", [])
-        
-        if messages:
-            message = messages[0]
-            if message:
-                phone_number = message.get("from")
-                # Process message asynchronously
-                await bot_controller.handle_message(phone_number, message)
+        # Acknowledge now; workers handle every message/status in per-phone order
+        if not await webhook_queue.dispatch(body):
+            return {"status": "received", "detail": "no events"}
         
         return {"status": "received"}
     except Exception as e:
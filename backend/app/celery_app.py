@@ -3,6 +3,7 @@ Celery Application Configuration
 """
 from celery import Celery
 from app.core.config import settings
+from app.core.constants import DISPATCH_WINDOW_SECONDS
 
 celery_app = Celery(
     "lion_bot",
@@ -58,3 +59,10 @@ celery_app.conf.beat_schedule = {
         "schedule": 86400.0,  # 24 hours
     },
 }
+
+# Batch driver dispatch for orders collected during the window (opt-in)
+if settings.ENABLE_AUTO_DISPATCH:
+    celery_app.conf.beat_schedule["dispatch-orders"] = {
+        "task": "app.tasks.order_processing.dispatch_orders",
+        "schedule": float(DISPATCH_WINDOW_SECONDS),
+    }
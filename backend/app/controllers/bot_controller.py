@@ -1,7 +1,11 @@
-from app.services.whatsapp_service import whatsapp_service
+from app.services.whatsapp_service import whatsapp_service, interactive_list
+from app.services.interactive_cache import interactive_cache
+from app.services.numbered_menu import numbered_menu_cache
 from app.services.redis_service import redis_service
 from app.services.ai_service import ai_service
 from app.services.fcm_service import fcm_service
+from app.services.phone_lock import phone_lock
+from app.core.exceptions import MessageLockTimeoutError
 from app.core.i18n import get_text
 from app.core.constants import (
     lbp_to_usd, usd_to_lbp, format_price_usd,
@@ -12,7 +16,9 @@ from app.core.constants import (
     AI_RATE_LIMIT_REQUESTS, AI_RATE_LIMIT_WINDOW
 )
 from app.core.validators import validate_quantity, validate_rating, sanitize_text
-from app.db.session import AsyncSessionLocal
+from app.controllers.message_context import (
+    message_context, message_session, load_user, remember_user, load_loyalty, remember_loyalty,
+)
 from app.models.restaurant import Restaurant, Branch, RestaurantCategory
 from app.models.menu import Menu, MenuItem, Category
 from app.models.order import Order, OrderItem, OrderStatus
@@ -50,8 +56,44 @@ class BotController:
         """Main entry point for handling incoming WhatsApp messages"""
         logger.debug(f"Handling message from {phone_number}")
 
+        # One message per user at a time: state and cart updates are read-modify-write
+        try:
+            async with phone_lock.hold(phone_number):
+                await self._handle_locked(phone_number, message_body)
+        except MessageLockTimeoutError as e:
+            # Running it unlocked would race the stuck handler on state and
+            # cart; ask the user to resend instead
+            e.log(logging.WARNING)
+            await self._reply_still_processing(phone_number)
+
+    async def _reply_still_processing(self, phone_number: str):
+        """Tell a user whose previous message is still being handled to resend"""
         try:
             state_data = await redis_service.get_user_state(phone_number)
+            lang = (state_data or {}).get("data", {}).get("lang", "ar")
+        except Exception:
+            lang = "ar"
+        await whatsapp_service.send_text(phone_number, get_text("still_processing", lang))
+
+    async def _handle_locked(self, phone_number: str, message_body: dict):
+        # Handlers share one DB session, the sender's User/loyalty rows and
+        # a single cart read for the whole message
+        async with message_context(phone_number) as ctx:
+            await self._dispatch_message(ctx, message_body)
+
+    async def handle_status(self, phone_number: str, status: dict):
+        """Delivery status update (sent/delivered/read/failed) for an outbound message"""
+        if status.get("status") == "failed":
+            errors = [f"{e.get('code')}: {e.get('title')}" for e in status.get("errors") or []]
+            logger.warning(f"WhatsApp message {status.get('id')} to {phone_number} failed: {errors}")
+        else:
+            logger.debug(f"WhatsApp message {status.get('id')} to {phone_number}: {status.get('status')}")
+
+    async def _dispatch_message(self, ctx, message_body: dict):
+        """Load the user's state and route the message to its handler"""
+        phone_number = ctx.phone_number
+        try:
+            state_data = await ctx.get_state()
             logger.debug(f"User state data: {state_data}")
         except Exception as e:
             logger.error(f"Failed to get user state: {e}")
@@ -407,7 +449,7 @@ class BotController:
 
     async def _quick_add_favorite_item(self, phone_number: str, item_id: int, restaurant_id: int, lang: str):
         """Quickly add a favorite item to cart"""
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             result = await db.execute(
                 select(MenuItem, Restaurant)
                 .join(Category, MenuItem.category_id == Category.id)
@@ -443,8 +485,7 @@ class BotController:
             await redis_service.add_to_cart(phone_number, cart_item)
 
             # Get cart total
-            cart_total = await redis_service.get_cart_total(phone_number)
-            cart_count = await redis_service.get_cart_count(phone_number)
+            cart_count, cart_total = await redis_service.get_cart_totals(phone_number)
 
             response = f"⚡ *طلب سريع!*\n\n"
             response += f"✅ تم إضافة {item_name}\n"
@@ -499,9 +540,8 @@ class BotController:
 
     async def _proceed_after_location(self, phone_number: str, lang: str, user_data: dict):
         """Next step after obtaining location/address"""
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+        async with message_session() as db:
+            user = await load_user(db, phone_number)
             
             # Check if we need a name
             if not user or not user.full_name or user.full_name == "WhatsApp Customer":
@@ -596,406 +636,418 @@ class BotController:
         import asyncio
         ITEMS_PER_PAGE = 9  # Leave room for navigation
 
-        categories = None
-        for attempt in range(3):
-            try:
-                async with AsyncSessionLocal() as db:
-                    result = await db.execute(
-                        select(RestaurantCategory)
-                        .where(RestaurantCategory.is_active == True)
-                        .order_by(RestaurantCategory.order)
-                    )
-                    categories = result.scalars().all()
-                    break
-            except Exception as e:
-                logger.error(f"DB attempt {attempt+1}/3 failed: {e}")
-                if attempt < 2:
-                    await asyncio.sleep(1)
-                else:
-                    await whatsapp_service.send_text(phone_number, "⚠️ عذراً، في مشكلة. جرب كمان مرة!")
-                    await self._send_main_menu(phone_number, lang)
-                    return
-
-        if not categories:
-            # Fallback to showing all restaurants if no categories exist
-            await self._show_restaurants(phone_number, lang)
-            return
-
-        # Pagination
-        total_categories = len(categories)
-        start_idx = page * ITEMS_PER_PAGE
-        end_idx = start_idx + ITEMS_PER_PAGE
-        categories_to_show = categories[start_idx:end_idx]
-        has_more = total_categories > end_idx
-        has_prev = page > 0
-
-        rows = [
-            {
-                "id": f"restcat_{c.id}",
-                "title": f"{c.icon} {c.name_ar if lang == 'ar' else c.name}"[:24],
-                "description": ""
-            }
-            for c in categories_to_show
-        ]
-
-        # Add navigation buttons
-        if has_prev:
-            rows.append({
-                "id": f"restcat_page_{page - 1}",
-                "title": "⬅️ السابق" if lang == 'ar' else "⬅️ Previous",
-                "description": ""
-            })
-
-        if has_more:
-            remaining = total_categories - end_idx
-            rows.append({
-                "id": f"restcat_page_{page + 1}",
-                "title": "التالي ➡️" if lang == 'ar' else "Next ➡️",
-                "description": f"{remaining} {'تصنيف آخر' if lang == 'ar' else 'more categories'}"
-            })
-
-        # Build page info
-        total_pages = (total_categories + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
-        page_info = f" ({page + 1}/{total_pages})" if total_pages > 1 else ""
-
-        sections = [{
-            "title": f"{get_text('select_category', lang) if lang == 'ar' else 'Select Category'}{page_info}"[:24],
-            "rows": rows
-        }]
-
-        header = "🍽️ اختر نوع المطعم:" if lang == "ar" else "🍽️ Choose restaurant type:"
-
-        await whatsapp_service.send_interactive_list(
-            phone_number,
-            header,
-            get_text("view_restaurants", lang),
-            sections
-        )
-        await redis_service.set_user_state(phone_number, "BROWSING_REST_CATEGORIES", {"lang": lang, "page": page})
-
-    async def _show_restaurants_by_category(self, phone_number: str, category_id: int, lang: str, page: int = 0):
-        """Show restaurants filtered by category with pagination"""
-        async with AsyncSessionLocal() as db:
-            # Get category info
-            cat_result = await db.execute(
-                select(RestaurantCategory).where(RestaurantCategory.id == category_id)
-            )
-            category = cat_result.scalars().first()
-            
-            if not category:
-                await self._show_restaurant_categories(phone_number, lang)
-                return
-
-            # Get all restaurants in this category
-            result = await db.execute(
-                select(Restaurant)
-                .where(Restaurant.is_active == True)
-                .where(Restaurant.category_id == category_id)
-            )
-            all_restaurants = result.scalars().all()
-
-            if not all_restaurants:
-                no_rest_msg = f"لا توجد مطاعم في قسم {category.name_ar}" if lang == "ar" else f"No restaurants in {category.name} category"
-                await whatsapp_service.send_text(phone_number, no_rest_msg)
-                await self._show_restaurant_categories(phone_number, lang)
-                return
-
-            cat_name = category.name_ar if lang == "ar" else category.name
-            
-            # Pagination: 9 items per page (leaving room for "More" option)
-            items_per_page = 9
-            start_idx = page * items_per_page
-            end_idx = start_idx + items_per_page
-            restaurants_to_show = all_restaurants[start_idx:end_idx]
-            has_more = len(all_restaurants) > end_idx
-            
-            rows = [
-                {
-                    "id": f"rest_{r.id}",
-                    "title": (r.name_ar if lang == 'ar' and r.name_ar else r.name)[:24],
-                    "description": ((r.description_ar if lang == 'ar' and r.description_ar else r.description) or "")[:70]
-                }
-                for r in restaurants_to_show
-            ]
-            
-            # Add "More" option if there are more restaurants
-            if has_more:
-                more_text = "المزيد ←" if lang == "ar" else "More →"
-                rows.append({
-                    "id": f"more_rest_{category_id}_{page + 1}",
-                    "title": more_text,
-                    "description": f"{len(all_restaurants) - end_idx} {'مطعم آخر' if lang == 'ar' else 'more restaurants'}"
-                })
-            
-            sections = [{
-                "title": f"{category.icon} {cat_name}"[:24],
-                "rows": rows
-            }]
-
-            await whatsapp_service.send_interactive_list(
-                phone_number,
-                get_text("select_restaurant", lang),
-                get_text("view_restaurants", lang),
-                sections
-            )
-            await redis_service.set_user_state(phone_number, "BROWSING_RESTAURANTS", {"lang": lang, "rest_category_id": category_id, "page": page})
-
-    async def _show_restaurants(self, phone_number: str, lang: str, page: int = 0):
-        """Show available restaurants list with pagination (max 10 items per WhatsApp message)"""
-        ITEMS_PER_PAGE = 9  # Leave room for "More" button
-
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(
-                select(Restaurant)
-                .where(Restaurant.is_active == True)
-            )
-            all_restaurants = result.scalars().all()
+        async def render():
+            categories = None
+            for attempt in range(3):
+                try:
+                    async with message_session() as db:
+                        result = await db.execute(
+                            select(RestaurantCategory)
+                            .where(RestaurantCategory.is_active == True)
+                            .order_by(RestaurantCategory.order)
+                        )
+                        categories = result.scalars().all()
+                        break
+                except Exception as e:
+                    logger.error(f"DB attempt {attempt+1}/3 failed: {e}")
+                    if attempt < 2:
+                        await asyncio.sleep(1)
+                    else:
+                        await whatsapp_service.send_text(phone_number, "⚠️ عذراً، في مشكلة. جرب كمان مرة!")
+                        await self._send_main_menu(phone_number, lang)
+                        return None
 
-            if not all_restaurants:
-                await whatsapp_service.send_text(phone_number, get_text("no_restaurants", lang))
-                await self._send_main_menu(phone_number, lang)
-                return
+            if not categories:
+                # Fallback to showing all restaurants if no categories exist
+                await self._show_restaurants(phone_number, lang)
+                return None
 
             # Pagination
-            total_restaurants = len(all_restaurants)
+            total_categories = len(categories)
             start_idx = page * ITEMS_PER_PAGE
             end_idx = start_idx + ITEMS_PER_PAGE
-            restaurants_to_show = all_restaurants[start_idx:end_idx]
-            has_more = total_restaurants > end_idx
+            categories_to_show = categories[start_idx:end_idx]
+            has_more = total_categories > end_idx
             has_prev = page > 0
 
             rows = [
                 {
-                    "id": f"rest_{r.id}",
-                    "title": (r.name_ar if lang == 'ar' and r.name_ar else r.name)[:24],
-                    "description": ((r.description_ar if lang == 'ar' and r.description_ar else r.description) or "")[:70]
+                    "id": f"restcat_{c.id}",
+                    "title": f"{c.icon} {c.name_ar if lang == 'ar' else c.name}"[:24],
+                    "description": ""
                 }
-                for r in restaurants_to_show
+                for c in categories_to_show
             ]
 
             # Add navigation buttons
             if has_prev:
                 rows.append({
-                    "id": f"all_rest_page_{page - 1}",
+                    "id": f"restcat_page_{page - 1}",
                     "title": "⬅️ السابق" if lang == 'ar' else "⬅️ Previous",
-                    "description": f"صفحة {page}" if lang == 'ar' else f"Page {page}"
+                    "description": ""
                 })
 
             if has_more:
-                remaining = total_restaurants - end_idx
+                remaining = total_categories - end_idx
                 rows.append({
-                    "id": f"all_rest_page_{page + 1}",
+                    "id": f"restcat_page_{page + 1}",
                     "title": "التالي ➡️" if lang == 'ar' else "Next ➡️",
-                    "description": f"{remaining} {'مطعم آخر' if lang == 'ar' else 'more restaurants'}"
+                    "description": f"{remaining} {'تصنيف آخر' if lang == 'ar' else 'more categories'}"
                 })
 
             # Build page info
-            total_pages = (total_restaurants + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+            total_pages = (total_categories + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
             page_info = f" ({page + 1}/{total_pages})" if total_pages > 1 else ""
 
             sections = [{
-                "title": f"{get_text('restaurants', lang)}{page_info}"[:24],
+                "title": f"{get_text('select_category', lang) if lang == 'ar' else 'Select Category'}{page_info}"[:24],
                 "rows": rows
             }]
 
-            await whatsapp_service.send_interactive_list(
-                phone_number,
-                get_text("select_restaurant", lang),
-                get_text("view_restaurants", lang),
-                sections
-            )
-            await redis_service.set_user_state(phone_number, "BROWSING_RESTAURANTS", {"lang": lang, "page": page})
+            header = "🍽️ اختر نوع المطعم:" if lang == "ar" else "🍽️ Choose restaurant type:"
+            return interactive_list(header, get_text("view_restaurants", lang), sections), None, {}
+
+        screen = await interactive_cache.get_or_render(("restaurant_categories", None, page, lang), render)
+        if screen is None:
+            return
+
+        await whatsapp_service.send_interactive_payload(phone_number, screen.body)
+        await redis_service.set_user_state(phone_number, "BROWSING_REST_CATEGORIES", {"lang": lang, "page": page})
+
+    async def _show_restaurants_by_category(self, phone_number: str, category_id: int, lang: str, page: int = 0):
+        """Show restaurants filtered by category with pagination"""
+        async def render():
+            async with message_session() as db:
+                # Get category info
+                cat_result = await db.execute(
+                    select(RestaurantCategory).where(RestaurantCategory.id == category_id)
+                )
+                category = cat_result.scalars().first()
+
+                if not category:
+                    await self._show_restaurant_categories(phone_number, lang)
+                    return None
+
+                # Get all restaurants in this category
+                result = await db.execute(
+                    select(Restaurant)
+                    .where(Restaurant.is_active == True)
+                    .where(Restaurant.category_id == category_id)
+                )
+                all_restaurants = result.scalars().all()
+
+                if not all_restaurants:
+                    no_rest_msg = f"لا توجد مطاعم في قسم {category.name_ar}" if lang == "ar" else f"No restaurants in {category.name} category"
+                    await whatsapp_service.send_text(phone_number, no_rest_msg)
+                    await self._show_restaurant_categories(phone_number, lang)
+                    return None
+
+                cat_name = category.name_ar if lang == "ar" else category.name
+
+                # Pagination: 9 items per page (leaving room for "More" option)
+                items_per_page = 9
+                start_idx = page * items_per_page
+                end_idx = start_idx + items_per_page
+                restaurants_to_show = all_restaurants[start_idx:end_idx]
+                has_more = len(all_restaurants) > end_idx
+
+                rows = [
+                    {
+                        "id": f"rest_{r.id}",
+                        "title": (r.name_ar if lang == 'ar' and r.name_ar else r.name)[:24],
+                        "description": ((r.description_ar if lang == 'ar' and r.description_ar else r.description) or "")[:70]
+                    }
+                    for r in restaurants_to_show
+                ]
+
+                # Add "More" option if there are more restaurants
+                if has_more:
+                    more_text = "المزيد ←" if lang == "ar" else "More →"
+                    rows.append({
+                        "id": f"more_rest_{category_id}_{page + 1}",
+                        "title": more_text,
+                        "description": f"{len(all_restaurants) - end_idx} {'مطعم آخر' if lang == 'ar' else 'more restaurants'}"
+                    })
+
+                sections = [{
+                    "title": f"{category.icon} {cat_name}"[:24],
+                    "rows": rows
+                }]
+                return interactive_list(get_text("select_restaurant", lang), get_text("view_restaurants", lang), sections), None, {}
+
+        screen = await interactive_cache.get_or_render(("restaurants_by_category", category_id, page, lang), render)
+        if screen is None:
+            return
+
+        await whatsapp_service.send_interactive_payload(phone_number, screen.body)
+        await redis_service.set_user_state(phone_number, "BROWSING_RESTAURANTS", {"lang": lang, "rest_category_id": category_id, "page": page})
+
+    async def _show_restaurants(self, phone_number: str, lang: str, page: int = 0):
+        """Show available restaurants list with pagination (max 10 items per WhatsApp message)"""
+        ITEMS_PER_PAGE = 9  # Leave room for "More" button
+
+        async def render():
+            async with message_session() as db:
+                result = await db.execute(
+                    select(Restaurant)
+                    .where(Restaurant.is_active == True)
+                )
+                all_restaurants = result.scalars().all()
+
+                if not all_restaurants:
+                    await whatsapp_service.send_text(phone_number, get_text("no_restaurants", lang))
+                    await self._send_main_menu(phone_number, lang)
+                    return None
+
+                # Pagination
+                total_restaurants = len(all_restaurants)
+                start_idx = page * ITEMS_PER_PAGE
+                end_idx = start_idx + ITEMS_PER_PAGE
+                restaurants_to_show = all_restaurants[start_idx:end_idx]
+                has_more = total_restaurants > end_idx
+                has_prev = page > 0
+
+                rows = [
+                    {
+                        "id": f"rest_{r.id}",
+                        "title": (r.name_ar if lang == 'ar' and r.name_ar else r.name)[:24],
+                        "description": ((r.description_ar if lang == 'ar' and r.description_ar else r.description) or "")[:70]
+                    }
+                    for r in restaurants_to_show
+                ]
+
+                # Add navigation buttons
+                if has_prev:
+                    rows.append({
+                        "id": f"all_rest_page_{page - 1}",
+                        "title": "⬅️ السابق" if lang == 'ar' else "⬅️ Previous",
+                        "description": f"صفحة {page}" if lang == 'ar' else f"Page {page}"
+                    })
+
+                if has_more:
+                    remaining = total_restaurants - end_idx
+                    rows.append({
+                        "id": f"all_rest_page_{page + 1}",
+                        "title": "التالي ➡️" if lang == 'ar' else "Next ➡️",
+                        "description": f"{remaining} {'مطعم آخر' if lang == 'ar' else 'more restaurants'}"
+                    })
+
+                # Build page info
+                total_pages = (total_restaurants + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+                page_info = f" ({page + 1}/{total_pages})" if total_pages > 1 else ""
+
+                sections = [{
+                    "title": f"{get_text('restaurants', lang)}{page_info}"[:24],
+                    "rows": rows
+                }]
+                return interactive_list(get_text("select_restaurant", lang), get_text("view_restaurants", lang), sections), None, {}
+
+        screen = await interactive_cache.get_or_render(("restaurants", None, page, lang), render)
+        if screen is None:
+            return
+
+        await whatsapp_service.send_interactive_payload(phone_number, screen.body)
+        await redis_service.set_user_state(phone_number, "BROWSING_RESTAURANTS", {"lang": lang, "page": page})
 
     async def _show_categories(self, phone_number: str, restaurant_id: int, lang: str, page: int = 0):
         """Show menu categories for a restaurant with pagination (max 10 items per WhatsApp message)"""
         ITEMS_PER_PAGE = 9  # Leave room for navigation
 
-        async with AsyncSessionLocal() as db:
-            # Get restaurant info
-            rest_result = await db.execute(
-                select(Restaurant).where(Restaurant.id == restaurant_id)
-            )
-            restaurant = rest_result.scalars().first()
+        async def render():
+            async with message_session() as db:
+                # Get restaurant info
+                rest_result = await db.execute(
+                    select(Restaurant).where(Restaurant.id == restaurant_id)
+                )
+                restaurant = rest_result.scalars().first()
 
-            if not restaurant:
-                await whatsapp_service.send_text(phone_number, get_text("restaurant_not_found", lang))
-                await self._show_restaurants(phone_number, lang)
-                return
+                if not restaurant:
+                    await whatsapp_service.send_text(phone_number, get_text("restaurant_not_found", lang))
+                    await self._show_restaurants(phone_number, lang)
+                    return None
 
-            # Get categories
-            result = await db.execute(
-                select(Category)
-                .join(Menu)
-                .where(Menu.restaurant_id == restaurant_id)
-                .where(Menu.is_active == True)
-            )
-            categories = result.scalars().all()
+                # Get categories
+                result = await db.execute(
+                    select(Category)
+                    .join(Menu)
+                    .where(Menu.restaurant_id == restaurant_id)
+                    .where(Menu.is_active == True)
+                )
+                categories = result.scalars().all()
 
-            if not categories:
-                await whatsapp_service.send_text(phone_number, get_text("no_menu", lang))
-                await self._show_restaurants(phone_number, lang)
-                return
+                if not categories:
+                    await whatsapp_service.send_text(phone_number, get_text("no_menu", lang))
+                    await self._show_restaurants(phone_number, lang)
+                    return None
 
-            # Get display name based on language
-            rest_name = (restaurant.name_ar if lang == 'ar' and restaurant.name_ar else restaurant.name)
+                # Get display name based on language
+                rest_name = (restaurant.name_ar if lang == 'ar' and restaurant.name_ar else restaurant.name)
 
-            # Pagination
-            total_categories = len(categories)
-            start_idx = page * ITEMS_PER_PAGE
-            end_idx = start_idx + ITEMS_PER_PAGE
-            categories_to_show = categories[start_idx:end_idx]
-            has_more = total_categories > end_idx
-            has_prev = page > 0
+                # Pagination
+                total_categories = len(categories)
+                start_idx = page * ITEMS_PER_PAGE
+                end_idx = start_idx + ITEMS_PER_PAGE
+                categories_to_show = categories[start_idx:end_idx]
+                has_more = total_categories > end_idx
+                has_prev = page > 0
 
-            rows = [
-                {
-                    "id": f"cat_{c.id}",
-                    "title": (c.name_ar if lang == 'ar' and c.name_ar else c.name)[:24],
-                    "description": ""
-                }
-                for c in categories_to_show
-            ]
+                rows = [
+                    {
+                        "id": f"cat_{c.id}",
+                        "title": (c.name_ar if lang == 'ar' and c.name_ar else c.name)[:24],
+                        "description": ""
+                    }
+                    for c in categories_to_show
+                ]
 
-            # Add navigation buttons
-            if has_prev:
-                rows.append({
-                    "id": f"menucat_page_{restaurant_id}_{page - 1}",
-                    "title": "⬅️ السابق" if lang == 'ar' else "⬅️ Previous",
-                    "description": ""
-                })
+                # Add navigation buttons
+                if has_prev:
+                    rows.append({
+                        "id": f"menucat_page_{restaurant_id}_{page - 1}",
+                        "title": "⬅️ السابق" if lang == 'ar' else "⬅️ Previous",
+                        "description": ""
+                    })
 
-            if has_more:
-                remaining = total_categories - end_idx
-                rows.append({
-                    "id": f"menucat_page_{restaurant_id}_{page + 1}",
-                    "title": "التالي ➡️" if lang == 'ar' else "Next ➡️",
-                    "description": f"{remaining} {'فئة أخرى' if lang == 'ar' else 'more categories'}"
-                })
+                if has_more:
+                    remaining = total_categories - end_idx
+                    rows.append({
+                        "id": f"menucat_page_{restaurant_id}_{page + 1}",
+                        "title": "التالي ➡️" if lang == 'ar' else "Next ➡️",
+                        "description": f"{remaining} {'فئة أخرى' if lang == 'ar' else 'more categories'}"
+                    })
 
-            # Build page info
-            total_pages = (total_categories + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
-            page_info = f" ({page + 1}/{total_pages})" if total_pages > 1 else ""
+                # Build page info
+                total_pages = (total_categories + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+                page_info = f" ({page + 1}/{total_pages})" if total_pages > 1 else ""
+
+                sections = [{
+                    "title": f"{rest_name}{page_info}"[:24],
+                    "rows": rows
+                }]
+                interactive = interactive_list(
+                    f"📋 {rest_name}\n{get_text('select_category', lang)}",
+                    get_text("view_menu", lang),
+                    sections
+                )
+                return interactive, restaurant_id, {"restaurant_name": rest_name}
 
-            sections = [{
-                "title": f"{rest_name}{page_info}"[:24],
-                "rows": rows
-            }]
+        screen = await interactive_cache.get_or_render(("categories", restaurant_id, page, lang), render)
+        if screen is None:
+            return
 
-            await whatsapp_service.send_interactive_list(
-                phone_number,
-                f"📋 {rest_name}\n{get_text('select_category', lang)}",
-                get_text("view_menu", lang),
-                sections
-            )
-            await redis_service.set_user_state(phone_number, "BROWSING_CATEGORIES", {
-                "lang": lang,
-                "restaurant_id": restaurant_id,
-                "restaurant_name": rest_name,
-                "page": page
-            })
+        await whatsapp_service.send_interactive_payload(phone_number, screen.body)
+        await redis_service.set_user_state(phone_number, "BROWSING_CATEGORIES", {
+            "lang": lang,
+            "restaurant_id": restaurant_id,
+            "restaurant_name": screen.meta["restaurant_name"],
+            "page": page
+        })
 
     async def _show_menu_items(self, phone_number: str, category_id: int, lang: str, user_data: dict, page: int = 0):
         """Show menu items in a category with pagination (max 10 items per page)"""
         ITEMS_PER_PAGE = 8  # Leave room for navigation buttons
 
-        async with AsyncSessionLocal() as db:
-            # Get category with items
-            result = await db.execute(
-                select(Category)
-                .options(selectinload(Category.items))
-                .where(Category.id == category_id)
-            )
-            category = result.scalars().first()
-
-            if not category or not category.items:
-                await whatsapp_service.send_text(phone_number, get_text("no_items", lang))
-                return
+        async def render():
+            async with message_session() as db:
+                # Get category with items (and its menu, for the restaurant id)
+                result = await db.execute(
+                    select(Category)
+                    .options(selectinload(Category.items), selectinload(Category.menu))
+                    .where(Category.id == category_id)
+                )
+                category = result.scalars().first()
 
-            # Filter available items
-            available_items = [item for item in category.items if item.is_available]
+                if not category or not category.items:
+                    await whatsapp_service.send_text(phone_number, get_text("no_items", lang))
+                    return None
 
-            if not available_items:
-                await whatsapp_service.send_text(phone_number, get_text("no_items_available", lang))
-                return
+                # Filter available items
+                available_items = [item for item in category.items if item.is_available]
 
-            # Calculate pagination
-            total_items = len(available_items)
-            total_pages = (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
-            start_idx = page * ITEMS_PER_PAGE
-            end_idx = min(start_idx + ITEMS_PER_PAGE, total_items)
+                if not available_items:
+                    await whatsapp_service.send_text(phone_number, get_text("no_items_available", lang))
+                    return None
+
+                # Calculate pagination
+                total_items = len(available_items)
+                total_pages = (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+                start_idx = page * ITEMS_PER_PAGE
+                end_idx = min(start_idx + ITEMS_PER_PAGE, total_items)
+
+                # Get items for current page
+                page_items = available_items[start_idx:end_idx]
+
+                # Get display names based on language
+                cat_name = category.name_ar if lang == 'ar' and category.name_ar else category.name
+
+                def get_item_name(item):
+                    return (item.name_ar if lang == 'ar' and item.name_ar else item.name)[:24]
+
+                def get_item_desc(item):
+                    desc = item.description_ar if lang == 'ar' and hasattr(item, 'description_ar') and item.description_ar else item.description
+                    # Handle variant items with price range
+                    if hasattr(item, 'has_variants') and item.has_variants and hasattr(item, 'price_min') and item.price_min:
+                        price_str = f"${item.price_min:.2f}-${item.price_max:.2f}"
+                    elif item.price:
+                        price_str = f"${item.price:.2f}"
+                    else:
+                        price_str = "$0.00"
+                    return f"💰 {price_str}" + (f" | {desc[:30]}" if desc else "")
 
-            # Get items for current page
-            page_items = available_items[start_idx:end_idx]
+                # Build rows for current page items
+                rows = [
+                    {
+                        "id": f"item_{item.id}",
+                        "title": get_item_name(item),
+                        "description": get_item_desc(item)
+                    }
+                    for item in page_items
+                ]
 
-            # Get display names based on language
-            cat_name = category.name_ar if lang == 'ar' and category.name_ar else category.name
-
-            def get_item_name(item):
-                return (item.name_ar if lang == 'ar' and item.name_ar else item.name)[:24]
-
-            def get_item_desc(item):
-                desc = item.description_ar if lang == 'ar' and hasattr(item, 'description_ar') and item.description_ar else item.description
-                # Handle variant items with price range
-                if hasattr(item, 'has_variants') and item.has_variants and hasattr(item, 'price_min') and item.price_min:
-                    price_str = f"${item.price_min:.2f}-${item.price_max:.2f}"
-                elif item.price:
-                    price_str = f"${item.price:.2f}"
-                else:
-                    price_str = "$0.00"
-                return f"💰 {price_str}" + (f" | {desc[:30]}" if desc else "")
+                # Add navigation rows
+                if page > 0:
+                    rows.append({
+                        "id": f"menu_page_{category_id}_{page - 1}",
+                        "title": "⬅️ السابق" if lang == 'ar' else "⬅️ Previous",
+                        "description": f"صفحة {page}" if lang == 'ar' else f"Page {page}"
+                    })
 
-            # Build rows for current page items
-            rows = [
-                {
-                    "id": f"item_{item.id}",
-                    "title": get_item_name(item),
-                    "description": get_item_desc(item)
-                }
-                for item in page_items
-            ]
+                if page < total_pages - 1:
+                    rows.append({
+                        "id": f"menu_page_{category_id}_{page + 1}",
+                        "title": "التالي ➡️" if lang == 'ar' else "Next ➡️",
+                        "description": f"صفحة {page + 2}" if lang == 'ar' else f"Page {page + 2}"
+                    })
 
-            # Add navigation rows
-            if page > 0:
-                rows.append({
-                    "id": f"menu_page_{category_id}_{page - 1}",
-                    "title": "⬅️ السابق" if lang == 'ar' else "⬅️ Previous",
-                    "description": f"صفحة {page}" if lang == 'ar' else f"Page {page}"
-                })
+                # Build section
+                page_info = f" ({page + 1}/{total_pages})" if total_pages > 1 else ""
+                sections = [{
+                    "title": f"{cat_name}{page_info}"[:24],
+                    "rows": rows
+                }]
 
-            if page < total_pages - 1:
-                rows.append({
-                    "id": f"menu_page_{category_id}_{page + 1}",
-                    "title": "التالي ➡️" if lang == 'ar' else "Next ➡️",
-                    "description": f"صفحة {page + 2}" if lang == 'ar' else f"Page {page + 2}"
-                })
+                # Build message with page info
+                if total_pages > 1:
+                    body_text = f"🍽️ {cat_name}\n📄 {page + 1}/{total_pages} | {total_items} {'صنف' if lang == 'ar' else 'items'}\n{get_text('select_item', lang)}"
+                else:
+                    body_text = f"🍽️ {cat_name}\n{get_text('select_item', lang)}"
 
-            # Build section
-            page_info = f" ({page + 1}/{total_pages})" if total_pages > 1 else ""
-            sections = [{
-                "title": f"{cat_name}{page_info}"[:24],
-                "rows": rows
-            }]
+                interactive = interactive_list(body_text, get_text("view_items", lang), sections)
+                return interactive, category.menu.restaurant_id, {}
 
-            # Build message with page info
-            if total_pages > 1:
-                body_text = f"🍽️ {cat_name}\n📄 {page + 1}/{total_pages} | {total_items} {'صنف' if lang == 'ar' else 'items'}\n{get_text('select_item', lang)}"
-            else:
-                body_text = f"🍽️ {cat_name}\n{get_text('select_item', lang)}"
+        screen = await interactive_cache.get_or_render(("menu_items", category_id, page, lang), render)
+        if screen is None:
+            return
 
-            await whatsapp_service.send_interactive_list(
-                phone_number,
-                body_text,
-                get_text("view_items", lang),
-                sections
-            )
+        await whatsapp_service.send_interactive_payload(phone_number, screen.body)
 
-            user_data["category_id"] = category_id
-            user_data["menu_page"] = page
-            await redis_service.set_user_state(phone_number, "BROWSING_ITEMS", user_data)
+        user_data["category_id"] = category_id
+        user_data["menu_page"] = page
+        await redis_service.set_user_state(phone_number, "BROWSING_ITEMS", user_data)
 
     async def _show_item_details(self, phone_number: str, item_id: int, lang: str, user_data: dict):
         """Show item details with add to cart option"""
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             result = await db.execute(
                 select(MenuItem).where(MenuItem.id == item_id)
             )
@@ -1077,7 +1129,7 @@ class BotController:
 
     async def _add_item_to_cart(self, phone_number: str, item_id: int, quantity: int, lang: str, user_data: dict):
         """Add item to cart - uses eager loading to avoid N+1 queries"""
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             # Load MenuItem with category and menu in a single query (N+1 fix)
             result = await db.execute(
                 select(MenuItem)
@@ -1123,7 +1175,7 @@ class BotController:
 
     async def _add_variant_to_cart(self, phone_number: str, item_id: int, variant_id: int, quantity: int, lang: str, user_data: dict):
         """Add item with specific variant/size to cart"""
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             from app.models.menu import MenuItemVariant
             
             # Get the variant
@@ -1274,10 +1326,9 @@ class BotController:
             await self._send_main_menu(phone_number, lang)
             return
 
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             logger.debug(f"Checking user persistence for {phone_number}")
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+            user = await load_user(db, phone_number)
 
             if user and user.default_address and user.full_name and user.full_name != "WhatsApp Customer":
                 logger.debug(f"Found persistent user info for {phone_number}")
@@ -1300,9 +1351,8 @@ class BotController:
 
     async def _process_previous_info(self, phone_number: str, lang: str, user_data: dict):
         """Use stored user info for checkout"""
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+        async with message_session() as db:
+            user = await load_user(db, phone_number)
             if not user:
                 await self._start_checkout(phone_number, lang)
                 return
@@ -1329,14 +1379,14 @@ class BotController:
         address = user_data.get("delivery_address", "WhatsApp Order")
         name = user_data.get("customer_name", "WhatsApp Customer")
 
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             # Find or create user
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+            user = await load_user(db, phone_number)
 
             if not user:
                 user = User(phone_number=phone_number, full_name=name)
                 db.add(user)
+                remember_user(phone_number, user)
             else:
                 user.full_name = name
             
@@ -1449,7 +1499,7 @@ class BotController:
 
     async def _notify_restaurant(self, order: Order, cart: list, lat: float, lng: float):
         """Send notification to restaurant about new order via WhatsApp"""
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             result = await db.execute(
                 select(Restaurant).where(Restaurant.id == order.restaurant_id)
             )
@@ -1483,12 +1533,13 @@ https://maps.google.com/?q={lat},{lng}
 ⏰ الرجاء قبول الطلب في أقرب وقت!"""
 
             # Send WhatsApp notification to restaurant if phone number exists
+            # (queued: the customer's conversation doesn't wait on it)
             if restaurant.phone_number:
                 try:
-                    await whatsapp_service.send_text(restaurant.phone_number, notification)
-                    logger.info(f"WhatsApp notification sent to restaurant {restaurant.name} ({restaurant.phone_number}) for order {order.id}")
+                    whatsapp_service.queue_text(restaurant.phone_number, notification)
+                    logger.info(f"WhatsApp notification queued to restaurant {restaurant.name} ({restaurant.phone_number}) for order {order.id}")
                 except Exception as e:
-                    logger.error(f"Failed to send WhatsApp to restaurant: {e}")
+                    logger.error(f"Failed to queue WhatsApp to restaurant: {e}")
             else:
                 logger.warning(f"Restaurant {restaurant.name} has no phone number for notifications")
 
@@ -1670,7 +1721,7 @@ https://maps.google.com/?q={lat},{lng}
         restaurants_found = []
 
         try:
-            async with AsyncSessionLocal() as db:
+            async with message_session() as db:
                 # Strategy 1: Search for similar items by name
                 words = [w for w in original_text.lower().split() if len(w) > 2]
 
@@ -1965,8 +2016,7 @@ https://maps.google.com/?q={lat},{lng}
             added_items.append(f"{item['quantity']}x {item['name']}")
         
         # Calculate totals
-        cart_total = await redis_service.get_cart_total(phone_number)
-        cart_count = await redis_service.get_cart_count(phone_number)
+        cart_count, cart_total = await redis_service.get_cart_totals(phone_number)
         
         # Build response with Lebanese marketing flair
         confirmations = ["تكرم عينك! ✅", "على راسي! 👍", "حاضر! 🙌", "بالخدمة! ✨"]
@@ -2097,7 +2147,7 @@ https://maps.google.com/?q={lat},{lng}
                     new_item = await self._find_item_by_name(replace_with, restaurant_id)
 
                     if new_item:
-                        await redis_service.remove_from_cart(phone_number, old_menu_item_id)
+                        await redis_service.remove_from_cart(phone_number, old_menu_item_id, target_item.get("variant_id"))
                         new_item["quantity"] = quantity
                         await redis_service.add_to_cart(phone_number, new_item)
                         modifications_made.append(f"🔄 غيرنا {old_name} ← {new_item['name']}")
@@ -2133,7 +2183,7 @@ https://maps.google.com/?q={lat},{lng}
                         new_item = await self._find_item_with_type(old_name, replace_type, restaurant_id)
 
                     if new_item:
-                        await redis_service.remove_from_cart(phone_number, old_menu_item_id)
+                        await redis_service.remove_from_cart(phone_number, old_menu_item_id, target_item.get("variant_id"))
                         new_item["quantity"] = quantity
                         await redis_service.add_to_cart(phone_number, new_item)
                         modifications_made.append(f"🔄 غيرنا {old_name} ← {new_item['name']}")
@@ -2151,11 +2201,11 @@ https://maps.google.com/?q={lat},{lng}
                     qty_to_remove = mod_item.get("quantity", 1)
                     new_qty = target_item.get("quantity", 1) - qty_to_remove
                     if new_qty <= 0:
-                        await redis_service.remove_from_cart(phone_number, target_item.get("menu_item_id"))
+                        await redis_service.remove_from_cart(phone_number, target_item.get("menu_item_id"), target_item.get("variant_id"))
                         modifications_made.append(f"❌ شلنا {target_item.get('name')}")
                     else:
                         await redis_service.update_cart_item_quantity(
-                            phone_number, target_item.get("menu_item_id"), new_qty
+                            phone_number, target_item.get("menu_item_id"), new_qty, target_item.get("variant_id")
                         )
                         modifications_made.append(f"➖ نقصنا {target_item.get('name')} ({new_qty})")
                 continue
@@ -2164,22 +2214,22 @@ https://maps.google.com/?q={lat},{lng}
                 cart_item_name = cart_item.get("name", "").lower()
                 if item_name in cart_item_name or cart_item_name in item_name:
                     if action == "remove":
-                        await redis_service.remove_from_cart(phone_number, cart_item.get("menu_item_id"))
+                        await redis_service.remove_from_cart(phone_number, cart_item.get("menu_item_id"), cart_item.get("variant_id"))
                         modifications_made.append(f"❌ شلنا {cart_item.get('name')}")
                     elif action == "increase":
                         new_qty = cart_item.get("quantity", 1) + mod_item.get("quantity", 1)
                         await redis_service.update_cart_item_quantity(
-                            phone_number, cart_item.get("menu_item_id"), new_qty
+                            phone_number, cart_item.get("menu_item_id"), new_qty, cart_item.get("variant_id")
                         )
                         modifications_made.append(f"➕ زدنا {cart_item.get('name')} ({new_qty})")
                     elif action == "decrease":
                         new_qty = cart_item.get("quantity", 1) - mod_item.get("quantity", 1)
                         if new_qty <= 0:
-                            await redis_service.remove_from_cart(phone_number, cart_item.get("menu_item_id"))
+                            await redis_service.remove_from_cart(phone_number, cart_item.get("menu_item_id"), cart_item.get("variant_id"))
                             modifications_made.append(f"❌ شلنا {cart_item.get('name')}")
                         else:
                             await redis_service.update_cart_item_quantity(
-                                phone_number, cart_item.get("menu_item_id"), new_qty
+                                phone_number, cart_item.get("menu_item_id"), new_qty, cart_item.get("variant_id")
                             )
                             modifications_made.append(f"➖ نقصنا {cart_item.get('name')} ({new_qty})")
                     break
@@ -2195,7 +2245,7 @@ https://maps.google.com/?q={lat},{lng}
     async def _find_item_with_size(self, current_name: str, target_size: str, restaurant_id: int) -> Optional[dict]:
         """Find a menu item with different size - supports both name-based and variant-based sizes"""
         try:
-            async with AsyncSessionLocal() as db:
+            async with message_session() as db:
                 result = await db.execute(
                     select(MenuItem)
                     .join(Category)
@@ -2280,7 +2330,7 @@ https://maps.google.com/?q={lat},{lng}
     async def _find_item_with_type(self, current_name: str, target_type: str, restaurant_id: int) -> Optional[dict]:
         """Find a menu item with different type (e.g., chicken → meat)"""
         try:
-            async with AsyncSessionLocal() as db:
+            async with message_session() as db:
                 result = await db.execute(
                     select(MenuItem)
                     .join(Category)
@@ -2320,7 +2370,7 @@ https://maps.google.com/?q={lat},{lng}
     async def _find_item_by_name(self, item_name: str, restaurant_id: int) -> Optional[dict]:
         """Find a menu item by name in a specific restaurant"""
         try:
-            async with AsyncSessionLocal() as db:
+            async with message_session() as db:
                 result = await db.execute(
                     select(MenuItem)
                     .join(Category)
@@ -2425,7 +2475,7 @@ https://maps.google.com/?q={lat},{lng}
             items_text.append(f"• {item['quantity']}x {item['name']}")
 
         # Get restaurant name
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             rest_result = await db.execute(select(Restaurant).where(Restaurant.id == restaurant_id))
             restaurant = rest_result.scalars().first()
             rest_name = restaurant.name if restaurant else "Unknown"
@@ -2652,27 +2702,9 @@ https://maps.google.com/?q={lat},{lng}
             await self._show_restaurants(phone_number, lang)
             return
 
-        # Find restaurant by name
+        # Find restaurant by name (Arabic, English or transliterated)
         restaurant_id = await ai_service._find_restaurant_id(restaurant_name)
 
-        if not restaurant_id:
-            # Try fuzzy match
-            async with AsyncSessionLocal() as db:
-                result = await db.execute(
-                    select(Restaurant)
-                    .where(Restaurant.is_active == True)
-                )
-                restaurants = result.scalars().all()
-
-                # Find best match
-                search_lower = restaurant_name.lower()
-                for rest in restaurants:
-                    name_en = (rest.name or "").lower()
-                    name_ar = (rest.name_ar or "").lower()
-                    if search_lower in name_en or search_lower in name_ar or name_en in search_lower or name_ar in search_lower:
-                        restaurant_id = rest.id
-                        break
-
         if not restaurant_id:
             await whatsapp_service.send_text(
                 phone_number,
@@ -2682,123 +2714,33 @@ https://maps.google.com/?q={lat},{lng}
             await self._show_restaurants(phone_number, lang)
             return
 
-        # Get full menu
-        async with AsyncSessionLocal() as db:
-            # Get restaurant
-            rest_result = await db.execute(
-                select(Restaurant).where(Restaurant.id == restaurant_id)
-            )
-            restaurant = rest_result.scalars().first()
+        # Numbered menu is prebuilt per restaurant/language and cached until the menu changes
+        menu = await numbered_menu_cache.get(restaurant_id, lang)
 
-            if not restaurant:
-                await whatsapp_service.send_text(phone_number, "المطعم غير موجود 🤔")
-                await self._show_restaurants(phone_number, lang)
-                return
-
-            rest_name = restaurant.name_ar if lang == "ar" and restaurant.name_ar else restaurant.name
+        if not menu:
+            await whatsapp_service.send_text(phone_number, "المطعم غير موجود 🤔")
+            await self._show_restaurants(phone_number, lang)
+            return
 
-            # Get all categories with items
-            categories_result = await db.execute(
-                select(Category)
-                .options(selectinload(Category.items))
-                .join(Menu)
-                .where(Menu.restaurant_id == restaurant_id)
-                .where(Menu.is_active == True)
+        if not menu.items_map:
+            await whatsapp_service.send_text(
+                phone_number,
+                f"لا يوجد قائمة طعام لـ {menu.restaurant_name} حالياً 😕" if lang == "ar"
+                else f"No menu available for {menu.restaurant_name} currently 😕"
             )
-            categories = categories_result.scalars().all()
-
-            if not categories:
-                await whatsapp_service.send_text(
-                    phone_number,
-                    f"لا يوجد قائمة طعام لـ {rest_name} حالياً 😕" if lang == "ar"
-                    else f"No menu available for {rest_name} currently 😕"
-                )
-                return
-
-            # Build numbered menu text and items map
-            from app.models.menu import MenuItemVariant
-            menu_text = f"📋 *مانيو {rest_name}*\n"
-            menu_text += "=" * 25 + "\n\n"
-            items_map = {}  # number -> item info for ordering
-            item_num = 0
-
-            for category in categories:
-                cat_name = category.name_ar if lang == "ar" and category.name_ar else category.name
-                available_items = [item for item in category.items if item.is_available]
-
-                if not available_items:
-                    continue
-
-                menu_text += f"🔸 *{cat_name}*\n"
-
-                for item in available_items:
-                    item_name = item.name_ar if lang == "ar" and item.name_ar else item.name
-
-                    if hasattr(item, 'has_variants') and item.has_variants:
-                        variants_result = await db.execute(
-                            select(MenuItemVariant)
-                            .where(MenuItemVariant.menu_item_id == item.id)
-                            .order_by(MenuItemVariant.order)
-                        )
-                        variants = variants_result.scalars().all()
-                        if variants:
-                            for v in variants:
-                                item_num += 1
-                                v_name = v.name_ar if lang == 'ar' and v.name_ar else v.name
-                                price = float(v.price)
-                                display_name = f"{item_name} ({v_name})"
-                                menu_text += f"  {item_num}. {display_name} - ${price:.2f}\n"
-                                items_map[str(item_num)] = {
-                                    "menu_item_id": item.id,
-                                    "variant_id": v.id,
-                                    "name": display_name,
-                                    "price": price,
-                                    "restaurant_id": restaurant_id
-                                }
-                        else:
-                            item_num += 1
-                            price = float(item.price) if item.price else 0.0
-                            menu_text += f"  {item_num}. {item_name} - ${price:.2f}\n"
-                            items_map[str(item_num)] = {
-                                "menu_item_id": item.id,
-                                "variant_id": None,
-                                "name": item_name,
-                                "price": price,
-                                "restaurant_id": restaurant_id
-                            }
-                    else:
-                        item_num += 1
-                        price = float(item.price) if item.price else 0.0
-                        price_str = f"${price:.2f}" if price > 0 else "-"
-                        menu_text += f"  {item_num}. {item_name} - {price_str}\n"
-                        items_map[str(item_num)] = {
-                            "menu_item_id": item.id,
-                            "variant_id": None,
-                            "name": item_name,
-                            "price": price,
-                            "restaurant_id": restaurant_id
-                        }
-
-                menu_text += "\n"
-
-            # Add instruction footer
-            if lang == "ar":
-                menu_text += "اكتب أرقام الأصناف يلي بدك ياها (مثلاً: 1 3) 👆\n"
-                menu_text += "أو اكتب *طلب* لعرض السلة 🛒"
-            else:
-                menu_text += "Type item numbers you want (e.g.: 1 3) 👆\n"
-                menu_text += "Or type *order* to view cart 🛒"
+            return
 
-            # Send full menu as one message
-            await whatsapp_service.send_text(phone_number, menu_text)
+        # Send the menu (split to WhatsApp's message size limit)
+        for chunk in menu.chunks:
+            await whatsapp_service.send_text(phone_number, chunk)
 
-            # Store items map in Redis and set state for numbered ordering
-            await redis_service.set_user_state(phone_number, "BROWSING_NUMBERED_MENU", {
-                "lang": lang,
-                "restaurant_id": restaurant_id,
-                "restaurant_name": rest_name,
-                "items_map": items_map
-            })
+        # Store items map in Redis and set state for numbered ordering
+        await redis_service.set_user_state(phone_number, "BROWSING_NUMBERED_MENU", {
+            "lang": lang,
+            "restaurant_id": restaurant_id,
+            "restaurant_name": menu.restaurant_name,
+            "items_map": menu.items_map
+        })
 
     # ==================== Description Search Feature ====================
     async def _handle_description_search(self, phone_number: str, ai_result: dict, lang: str):
@@ -2847,7 +2789,7 @@ https://maps.google.com/?q={lat},{lng}
         # Search in database
         matching_items = []
         try:
-            async with AsyncSessionLocal() as db:
+            async with message_session() as db:
                 result = await db.execute(
                     select(MenuItem, Restaurant)
                     .join(Category, MenuItem.category_id == Category.id)
@@ -2942,10 +2884,9 @@ https://maps.google.com/?q={lat},{lng}
     # ==================== Reorder Feature ====================
     async def _show_previous_orders(self, phone_number: str, lang: str):
         """Show user's previous orders for quick reorder"""
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             # Find user
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+            user = await load_user(db, phone_number)
 
             if not user:
                 await whatsapp_service.send_text(phone_number, get_text("no_previous_orders", lang))
@@ -2995,7 +2936,7 @@ https://maps.google.com/?q={lat},{lng}
 
     async def _process_reorder(self, phone_number: str, order_id: int, lang: str):
         """Add items from previous order to cart"""
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             # Get order with items
             result = await db.execute(
                 select(Order)
@@ -3054,10 +2995,9 @@ https://maps.google.com/?q={lat},{lng}
         """Show user's loyalty points and tier"""
         from app.models.loyalty import CustomerLoyalty, LoyaltyTier
 
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             # Find user
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+            user = await load_user(db, phone_number)
 
             if not user:
                 # Create user and loyalty
@@ -3065,12 +3005,10 @@ https://maps.google.com/?q={lat},{lng}
                 db.add(user)
                 await db.commit()
                 await db.refresh(user)
+                remember_user(phone_number, user)
 
             # Get or create loyalty
-            loyalty_result = await db.execute(
-                select(CustomerLoyalty).where(CustomerLoyalty.user_id == user.id)
-            )
-            loyalty = loyalty_result.scalars().first()
+            loyalty = await load_loyalty(db, user)
 
             if not loyalty:
                 # Create loyalty record
@@ -3084,6 +3022,7 @@ https://maps.google.com/?q={lat},{lng}
                 db.add(loyalty)
                 await db.commit()
                 await db.refresh(loyalty)
+                remember_loyalty(user, loyalty)
 
             # Tier icons and names
             tier_info = {
@@ -3141,16 +3080,12 @@ https://maps.google.com/?q={lat},{lng}
         from app.models.loyalty import CustomerLoyalty, LoyaltyTier, PointTransaction, PointTransactionType
         from datetime import timedelta
 
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+        async with message_session() as db:
+            user = await load_user(db, phone_number)
             if not user:
                 return
 
-            loyalty_result = await db.execute(
-                select(CustomerLoyalty).where(CustomerLoyalty.user_id == user.id)
-            )
-            loyalty = loyalty_result.scalars().first()
+            loyalty = await load_loyalty(db, user)
 
             if not loyalty:
                 return
@@ -3219,9 +3154,8 @@ https://maps.google.com/?q={lat},{lng}
         from app.api.v1.endpoints.favorites import Favorite
         from sqlalchemy import func
 
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+        async with message_session() as db:
+            user = await load_user(db, phone_number)
 
             if not user:
                 await whatsapp_service.send_text(phone_number, get_text("no_favorites", lang))
@@ -3309,9 +3243,8 @@ https://maps.google.com/?q={lat},{lng}
         """Check if restaurant should be suggested as favorite"""
         from app.api.v1.endpoints.favorites import Favorite
 
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+        async with message_session() as db:
+            user = await load_user(db, phone_number)
             if not user:
                 return
 
@@ -3357,9 +3290,8 @@ https://maps.google.com/?q={lat},{lng}
         """Add restaurant to favorites"""
         from app.api.v1.endpoints.favorites import Favorite
 
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+        async with message_session() as db:
+            user = await load_user(db, phone_number)
             if not user:
                 return
 
@@ -3408,10 +3340,9 @@ https://maps.google.com/?q={lat},{lng}
 
         order_id = pending.get("order_id")
 
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             # Get user
-            result = await db.execute(select(User).where(User.phone_number == phone_number))
-            user = result.scalars().first()
+            user = await load_user(db, phone_number)
             if not user:
                 return False
 
@@ -3445,7 +3376,7 @@ https://maps.google.com/?q={lat},{lng}
     # ==================== Quick Add from Suggestions ====================
     async def _quick_add_suggestion(self, phone_number: str, suggestion: dict, lang: str):
         """Quick add item from AI suggestions"""
-        async with AsyncSessionLocal() as db:
+        async with message_session() as db:
             # Get menu item
             result = await db.execute(
                 select(MenuItem)
@@ -0,0 +1,234 @@
+"""
+Per-message context for BotController.
+
+One MessageContext lives for the handling of one incoming WhatsApp message.
+It shares a single DB session between every handler that runs for the
+message and lazily loads, then memoizes, what those handlers keep asking for
+(the transaction ends when each handler's message_session() block does, so
+no pooled connection is held across LLM calls or WhatsApp sends in between):
+
+    user     -> User row for the sender's phone number
+    loyalty  -> CustomerLoyalty row of that user
+    state    -> conversation state read from Redis at message start
+    cart     -> cart summary (served by the redis_service cart cache scope)
+
+Every SQL statement executed while a context is active is counted, so the
+queries-per-message figure can be logged and exposed in stats.
+"""
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any
+import logging
+import time
+
+from sqlalchemy import select, event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal, engine
+from app.models.user import User
+from app.services.redis_service import redis_service
+
+logger = logging.getLogger(__name__)
+
+# Messages needing more queries than this are logged as warnings
+QUERY_WARNING_THRESHOLD = 20
+
+_current: ContextVar[Optional["MessageContext"]] = ContextVar("message_context", default=None)
+
+_stats = {"messages": 0, "queries": 0, "max_queries": 0, "user_loads": 0, "user_hits": 0}
+
+_UNSET = object()
+
+
+class MessageContext:
+    """Lazily loaded, memoized per-message data plus one shared DB session"""
+
+    def __init__(self, phone_number: str):
+        self.phone_number = phone_number
+        self.queries = 0
+        self.started = time.monotonic()
+        self._session: Optional[AsyncSession] = None
+        self._depth = 0
+        self._user: Any = _UNSET
+        self._loyalty: Any = _UNSET
+        self._state: Any = _UNSET
+
+    # ==================== Session ====================
+
+    @property
+    def session(self) -> AsyncSession:
+        """The message's shared session, opened on first use"""
+        if self._session is None:
+            self._session = AsyncSessionLocal()
+        return self._session
+
+    def forget_rows(self):
+        """Drop memoized ORM rows (expired after a rollback)"""
+        self._user = _UNSET
+        self._loyalty = _UNSET
+
+    async def release(self):
+        """
+        End the open transaction, returning its connection to the pool while
+        keeping the identity map (expire_on_commit=False). Changes a handler
+        left uncommitted are discarded, as closing its own session would.
+        """
+        db = self._session
+        if db is None or not db.in_transaction():
+            return
+        if db.new or db.dirty or db.deleted:
+            await db.rollback()
+            self.forget_rows()
+        else:
+            await db.commit()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # ==================== Lazy data ====================
+
+    async def get_user(self) -> Optional[User]:
+        if self._user is _UNSET:
+            _stats["user_loads"] += 1
+            result = await self.session.execute(select(User).where(User.phone_number == self.phone_number))
+            self._user = result.scalars().first()
+        else:
+            _stats["user_hits"] += 1
+        return self._user
+
+    def set_user(self, user: Optional[User]):
+        """Remember a user created or replaced by a handler"""
+        if user is not self._user:
+            self._loyalty = _UNSET
+        self._user = user
+
+    async def get_loyalty(self):
+        if self._loyalty is _UNSET:
+            from app.models.loyalty import CustomerLoyalty
+
+            user = await self.get_user()
+            if user is None or user.id is None:
+                return None
+            result = await self.session.execute(
+                select(CustomerLoyalty).where(CustomerLoyalty.user_id == user.id)
+            )
+            self._loyalty = result.scalars().first()
+        return self._loyalty
+
+    def set_loyalty(self, loyalty):
+        self._loyalty = loyalty
+
+    async def get_state(self) -> Optional[Dict[str, Any]]:
+        """Conversation state as stored when the message arrived"""
+        if self._state is _UNSET:
+            self._state = await redis_service.get_user_state(self.phone_number)
+        return self._state
+
+    async def get_cart(self) -> Dict[str, Any]:
+        return await redis_service.get_cart_summary(self.phone_number)
+
+
+def current_message_context() -> Optional[MessageContext]:
+    return _current.get()
+
+
+@asynccontextmanager
+async def message_context(phone_number: str):
+    """Activate a MessageContext (and the cart cache) for one incoming message"""
+    ctx = MessageContext(phone_number)
+    token = _current.set(ctx)
+    try:
+        with redis_service.cart_cache_scope():
+            yield ctx
+    finally:
+        _current.reset(token)
+        await ctx.close()
+        _record(ctx)
+
+
+def _record(ctx: MessageContext):
+    _stats["messages"] += 1
+    _stats["queries"] += ctx.queries
+    _stats["max_queries"] = max(_stats["max_queries"], ctx.queries)
+    elapsed_ms = (time.monotonic() - ctx.started) * 1000
+    if ctx.queries > QUERY_WARNING_THRESHOLD:
+        logger.warning(f"Message from {ctx.phone_number} ran {ctx.queries} queries ({elapsed_ms:.0f}ms)")
+    else:
+        logger.debug(f"Message from {ctx.phone_number}: {ctx.queries} queries ({elapsed_ms:.0f}ms)")
+
+
+@asynccontextmanager
+async def message_session():
+    """
+    DB session for bot handlers: the message's shared session inside a
+    MessageContext, otherwise a fresh session closed on exit.
+    """
+    ctx = _current.get()
+    if ctx is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    db = ctx.session
+    ctx._depth += 1
+    try:
+        yield db
+    except SQLAlchemyError:
+        # A failed statement aborts the transaction; reset it (and the rows it
+        # expired) so later handlers of this message can still use the session
+        await db.rollback()
+        ctx.forget_rows()
+        raise
+    finally:
+        ctx._depth -= 1
+    if ctx._depth == 0:
+        await ctx.release()
+
+
+async def load_user(db: AsyncSession, phone_number: str) -> Optional[User]:
+    """User by phone number, memoized when it is the current message's sender"""
+    ctx = _current.get()
+    if ctx is not None and ctx.phone_number == phone_number and db is ctx.session:
+        return await ctx.get_user()
+    result = await db.execute(select(User).where(User.phone_number == phone_number))
+    return result.scalars().first()
+
+
+def remember_user(phone_number: str, user: Optional[User]):
+    ctx = _current.get()
+    if ctx is not None and ctx.phone_number == phone_number:
+        ctx.set_user(user)
+
+
+async def load_loyalty(db: AsyncSession, user: User):
+    """CustomerLoyalty of a user, memoized for the current message's sender"""
+    ctx = _current.get()
+    if ctx is not None and db is ctx.session and ctx._user is user:
+        return await ctx.get_loyalty()
+    from app.models.loyalty import CustomerLoyalty
+
+    result = await db.execute(select(CustomerLoyalty).where(CustomerLoyalty.user_id == user.id))
+    return result.scalars().first()
+
+
+def remember_loyalty(user: User, loyalty):
+    ctx = _current.get()
+    if ctx is not None and ctx._user is user:
+        ctx.set_loyalty(loyalty)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    """Attribute every SQL statement to the active message, if any"""
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.queries += 1
+
+
+def get_message_stats() -> Dict[str, Any]:
+    stats = dict(_stats)
+    stats["avg_queries"] = round(stats["queries"] / stats["messages"], 2) if stats["messages"] else 0.0
+    return stats
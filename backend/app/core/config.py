@@ -58,6 +58,8 @@ class Settings(BaseSettings):
     WHATSAPP_VERIFY_TOKEN: Optional[str] = None
     WHATSAPP_BUSINESS_ACCOUNT_ID: Optional[str] = None
     WHATSAPP_APP_SECRET: Optional[str] = None
+    # Graph API host; point at benchmarks/mock_graph_api.py for offline load tests
+    WHATSAPP_API_BASE_URL: str = "https://graph.facebook.com"
 
     # OpenAI
     OPENAI_API_KEY: Optional[str] = None
@@ -70,6 +72,14 @@ class Settings(BaseSettings):
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_URL: Optional[str] = None
+    # auto (Upstash if configured, else memory) | upstash | redis | memory
+    REDIS_BACKEND: str = "auto"
+    REDIS_MAX_CONNECTIONS: int = 20
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    # Incoming webhook messages: auto (stream on Redis/Upstash, local on memory) | stream | local | inline
+    WEBHOOK_QUEUE_BACKEND: str = "auto"
+    # Per-phone message lock: auto (Redis lease if Redis, else local) | redis | local
+    PHONE_LOCK_BACKEND: str = "auto"
     
     # Upstash Redis (for serverless)
     UPSTASH_REDIS_REST_URL: Optional[str] = None
@@ -101,6 +111,9 @@ class Settings(BaseSettings):
     DRIVER_PLATFORM_CUT: float = 0.20  # 20% platform fee on delivery
     TAX_RATE: float = 0.0
     
+    # Batch driver dispatch (Celery beat assigns unassigned delivery orders every DISPATCH_WINDOW_SECONDS)
+    ENABLE_AUTO_DISPATCH: bool = False
+
     # Notifications
     ENABLE_WHATSAPP_NOTIFICATIONS: bool = True
     ENABLE_PUSH_NOTIFICATIONS: bool = True
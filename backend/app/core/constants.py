@@ -82,6 +82,99 @@ PENDING_REVIEW_EXPIRY_SECONDS: int = int(os.getenv("PENDING_REVIEW_EXPIRY_SECOND
 # Analytics data retention (seconds) - 7 days
 ANALYTICS_RETENTION_SECONDS: int = int(os.getenv("ANALYTICS_RETENTION_SECONDS", "604800"))
 
+# In-memory catalog snapshot max age (seconds) - safety net for writes made outside the API
+CATALOG_SNAPSHOT_TTL_SECONDS: int = int(os.getenv("CATALOG_SNAPSHOT_TTL_SECONDS", "300"))
+
+# Pre-rendered WhatsApp browsing screens kept in memory (restaurant / category / menu lists)
+INTERACTIVE_CACHE_SIZE: int = int(os.getenv("INTERACTIVE_CACHE_SIZE", "2000"))
+
+# Rendered screen max age (seconds). Screens are rendered from the catalog snapshot,
+# so a shorter TTL would only re-render the same data; longer would outlive it
+INTERACTIVE_CACHE_TTL_SECONDS: int = int(os.getenv("INTERACTIVE_CACHE_TTL_SECONDS", "300"))
+
+# Numbered menu ("type 1 3 to order") max age (seconds). Long enough for a customer to
+# read the menu and reply with numbers; it is built from the catalog snapshot, so
+# keeping it past CATALOG_SNAPSHOT_TTL_SECONDS would serve prices the snapshot dropped
+NUMBERED_MENU_TTL_SECONDS: int = int(os.getenv("NUMBERED_MENU_TTL_SECONDS", "300"))
+
+# Public catalog API responses (/public/...) kept in memory, keyed by catalog version
+PUBLIC_CACHE_SIZE: int = int(os.getenv("PUBLIC_CACHE_SIZE", "1000"))
+PUBLIC_CACHE_TTL_SECONDS: int = int(os.getenv("PUBLIC_CACHE_TTL_SECONDS", "300"))
+
+# Cache-Control max-age (seconds) for public catalog responses (browsers / proxies revalidate with ETag)
+PUBLIC_CACHE_MAX_AGE_SECONDS: int = int(os.getenv("PUBLIC_CACHE_MAX_AGE_SECONDS", "60"))
+
+# Autocomplete (/public/autocomplete): memoized prefix answers, and order popularity used as weights
+AUTOCOMPLETE_CACHE_SIZE: int = int(os.getenv("AUTOCOMPLETE_CACHE_SIZE", "5000"))
+AUTOCOMPLETE_POPULARITY_DAYS: int = int(os.getenv("AUTOCOMPLETE_POPULARITY_DAYS", "30"))
+AUTOCOMPLETE_POPULARITY_TTL_SECONDS: int = int(os.getenv("AUTOCOMPLETE_POPULARITY_TTL_SECONDS", "3600"))
+
+# Catalog change feed poll interval (seconds) when the Redis backend has no pub/sub (Upstash REST)
+CATALOG_VERSION_POLL_SECONDS: float = float(os.getenv("CATALOG_VERSION_POLL_SECONDS", "5"))
+
+# Live driver position max age (seconds) - older GEO entries count as offline and are pruned
+DRIVER_LOCATION_TTL_SECONDS: int = int(os.getenv("DRIVER_LOCATION_TTL_SECONDS", "300"))
+
+
+# ==================== Webhook Processing ====================
+# Async workers handling incoming WhatsApp messages (one phone's messages one at a time)
+WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", "8"))
+
+# Max messages waiting per worker (in total across phones) before producers wait
+WEBHOOK_QUEUE_MAXSIZE: int = int(os.getenv("WEBHOOK_QUEUE_MAXSIZE", "1000"))
+
+# Approximate cap on the Redis webhook stream length
+WEBHOOK_STREAM_MAXLEN: int = int(os.getenv("WEBHOOK_STREAM_MAXLEN", "10000"))
+
+# Stream entries read per XREADGROUP call
+WEBHOOK_READ_BATCH: int = int(os.getenv("WEBHOOK_READ_BATCH", "50"))
+
+# Stream read block / poll interval (milliseconds)
+WEBHOOK_POLL_INTERVAL_MS: int = int(os.getenv("WEBHOOK_POLL_INTERVAL_MS", "200"))
+
+# Stream poll interval on REST backends (Upstash), which cannot block (milliseconds)
+WEBHOOK_REST_POLL_INTERVAL_MS: int = int(os.getenv("WEBHOOK_REST_POLL_INTERVAL_MS", "1000"))
+
+# Unacked stream entries idle this long are claimed from dead workers (milliseconds).
+# Must stay well above one entry's read-to-ack time on a live worker: waiting
+# behind the same phone's messages, then up to PHONE_LOCK_TIMEOUT_SECONDS for
+# the lock plus AI_QUEUE_TIMEOUT_SECONDS + AI_CALL_TIMEOUT_SECONDS per LLM call
+WEBHOOK_CLAIM_IDLE_MS: int = int(os.getenv("WEBHOOK_CLAIM_IDLE_MS", "600000"))
+
+# How often each consumer looks for such entries (milliseconds)
+WEBHOOK_CLAIM_INTERVAL_MS: int = int(os.getenv("WEBHOOK_CLAIM_INTERVAL_MS", "30000"))
+
+
+# ==================== Message Deduplication ====================
+# How long a WhatsApp message id is remembered (Meta retries for hours)
+MESSAGE_DEDUP_TTL_SECONDS: int = int(os.getenv("MESSAGE_DEDUP_TTL_SECONDS", "86400"))
+
+# Claim held while a message is being queued / handled; a node that crashes in
+# between only blocks Meta's redelivery this long
+MESSAGE_DEDUP_PENDING_TTL_SECONDS: int = int(os.getenv("MESSAGE_DEDUP_PENDING_TTL_SECONDS", "120"))
+
+# Recently seen message ids kept in process (skips the Redis round trip)
+MESSAGE_DEDUP_LOCAL_SIZE: int = int(os.getenv("MESSAGE_DEDUP_LOCAL_SIZE", "10000"))
+
+
+# ==================== Per-phone Locking ====================
+# Max wait for another message of the same user to finish (seconds)
+PHONE_LOCK_TIMEOUT_SECONDS: float = float(os.getenv("PHONE_LOCK_TIMEOUT_SECONDS", "30"))
+
+# Redis lease length; renewed while the holder is still working (milliseconds)
+PHONE_LOCK_LEASE_MS: int = int(os.getenv("PHONE_LOCK_LEASE_MS", "15000"))
+
+# Delay between Redis lease attempts while another node holds it (milliseconds)
+PHONE_LOCK_RETRY_MS: int = int(os.getenv("PHONE_LOCK_RETRY_MS", "50"))
+
+
+# ==================== Driver Dispatch ====================
+# Batch window (seconds): unassigned delivery orders are collected and assigned together this often
+DISPATCH_WINDOW_SECONDS: int = int(os.getenv("DISPATCH_WINDOW_SECONDS", "15"))
+
+# Most orders considered in one dispatch round (oldest first; the rest wait for the next round)
+DISPATCH_MAX_ORDERS: int = int(os.getenv("DISPATCH_MAX_ORDERS", "200"))
+
 
 # ==================== Database ====================
 # Connection pool settings
@@ -104,6 +197,18 @@ AI_MAX_PRODUCTS_CONTEXT: int = int(os.getenv("AI_MAX_PRODUCTS_CONTEXT", "80"))
 # Max conversation messages to keep
 AI_MAX_CONVERSATION_MESSAGES: int = int(os.getenv("AI_MAX_CONVERSATION_MESSAGES", "10"))
 
+# LLM backend: "gemini" (production) or "fake" (local load tests)
+AI_LLM_BACKEND: str = os.getenv("AI_LLM_BACKEND", "gemini")
+
+# Max concurrent LLM calls per process (also the Gemini worker pool size)
+AI_MAX_CONCURRENT_CALLS: int = int(os.getenv("AI_MAX_CONCURRENT_CALLS", "8"))
+
+# Per-call LLM timeout (seconds)
+AI_CALL_TIMEOUT_SECONDS: float = float(os.getenv("AI_CALL_TIMEOUT_SECONDS", "20"))
+
+# Max time to wait for a free LLM slot before giving up (seconds)
+AI_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("AI_QUEUE_TIMEOUT_SECONDS", "10"))
+
 
 # ==================== WhatsApp ====================
 # API version
@@ -115,6 +220,22 @@ WHATSAPP_MAX_LIST_ITEMS: int = 10
 WHATSAPP_MAX_LIST_SECTIONS: int = 10
 WHATSAPP_MAX_TITLE_LENGTH: int = 24
 WHATSAPP_MAX_DESCRIPTION_LENGTH: int = 72
+WHATSAPP_MAX_TEXT_LENGTH: int = 4096
+
+# Outbound throughput per sender number (Cloud API default is 80 messages/s)
+WHATSAPP_SEND_RATE_PER_SECOND: float = float(os.getenv("WHATSAPP_SEND_RATE_PER_SECOND", "80"))
+WHATSAPP_SEND_BURST: int = int(os.getenv("WHATSAPP_SEND_BURST", "80"))
+
+# Max Graph API requests in flight (also the HTTP connection pool size)
+WHATSAPP_MAX_CONCURRENT_SENDS: int = int(os.getenv("WHATSAPP_MAX_CONCURRENT_SENDS", "32"))
+
+# Workers draining the outbound queue (one recipient -> one worker)
+WHATSAPP_SEND_WORKERS: int = int(os.getenv("WHATSAPP_SEND_WORKERS", "16"))
+
+# Retries for timeouts, 5xx and rate limits; jittered exponential backoff (seconds)
+WHATSAPP_MAX_RETRIES: int = int(os.getenv("WHATSAPP_MAX_RETRIES", "3"))
+WHATSAPP_RETRY_BASE_SECONDS: float = float(os.getenv("WHATSAPP_RETRY_BASE_SECONDS", "1"))
+WHATSAPP_RETRY_MAX_SECONDS: float = float(os.getenv("WHATSAPP_RETRY_MAX_SECONDS", "30"))
 
 
 # ==================== Pagination ====================
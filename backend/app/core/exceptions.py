@@ -386,3 +386,12 @@ class WebhookPayloadError(WebhookError):
     def __init__(self, reason: str = "Malformed payload"):
         super().__init__(reason)
         self.code = "INVALID_WEBHOOK_PAYLOAD"
+
+
+class MessageLockTimeoutError(WebhookError):
+    """Timed out waiting for another message of the same user to finish"""
+
+    def __init__(self, phone_number: str, waited: float):
+        super().__init__(f"Timed out after {waited:.1f}s waiting for the message lock")
+        self.code = "MESSAGE_LOCK_TIMEOUT"
+        self.details["phone_number"] = phone_number
@@ -0,0 +1,122 @@
+"""
+HTTP response cache for anonymous catalog endpoints (/public/...).
+
+Responses are rendered once per (path, query, catalog stamp) and kept as
+serialized JSON with a strong ETag (hash of the body):
+
+    catalog stamp   - restaurant routes: version of the restaurant list and of
+                      that restaurant; list routes: sum of every restaurant's
+                      version (see app.services.catalog_events), so a catalog
+                      write changes the key and the next request re-renders
+    If-None-Match   - answered with 304 when it matches the current ETag
+    Cache-Control   - public, short max-age so browsers and proxies revalidate
+
+Requests with free-text parameters (search) are rendered every time and not
+stored: each keystroke would otherwise push a single-use entry into the LRU
+and evict the shared list and menu pages.
+
+The ETag depends only on the body, so every node agrees on it.
+"""
+import hashlib
+import json
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.constants import (
+    PUBLIC_CACHE_MAX_AGE_SECONDS, PUBLIC_CACHE_SIZE, PUBLIC_CACHE_TTL_SECONDS,
+)
+from app.services.catalog_events import catalog_feed
+from app.services.redis_service import LRUCache
+
+CacheKey = Tuple[str, str, str]
+
+# Query parameters holding free text; a request using any of them is not cached
+UNCACHED_PARAMS = ("search", "q")
+
+
+def catalog_stamp(restaurant_id: Optional[int] = None) -> str:
+    """Version stamp of the catalog data a response depends on"""
+    if restaurant_id is None:
+        return f"all.{sum(catalog_feed.versions.values())}"
+    return f"{catalog_feed.get_version(None)}.{catalog_feed.get_version(restaurant_id)}"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/"x" matches "x", * matches anything"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class CachedBody:
+    __slots__ = ("body", "etag", "built_at")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.built_at = time.time()
+
+
+class PublicResponseCache:
+    """(path, query, catalog stamp) -> serialized JSON body + ETag"""
+
+    def __init__(self, max_size: int = PUBLIC_CACHE_SIZE, ttl_seconds: int = PUBLIC_CACHE_TTL_SECONDS,
+                 max_age: int = PUBLIC_CACHE_MAX_AGE_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.cache_control = f"public, max-age={max_age}, stale-while-revalidate={max_age * 5}"
+        self._bodies = LRUCache(max_size)
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "not_modified": 0}
+
+    @staticmethod
+    def _key(request: Request, restaurant_id: Optional[int]) -> Optional[CacheKey]:
+        """None for requests that must not be stored (free-text search)"""
+        if any(request.query_params.get(param) for param in UNCACHED_PARAMS):
+            return None
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        return request.url.path, query, catalog_stamp(restaurant_id)
+
+    async def respond(
+        self,
+        request: Request,
+        render: Callable[[], Awaitable[Any]],
+        restaurant_id: Optional[int] = None,
+    ) -> Response:
+        """Cached (or freshly rendered) JSON response; 304 if the client has it"""
+        key = self._key(request, restaurant_id)
+        cached = self._bodies.get(key) if key is not None else None
+        if cached is not None and time.time() - cached.built_at < self.ttl_seconds:
+            self._stats["hits"] += 1
+        else:
+            self._stats["misses" if key is not None else "bypassed"] += 1
+            # HTTPException (e.g. 404) propagates and is not cached
+            data = await render()
+            cached = CachedBody(json.dumps(
+                jsonable_encoder(data), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            ).encode("utf-8"))
+            if key is not None:
+                self._bodies.set(key, cached)
+
+        headers = {"ETag": cached.etag, "Cache-Control": self.cache_control}
+        if etag_matches(request.headers.get("if-none-match"), cached.etag):
+            self._stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        self._bodies.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["responses"] = len(self._bodies)
+        return stats
+
+
+public_response_cache = PublicResponseCache()
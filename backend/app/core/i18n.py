@@ -119,6 +119,7 @@ TRANSLATIONS = {
 
         # Conversation
         "thinking": "🤔 Let me check...",
+        "still_processing": "⏳ Still working on your previous message. Please send this one again in a moment.",
     },
     "ar": {
         # Welcome & Main Menu
@@ -238,6 +239,7 @@ TRANSLATIONS = {
 
         # Conversation
         "thinking": "🤔 خليني شوف...",
+        "still_processing": "⏳ بعدنا عم نشتغل على رسالتك السابقة. ابعت هالرسالة كمان مرة بعد شوي 🙏",
     }
 }
 
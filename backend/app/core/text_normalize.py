@@ -0,0 +1,96 @@
+"""
+Text normalization shared by the in-memory search structures.
+Arabic letter variants, diacritics and Arabic-Indic digits are unified so that
+"شاورما" / "شاورمآ" / "شَاوَرما" all index to the same key.
+"""
+import re
+from typing import List, Set
+
+_ALEF_RE = re.compile(r'[أإآا]')
+_YEH_RE = re.compile(r'[يى]')
+_DIACRITICS_RE = re.compile(r'[ً-ْ]')
+_TOKEN_SPLIT_RE = re.compile(r'[^\w]+', re.UNICODE)
+_ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+
+
+def normalize_arabic(text: str) -> str:
+    """Normalize Arabic text (same rules as the bot's historical matcher)"""
+    if not text:
+        return ""
+    text = _ALEF_RE.sub('ا', text)
+    text = _YEH_RE.sub('ي', text)
+    text = text.replace('ة', 'ه')
+    text = _DIACRITICS_RE.sub('', text)
+    text = text.translate(_ARABIC_DIGITS)
+    return text.strip().lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split normalized text into word tokens"""
+    return [t for t in _TOKEN_SPLIT_RE.split(text) if t]
+
+
+def char_ngrams(text: str, n: int = 3) -> Set[str]:
+    """Unpadded character n-grams of a normalized string"""
+    if len(text) < n:
+        return set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+# Arabic letters -> Latin, as restaurant names are usually transliterated
+_ARABIC_TO_LATIN = str.maketrans({
+    'ا': 'a', 'أ': 'a', 'إ': 'i', 'آ': 'a', 'ء': '', 'ئ': 'y', 'ؤ': 'w',
+    'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j', 'ح': 'h', 'خ': 'kh', 'د': 'd',
+    'ذ': 'z', 'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'sh', 'ص': 's', 'ض': 'd',
+    'ط': 't', 'ظ': 'z', 'ع': 'a', 'غ': 'gh', 'ف': 'f', 'ق': 'q', 'ك': 'k',
+    'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h', 'ة': 'h', 'و': 'w', 'ي': 'y',
+    'ى': 'a', 'ـ': '',
+})
+# Latin spellings that Arabic writes with a single letter (g -> ج, p -> ب, v -> ف ...)
+_LATIN_FOLD = str.maketrans({'c': 'k', 'q': 'k', 'g': 'j', 'p': 'b', 'v': 'f', 'x': 'k', 'z': 's'})
+_LATIN_DIGRAPHS = (('ch', 'tsh'), ('tz', 'z'), ('ph', 'f'), ('ck', 'k'))
+_ARTICLES = {'al', 'el'}
+_VOWELS_RE = re.compile(r'[aeiouywh]')
+_REPEAT_RE = re.compile(r'(.)\1+')
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9 ]')
+
+
+def transliterate_arabic(text: str) -> str:
+    """Rough Arabic -> Latin transliteration of normalized text"""
+    return normalize_arabic(text).translate(_ARABIC_TO_LATIN)
+
+
+def phonetic_key(text: str) -> str:
+    """
+    Script-independent consonant skeleton, so "كينج كرواسون" and
+    "King Croissant" both become "knj krsn(t)".
+    """
+    latin = _NON_ALNUM_RE.sub('', transliterate_arabic(text))
+    words = []
+    for word in latin.split():
+        # Definite article, written apart ("Al Safadi") or joined ("الصفدي")
+        if word in _ARTICLES:
+            continue
+        if word[:2] == 'al' and len(word) > 4:
+            word = word[2:]
+        for digraph, replacement in _LATIN_DIGRAPHS:
+            word = word.replace(digraph, replacement)
+        word = word.translate(_LATIN_FOLD)
+        word = word[0] + _VOWELS_RE.sub('', word[1:]) if word[0] in 'aeiouy' else _VOWELS_RE.sub('', word)
+        word = _REPEAT_RE.sub(r'\1', word)
+        if word:
+            words.append(word)
+    return " ".join(words)
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance between two short strings"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
@@ -4,3 +4,4 @@ from app.models.restaurant import Restaurant, Branch
 from app.models.menu import Menu, Category, MenuItem
 from app.models.order import Order, OrderItem
 from app.models.audit import AuditLog
+from app.models.catalog import CatalogVersion
@@ -7,6 +7,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import AsyncSessionLocal
 from app.models.restaurant import Restaurant, RestaurantCategory, Branch
 from app.models.menu import Menu, Category, MenuItem, MenuItemVariant
+from app.services.catalog_events import bump_catalog_version, catalog_feed
+from app.services.restaurant_slugs import assign_slug
 
 # LBP to USD conversion rate
 LBP_RATE = 90000
@@ -203,6 +205,7 @@ async def seed_categories(db: AsyncSession):
             db.add(cat)
             created += 1
     
+    await bump_catalog_version(db, None)
     await db.commit()
     print(f"✅ Categories: {created} created, {len(existing)} already existed")
 
@@ -223,6 +226,7 @@ async def seed_restaurants(db: AsyncSession):
             category_id=categories.get(rest_data["category"]),
             is_active=True,
         )
+        await assign_slug(db, restaurant)
         db.add(restaurant)
         await db.flush()
         
@@ -314,6 +318,7 @@ async def seed_restaurants(db: AsyncSession):
         
         print(f"✅ Seeded: {rest_data['name']}")
     
+    await bump_catalog_version(db, None)
     await db.commit()
 
 
@@ -322,6 +327,8 @@ async def main():
         print("🚀 Starting seed...")
         await seed_categories(db)
         await seed_restaurants(db)
+        # Tell running nodes to drop their cached menus
+        await catalog_feed.flush()
         print("✅ Seeding complete!")
 
 
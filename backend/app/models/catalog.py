@@ -0,0 +1,18 @@
+"""
+Catalog version stamps.
+
+One row per restaurant, bumped in the same transaction as any write to its
+menus, categories, items, variants or customizations (see
+app.services.catalog_events). Row 0 stands for the restaurant list itself
+(writes affecting every restaurant).
+"""
+from sqlalchemy import Column, Integer, BigInteger, DateTime, func
+from app.db.base_class import Base
+
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+
+    restaurant_id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False, index=True)
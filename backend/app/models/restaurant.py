@@ -26,6 +26,7 @@ class Restaurant(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)  # English name
     name_ar = Column(String, nullable=True)  # Arabic name
+    slug = Column(String, unique=True, index=True, nullable=True)  # Website URL slug (from name)
     description = Column(String, nullable=True)  # English description
     description_ar = Column(String, nullable=True)  # Arabic description
     logo_url = Column(String, nullable=True)
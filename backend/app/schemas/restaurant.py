@@ -5,6 +5,7 @@ from pydantic import BaseModel
 class RestaurantBase(BaseModel):
     name: str
     name_ar: Optional[str] = None
+    slug: Optional[str] = None  # Derived from name when not given
     description: Optional[str] = None
     description_ar: Optional[str] = None
     logo_url: Optional[str] = None
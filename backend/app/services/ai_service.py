@@ -1,5 +1,11 @@
-import google.generativeai as genai
 from app.core.config import settings
+from app.core.constants import AI_LLM_BACKEND, AI_TEMPERATURE
+from app.services.llm_service import LLMExecutor, LLMBackend, create_llm_backend
+from app.services.catalog_service import catalog_service
+from app.services.search_index import ProductSearchIndex, product_search_service
+from app.services.restaurant_resolver import restaurant_resolver
+from app.services.menu_matcher import menu_matcher_cache
+from app.core.text_normalize import normalize_arabic
 from app.db.session import AsyncSessionLocal
 from app.models.menu import MenuItem, Category, Menu
 from app.models.restaurant import Restaurant, RestaurantCategory
@@ -67,15 +73,25 @@ def get_phrase(category: str, **kwargs) -> str:
 
 
 class AIService:
-    def __init__(self):
+    def __init__(self, backend: Optional[LLMBackend] = None):
         self.api_key = settings.GEMINI_API_KEY
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash')
-            logger.info("✅ Gemini AI initialized successfully")
+        if backend is None:
+            backend = create_llm_backend(AI_LLM_BACKEND, self.api_key)
+        # Async execution layer - keeps blocking SDK calls off the event loop
+        self.llm = LLMExecutor(backend)
+        if backend:
+            logger.info(f"✅ AI initialized successfully (backend: {backend.name})")
         else:
             logger.warning("GEMINI_API_KEY not found. AI features will be disabled.")
-            self.model = None
+
+    @property
+    def model(self) -> Optional[LLMBackend]:
+        """Active LLM backend (None when AI is disabled)"""
+        return self.llm.backend
+
+    async def close(self):
+        """Shut down the LLM backend"""
+        await self.llm.close()
 
     async def process_smart_order(
         self,
@@ -99,7 +115,7 @@ class AIService:
             return {"success": False, "intent": "error", "message": "AI غير متاح"}
 
         try:
-            # Get smart context based on current state
+            # Get smart context based on current state (served from the in-memory catalog snapshot)
             products_context = await self._get_smart_products_context(restaurant_id, text)
             restaurants_context = await self._get_restaurants_with_categories()
             categories_context = await self._get_categories_context()
@@ -111,15 +127,9 @@ class AIService:
                 restaurant_id, conversation_history, cart_items
             )
             
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.4,
-                    response_mime_type="application/json"
-                )
-            )
+            response_text = await self.llm.generate(prompt, temperature=AI_TEMPERATURE, json_mode=True)
             
-            result = self._parse_ai_response(response.text)
+            result = self._parse_ai_response(response_text)
             
             # Enrich result with database info
             result = await self._enrich_result(result, restaurant_id)
@@ -321,73 +331,8 @@ class AIService:
     async def _get_smart_products_context(self, restaurant_id: Optional[int] = None, query: str = "") -> str:
         """Get smart products context based on current state"""
         try:
-            async with AsyncSessionLocal() as db:
-                # Strategy 1: If in a specific restaurant, get only that restaurant's products
-                if restaurant_id:
-                    result = await db.execute(
-                        select(MenuItem, Menu, Restaurant)
-                        .join(Category, MenuItem.category_id == Category.id)
-                        .join(Menu, Category.menu_id == Menu.id)
-                        .join(Restaurant, Menu.restaurant_id == Restaurant.id)
-                        .where(MenuItem.is_available == True)
-                        .where(Restaurant.id == restaurant_id)
-                        .limit(100)
-                    )
-                    items = result.all()
-
-                # Strategy 2: If query contains a product keyword, search for it
-                elif query:
-                    # Common product keywords
-                    keywords = query.lower().split()
-                    result = await db.execute(
-                        select(MenuItem, Menu, Restaurant)
-                        .join(Category, MenuItem.category_id == Category.id)
-                        .join(Menu, Category.menu_id == Menu.id)
-                        .join(Restaurant, Menu.restaurant_id == Restaurant.id)
-                        .where(MenuItem.is_available == True)
-                        .where(Restaurant.is_active == True)
-                        .limit(300)
-                    )
-                    all_items = result.all()
-
-                    # Filter items that match the query
-                    items = []
-                    for item, menu, restaurant in all_items:
-                        item_name = (item.name_ar or item.name or "").lower()
-                        if any(kw in item_name for kw in keywords):
-                            items.append((item, menu, restaurant))
-
-                    # If no matches, return most popular items
-                    if not items:
-                        items = all_items[:50]
-
-                # Strategy 3: Default - get popular/diverse items
-                else:
-                    result = await db.execute(
-                        select(MenuItem, Menu, Restaurant)
-                        .join(Category, MenuItem.category_id == Category.id)
-                        .join(Menu, Category.menu_id == Menu.id)
-                        .join(Restaurant, Menu.restaurant_id == Restaurant.id)
-                        .where(MenuItem.is_available == True)
-                        .where(Restaurant.is_active == True)
-                        .limit(80)
-                    )
-                    items = result.all()
-
-                # Format products
-                products = []
-                for item, menu, restaurant in items[:80]:  # Limit to 80
-                    name = item.name_ar or item.name
-                    rest_name = restaurant.name_ar or restaurant.name
-                    if hasattr(item, 'has_variants') and item.has_variants and hasattr(item, 'price_min') and item.price_min:
-                        price_str = f"${item.price_min:.2f}-${item.price_max:.2f}"
-                    elif item.price:
-                        price_str = f"${item.price:.2f}"
-                    else:
-                        price_str = "$0.00"
-                    products.append(f"- {name} ({price_str}) @ {rest_name} [ID:{item.id}]")
-
-                return "\n".join(products)
+            snapshot = await catalog_service.get_snapshot()
+            return snapshot.products_context(restaurant_id, query) if snapshot else ""
         except Exception as e:
             logger.error(f"Error getting smart products: {e}")
             return ""
@@ -399,21 +344,8 @@ class AIService:
     async def _get_restaurants_with_categories(self) -> str:
         """Get restaurants with their categories"""
         try:
-            async with AsyncSessionLocal() as db:
-                result = await db.execute(
-                    select(Restaurant, RestaurantCategory)
-                    .outerjoin(RestaurantCategory, Restaurant.category_id == RestaurantCategory.id)
-                    .where(Restaurant.is_active == True)
-                )
-                rows = result.all()
-                
-                restaurants = []
-                for rest, cat in rows:
-                    cat_name = cat.name if cat else "Other"
-                    rest_name = rest.name_ar or rest.name
-                    restaurants.append(f"- {rest_name} (ID:{rest.id}) [{cat_name}]")
-                
-                return "\n".join(restaurants)
+            snapshot = await catalog_service.get_snapshot()
+            return snapshot.restaurants_context if snapshot else ""
         except Exception as e:
             logger.error(f"Error getting restaurants: {e}")
             return ""
@@ -421,13 +353,8 @@ class AIService:
     async def _get_categories_context(self) -> str:
         """Get restaurant categories"""
         try:
-            async with AsyncSessionLocal() as db:
-                result = await db.execute(
-                    select(RestaurantCategory)
-                    .where(RestaurantCategory.is_active == True)
-                )
-                categories = result.scalars().all()
-                return "\n".join([f"- {c.name} / {c.name_ar}" for c in categories])
+            snapshot = await catalog_service.get_snapshot()
+            return snapshot.categories_context if snapshot else ""
         except Exception as e:
             return ""
 
@@ -477,37 +404,14 @@ class AIService:
         return result
 
     async def _find_restaurants_with_product(self, product: str) -> List[dict]:
-        """Find restaurants that have products matching the query"""
+        """Find restaurants that have products matching the query (ranked)"""
         try:
-            async with AsyncSessionLocal() as db:
-                # Search in menu items
-                result = await db.execute(
-                    select(Restaurant, MenuItem)
-                    .join(Menu, Restaurant.id == Menu.restaurant_id)
-                    .join(Category, Menu.id == Category.menu_id)
-                    .join(MenuItem, Category.id == MenuItem.category_id)
-                    .where(Restaurant.is_active == True)
-                    .where(MenuItem.is_available == True)
-                )
-                rows = result.all()
-                
-                # Normalize search
-                product_lower = self._normalize_arabic(product)
-                matching = {}
-                
-                for rest, item in rows:
-                    item_name = self._normalize_arabic(item.name_ar or item.name)
-                    if product_lower in item_name or item_name in product_lower:
-                        if rest.id not in matching:
-                            matching[rest.id] = {
-                                "id": rest.id,
-                                "name": rest.name_ar or rest.name,
-                                "name_en": rest.name,
-                                "items_count": 0
-                            }
-                        matching[rest.id]["items_count"] += 1
-                
-                return list(matching.values())
+            results = await product_search_service.search(product)
+            if results is not None:
+                return results
+            # No snapshot yet: index a one-off catalog read instead
+            snapshot = await catalog_service.load_uncached()
+            return ProductSearchIndex.from_snapshot(snapshot).search(product)
         except Exception as e:
             logger.error(f"Error finding restaurants: {e}")
             return []
@@ -540,36 +444,16 @@ class AIService:
             return []
 
     async def _find_restaurant_id(self, name: str) -> Optional[int]:
-        """Find restaurant ID by name"""
+        """Find restaurant ID by name (Arabic, English or transliterated)"""
         try:
-            async with AsyncSessionLocal() as db:
-                result = await db.execute(
-                    select(Restaurant).where(Restaurant.is_active == True)
-                )
-                restaurants = result.scalars().all()
-                name_lower = self._normalize_arabic(name)
-                
-                for r in restaurants:
-                    r_name = self._normalize_arabic(r.name_ar or r.name)
-                    r_name_en = r.name.lower()
-                    if name_lower in r_name or r_name in name_lower or name_lower in r_name_en:
-                        return r.id
-                return None
-        except Exception:
+            return await restaurant_resolver.resolve(name)
+        except Exception as e:
+            logger.error(f"Restaurant resolver failed: {e}")
             return None
 
     def _normalize_arabic(self, text: str) -> str:
         """Normalize Arabic text"""
-        if not text:
-            return ""
-        text = re.sub(r'[أإآا]', 'ا', text)
-        text = re.sub(r'[يى]', 'ي', text)
-        text = re.sub(r'ة', 'ه', text)
-        text = re.sub(r'[\u064B-\u0652]', '', text)
-        arabic_nums = {'٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4', '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9'}
-        for ar, en in arabic_nums.items():
-            text = text.replace(ar, en)
-        return text.strip().lower()
+        return normalize_arabic(text)
 
     def _parse_ai_response(self, response_text: str) -> Dict[str, Any]:
         """Parse AI response JSON"""
@@ -637,113 +521,53 @@ class AIService:
 
     async def _match_menu_items(self, ai_result: dict, restaurant_id: int) -> dict:
         """Match AI items with actual menu - enhanced with size/variant support"""
+        try:
+            matcher = await menu_matcher_cache.get(restaurant_id)
+        except Exception as e:
+            logger.error(f"Menu matcher unavailable: {e}")
+            matcher = None
+
         matched_items = []
         unmatched_items = []
 
-        try:
-            async with AsyncSessionLocal() as db:
-                # Get menu items
-                result = await db.execute(
-                    select(MenuItem)
-                    .join(Category)
-                    .join(Menu)
-                    .where(Menu.restaurant_id == restaurant_id)
-                    .where(MenuItem.is_available == True)
-                )
-                menu_items = result.scalars().all()
-
-                # Build lookup with both Arabic and English names
-                menu_lookup = {}
-                for item in menu_items:
-                    name = self._normalize_arabic(item.name_ar or item.name)
-                    menu_lookup[name] = item
-                    if item.name_ar:
-                        menu_lookup[self._normalize_arabic(item.name)] = item
-
-                for requested in ai_result.get("items", []):
-                    req_name = requested.get("name", "")
-                    req_size = requested.get("size")  # Size from AI
-                    quantity = requested.get("quantity", 1)
-                    matched = None
-                    matched_variant = None
-
-                    # Extract size from name if not provided separately
-                    base_name, extracted_size = self._extract_size_from_name(req_name)
-                    if not req_size and extracted_size:
-                        req_size = extracted_size
-
-                    normalized_name = self._normalize_arabic(base_name or req_name)
-
-                    # Try exact match first
-                    if normalized_name in menu_lookup:
-                        matched = menu_lookup[normalized_name]
-                    else:
-                        # Partial match
-                        for menu_name, item in menu_lookup.items():
-                            if normalized_name in menu_name or menu_name in normalized_name:
-                                matched = item
-                                break
-
-                    if matched:
-                        price = float(matched.price) if matched.price else 0.0
-                        variant_id = None
-                        variant_name = None
-
-                        # Check if item has variants and size was requested
-                        if hasattr(matched, 'has_variants') and matched.has_variants and req_size:
-                            # Get variants for this item
-                            from app.models.menu import MenuItemVariant
-                            variants_result = await db.execute(
-                                select(MenuItemVariant)
-                                .where(MenuItemVariant.menu_item_id == matched.id)
-                            )
-                            variants = variants_result.scalars().all()
-
-                            # Map size to variant
-                            size_map = {
-                                "small": ["small", "s", "صغير", "صغيرة"],
-                                "medium": ["medium", "m", "وسط", "متوسط"],
-                                "large": ["large", "l", "كبير", "كبيرة"],
-                            }
-
-                            for variant in variants:
-                                v_name = (variant.name or "").lower()
-                                v_name_ar = (variant.name_ar or "").lower()
-
-                                # Check if variant matches requested size
-                                if req_size in size_map:
-                                    for size_keyword in size_map[req_size]:
-                                        if size_keyword in v_name or size_keyword in v_name_ar:
-                                            matched_variant = variant
-                                            break
-                                if matched_variant:
-                                    break
-
-                            if matched_variant:
-                                price = float(matched_variant.price) if matched_variant.price else price
-                                variant_id = matched_variant.id
-                                variant_name = matched_variant.name_ar or matched_variant.name
-                                logger.info(f"Matched item: {matched.name_ar or matched.name} with variant: {variant_name} price: {price}")
-
-                        item_data = {
-                            "menu_item_id": matched.id,
-                            "name": matched.name_ar or matched.name,
-                            "price": price,
-                            "quantity": quantity,
-                            "restaurant_id": restaurant_id
-                        }
-
-                        if variant_id:
-                            item_data["variant_id"] = variant_id
-                            item_data["variant_name"] = variant_name
-                            item_data["name"] = f"{matched.name_ar or matched.name} ({variant_name})"
-
-                        matched_items.append(item_data)
-                        logger.info(f"Matched item: {item_data['name']} with price: {price}")
-                    else:
-                        unmatched_items.append(requested.get("name", ""))
-        except Exception as e:
-            logger.error(f"Error matching items: {e}")
+        for requested in ai_result.get("items", []):
+            if matcher is None:
+                unmatched_items.append(requested.get("name", ""))
+                continue
+            req_name = requested.get("name", "")
+            req_size = requested.get("size")  # Size from AI
+            quantity = requested.get("quantity", 1)
+
+            # Extract size from name if not provided separately
+            base_name, extracted_size = self._extract_size_from_name(req_name)
+            if not req_size and extracted_size:
+                req_size = extracted_size
+
+            normalized_name = self._normalize_arabic(base_name or req_name)
+            matched, matched_variant = matcher.match(normalized_name, req_size)
+
+            if not matched:
+                unmatched_items.append(req_name)
+                continue
+
+            item_name = matched["name_ar"] or matched["name"]
+            item_data = {
+                "menu_item_id": matched["id"],
+                "name": item_name,
+                "price": matched["price"] or 0.0,
+                "quantity": quantity,
+                "restaurant_id": restaurant_id
+            }
+
+            if matched_variant:
+                variant_name = matched_variant["name_ar"] or matched_variant["name"]
+                item_data["price"] = matched_variant["price"] or item_data["price"]
+                item_data["variant_id"] = matched_variant["id"]
+                item_data["variant_name"] = variant_name
+                item_data["name"] = f"{item_name} ({variant_name})"
+
+            matched_items.append(item_data)
+            logger.info(f"Matched item: {item_data['name']} with price: {item_data['price']}")
 
         ai_result["items"] = matched_items
         ai_result["unmatched"] = unmatched_items
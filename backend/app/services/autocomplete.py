@@ -0,0 +1,297 @@
+"""
+Prefix autocomplete over restaurant and menu item names.
+
+Built from the catalog snapshot as one sorted array of
+
+    (term, kind, id)   kind "r" = restaurant, "i" = menu item
+
+where a term is a normalized Arabic or English name starting at each of its
+words ("شاورما دجاج" is reachable from "شاو" and from "دج"). A prefix is a
+bisect to the first term >= prefix and a walk while terms still start with
+it. Matches are ranked by whole-name prefix first, then by order popularity
+(order count of the restaurant / item over AUTOCOMPLETE_POPULARITY_DAYS),
+and each (prefix, limit) answer is memoized until the index next changes.
+
+Catalog writes re-index only the touched restaurant; popularity is reloaded
+every AUTOCOMPLETE_POPULARITY_TTL_SECONDS with a full rebuild.
+"""
+import asyncio
+import bisect
+import heapq
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple
+import logging
+
+from sqlalchemy import select, func
+
+from app.core.constants import (
+    AUTOCOMPLETE_CACHE_SIZE, AUTOCOMPLETE_POPULARITY_DAYS, AUTOCOMPLETE_POPULARITY_TTL_SECONDS,
+)
+from app.core.text_normalize import normalize_arabic, tokenize
+from app.db.session import AsyncSessionLocal
+from app.models.order import Order, OrderItem
+from app.services.catalog_service import catalog_service, CatalogSnapshot
+from app.services.redis_service import LRUCache
+
+logger = logging.getLogger(__name__)
+
+RESTAURANT = "r"
+ITEM = "i"
+
+# (partial match, -weight, is item, kind, id): sorts best first; [3:] is the entry id
+Posting = Tuple[bool, int, bool, str, int]
+Key = Tuple[str, Posting]
+EntryId = Tuple[str, int]
+
+# Prefixes up to this length are answered from pre-ranked lists
+HEAD_PREFIX_LENGTH = 3
+
+
+class Popularity:
+    """Order counts used as autocomplete weights"""
+
+    def __init__(self, restaurants: Optional[Dict[int, int]] = None, items: Optional[Dict[int, int]] = None):
+        self.restaurants = restaurants or {}
+        self.items = items or {}
+        self.loaded_at = time.time()
+
+
+@lru_cache(maxsize=65536)
+def name_terms(name: Optional[str]) -> Tuple[Tuple[str, bool], ...]:
+    """
+    (term, is_whole_name) for the normalized name and each later word onwards.
+    A word with the Arabic article is also reachable without it ("الشاورما" from "شاورما").
+    """
+    normalized = " ".join(tokenize(normalize_arabic(name or "")))
+    if not normalized:
+        return ()
+    terms = [(normalized, True)]
+    start = 0
+    for word in normalized.split(" "):
+        if start:
+            terms.append((normalized[start:], False))
+        if word.startswith("ال") and len(word) > 4:
+            terms.append((normalized[start + 2:], False))
+        start += len(word) + 1
+    return tuple(terms)
+
+
+class AutocompleteIndex:
+    """Sorted prefix arrays of active restaurants and their available items"""
+
+    def __init__(self, popularity: Optional[Popularity] = None, cache_size: int = AUTOCOMPLETE_CACHE_SIZE):
+        self.version = -1
+        self.popularity = popularity or Popularity()
+        # first letter -> sorted (term, posting); small arrays keep inserts cheap
+        self.shards: Dict[str, List[Key]] = {}
+        # short prefix -> (posting, term) best first, so "ش" never walks half the catalog
+        self.heads: Dict[str, List[Tuple[Posting, str]]] = {}
+        self.entries: Dict[EntryId, Dict[str, Any]] = {}
+        self.restaurant_keys: Dict[int, List[Key]] = {}
+        self._results = LRUCache(cache_size)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def key_count(self) -> int:
+        return sum(len(shard) for shard in self.shards.values())
+
+    # ==================== Maintenance ====================
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CatalogSnapshot, popularity: Optional[Popularity] = None) -> "AutocompleteIndex":
+        index = cls(popularity)
+        index.version = snapshot.version
+        for restaurant_id in snapshot.restaurants:
+            for term, posting in index._add_restaurant(snapshot, restaurant_id):
+                index.shards.setdefault(term[0], []).append((term, posting))
+                for length in range(1, min(HEAD_PREFIX_LENGTH, len(term)) + 1):
+                    index.heads.setdefault(term[:length], []).append((posting, term))
+        for keys in (*index.shards.values(), *index.heads.values()):
+            keys.sort()
+        return index
+
+    def reindex_restaurant(self, snapshot: CatalogSnapshot, restaurant_id: int):
+        """Replace one restaurant's keys with its current snapshot names"""
+        for term, posting in self.restaurant_keys.pop(restaurant_id, ()):
+            self._discard(self.shards.get(term[0]), (term, posting))
+            for length in range(1, min(HEAD_PREFIX_LENGTH, len(term)) + 1):
+                self._discard(self.heads.get(term[:length]), (posting, term))
+            self.entries.pop(posting[3:], None)
+        for term, posting in self._add_restaurant(snapshot, restaurant_id):
+            bisect.insort(self.shards.setdefault(term[0], []), (term, posting))
+            for length in range(1, min(HEAD_PREFIX_LENGTH, len(term)) + 1):
+                bisect.insort(self.heads.setdefault(term[:length], []), (posting, term))
+        self._results.clear()
+
+    @staticmethod
+    def _discard(keys: Optional[list], key: tuple):
+        if keys is None:
+            return
+        position = bisect.bisect_left(keys, key)
+        if position < len(keys) and keys[position] == key:
+            del keys[position]
+
+    def _add_restaurant(self, snapshot: CatalogSnapshot, restaurant_id: int) -> List[Key]:
+        """Register a restaurant's entries; returns its (unsorted) keys"""
+        restaurant = snapshot.restaurants.get(restaurant_id)
+        if not restaurant or not restaurant["is_active"]:
+            return []
+        keys: List[Key] = []
+        self._add_entry(keys, RESTAURANT, restaurant_id, restaurant, restaurant_id,
+                        self.popularity.restaurants.get(restaurant_id, 0))
+        for item in snapshot.iter_items(restaurant_id):
+            if not item["menu_is_active"]:
+                continue
+            self._add_entry(keys, ITEM, item["id"], item, restaurant_id, self.popularity.items.get(item["id"], 0))
+        self.restaurant_keys[restaurant_id] = keys
+        return keys
+
+    def _add_entry(self, keys: List[Key], kind: str, entry_id: int, source: Dict[str, Any],
+                   restaurant_id: int, weight: int):
+        terms = {t for name in (source["name"], source["name_ar"]) for t in name_terms(name)}
+        if not terms:
+            return
+        self.entries[(kind, entry_id)] = {
+            "type": "restaurant" if kind == RESTAURANT else "item",
+            "id": entry_id,
+            "name": source["name"],
+            "name_ar": source["name_ar"],
+            "restaurant_id": restaurant_id,
+            "weight": weight,
+        }
+        for term, whole in terms:
+            # Ranking: whole-name match, then most ordered, restaurants before items
+            keys.append((term, (not whole, -weight, kind != RESTAURANT, kind, entry_id)))
+
+    # ==================== Query ====================
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Best entries whose name (or a later word of it) starts with prefix"""
+        prefix = " ".join(tokenize(normalize_arabic(prefix)))
+        if not prefix:
+            return []
+        cache_key = (prefix, limit)
+        cached = self._results.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if len(prefix) <= HEAD_PREFIX_LENGTH:
+            # Already best first: take the first `limit` distinct entries
+            found: Dict[EntryId, None] = {}
+            for posting, _ in self.heads.get(prefix, ()):
+                found.setdefault(posting[3:])
+                if len(found) == limit:
+                    break
+            ranked = list(found)
+        else:
+            best: Dict[EntryId, Posting] = {}
+            keys = self.shards.get(prefix[0], [])
+            position = bisect.bisect_left(keys, (prefix,))
+            while position < len(keys) and keys[position][0].startswith(prefix):
+                posting = keys[position][1]
+                entry_id = posting[3:]
+                if entry_id not in best or posting < best[entry_id]:
+                    best[entry_id] = posting
+                position += 1
+            ranked = [posting[3:] for posting in heapq.nsmallest(limit, best.values())]
+
+        results = [self.entries[entry_id] for entry_id in ranked]
+        self._results.set(cache_key, results)
+        return results
+
+
+class AutocompleteService:
+    """Keeps an AutocompleteIndex in step with the catalog snapshot"""
+
+    def __init__(self, popularity_ttl_seconds: int = AUTOCOMPLETE_POPULARITY_TTL_SECONDS):
+        self.popularity_ttl_seconds = popularity_ttl_seconds
+        self._index: Optional[AutocompleteIndex] = None
+        # restaurant id (None = everything) -> catalog version of the write
+        self._pending: Dict[Optional[int], int] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._stats = {"queries": 0, "full_builds": 0, "incremental_updates": 0, "popularity_errors": 0}
+        catalog_service.add_listener(self.on_catalog_change)
+
+    def on_catalog_change(self, restaurant_id: Optional[int] = None):
+        self._pending[restaurant_id] = catalog_service.version
+
+    async def _load_popularity(self) -> Popularity:
+        since = datetime.utcnow() - timedelta(days=AUTOCOMPLETE_POPULARITY_DAYS)
+        async with AsyncSessionLocal() as db:
+            restaurant_result = await db.execute(
+                select(Order.restaurant_id, func.count(Order.id))
+                .where(Order.created_at >= since, Order.restaurant_id.isnot(None))
+                .group_by(Order.restaurant_id)
+            )
+            item_result = await db.execute(
+                select(OrderItem.menu_item_id, func.sum(OrderItem.quantity))
+                .join(Order, OrderItem.order_id == Order.id)
+                .where(Order.created_at >= since, OrderItem.menu_item_id.isnot(None))
+                .group_by(OrderItem.menu_item_id)
+            )
+            return Popularity(
+                {rid: int(count) for rid, count in restaurant_result.all()},
+                {item_id: int(count or 0) for item_id, count in item_result.all()},
+            )
+
+    def _popularity_expired(self) -> bool:
+        return time.time() - self._index.popularity.loaded_at >= self.popularity_ttl_seconds
+
+    async def get_index(self) -> Optional[AutocompleteIndex]:
+        snapshot = await catalog_service.get_snapshot()
+        if snapshot is None:
+            return None
+        if self._index is not None and self._index.version == snapshot.version and not self._popularity_expired():
+            return self._index
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._index is not None and self._index.version == snapshot.version and not self._popularity_expired():
+                return self._index
+
+            # Only consume writes this snapshot already reflects
+            applied = [r for r, v in self._pending.items() if v <= snapshot.version]
+            for restaurant_id in applied:
+                del self._pending[restaurant_id]
+
+            if self._index is None or None in applied or self._popularity_expired():
+                try:
+                    popularity = await self._load_popularity()
+                except Exception as e:
+                    # Unweighted (or last known) ranking is still useful
+                    self._stats["popularity_errors"] += 1
+                    logger.warning(f"Could not load order popularity for autocomplete: {e}")
+                    popularity = self._index.popularity if self._index else Popularity()
+                    popularity.loaded_at = time.time()
+                # CPU-bound on large catalogs: build off the event loop, then swap in
+                self._index = await asyncio.to_thread(AutocompleteIndex.from_snapshot, snapshot, popularity)
+                self._stats["full_builds"] += 1
+                logger.info(f"Autocomplete index built: {len(self._index)} names (v{snapshot.version})")
+            else:
+                for restaurant_id in applied:
+                    self._index.reindex_restaurant(snapshot, restaurant_id)
+                self._index.version = snapshot.version
+                self._stats["incremental_updates"] += 1
+            return self._index
+
+    async def complete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Suggestions for a typed prefix ([] if the catalog is unavailable)"""
+        index = await self.get_index()
+        if index is None:
+            return []
+        self._stats["queries"] += 1
+        return index.complete(prefix, limit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["entries"] = len(self._index) if self._index else 0
+        stats["keys"] = self._index.key_count if self._index else 0
+        return stats
+
+
+autocomplete_service = AutocompleteService()
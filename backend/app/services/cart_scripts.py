@@ -0,0 +1,342 @@
+"""
+Atomic WhatsApp cart operations on a Redis hash.
+
+Layout of cart:v2:{phone} (one field group per cart line, line = "{menu_item_id}:{variant_id or 0}"):
+
+    qty:{line}      quantity (HINCRBY)
+    price:{line}    unit price in cents, fixed when the line is created
+    seq:{line}      insertion order, for display
+    meta:{line}     JSON of the cart item as added (name, price, variant_name, ...)
+    _count          cached total quantity
+    _subtotal_cents cached subtotal
+    _seq            line counter
+
+Every operation is a single EVAL (one round trip, no lost updates when
+messages arrive back to back). Each script first migrates a legacy JSON cart
+stored under cart:{phone} if the hash does not exist yet.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.redis_backends import RedisScript, MemoryRedisBackend
+
+CART_KEY = "cart:v2:{phone}"
+LEGACY_CART_KEY = "cart:{phone}"
+
+
+def line_key(menu_item_id: Any, variant_id: Any = None) -> str:
+    return f"{menu_item_id}:{variant_id or 0}"
+
+
+def price_cents(price: Any) -> int:
+    return int(round(float(price or 0) * 100))
+
+
+# ==================== Lua ====================
+
+_LUA_PRELUDE = """
+local cart, legacy = KEYS[1], KEYS[2]
+local ttl = tonumber(ARGV[1])
+
+local function add_line(line, meta, qty, cents)
+  local q = redis.call('HINCRBY', cart, 'qty:' .. line, qty)
+  if q == qty then
+    local seq = redis.call('HINCRBY', cart, '_seq', 1)
+    redis.call('HSET', cart, 'meta:' .. line, meta, 'price:' .. line, cents, 'seq:' .. line, seq)
+  else
+    cents = tonumber(redis.call('HGET', cart, 'price:' .. line) or '0')
+  end
+  redis.call('HINCRBY', cart, '_subtotal_cents', cents * qty)
+  redis.call('HINCRBY', cart, '_count', qty)
+end
+
+local function remove_line(line)
+  local q = tonumber(redis.call('HGET', cart, 'qty:' .. line) or '0')
+  local cents = tonumber(redis.call('HGET', cart, 'price:' .. line) or '0')
+  redis.call('HDEL', cart, 'qty:' .. line, 'price:' .. line, 'seq:' .. line, 'meta:' .. line)
+  redis.call('HINCRBY', cart, '_subtotal_cents', -cents * q)
+  redis.call('HINCRBY', cart, '_count', -q)
+end
+
+local function lines_of(menu_item_id)
+  local fields = redis.call('HGETALL', cart)
+  local prefix = 'qty:' .. menu_item_id .. ':'
+  local lines = {}
+  for i = 1, #fields, 2 do
+    if string.sub(fields[i], 1, #prefix) == prefix then
+      local line = string.sub(fields[i], 5)
+      table.insert(lines, {line, tonumber(redis.call('HGET', cart, 'seq:' .. line) or '0')})
+    end
+  end
+  table.sort(lines, function(a, b) return a[2] < b[2] end)
+  local result = {}
+  for i, entry in ipairs(lines) do result[i] = entry[1] end
+  return result
+end
+
+local function finish()
+  if tonumber(redis.call('HGET', cart, '_count') or '0') <= 0 then
+    redis.call('DEL', cart)
+  else
+    redis.call('EXPIRE', cart, ttl)
+  end
+end
+
+if redis.call('EXISTS', cart) == 0 then
+  local raw = redis.call('GET', legacy)
+  if raw then
+    redis.call('DEL', legacy)
+    local ok, items = pcall(cjson.decode, raw)
+    if ok and type(items) == 'table' then
+      for _, item in ipairs(items) do
+        local qty = tonumber(item.quantity) or 1
+        local variant = item.variant_id
+        if variant == nil or variant == cjson.null then variant = 0 end
+        item.quantity = nil
+        local price = tonumber(item.price) or 0
+        add_line(tostring(item.menu_item_id) .. ':' .. tostring(variant), cjson.encode(item), qty, math.floor(price * 100 + 0.5))
+      end
+      finish()
+    end
+  end
+end
+"""
+
+_LUA_ADD = _LUA_PRELUDE + """
+add_line(ARGV[2], ARGV[3], tonumber(ARGV[4]), tonumber(ARGV[5]))
+finish()
+return {tonumber(redis.call('HGET', cart, '_count') or '0'), tonumber(redis.call('HGET', cart, '_subtotal_cents') or '0')}
+"""
+
+_LUA_SET_QUANTITY = _LUA_PRELUDE + """
+local line
+if ARGV[3] ~= '' then
+  line = ARGV[2] .. ':' .. ARGV[3]
+  if redis.call('HEXISTS', cart, 'qty:' .. line) == 0 then line = nil end
+else
+  line = lines_of(ARGV[2])[1]
+end
+if not line then return 0 end
+local qty = tonumber(ARGV[4])
+if qty <= 0 then
+  remove_line(line)
+else
+  local old = tonumber(redis.call('HGET', cart, 'qty:' .. line))
+  local cents = tonumber(redis.call('HGET', cart, 'price:' .. line) or '0')
+  redis.call('HSET', cart, 'qty:' .. line, qty)
+  redis.call('HINCRBY', cart, '_subtotal_cents', cents * (qty - old))
+  redis.call('HINCRBY', cart, '_count', qty - old)
+end
+finish()
+return 1
+"""
+
+_LUA_REMOVE = _LUA_PRELUDE + """
+local lines
+if ARGV[3] ~= '' then
+  lines = {}
+  local line = ARGV[2] .. ':' .. ARGV[3]
+  if redis.call('HEXISTS', cart, 'qty:' .. line) == 1 then lines[1] = line end
+else
+  lines = lines_of(ARGV[2])
+end
+for _, line in ipairs(lines) do remove_line(line) end
+if #lines > 0 then finish() end
+return #lines
+"""
+
+_LUA_READ = _LUA_PRELUDE + """
+return redis.call('HGETALL', cart)
+"""
+
+_LUA_TOTALS = _LUA_PRELUDE + """
+return {tonumber(redis.call('HGET', cart, '_count') or '0'), tonumber(redis.call('HGET', cart, '_subtotal_cents') or '0')}
+"""
+
+
+# ==================== Python (memory backend) ====================
+
+class _LocalCart:
+    """Same operations as the Lua prelude, on a MemoryRedisBackend hash"""
+
+    def __init__(self, backend: MemoryRedisBackend, keys: List[str], ttl: Any):
+        self.backend = backend
+        self.key, self.legacy = keys
+        self.ttl = int(ttl)
+        self._migrate()
+
+    @property
+    def h(self) -> Dict[str, str]:
+        return self.backend._get(self.key) or {}
+
+    def _migrate(self):
+        if self.backend._alive(self.key):
+            return
+        raw = self.backend._cmd_get(self.legacy)
+        if raw is None:
+            return
+        self.backend._cmd_del(self.legacy)
+        try:
+            items = json.loads(raw)
+        except ValueError:
+            return
+        if not isinstance(items, list):
+            return
+        for item in items:
+            qty = int(item.pop("quantity", 1) or 1)
+            self.add_line(line_key(item.get("menu_item_id"), item.get("variant_id")), json.dumps(item), qty, price_cents(item.get("price")))
+        self.finish()
+
+    def add_line(self, line: str, meta: str, qty: int, cents: int):
+        h = self.backend._container(self.key, dict)
+        q = int(h.get(f"qty:{line}", 0)) + qty
+        h[f"qty:{line}"] = str(q)
+        if q == qty:
+            h["_seq"] = str(int(h.get("_seq", 0)) + 1)
+            h[f"meta:{line}"] = meta
+            h[f"price:{line}"] = str(cents)
+            h[f"seq:{line}"] = h["_seq"]
+        else:
+            cents = int(h.get(f"price:{line}", 0))
+        h["_subtotal_cents"] = str(int(h.get("_subtotal_cents", 0)) + cents * qty)
+        h["_count"] = str(int(h.get("_count", 0)) + qty)
+
+    def remove_line(self, line: str):
+        h = self.h
+        q = int(h.pop(f"qty:{line}", 0))
+        cents = int(h.pop(f"price:{line}", 0))
+        h.pop(f"seq:{line}", None)
+        h.pop(f"meta:{line}", None)
+        h["_subtotal_cents"] = str(int(h.get("_subtotal_cents", 0)) - cents * q)
+        h["_count"] = str(int(h.get("_count", 0)) - q)
+
+    def lines_of(self, menu_item_id: str) -> List[str]:
+        prefix = f"qty:{menu_item_id}:"
+        h = self.h
+        lines = [field[4:] for field in h if field.startswith(prefix)]
+        return sorted(lines, key=lambda line: int(h.get(f"seq:{line}", 0)))
+
+    def find(self, menu_item_id: str, variant_id: str) -> List[str]:
+        if variant_id != "":
+            line = f"{menu_item_id}:{variant_id}"
+            return [line] if f"qty:{line}" in self.h else []
+        return self.lines_of(menu_item_id)
+
+    def finish(self):
+        if int(self.h.get("_count", 0)) <= 0:
+            self.backend._cmd_del(self.key)
+        else:
+            self.backend._cmd_expire(self.key, self.ttl)
+
+    def totals(self) -> List[int]:
+        if not self.backend._alive(self.key):
+            return [0, 0]
+        h = self.h
+        return [int(h.get("_count", 0)), int(h.get("_subtotal_cents", 0))]
+
+
+def _local_add(backend, keys, args):
+    cart = _LocalCart(backend, keys, args[0])
+    cart.add_line(args[1], args[2], int(args[3]), int(args[4]))
+    cart.finish()
+    return cart.totals()
+
+
+def _local_set_quantity(backend, keys, args):
+    cart = _LocalCart(backend, keys, args[0])
+    lines = cart.find(str(args[1]), str(args[2]))
+    if not lines:
+        return 0
+    line, qty = lines[0], int(args[3])
+    if qty <= 0:
+        cart.remove_line(line)
+    else:
+        h = cart.h
+        old = int(h[f"qty:{line}"])
+        cents = int(h.get(f"price:{line}", 0))
+        h[f"qty:{line}"] = str(qty)
+        h["_subtotal_cents"] = str(int(h.get("_subtotal_cents", 0)) + cents * (qty - old))
+        h["_count"] = str(int(h.get("_count", 0)) + qty - old)
+    cart.finish()
+    return 1
+
+
+def _local_remove(backend, keys, args):
+    cart = _LocalCart(backend, keys, args[0])
+    lines = cart.find(str(args[1]), str(args[2]))
+    for line in lines:
+        cart.remove_line(line)
+    if lines:
+        cart.finish()
+    return len(lines)
+
+
+def _local_read(backend, keys, args):
+    _LocalCart(backend, keys, args[0])
+    flat: List[str] = []
+    for field, value in backend._cmd_hgetall(keys[0]).items():
+        flat.extend([field, value])
+    return flat
+
+
+def _local_totals(backend, keys, args):
+    return _LocalCart(backend, keys, args[0]).totals()
+
+
+CART_ADD = RedisScript("cart_add", _LUA_ADD, _local_add)
+CART_SET_QUANTITY = RedisScript("cart_set_quantity", _LUA_SET_QUANTITY, _local_set_quantity)
+CART_REMOVE = RedisScript("cart_remove", _LUA_REMOVE, _local_remove)
+CART_READ = RedisScript("cart_read", _LUA_READ, _local_read)
+CART_TOTALS = RedisScript("cart_totals", _LUA_TOTALS, _local_totals)
+
+
+# ==================== Decoding ====================
+
+def decode_cart(reply: Any) -> List[Dict[str, Any]]:
+    """Cart items (as added, plus quantity) from a CART_READ reply, in insertion order"""
+    if not reply:
+        return []
+    fields = reply if isinstance(reply, dict) else {reply[i]: reply[i + 1] for i in range(0, len(reply) - 1, 2)}
+    items: List[Tuple[int, Dict[str, Any]]] = []
+    for field, value in fields.items():
+        if not field.startswith("meta:"):
+            continue
+        line = field[5:]
+        item = json.loads(value)
+        item["quantity"] = int(fields.get(f"qty:{line}", 0))
+        items.append((int(fields.get(f"seq:{line}", 0)), item))
+    return [item for _, item in sorted(items, key=lambda entry: entry[0])]
+
+
+def decode_summary(reply: Any) -> Dict[str, Any]:
+    """Items, count, subtotal and restaurant from a CART_READ reply"""
+    if not reply:
+        return empty_summary()
+    fields = reply if isinstance(reply, dict) else {reply[i]: reply[i + 1] for i in range(0, len(reply) - 1, 2)}
+    items = decode_cart(fields)
+    return {
+        "items": items,
+        "count": int(fields.get("_count", 0)),
+        "subtotal": int(fields.get("_subtotal_cents", 0)) / 100,
+        "restaurant_id": next((i["restaurant_id"] for i in items if i.get("restaurant_id")), None),
+    }
+
+
+def empty_summary() -> Dict[str, Any]:
+    return {"items": [], "count": 0, "subtotal": 0.0, "restaurant_id": None}
+
+
+def decode_totals(reply: Any) -> Tuple[int, float]:
+    """(item count, subtotal) from a CART_ADD / CART_TOTALS reply"""
+    if not reply:
+        return 0, 0.0
+    count, cents = reply
+    return int(count or 0), int(cents or 0) / 100
+
+
+def cart_keys(phone_number: str) -> List[str]:
+    return [CART_KEY.format(phone=phone_number), LEGACY_CART_KEY.format(phone=phone_number)]
+
+
+def variant_arg(variant_id: Optional[Any]) -> str:
+    return "" if variant_id is None else str(variant_id)
@@ -0,0 +1,215 @@
+"""
+Catalog change feed.
+
+Every catalog write (restaurant, menu, category, item, variant,
+customization) calls bump_catalog_version(db, restaurant_id) before it
+commits. That increments the restaurant's row in catalog_version inside the
+same transaction, so the version only moves if the write is committed.
+
+After the commit the change is:
+
+    applied locally   - CatalogService.invalidate(restaurant_id), which tells
+                        every derived cache (menu matchers, search index,
+                        rendered screens, numbered menus) which restaurant
+                        changed
+    published         - PUBLISH catalog:changes {"restaurant_id", "version"}
+                        so other nodes invalidate the same restaurant
+
+Nodes on a backend without pub/sub (Upstash REST) poll catalog_version every
+CATALOG_VERSION_POLL_SECONDS instead. A change is applied once per version,
+so local applies, echoes and polls never invalidate twice.
+"""
+import asyncio
+import json
+from typing import Optional, Dict, Any, Set
+import logging
+
+from sqlalchemy import event, select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.constants import CATALOG_VERSION_POLL_SECONDS
+from app.db.session import AsyncSessionLocal
+from app.models.catalog import CatalogVersion
+from app.models.menu import Menu, Category, MenuItem
+from app.services.catalog_service import catalog_service
+from app.services.redis_service import redis_service
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "catalog:changes"
+# catalog_version row for writes affecting every restaurant
+ALL_RESTAURANTS = 0
+# Session.info key holding {restaurant_id: version} bumped in the open transaction
+PENDING_KEY = "catalog_changes"
+
+
+async def bump_catalog_version(db: AsyncSession, restaurant_id: Optional[int]) -> int:
+    """Increment a restaurant's catalog version in the caller's transaction"""
+    row_id = restaurant_id or ALL_RESTAURANTS
+    stmt = (
+        insert(CatalogVersion)
+        .values(restaurant_id=row_id, version=1)
+        .on_conflict_do_update(
+            index_elements=[CatalogVersion.restaurant_id],
+            set_={"version": CatalogVersion.version + 1, "updated_at": func.now()},
+        )
+        .returning(CatalogVersion.version)
+    )
+    version = (await db.execute(stmt)).scalar_one()
+    db.info.setdefault(PENDING_KEY, {})[row_id] = version
+    return version
+
+
+async def restaurant_id_for_item(db: AsyncSession, menu_item_id: int) -> Optional[int]:
+    """Restaurant owning a menu item (for writes that only know the item)"""
+    result = await db.execute(
+        select(Menu.restaurant_id)
+        .join(Category, Category.menu_id == Menu.id)
+        .join(MenuItem, MenuItem.category_id == Category.id)
+        .where(MenuItem.id == menu_item_id)
+    )
+    return result.scalar_one_or_none()
+
+
+class CatalogFeed:
+    """Applies and distributes committed catalog versions"""
+
+    def __init__(self, redis=None, poll_seconds: float = CATALOG_VERSION_POLL_SECONDS):
+        self.redis = redis or redis_service
+        self.poll_seconds = poll_seconds
+        # restaurant id -> latest applied version (ALL_RESTAURANTS for the list itself)
+        self.versions: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._pending_publishes: Set[asyncio.Task] = set()
+        self._stats = {"committed": 0, "published": 0, "received": 0, "applied": 0, "polls": 0, "errors": 0}
+
+    def get_version(self, restaurant_id: Optional[int] = None) -> int:
+        """Latest known catalog version of a restaurant (None = the restaurant list)"""
+        return self.versions.get(restaurant_id or ALL_RESTAURANTS, 0)
+
+    def apply(self, restaurant_id: int, version: int) -> bool:
+        """Invalidate caches for a version newer than the one already applied"""
+        if version <= self.versions.get(restaurant_id, 0):
+            return False
+        self.versions[restaurant_id] = version
+        self._stats["applied"] += 1
+        catalog_service.invalidate(None if restaurant_id == ALL_RESTAURANTS else restaurant_id)
+        return True
+
+    def on_commit(self, changes: Dict[int, int]):
+        """Called after a transaction that bumped versions has committed"""
+        self._stats["committed"] += len(changes)
+        for restaurant_id, version in changes.items():
+            self.apply(restaurant_id, version)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sync context (scripts): other nodes catch up by polling / TTL
+        task = loop.create_task(self.publish(changes))
+        self._pending_publishes.add(task)
+        task.add_done_callback(self._pending_publishes.discard)
+
+    async def publish(self, changes: Dict[int, int]):
+        for restaurant_id, version in changes.items():
+            try:
+                await self.redis.publish_catalog_change(restaurant_id, version)
+                self._stats["published"] += 1
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Failed to publish catalog change for restaurant {restaurant_id}: {e}")
+
+    async def flush(self):
+        """Wait for publishes scheduled by recent commits (scripts exiting right after a write)"""
+        if self._pending_publishes:
+            await asyncio.gather(*self._pending_publishes, return_exceptions=True)
+
+    def on_message(self, data: Any):
+        """Handle one catalog:changes message"""
+        self._stats["received"] += 1
+        try:
+            change = json.loads(data) if isinstance(data, (str, bytes)) else data
+            self.apply(int(change["restaurant_id"]), int(change["version"]))
+        except (ValueError, KeyError, TypeError) as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Malformed catalog change message {data!r}: {e}")
+
+    async def sync_from_db(self, initial: bool = False):
+        """Read catalog_version; apply rows newer than what this node has seen"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(CatalogVersion.restaurant_id, CatalogVersion.version))
+            rows = result.all()
+        self._stats["polls"] += 1
+        for restaurant_id, version in rows:
+            if initial:
+                self.versions[restaurant_id] = max(self.versions.get(restaurant_id, 0), version)
+            else:
+                self.apply(restaurant_id, version)
+
+    async def start(self):
+        """Load current versions and follow changes made by other nodes"""
+        if self._task is not None:
+            return
+        try:
+            await self.sync_from_db(initial=True)
+        except Exception as e:
+            logger.warning(f"Could not load catalog versions: {e}")
+        if self.redis.backend.supports_pubsub:
+            self._task = asyncio.create_task(self._listen())
+        else:
+            self._task = asyncio.create_task(self._poll())
+        logger.info(f"Catalog feed started ({'pub/sub' if self.redis.backend.supports_pubsub else 'polling'})")
+
+    async def stop(self):
+        tasks = [t for t in [self._task, *self._pending_publishes] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self.redis.subscribe(CHANNEL):
+                    self.on_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Catalog feed subscription lost: {e}")
+            # Catch up on anything published while disconnected, then resubscribe
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.sync_from_db()
+            except Exception as e:
+                logger.warning(f"Catalog version sync failed: {e}")
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.sync_from_db()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Catalog version poll failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["restaurants"] = len(self.versions)
+        return stats
+
+
+catalog_feed = CatalogFeed()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session):
+    changes = session.info.pop(PENDING_KEY, None)
+    if changes:
+        catalog_feed.on_commit(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session):
+    session.info.pop(PENDING_KEY, None)
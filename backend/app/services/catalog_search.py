@@ -0,0 +1,278 @@
+"""
+Postgres catalog search (restaurants and menu items).
+
+Restaurant and menuitem carry two generated columns, both built with
+lionbot_normalize() (the SQL twin of app.core.text_normalize.normalize_arabic,
+so Arabic letter variants, diacritics and digits fold the same way):
+
+    search_name    normalized "name name_ar"      - pg_trgm GIN index
+    search_vector  'simple' tsvector of the names  - GIN index
+                   (weight A) and descriptions (B)
+
+A query matches on word prefixes (tsquery "شاور:*") or on trigram word
+similarity (typos, partial words), and is ranked by ts_rank + similarity.
+Results are paged with an opaque (rank, id) keyset cursor; a plain offset is
+still accepted for clients paging with skip.
+
+If the columns or pg_trgm are missing (SEARCH_DDL could not be applied, e.g.
+no right to create the extension), queries fall back to ILIKE on the names and
+descriptions, unranked, newest id first; the same cursor still pages them.
+"""
+import base64
+import json
+import logging
+from typing import Optional, List, Tuple, Any
+
+from sqlalchemy import select, func, cast, literal, literal_column, or_, text, tuple_, Float
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
+
+from app.core.text_normalize import normalize_arabic, tokenize
+from app.models.restaurant import Restaurant, RestaurantCategory
+from app.models.menu import Menu, Category, MenuItem
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLES = ("restaurant", "menuitem")
+SEARCH_COLUMNS = ("search_name", "search_vector")
+
+# Idempotent DDL for the search columns and indexes (startup and benchmarks;
+# alembic revision 007 applies the same statements)
+SEARCH_DDL: List[str] = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION lionbot_normalize(input text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT lower(btrim(translate(
+            regexp_replace(coalesce(input, ''), '[\u064b-\u0652]', '', 'g'),
+            'أإآىة٠١٢٣٤٥٦٧٨٩', 'ااايه0123456789'
+        )))
+    $$
+    """,
+]
+for _table in SEARCH_TABLES:
+    SEARCH_DDL += [
+        f"""
+        ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS search_name text
+        GENERATED ALWAYS AS (lionbot_normalize(coalesce(name, '') || ' ' || coalesce(name_ar, ''))) STORED
+        """,
+        f"""
+        ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', lionbot_normalize(coalesce(name, '') || ' ' || coalesce(name_ar, ''))), 'A') ||
+            setweight(to_tsvector('simple', lionbot_normalize(coalesce(description, '') || ' ' || coalesce(description_ar, ''))), 'B')
+        ) STORED
+        """,
+        f"CREATE INDEX IF NOT EXISTS ix_{_table}_search_vector ON {_table} USING gin (search_vector)",
+        f"CREATE INDEX IF NOT EXISTS ix_{_table}_search_name_trgm ON {_table} USING gin (search_name gin_trgm_ops)",
+    ]
+
+
+# None until looked up: ensure_search_columns() at startup, else the first search
+_columns_ready: Optional[bool] = None
+
+
+async def _detect_search_columns(conn) -> bool:
+    result = await conn.execute(
+        text(
+            "SELECT (SELECT count(*) FROM information_schema.columns"
+            " WHERE table_schema = current_schema() AND table_name = ANY(:tables) AND column_name = ANY(:columns))"
+            " = :expected AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"
+        ),
+        {"tables": list(SEARCH_TABLES), "columns": list(SEARCH_COLUMNS),
+         "expected": len(SEARCH_TABLES) * len(SEARCH_COLUMNS)},
+    )
+    return bool(result.scalar())
+
+
+async def ensure_search_columns(conn) -> bool:
+    """Apply SEARCH_DDL, then record whether ranked search can run on this database"""
+    global _columns_ready
+    try:
+        async with conn.begin_nested():
+            for statement in SEARCH_DDL:
+                await conn.execute(text(statement))
+    except Exception as e:
+        logger.warning(f"Search DDL not applied: {e}")
+    _columns_ready = None
+    return await search_columns_ready(conn)
+
+
+async def search_columns_ready(db) -> bool:
+    """Whether the search columns and pg_trgm exist (looked up once, e.g. in workers that skip ensure)"""
+    global _columns_ready
+    if _columns_ready is None:
+        _columns_ready = await _detect_search_columns(db)
+        if not _columns_ready:
+            logger.warning("Search columns or pg_trgm missing: catalog search falls back to ILIKE")
+    return _columns_ready
+
+
+def prefix_tsquery(normalized: str) -> Optional[str]:
+    """'شاورما دج' -> 'شاورما:* & دج:*' (tokens are \\w+ only, so nothing to escape)"""
+    tokens = tokenize(normalized)
+    if not tokens:
+        return None
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def encode_cursor(rank: float, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, row_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """Inverse of encode_cursor; ValueError if the cursor was not issued by us"""
+    try:
+        rank, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(rank), int(row_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def _match_and_rank(table: str, q: str, ranked: bool = True):
+    """(WHERE clause, rank expression) for one table's search columns, or plain ILIKE"""
+    if not ranked:
+        pattern = f"%{q}%"
+        columns = [literal_column(f"{table}.{name}") for name in ("name", "name_ar", "description")]
+        return or_(*(column.ilike(pattern) for column in columns)), cast(literal(0.0), Float).label("rank")
+
+    normalized = normalize_arabic(q)
+    search_name = literal_column(f"{table}.search_name")
+    search_vector = literal_column(f"{table}.search_vector", type_=TSVECTOR)
+    tsquery = prefix_tsquery(normalized)
+
+    similarity = func.word_similarity(literal(normalized), search_name)
+    # word_similarity(q, name) >= pg_trgm.word_similarity_threshold, via the trigram index
+    conditions = [literal(normalized).op("<%")(search_name)]
+    rank = similarity
+    if tsquery:
+        query = func.to_tsquery(literal_column("'simple'::regconfig"), tsquery)
+        conditions.append(search_vector.op("@@")(query))
+        rank = func.ts_rank(search_vector, query) + similarity
+    return or_(*conditions), cast(rank, Float).label("rank")
+
+
+def _page(query: Select, rank, id_column, limit: int, cursor: Optional[str], offset: int = 0) -> Select:
+    if cursor:
+        cursor_rank, cursor_id = decode_cursor(cursor)
+        query = query.where(tuple_(rank, id_column) < tuple_(literal(cursor_rank), literal(cursor_id)))
+    if offset:
+        query = query.offset(offset)
+    # One extra row tells whether there is a next page
+    return query.order_by(rank.desc(), id_column.desc()).limit(limit + 1)
+
+
+def restaurant_search_query(
+    q: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    category_id: Optional[int] = None,
+    category: Optional[str] = None,
+    is_active: bool = True,
+    offset: int = 0,
+    ranked: bool = True,
+) -> Select:
+    match, rank = _match_and_rank("restaurant", q, ranked)
+    query = (
+        select(Restaurant, rank)
+        .options(selectinload(Restaurant.category))
+        .where(Restaurant.is_active == is_active, match)
+    )
+    if category_id:
+        query = query.where(Restaurant.category_id == category_id)
+    if category:
+        query = query.where(Restaurant.category.has(RestaurantCategory.name == category))
+    return _page(query, rank.element, Restaurant.id, limit, cursor, offset)
+
+
+def menu_item_search_query(
+    q: str,
+    limit: int = 30,
+    cursor: Optional[str] = None,
+    restaurant_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    is_available: bool = True,
+    offset: int = 0,
+    category: Optional[str] = None,
+    ranked: bool = True,
+) -> Select:
+    match, rank = _match_and_rank("menuitem", q, ranked)
+    query = (
+        select(
+            MenuItem,
+            Menu.restaurant_id,
+            Restaurant.name.label("restaurant_name"),
+            Restaurant.name_ar.label("restaurant_name_ar"),
+            rank,
+        )
+        .join(Category, MenuItem.category_id == Category.id)
+        .join(Menu, Category.menu_id == Menu.id)
+        .join(Restaurant, Menu.restaurant_id == Restaurant.id)
+        .where(
+            MenuItem.is_available == is_available,
+            Menu.is_active == True,
+            Restaurant.is_active == True,
+            match,
+        )
+    )
+    if restaurant_id:
+        query = query.where(Menu.restaurant_id == restaurant_id)
+    if category:
+        query = query.where(Category.name == category)
+    price = func.coalesce(MenuItem.price, MenuItem.price_min)
+    if min_price is not None:
+        query = query.where(price >= min_price)
+    if max_price is not None:
+        query = query.where(price <= max_price)
+    return _page(query, rank.element, MenuItem.id, limit, cursor, offset)
+
+
+def _split_page(rows: List[Any], limit: int, id_of) -> Tuple[List[Any], Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.rank, id_of(last))
+
+
+async def search_restaurants(
+    db: AsyncSession,
+    q: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    category_id: Optional[int] = None,
+    category: Optional[str] = None,
+    is_active: bool = True,
+    offset: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """Rows of (Restaurant, rank) best first, plus the cursor of the next page"""
+    ranked = await search_columns_ready(db)
+    result = await db.execute(
+        restaurant_search_query(q, limit, cursor, category_id, category, is_active, offset, ranked)
+    )
+    return _split_page(result.all(), limit, lambda row: row.Restaurant.id)
+
+
+async def search_menu_items(
+    db: AsyncSession,
+    q: str,
+    limit: int = 30,
+    cursor: Optional[str] = None,
+    restaurant_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    is_available: bool = True,
+    offset: int = 0,
+    category: Optional[str] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """Rows of (MenuItem, restaurant_id, restaurant_name, restaurant_name_ar, rank) best first, plus the next cursor"""
+    ranked = await search_columns_ready(db)
+    result = await db.execute(
+        menu_item_search_query(
+            q, limit, cursor, restaurant_id, min_price, max_price, is_available, offset, category, ranked
+        )
+    )
+    return _split_page(result.all(), limit, lambda row: row.MenuItem.id)
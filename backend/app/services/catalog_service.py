@@ -0,0 +1,353 @@
+"""
+In-process catalog snapshot.
+
+Holds restaurants, restaurant categories, menu items and variants in memory with
+precomputed prompt fragments, so the AI hot path builds its context without
+touching the database. The snapshot is rebuilt lazily after a CRUD endpoint
+invalidates it (or after CATALOG_SNAPSHOT_TTL_SECONDS as a safety net for
+writes made outside the API, e.g. seed scripts).
+"""
+import asyncio
+import time
+from typing import Optional, Dict, Any, List, Iterable, Tuple, Callable
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.core.constants import AI_MAX_PRODUCTS_CONTEXT, CATALOG_SNAPSHOT_TTL_SECONDS
+from app.db.session import AsyncSessionLocal
+from app.models.menu import MenuItem, Category, Menu
+from app.models.restaurant import Restaurant, RestaurantCategory
+
+logger = logging.getLogger(__name__)
+
+# Products shown in the prompt when the user is inside a restaurant
+RESTAURANT_CONTEXT_LIMIT = 80
+# Products shown when a keyword search finds nothing
+FALLBACK_CONTEXT_LIMIT = 50
+
+
+def _to_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def format_product_line(item: Dict[str, Any], restaurant: Dict[str, Any]) -> str:
+    """Prompt line for a menu item: '- name (price) @ restaurant [ID:x]'"""
+    name = item["name_ar"] or item["name"]
+    rest_name = restaurant["name_ar"] or restaurant["name"]
+    if item["has_variants"] and item["price_min"]:
+        price_str = f"${item['price_min']:.2f}-${item['price_max']:.2f}"
+    elif item["price"]:
+        price_str = f"${item['price']:.2f}"
+    else:
+        price_str = "$0.00"
+    return f"- {name} ({price_str}) @ {rest_name} [ID:{item['id']}]"
+
+
+class CatalogSnapshot:
+    """
+    Immutable, versioned view of the catalog.
+
+    restaurants:       id -> restaurant dict
+    categories:        active restaurant categories (dicts)
+    items:             id -> menu item dict (with "variants" list)
+    restaurant_items:  restaurant id -> item ids (menu/category/item display order)
+    """
+
+    def __init__(
+        self,
+        version: int,
+        restaurants: Dict[int, Dict[str, Any]],
+        categories: List[Dict[str, Any]],
+        items: Dict[int, Dict[str, Any]],
+    ):
+        self.version = version
+        self.built_at = time.time()
+        self.restaurants = restaurants
+        self.categories = categories
+        self.items = items
+
+        self.restaurant_items: Dict[int, List[int]] = {}
+        for item in items.values():
+            self.restaurant_items.setdefault(item["restaurant_id"], []).append(item["id"])
+
+        # Precomputed prompt fragments
+        self.product_lines: Dict[int, str] = {}
+        for item in items.values():
+            restaurant = restaurants.get(item["restaurant_id"])
+            if restaurant and item["is_available"]:
+                self.product_lines[item["id"]] = format_product_line(item, restaurant)
+
+        self.active_item_ids: List[int] = [
+            item_id for item_id in self.product_lines
+            if restaurants[items[item_id]["restaurant_id"]]["is_active"]
+        ]
+
+        self.restaurant_fragments: Dict[int, str] = {
+            rest_id: "\n".join(
+                [self.product_lines[i] for i in item_ids if i in self.product_lines][:RESTAURANT_CONTEXT_LIMIT]
+            )
+            for rest_id, item_ids in self.restaurant_items.items()
+        }
+
+        self.default_products_context = "\n".join(
+            self.product_lines[i] for i in self.active_item_ids[:AI_MAX_PRODUCTS_CONTEXT]
+        )
+
+        self.restaurants_context = "\n".join(
+            f"- {r['name_ar'] or r['name']} (ID:{r['id']}) [{r['category_name'] or 'Other'}]"
+            for r in restaurants.values() if r["is_active"]
+        )
+        self.categories_context = "\n".join(
+            f"- {c['name']} / {c['name_ar']}" for c in categories
+        )
+
+    def products_context(self, restaurant_id: Optional[int] = None, query: str = "") -> str:
+        """Product lines for the prompt, following the same strategies as the old DB path"""
+        # Strategy 1: inside a restaurant - that restaurant's products only
+        if restaurant_id:
+            return self.restaurant_fragments.get(restaurant_id, "")
+
+        # Strategy 2: keyword filter over active products
+        if query:
+            keywords = query.lower().split()
+            matched = [
+                i for i in self.active_item_ids
+                if any(kw in self.items[i]["search_name"] for kw in keywords)
+            ]
+            if not matched:
+                matched = self.active_item_ids[:FALLBACK_CONTEXT_LIMIT]
+            return "\n".join(self.product_lines[i] for i in matched[:AI_MAX_PRODUCTS_CONTEXT])
+
+        # Strategy 3: default diverse products
+        return self.default_products_context
+
+    def iter_items(self, restaurant_id: Optional[int] = None, available_only: bool = True) -> Iterable[Dict[str, Any]]:
+        """Iterate item dicts, optionally for one restaurant"""
+        item_ids = self.restaurant_items.get(restaurant_id, []) if restaurant_id else self.items.keys()
+        for item_id in item_ids:
+            item = self.items[item_id]
+            if available_only and not item["is_available"]:
+                continue
+            yield item
+
+
+def build_snapshot(
+    version: int,
+    restaurant_rows: Iterable[Tuple[Any, Any]],
+    category_rows: Iterable[Any],
+    item_rows: Iterable[Tuple[Any, Any, Any]],
+) -> CatalogSnapshot:
+    """
+    Build a snapshot from ORM rows:
+    restaurant_rows: (Restaurant, RestaurantCategory | None)
+    category_rows:   RestaurantCategory (active only)
+    item_rows:       (MenuItem with variants loaded, Category, Menu)
+    """
+    restaurants: Dict[int, Dict[str, Any]] = {}
+    for rest, cat in restaurant_rows:
+        restaurants[rest.id] = {
+            "id": rest.id,
+            "name": rest.name,
+            "name_ar": rest.name_ar,
+            "description": rest.description,
+            "description_ar": rest.description_ar,
+            "is_active": bool(rest.is_active),
+            "category_id": rest.category_id,
+            "category_name": cat.name if cat else None,
+        }
+
+    categories = [
+        {"id": c.id, "name": c.name, "name_ar": c.name_ar, "icon": c.icon, "order": c.order}
+        for c in category_rows
+    ]
+
+    items: Dict[int, Dict[str, Any]] = {}
+    for item, category, menu in item_rows:
+        items[item.id] = {
+            "id": item.id,
+            "restaurant_id": menu.restaurant_id,
+            "menu_id": menu.id,
+            "menu_is_active": bool(menu.is_active),
+            "category_id": category.id,
+            "category_name": category.name,
+            "category_name_ar": category.name_ar,
+            "category_order": category.order,
+            "name": item.name,
+            "name_ar": item.name_ar,
+            "description": item.description,
+            "description_ar": item.description_ar,
+            "price": _to_float(item.price),
+            "price_min": _to_float(item.price_min),
+            "price_max": _to_float(item.price_max),
+            "has_variants": bool(item.has_variants),
+            "is_available": bool(item.is_available),
+            "order": item.order,
+            "search_name": (item.name_ar or item.name or "").lower(),
+            "variants": [
+                {
+                    "id": v.id,
+                    "name": v.name,
+                    "name_ar": v.name_ar,
+                    "price": _to_float(v.price),
+                    "order": v.order,
+                }
+                for v in sorted(item.variants or [], key=lambda v: (v.order or 0, v.id))
+            ],
+        }
+
+    return CatalogSnapshot(version, restaurants, categories, items)
+
+
+class CatalogService:
+    """Lazily rebuilt catalog snapshot shared by the whole process"""
+
+    def __init__(self, ttl_seconds: int = CATALOG_SNAPSHOT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._version = 0
+        self._dirty = True
+        self._lock: Optional[asyncio.Lock] = None
+        self._stats = {"hits": 0, "rebuilds": 0, "invalidations": 0, "expirations": 0, "errors": 0}
+        self._listeners: List[Callable[[Optional[int]], None]] = []
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and not self._dirty
+            and time.time() - self._snapshot.built_at < self.ttl_seconds
+        )
+
+    async def get_snapshot(self) -> Optional[CatalogSnapshot]:
+        """Return the current snapshot, rebuilding it once if stale (single-flight)"""
+        if self._is_fresh():
+            self._stats["hits"] += 1
+            return self._snapshot
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._is_fresh():
+                self._stats["hits"] += 1
+                return self._snapshot
+            if self._snapshot is not None and not self._dirty:
+                # TTL expiry: writes made outside the API may have touched any
+                # restaurant, so derived caches keyed on the version rebuild too
+                self._stats["expirations"] += 1
+                self.invalidate()
+            try:
+                self._dirty = False
+                self._snapshot = await self._load(self._version)
+                self._stats["rebuilds"] += 1
+                logger.info(
+                    f"Catalog snapshot v{self._version} built: "
+                    f"{len(self._snapshot.restaurants)} restaurants, {len(self._snapshot.items)} items"
+                )
+            except Exception as e:
+                self._dirty = True
+                self._stats["errors"] += 1
+                logger.error(f"Failed to build catalog snapshot: {e}")
+            # Serve the last good snapshot if the rebuild failed
+            return self._snapshot
+
+    async def load_uncached(self, restaurant_id: Optional[int] = None, with_items: bool = True) -> CatalogSnapshot:
+        """
+        Snapshot read straight from the database, neither kept nor shared:
+        the fallback for derived lookups while no full snapshot can be built.
+        Narrow it to one restaurant, or to restaurants without their menus.
+        """
+        return await self._load(self._version, restaurant_id, with_items)
+
+    async def _load(self, version: int, restaurant_id: Optional[int] = None, with_items: bool = True) -> CatalogSnapshot:
+        async with AsyncSessionLocal() as db:
+            rest_query = (
+                select(Restaurant, RestaurantCategory)
+                .outerjoin(RestaurantCategory, Restaurant.category_id == RestaurantCategory.id)
+                .order_by(Restaurant.id)
+            )
+            if restaurant_id is not None:
+                rest_query = rest_query.where(Restaurant.id == restaurant_id)
+            rest_result = await db.execute(rest_query)
+            cat_result = await db.execute(
+                select(RestaurantCategory)
+                .where(RestaurantCategory.is_active == True)
+                .order_by(RestaurantCategory.order)
+            )
+            item_rows = []
+            if with_items:
+                item_query = (
+                    select(MenuItem, Category, Menu)
+                    .join(Category, MenuItem.category_id == Category.id)
+                    .join(Menu, Category.menu_id == Menu.id)
+                    .options(selectinload(MenuItem.variants))
+                    .order_by(Menu.restaurant_id, Menu.order, Category.order, MenuItem.order, MenuItem.id)
+                )
+                if restaurant_id is not None:
+                    item_query = item_query.where(Menu.restaurant_id == restaurant_id)
+                item_rows = (await db.execute(item_query)).all()
+            return build_snapshot(
+                version,
+                rest_result.all(),
+                cat_result.scalars().all(),
+                item_rows,
+            )
+
+    def add_listener(self, callback: Callable[[Optional[int]], None]):
+        """Register a derived structure to be told which restaurant changed"""
+        self._listeners.append(callback)
+
+    def invalidate(self, restaurant_id: Optional[int] = None):
+        """Mark the snapshot stale after a catalog write"""
+        self._version += 1
+        self._dirty = True
+        self._stats["invalidations"] += 1
+        logger.debug(f"Catalog invalidated (restaurant={restaurant_id}) -> v{self._version}")
+        for callback in self._listeners:
+            try:
+                callback(restaurant_id)
+            except Exception as e:
+                logger.error(f"Catalog listener failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["version"] = self._version
+        stats["items"] = len(self._snapshot.items) if self._snapshot else 0
+        return stats
+
+
+catalog_service = CatalogService()
+
+
+class CatalogWrites:
+    """
+    Freshness check for caches derived from the snapshot.
+
+    Records the catalog version of the last write per restaurant (None = the
+    whole catalog); an entry built from snapshot version V is current while
+    V is at least that version for its restaurant (an entry with restaurant
+    None depends on every restaurant), and, with ttl_seconds, while younger
+    than the TTL.
+    """
+
+    def __init__(self, catalog: CatalogService, ttl_seconds: Optional[int] = None):
+        self.catalog = catalog
+        self.ttl_seconds = ttl_seconds
+        self._stale_before: Dict[Optional[int], int] = {}
+
+    def record(self, restaurant_id: Optional[int] = None):
+        """Call from a catalog listener"""
+        self._stale_before[restaurant_id] = self.catalog.version
+
+    def is_current(self, version: int, restaurant_id: Optional[int], built_at: Optional[float] = None) -> bool:
+        if self.ttl_seconds is not None and built_at is not None and time.time() - built_at >= self.ttl_seconds:
+            return False
+        if restaurant_id is None:
+            stale_before = max(self._stale_before.values(), default=-1)
+        else:
+            stale_before = max(self._stale_before.get(None, -1), self._stale_before.get(restaurant_id, -1))
+        return version >= stale_before
@@ -0,0 +1,254 @@
+"""
+Batch driver dispatch.
+
+Instead of giving each order the best driver at the moment it asks (greedy:
+the first order of a lunch rush takes the driver a later one needed more),
+unassigned delivery orders are collected for DISPATCH_WINDOW_SECONDS and
+assigned together. Every (order, driver) pair within range is scored with
+DriverAssignmentService's weights, and the assignment that serves the most
+orders with the highest total score is solved with the Hungarian method.
+
+A driver with free capacity offers one column per free slot; each extra
+slot is scored as if the driver already carried the orders before it, so
+work spreads across drivers before it stacks on one. Orders that share no
+candidate driver are solved as separate (small) problems.
+"""
+from typing import Dict, Any, List, Tuple, Sequence
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.constants import DISPATCH_MAX_ORDERS
+from app.models.order import Order, OrderStatus, OrderType
+from app.services.driver_assignment_service import DriverAssignmentService
+from app.services.geo_index import haversine_km, bounding_box
+
+logger = logging.getLogger(__name__)
+
+# Unassigned orders in these states are dispatched
+DISPATCHABLE_STATUSES = (
+    OrderStatus.ACCEPTED,
+    OrderStatus.CONFIRMED,
+    OrderStatus.PREPARING,
+    OrderStatus.READY,
+)
+
+# (driver, active orders, deliveries today); driver has last_latitude / last_longitude
+DriverRow = Tuple[Any, int, int]
+
+
+def hungarian(cost: List[List[float]]) -> List[int]:
+    """
+    Column for each row minimizing the total cost (needs rows <= columns).
+    Shortest augmenting paths with potentials, O(rows^2 * columns).
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    owner = [0] * (m + 1)  # row (1-based) holding each column, 0 = free
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        min_slack = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    slack = row[j - 1] - ui0 - v[j]
+                    if slack < min_slack[j]:
+                        min_slack[j] = slack
+                        way[j] = j0
+                    if min_slack[j] < delta:
+                        delta = min_slack[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+    assignment = [-1] * n
+    for j in range(1, m + 1):
+        if owner[j]:
+            assignment[owner[j] - 1] = j - 1
+    return assignment
+
+
+def max_score_assignment(scores: List[List[float]]) -> List[Tuple[int, int]]:
+    """
+    (row, column) pairs, each row and column used at most once, maximizing
+    first the number of matched pairs with a positive score, then their total.
+    """
+    if not scores or not scores[0]:
+        return []
+    transpose = len(scores) > len(scores[0])
+    if transpose:
+        scores = [list(column) for column in zip(*scores)]
+    n = len(scores)
+    ceiling = max(max(row) for row in scores) + 1
+    # Any feasible pair is cheaper than every infeasible one combined
+    infeasible = ceiling * (n + 1)
+    cost = [[ceiling - score if score > 0 else infeasible for score in row] for row in scores]
+    pairs = [(i, j) for i, j in enumerate(hungarian(cost)) if scores[i][j] > 0]
+    return [(j, i) for i, j in pairs] if transpose else pairs
+
+
+class PendingOrder:
+    """An unassigned delivery order and its pickup point"""
+
+    def __init__(self, order_id: int, pickup_lat: float, pickup_lng: float,
+                 order_value: float = 0, priority: str = "normal"):
+        self.order_id = order_id
+        self.pickup_lat = pickup_lat
+        self.pickup_lng = pickup_lng
+        self.order_value = order_value
+        self.priority = priority
+
+
+def plan_dispatch(
+    service: DriverAssignmentService, orders: Sequence[PendingOrder], drivers: Sequence[DriverRow]
+) -> List[Tuple[PendingOrder, Any, float]]:
+    """(order, driver, score) for the best joint assignment of orders to drivers"""
+    max_km = service.MAX_ASSIGNMENT_DISTANCE_KM
+    capacity = service.MAX_ACTIVE_ORDERS_PER_DRIVER
+    # Columns: one per free slot, (driver index, active orders once this slot is taken)
+    slots = [
+        (index, active + taken)
+        for index, (_, active, _) in enumerate(drivers)
+        for taken in range(max(0, capacity - active))
+    ]
+    driver_slots: Dict[int, List[int]] = {}
+    for column, (index, _) in enumerate(slots):
+        driver_slots.setdefault(index, []).append(column)
+
+    # Sparse scores: order row -> {slot column: score}
+    edges: List[Dict[int, float]] = []
+    for order in orders:
+        min_lat, max_lat, min_lng, max_lng = bounding_box(order.pickup_lat, order.pickup_lng, max_km)
+        columns, distances, ratings, actives, todays = [], [], [], [], []
+        for index, (driver, _, today) in enumerate(drivers):
+            lat, lng = driver.last_latitude, driver.last_longitude
+            if index not in driver_slots or lat is None or lng is None:
+                continue
+            if not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+                continue
+            distance = haversine_km(order.pickup_lat, order.pickup_lng, lat, lng)
+            for column in driver_slots[index]:
+                columns.append(column)
+                distances.append(distance)
+                ratings.append(getattr(driver, "average_rating", None))
+                actives.append(slots[column][1])
+                todays.append(today)
+        scores = service.score_candidates(distances, ratings, actives, todays, order.order_value, order.priority)
+        edges.append({column: score for column, score in zip(columns, scores) if score > 0})
+
+    # Orders connected through a shared driver form one subproblem
+    parent = list(range(len(orders)))
+
+    def find(row: int) -> int:
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    first_row_of_driver: Dict[int, int] = {}
+    for row, row_edges in enumerate(edges):
+        for column in row_edges:
+            other = first_row_of_driver.setdefault(slots[column][0], row)
+            parent[find(row)] = find(other)
+    components: Dict[int, List[int]] = {}
+    for row, row_edges in enumerate(edges):
+        if row_edges:
+            components.setdefault(find(row), []).append(row)
+
+    plan = []
+    for rows in components.values():
+        columns = sorted({column for row in rows for column in edges[row]})
+        matrix = [[edges[row].get(column, 0.0) for column in columns] for row in rows]
+        for i, j in max_score_assignment(matrix):
+            order, column = orders[rows[i]], columns[j]
+            plan.append((order, drivers[slots[column][0]][0], matrix[i][j]))
+    return plan
+
+
+class DispatchService:
+    """Runs batch dispatch rounds against the database"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.assigner = DriverAssignmentService(db)
+
+    async def pending_orders(self, limit: int = DISPATCH_MAX_ORDERS) -> List[Order]:
+        """Oldest unassigned delivery orders, row-locked (orders another round holds are skipped)"""
+        result = await self.db.execute(
+            select(Order)
+            .where(Order.driver_id == None)
+            .where(Order.order_type == OrderType.DELIVERY)
+            .where(Order.status.in_(DISPATCHABLE_STATUSES))
+            .order_by(Order.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return result.scalars().all()
+
+    async def load_drivers(self, pending: Sequence[PendingOrder]) -> List[DriverRow]:
+        """Drivers in range of any pickup with their workload (one candidate query around all pickups)"""
+        center_lat = sum(order.pickup_lat for order in pending) / len(pending)
+        center_lng = sum(order.pickup_lng for order in pending) / len(pending)
+        spread = max(haversine_km(center_lat, center_lng, o.pickup_lat, o.pickup_lng) for o in pending)
+        candidates = await self.assigner.get_candidates(
+            center_lat, center_lng, spread + self.assigner.MAX_ASSIGNMENT_DISTANCE_KM
+        )
+        return [(driver, active, today) for driver, active, today, _ in candidates]
+
+    async def run_round(self) -> List[Tuple[int, int]]:
+        """Assign the current batch of unassigned orders; (order id, driver id) per assignment"""
+        orders = await self.pending_orders()
+        if not orders:
+            return []
+        pickups = await self.assigner.get_pickup_points(orders)
+        pending = [
+            PendingOrder(
+                order.id, *pickups[order.id],
+                order_value=float(order.total_amount),
+                priority="high" if order.total_amount > 100 else "normal",
+            )
+            for order in orders if order.id in pickups
+        ]
+        if len(pending) < len(orders):
+            logger.warning(f"Dispatch: {len(orders) - len(pending)} orders have no located branch to pick up from")
+        if not pending:
+            await self.db.rollback()
+            return []
+
+        drivers = await self.load_drivers(pending)
+        plan = plan_dispatch(self.assigner, pending, drivers)
+
+        by_id = {order.id: order for order in orders}
+        assignments = []
+        for pending_order, driver, _ in plan:
+            await self.assigner.assign(by_id[pending_order.order_id], driver.id)
+            assignments.append((pending_order.order_id, driver.id))
+        await self.db.commit()
+        logger.info(
+            f"Dispatch round: {len(assignments)}/{len(pending)} orders assigned, {len(drivers)} drivers in range"
+        )
+        return assignments
@@ -1,11 +1,24 @@
-from typing import List, Optional
-from sqlalchemy import select, func, and_
+from typing import List, Optional, Tuple, Sequence, Dict
+from sqlalchemy import select, func, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 from datetime import datetime, timedelta
 import math
 
 from app.models.user import User
 from app.models.order import Order, OrderStatus
+from app.models.restaurant import Branch
+from app.services.audit_service import get_audit_service
+from app.services.geo_index import geo_index
+
+# Orders a driver is still carrying
+ACTIVE_ORDER_STATUSES = (
+    OrderStatus.ACCEPTED,
+    OrderStatus.CONFIRMED,
+    OrderStatus.PREPARING,
+    OrderStatus.READY,
+    OrderStatus.OUT_FOR_DELIVERY,
+)
 
 
 class DriverAssignmentService:
@@ -46,42 +59,114 @@ class DriverAssignmentService:
         Returns:
             Best matched driver or None if no drivers available
         """
-        # Get all active drivers
-        active_drivers = await self._get_active_drivers()
+        # Drivers in range with their workload, in one query
+        candidates = await self.get_candidates(pickup_lat, pickup_lng)
         
-        if not active_drivers:
+        if not candidates:
             return None
         
-        # Score each driver
-        scored_drivers = []
-        for driver in active_drivers:
-            score = await self._calculate_driver_score(
-                driver, 
-                pickup_lat, 
-                pickup_lng,
-                order_value,
-                priority
-            )
-            if score > 0:
-                scored_drivers.append((driver, score))
-        
-        if not scored_drivers:
-            return None
+        # Score all candidates at once
+        drivers, active_orders, today_deliveries, distances = zip(*candidates)
+        scores = self.score_candidates(
+            distances,
+            [getattr(driver, "average_rating", None) for driver in drivers],
+            active_orders,
+            today_deliveries,
+            order_value,
+            priority,
+        )
         
-        # Sort by score (highest first) and return best match
-        scored_drivers.sort(key=lambda x: x[1], reverse=True)
-        return scored_drivers[0][0]
+        # Highest score wins (nearest first on ties)
+        best = max(range(len(scores)), key=scores.__getitem__)
+        return drivers[best] if scores[best] > 0 else None
 
-    async def _get_active_drivers(self) -> List[User]:
-        """Get all online and available drivers."""
-        result = await self.db.execute(
-            select(User)
-            .where(User.role == "driver")
-            .where(User.is_active == True)
-            .where(User.last_latitude != None)
-            .where(User.last_longitude != None)
+    @staticmethod
+    def _workload_counts():
+        """(active orders, delivered today) count columns over Order, and the rows they need"""
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        delivered_today = and_(Order.status == OrderStatus.DELIVERED, Order.created_at >= today_start)
+        active = Order.status.in_(ACTIVE_ORDER_STATUSES)
+        counts = (
+            func.count(Order.id).filter(active).label("active_orders"),
+            func.count(Order.id).filter(delivered_today).label("today_deliveries"),
+        )
+        return counts, or_(active, delivered_today)
+
+    def _candidates_query(self) -> Select:
+        """Active drivers with their active-order and delivered-today counts (one grouped subquery)"""
+        counts, relevant = self._workload_counts()
+        workload = (
+            select(Order.driver_id, *counts)
+            .where(Order.driver_id.isnot(None))
+            .where(relevant)
+            .group_by(Order.driver_id)
+            .subquery()
+        )
+        return (
+            geo_index.drivers_query()
+            .add_columns(
+                func.coalesce(workload.c.active_orders, 0).label("active_orders"),
+                func.coalesce(workload.c.today_deliveries, 0).label("today_deliveries"),
+            )
+            .outerjoin(workload, workload.c.driver_id == User.id)
+        )
+
+    async def get_candidates(
+        self,
+        pickup_lat: float,
+        pickup_lng: float,
+        radius_km: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[User, int, int, float]]:
+        """
+        (driver, active orders, deliveries today, distance km) for active drivers
+        within radius_km (default MAX_ASSIGNMENT_DISTANCE_KM) of the pickup,
+        nearest first. One SQL round trip whatever the fleet size.
+        """
+        return await geo_index.driver_candidates(
+            self.db, pickup_lat, pickup_lng, radius_km or self.MAX_ASSIGNMENT_DISTANCE_KM,
+            limit, query=self._candidates_query(),
         )
-        return result.scalars().all()
+
+    def score_candidates(
+        self,
+        distances: Sequence[float],
+        ratings: Sequence[Optional[float]],
+        active_orders: Sequence[int],
+        today_deliveries: Sequence[int],
+        order_value: float = 0,
+        priority: str = "normal",
+    ) -> List[float]:
+        """
+        Scores (0-100, 0 = not assignable) for candidates given as parallel
+        columns: out of range or at capacity scores 0.
+        """
+        max_km = self.MAX_ASSIGNMENT_DISTANCE_KM
+        max_active = self.MAX_ACTIVE_ORDERS_PER_DRIVER
+        
+        # Bonus for priority orders
+        if priority == "urgent":
+            # Prefer experienced drivers for urgent orders
+            multiplier = 1.2
+        elif priority == "high" and order_value > 100:
+            # Prefer top-rated drivers for high-value orders
+            multiplier = 1.1
+        else:
+            multiplier = 1.0
+        
+        return [
+            0.0 if distance > max_km or active >= max_active else multiplier * (
+                # Distance (closer = better)
+                max(0, 100 - (distance / max_km * 100)) * self.WEIGHT_DISTANCE +
+                # Rating (5-star to 100)
+                (rating or 4.0) * 20 * self.WEIGHT_RATING +
+                # Availability (fewer active orders = better)
+                (100 - (active / max_active * 100)) * self.WEIGHT_AVAILABILITY +
+                # Workload balance (penalty for many deliveries today)
+                max(0, 100 - (today * 5)) * self.WEIGHT_WORKLOAD
+            )
+            for distance, rating, active, today in zip(distances, ratings, active_orders, today_deliveries)
+        ]
 
     async def _calculate_driver_score(
         self,
@@ -91,9 +176,7 @@ class DriverAssignmentService:
         order_value: float,
         priority: str
     ) -> float:
-        """Calculate assignment score for a driver (0-100)."""
-        
-        # 1. Distance Score (closer = better)
+        """Calculate assignment score for a single driver (0-100)."""
         distance = self._haversine_distance(
             driver.last_latitude, driver.last_longitude,
             pickup_lat, pickup_lng
@@ -102,65 +185,52 @@ class DriverAssignmentService:
         if distance > self.MAX_ASSIGNMENT_DISTANCE_KM:
             return 0  # Too far, skip this driver
         
-        distance_score = max(0, 100 - (distance / self.MAX_ASSIGNMENT_DISTANCE_KM * 100))
-        
-        # 2. Rating Score (if available)
-        rating_score = (driver.average_rating or 4.0) * 20  # Convert 5-star to 100
-        
-        # 3. Availability Score (fewer active orders = better)
-        active_orders = await self._get_driver_active_orders_count(driver.id)
+        counts, relevant = self._workload_counts()
+        result = await self.db.execute(select(*counts).where(Order.driver_id == driver.id).where(relevant))
+        active_orders, today_deliveries = result.one()
         
-        if active_orders >= self.MAX_ACTIVE_ORDERS_PER_DRIVER:
-            return 0  # Driver is at capacity
-        
-        availability_score = 100 - (active_orders / self.MAX_ACTIVE_ORDERS_PER_DRIVER * 100)
-        
-        # 4. Workload Balance Score (fair distribution)
-        today_deliveries = await self._get_driver_today_deliveries(driver.id)
-        workload_score = max(0, 100 - (today_deliveries * 5))  # Penalty for high workload
-        
-        # Calculate weighted final score
-        final_score = (
-            distance_score * self.WEIGHT_DISTANCE +
-            rating_score * self.WEIGHT_RATING +
-            availability_score * self.WEIGHT_AVAILABILITY +
-            workload_score * self.WEIGHT_WORKLOAD
-        )
-        
-        # Bonus for priority orders
-        if priority == "urgent":
-            # Prefer experienced drivers for urgent orders
-            final_score *= 1.2
-        elif priority == "high" and order_value > 100:
-            # Prefer top-rated drivers for high-value orders
-            final_score *= 1.1
-        
-        return final_score
-
-    async def _get_driver_active_orders_count(self, driver_id: int) -> int:
-        """Get count of driver's currently active orders."""
-        result = await self.db.execute(
-            select(func.count(Order.id))
-            .where(Order.driver_id == driver_id)
-            .where(Order.status.in_([
-                OrderStatus.ACCEPTED,
-                OrderStatus.PREPARING,
-                OrderStatus.READY,
-                OrderStatus.OUT_FOR_DELIVERY
-            ]))
-        )
-        return result.scalar() or 0
+        return self.score_candidates(
+            [distance],
+            [getattr(driver, "average_rating", None)],
+            [active_orders],
+            [today_deliveries],
+            order_value,
+            priority,
+        )[0]
 
-    async def _get_driver_today_deliveries(self, driver_id: int) -> int:
-        """Get count of driver's deliveries today."""
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    async def get_pickup_points(self, orders: Sequence[Order]) -> Dict[int, Tuple[float, float]]:
+        """
+        Pickup (lat, lng) per order id: the restaurant's active branch nearest to
+        the delivery address (its first located branch if the address has no
+        coordinates). Orders whose restaurant has no located branch are left out.
+        """
+        restaurant_ids = {order.restaurant_id for order in orders if order.restaurant_id}
+        if not restaurant_ids:
+            return {}
         result = await self.db.execute(
-            select(func.count(Order.id))
-            .where(Order.driver_id == driver_id)
-            .where(Order.status == OrderStatus.DELIVERED)
-            .where(Order.created_at >= today_start)
+            select(Branch.restaurant_id, Branch.latitude, Branch.longitude)
+            .where(Branch.restaurant_id.in_(restaurant_ids))
+            .where(Branch.is_active == True)
+            .where(Branch.latitude != None)
+            .where(Branch.longitude != None)
+            .order_by(Branch.id)
         )
-        return result.scalar() or 0
+        branches: Dict[int, List[Tuple[float, float]]] = {}
+        for restaurant_id, lat, lng in result.all():
+            branches.setdefault(restaurant_id, []).append((lat, lng))
+        
+        pickups = {}
+        for order in orders:
+            points = branches.get(order.restaurant_id)
+            if not points:
+                continue
+            if order.latitude is not None and order.longitude is not None:
+                pickups[order.id] = min(
+                    points, key=lambda point: self._haversine_distance(order.latitude, order.longitude, *point)
+                )
+            else:
+                pickups[order.id] = points[0]
+        return pickups
 
     @staticmethod
     def _haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -179,23 +249,40 @@ class DriverAssignmentService:
         
         return R * c
 
-    async def auto_assign_order(self, order_id: int) -> Optional[User]:
+    async def assign(self, order: Order, driver_id: int, status: Optional[OrderStatus] = None,
+                     user: Optional[User] = None) -> None:
+        """Set the order's driver (and status) with an audit record; the caller commits"""
+        old_values = {"driver_id": order.driver_id, "status": order.status.value if order.status else None}
+        order.driver_id = driver_id
+        if status is not None:
+            order.status = status
+        await get_audit_service(self.db).log_update(
+            entity_type="order",
+            entity_id=order.id,
+            old_values=old_values,
+            new_values={"driver_id": driver_id, "status": order.status.value if order.status else None},
+            user=user,
+        )
+
+    async def auto_assign_order(self, order_id: int, user: Optional[User] = None) -> Optional[User]:
         """
         Automatically assign a driver to an order.
         Updates the order with the assigned driver.
         """
-        # Get order details
+        # Get order details (locked, so a concurrent dispatch round skips it)
         result = await self.db.execute(
-            select(Order).where(Order.id == order_id)
+            select(Order).where(Order.id == order_id).with_for_update(skip_locked=True)
         )
         order = result.scalars().first()
         
         if not order or order.driver_id:
-            return None  # Order not found or already assigned
+            return None  # Order not found, locked or already assigned
         
-        # Get restaurant location (assuming order has restaurant relationship)
-        pickup_lat = order.restaurant.latitude if order.restaurant else 0
-        pickup_lng = order.restaurant.longitude if order.restaurant else 0
+        # Pickup at the restaurant branch serving this order
+        pickup = (await self.get_pickup_points([order])).get(order.id)
+        if pickup is None:
+            return None  # No branch with coordinates to pick up from
+        pickup_lat, pickup_lng = pickup
         
         # Find best driver
         driver = await self.find_best_driver(
@@ -206,8 +293,7 @@ class DriverAssignmentService:
         )
         
         if driver:
-            order.driver_id = driver.id
-            order.status = OrderStatus.OUT_FOR_DELIVERY
+            await self.assign(order, driver.id, OrderStatus.OUT_FOR_DELIVERY, user=user)
             await self.db.commit()
             
             # TODO: Send notification to driver
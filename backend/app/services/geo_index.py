@@ -0,0 +1,295 @@
+"""
+Geospatial lookups for drivers and restaurant branches.
+
+"Who / what is near (lat, lng)" is answered from an index instead of loading
+every row and running haversine in Python:
+
+    live driver positions   Redis GEO set DRIVER_POSITIONS_KEY, written on each
+                            location update (GEOADD) and read with GEOSEARCH,
+                            nearest first. A member counts while its
+                            driver_location:{id} key (DRIVER_LOCATION_TTL_SECONDS)
+                            is alive; stale members are pruned on read.
+    persisted coordinates   GiST expression indexes on user.last_latitude /
+                            last_longitude and branch.latitude / longitude:
+                            PostGIS geography when the extension can be created,
+                            otherwise cube + earthdistance (ll_to_earth).
+
+Without either extension the SQL path still only reads rows inside the
+radius' bounding box and finishes with haversine on those.
+"""
+import json
+import math
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+import logging
+
+from sqlalchemy import select, func, cast, literal, literal_column, text, and_, Float
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
+from sqlalchemy.types import UserDefinedType
+
+from app.core.constants import DRIVER_LOCATION_TTL_SECONDS
+from app.models.restaurant import Restaurant, Branch
+from app.models.user import User, UserRole
+from app.services.redis_service import redis_service, RedisService
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+DRIVER_POSITIONS_KEY = "drivers:geo"
+
+POSTGIS = "postgis"
+EARTHDISTANCE = "earthdistance"
+
+# table -> (latitude column, longitude column) with a spatial index
+GEO_COLUMNS = {"user": ("last_latitude", "last_longitude"), "branch": ("latitude", "longitude")}
+
+# Idempotent DDL per backend, tried in this order (startup; alembic revision 008
+# applies the same statements). Partial indexes: rows without coordinates are skipped.
+SPATIAL_DDL: Dict[str, List[str]] = {
+    POSTGIS: ["CREATE EXTENSION IF NOT EXISTS postgis"],
+    EARTHDISTANCE: ["CREATE EXTENSION IF NOT EXISTS cube", "CREATE EXTENSION IF NOT EXISTS earthdistance"],
+}
+for _table, (_lat, _lng) in GEO_COLUMNS.items():
+    _where = f"WHERE {_lat} IS NOT NULL AND {_lng} IS NOT NULL"
+    SPATIAL_DDL[POSTGIS].append(
+        f'CREATE INDEX IF NOT EXISTS ix_{_table}_location_geog ON "{_table}" '
+        f"USING gist ((ST_SetSRID(ST_MakePoint({_lng}, {_lat}), 4326)::geography)) {_where}"
+    )
+    SPATIAL_DDL[EARTHDISTANCE].append(
+        f'CREATE INDEX IF NOT EXISTS ix_{_table}_location_earth ON "{_table}" '
+        f"USING gist (ll_to_earth({_lat}, {_lng})) {_where}"
+    )
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great circle distance between two points in km"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lng, max_lng) enclosing the circle (not across the poles / antimeridian)"""
+    angle = radius_km / EARTH_RADIUS_KM
+    d_lat = math.degrees(angle)
+    d_lng = math.degrees(math.asin(min(1.0, math.sin(angle) / max(math.cos(math.radians(lat)), 1e-9))))
+    return lat - d_lat, lat + d_lat, lng - d_lng, lng + d_lng
+
+
+class Geography(UserDefinedType):
+    """PostGIS geography (only used in casts)"""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "geography"
+
+
+def _geography(lng, lat):
+    # SRID inlined, not bound: the expression must match the index definition
+    return cast(func.ST_SetSRID(func.ST_MakePoint(lng, lat), literal_column("4326")), Geography)
+
+
+def spatial_terms(backend: str, lat_col, lng_col, lat: float, lng: float, radius_km: float):
+    """(distance km, WHERE within radius, nearest-first ordering) over two coordinate columns"""
+    radius_m = float(radius_km) * 1000
+    # Same predicate as the partial indexes, so the planner can use them
+    present = and_(lat_col.isnot(None), lng_col.isnot(None))
+    if backend == POSTGIS:
+        point = _geography(lng_col, lat_col)
+        origin = _geography(literal(lng), literal(lat))
+        distance = func.ST_Distance(point, origin, type_=Float)
+        within = func.ST_DWithin(point, origin, literal(radius_m))
+    else:
+        point = func.ll_to_earth(lat_col, lng_col)
+        origin = func.ll_to_earth(literal(lat), literal(lng))
+        distance = func.earth_distance(origin, point, type_=Float)
+        # earth_box is the indexable cube test; earth_distance trims its corners
+        within = and_(func.earth_box(origin, literal(radius_m)).op("@>")(point), distance <= radius_m)
+    return (distance / 1000.0).label("distance_km"), and_(present, within), point.op("<->")(origin)
+
+
+class GeoIndex:
+    """Radius / nearest-k candidates from Redis GEO (live) and spatial SQL (persisted)"""
+
+    def __init__(self, redis: Optional[RedisService] = None):
+        self._redis = redis or redis_service
+        self.backend: Optional[str] = None
+        self._detected = False
+        self._stats = {
+            "live_searches": 0, "live_candidates": 0, "stale_pruned": 0,
+            "sql_searches": 0, "sql_candidates": 0,
+        }
+
+    # ==================== Persisted coordinates ====================
+
+    async def ensure(self, conn) -> Optional[str]:
+        """Create the first spatial backend this database allows, with its indexes"""
+        for backend, statements in SPATIAL_DDL.items():
+            try:
+                async with conn.begin_nested():
+                    for statement in statements:
+                        await conn.execute(text(statement))
+            except Exception as e:
+                logger.info(f"Spatial backend {backend} unavailable: {e}")
+                continue
+            self.backend, self._detected = backend, True
+            return backend
+        self.backend, self._detected = None, True
+        return None
+
+    async def get_backend(self, db: AsyncSession) -> Optional[str]:
+        """Installed spatial backend (looked up once, e.g. in workers that skip ensure())"""
+        if not self._detected:
+            result = await db.execute(
+                text("SELECT extname FROM pg_extension WHERE extname IN ('postgis', 'earthdistance')")
+            )
+            installed = set(result.scalars().all())
+            self.backend = next((backend for backend in SPATIAL_DDL if backend in installed), None)
+            self._detected = True
+        return self.backend
+
+    async def _nearby(
+        self, db: AsyncSession, query: Select, lat_col, lng_col,
+        lat: float, lng: float, radius_km: float, limit: Optional[int],
+    ) -> List[Tuple[Any, ...]]:
+        """Rows of query (entity first) within radius_km, nearest first, each with its km appended"""
+        self._stats["sql_searches"] += 1
+        backend = await self.get_backend(db)
+        if backend is None:
+            min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+            result = await db.execute(
+                query.where(lat_col.between(min_lat, max_lat), lng_col.between(min_lng, max_lng))
+            )
+            rows = []
+            for row in result.all():
+                entity = row[0]
+                distance = haversine_km(lat, lng, getattr(entity, lat_col.key), getattr(entity, lng_col.key))
+                if distance <= radius_km:
+                    rows.append((*row, distance))
+            rows.sort(key=lambda row: row[-1])
+            rows = rows[:limit] if limit else rows
+        else:
+            distance, within, nearest = spatial_terms(backend, lat_col, lng_col, lat, lng, radius_km)
+            statement = query.add_columns(distance).where(within).order_by(nearest)
+            if limit:
+                statement = statement.limit(limit)
+            result = await db.execute(statement)
+            rows = [(*row[:-1], float(row[-1])) for row in result.all()]
+        self._stats["sql_candidates"] += len(rows)
+        return rows
+
+    @staticmethod
+    def drivers_query() -> Select:
+        return select(User).where(User.role == UserRole.DRIVER, User.is_active == True)
+
+    async def nearby_drivers(
+        self, db: AsyncSession, lat: float, lng: float, radius_km: float,
+        limit: Optional[int] = None, query: Optional[Select] = None,
+    ) -> List[Tuple[Any, ...]]:
+        """
+        (driver, km) by persisted coordinates within radius_km, nearest first.
+        query: a drivers_query() with extra columns, returned between driver and km.
+        """
+        return await self._nearby(
+            db, query if query is not None else self.drivers_query(),
+            User.last_latitude, User.last_longitude, lat, lng, radius_km, limit,
+        )
+
+    async def nearby_branches(
+        self, db: AsyncSession, lat: float, lng: float, radius_km: float, limit: Optional[int] = None
+    ) -> List[Tuple[Branch, float]]:
+        """(branch, km) of active branches of active restaurants within radius_km, nearest first"""
+        query = (
+            select(Branch)
+            .join(Restaurant, Branch.restaurant_id == Restaurant.id)
+            .where(Branch.is_active == True, Restaurant.is_active == True)
+            .options(selectinload(Branch.restaurant).selectinload(Restaurant.category))
+        )
+        return await self._nearby(db, query, Branch.latitude, Branch.longitude, lat, lng, radius_km, limit)
+
+    # ==================== Live positions ====================
+
+    async def update_driver_position(
+        self, driver_id: int, lat: float, lng: float,
+        heading: Optional[float] = None, speed: Optional[float] = None,
+    ):
+        """Record a live position: driver_location:{id} for tracking, the GEO set for search"""
+        location = {
+            "latitude": lat,
+            "longitude": lng,
+            "heading": heading,
+            "speed": speed,
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        await (
+            self._redis.pipeline()
+            .command("SET", f"driver_location:{driver_id}", json.dumps(location), "EX", DRIVER_LOCATION_TTL_SECONDS)
+            .command("GEOADD", DRIVER_POSITIONS_KEY, lng, lat, driver_id)
+            .execute()
+        )
+
+    async def remove_driver(self, driver_id: int):
+        """Driver went offline: drop the live position"""
+        await (
+            self._redis.pipeline()
+            .command("ZREM", DRIVER_POSITIONS_KEY, driver_id)
+            .command("DEL", f"driver_location:{driver_id}")
+            .execute()
+        )
+
+    async def nearby_live_drivers(
+        self, lat: float, lng: float, radius_km: float, limit: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """(driver id, km) of drivers with a fresh live position within radius_km, nearest first"""
+        self._stats["live_searches"] += 1
+        fresh: List[Tuple[int, float]] = []
+        # A full page with stale members is retried once they are pruned
+        for _ in range(3):
+            found = await self._redis.geo_search(DRIVER_POSITIONS_KEY, lng, lat, radius_km, count=limit)
+            ids = [int(member) for member, _ in found]
+            locations = await self._redis.get_many(*(f"driver_location:{driver_id}" for driver_id in ids))
+            fresh = [(driver_id, km) for driver_id, (_, km), location in zip(ids, found, locations) if location]
+            stale = [driver_id for driver_id, location in zip(ids, locations) if not location]
+            if stale:
+                self._stats["stale_pruned"] += len(stale)
+                await self._redis.geo_remove(DRIVER_POSITIONS_KEY, *stale)
+            if not stale or not limit or len(found) < limit:
+                break
+        self._stats["live_candidates"] += len(fresh)
+        return fresh
+
+    async def driver_candidates(
+        self, db: AsyncSession, lat: float, lng: float, radius_km: float,
+        limit: Optional[int] = None, query: Optional[Select] = None,
+    ) -> List[Tuple[Any, ...]]:
+        """
+        (driver, km) of active drivers within radius_km, nearest first: the
+        live position of drivers that report one, persisted coordinates for
+        the rest. Extra columns of query come between driver and km.
+        """
+        query = query if query is not None else self.drivers_query()
+        # No limit on either side: inactive accounts and drivers whose live
+        # position is elsewhere are only dropped below
+        live = dict(await self.nearby_live_drivers(lat, lng, radius_km))
+        candidates = []
+        if live:
+            result = await db.execute(query.where(User.id.in_(list(live))))
+            candidates = [(*row, live[row[0].id]) for row in result.all()]
+        persisted = [row for row in await self.nearby_drivers(db, lat, lng, radius_km, None, query)
+                     if row[0].id not in live]
+        if persisted:
+            locations = await self._redis.get_many(*(f"driver_location:{row[0].id}" for row in persisted))
+            candidates += [row for row, location in zip(persisted, locations) if not location]
+        candidates.sort(key=lambda row: row[-1])
+        return candidates[:limit] if limit else candidates
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["backend"] = self.backend if self._detected else "unknown"
+        return stats
+
+
+geo_index = GeoIndex()
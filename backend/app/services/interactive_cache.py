@@ -0,0 +1,108 @@
+"""
+Pre-rendered WhatsApp interactive payloads for the browsing screens.
+
+Restaurant / category / menu lists only change when the catalog changes, so
+each rendered screen is kept as its serialized `interactive` JSON body:
+
+    key:   (screen, restaurant or category id, page, lang)
+    value: InteractivePayload(body, meta, version, restaurant_id)
+
+A tap on a cached screen is a dict lookup plus one send. Entries are dropped
+when their restaurant (or the whole catalog) is invalidated, and expire after
+INTERACTIVE_CACHE_TTL_SECONDS as a safety net for writes made outside the API.
+"""
+from typing import Optional, Dict, Any, Tuple, Callable, Awaitable
+import json
+import logging
+import time
+
+from app.core.constants import INTERACTIVE_CACHE_SIZE, INTERACTIVE_CACHE_TTL_SECONDS
+from app.services.catalog_service import catalog_service, CatalogWrites
+from app.services.redis_service import LRUCache
+
+logger = logging.getLogger(__name__)
+
+ScreenKey = Tuple[str, Optional[int], int, str]
+
+
+class InteractivePayload:
+    """One rendered screen: serialized interactive body plus data the handler needs"""
+
+    __slots__ = ("body", "meta", "version", "restaurant_id", "built_at")
+
+    def __init__(self, interactive: dict, version: int, restaurant_id: Optional[int] = None,
+                 meta: Optional[Dict[str, Any]] = None):
+        self.body = json.dumps(interactive, ensure_ascii=False, separators=(",", ":"))
+        self.meta = meta or {}
+        self.version = version
+        self.restaurant_id = restaurant_id
+        self.built_at = time.time()
+
+
+# A renderer returns (interactive, restaurant_id, meta), or None when there is
+# nothing to show (it has already answered the user in that case)
+Renderer = Callable[[], Awaitable[Optional[Tuple[dict, Optional[int], Dict[str, Any]]]]]
+
+
+class InteractiveCache:
+    """Screen key -> InteractivePayload, invalidated by catalog writes"""
+
+    def __init__(self, max_size: int = INTERACTIVE_CACHE_SIZE, ttl_seconds: int = INTERACTIVE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._payloads = LRUCache(max_size)
+        self._writes = CatalogWrites(catalog_service, ttl_seconds)
+        self._stats = {"hits": 0, "misses": 0, "renders": 0, "invalidations": 0}
+        catalog_service.add_listener(self.on_catalog_change)
+
+    def on_catalog_change(self, restaurant_id: Optional[int] = None):
+        self._stats["invalidations"] += 1
+        if restaurant_id is None:
+            self._payloads.clear()
+        else:
+            # Restaurant lists show every restaurant, so they go too
+            for key in [k for k, p in self._payloads.items() if p.restaurant_id in (None, restaurant_id)]:
+                del self._payloads[key]
+        self._writes.record(restaurant_id)
+
+    def _is_current(self, payload: InteractivePayload) -> bool:
+        # Global screens (restaurant None) depend on every restaurant
+        return self._writes.is_current(payload.version, payload.restaurant_id, payload.built_at)
+
+    def get(self, key: ScreenKey) -> Optional[InteractivePayload]:
+        payload = self._payloads.get(key)
+        if payload is not None and self._is_current(payload):
+            self._stats["hits"] += 1
+            return payload
+        self._stats["misses"] += 1
+        return None
+
+    async def get_or_render(self, key: ScreenKey, render: Renderer) -> Optional[InteractivePayload]:
+        """Cached payload for a screen, rendering (and caching) it on a miss"""
+        payload = self.get(key)
+        if payload is not None:
+            return payload
+
+        # Version before reading, so a write during the render is not cached as current
+        version = catalog_service.version
+        rendered = await render()
+        if rendered is None:
+            return None
+        interactive, restaurant_id, meta = rendered
+        payload = InteractivePayload(interactive, version, restaurant_id, meta)
+        self._stats["renders"] += 1
+        if self._is_current(payload):
+            self._payloads.set(key, payload)
+        return payload
+
+    def clear(self):
+        self._payloads.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["screens"] = len(self._payloads)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+interactive_cache = InteractiveCache()
@@ -0,0 +1,254 @@
+"""
+Async LLM execution layer.
+
+Keeps blocking model SDK calls off the event loop:
+- LLMBackend: pluggable backend interface (Gemini in production, fake for load tests)
+- LLMExecutor: concurrency cap, queue timeout, per-call timeout and cancellation
+"""
+import abc
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict, Any, Union
+import logging
+
+from app.core.constants import (
+    AI_MAX_CONCURRENT_CALLS, AI_CALL_TIMEOUT_SECONDS,
+    AI_QUEUE_TIMEOUT_SECONDS, AI_TEMPERATURE
+)
+from app.core.exceptions import AIServiceError
+
+logger = logging.getLogger(__name__)
+
+
+class LLMTimeoutError(AIServiceError):
+    """LLM call exceeded its time budget"""
+
+    def __init__(self, timeout: float):
+        super().__init__(f"AI call timed out after {timeout:.1f}s")
+        self.code = "AI_TIMEOUT"
+        self.details["timeout"] = timeout
+
+
+class LLMOverloadedError(AIServiceError):
+    """All LLM slots are busy and the caller waited too long for one"""
+
+    def __init__(self, max_concurrency: int):
+        super().__init__("AI service is busy, try again shortly")
+        self.code = "AI_OVERLOADED"
+        self.details["max_concurrency"] = max_concurrency
+
+
+class LLMBackend(abc.ABC):
+    """Base interface for LLM backends. Implementations return raw response text."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    async def generate(self, prompt: str, temperature: float, json_mode: bool, timeout: float) -> str:
+        """Raw response text for prompt"""
+
+    async def close(self):
+        """Release backend resources"""
+        pass
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Gemini backend.
+    The SDK call is synchronous, so it runs on a bounded thread pool sized to the
+    executor's concurrency cap. The per-call timeout is also passed to the SDK so the
+    underlying HTTP request is aborted instead of leaking a busy worker thread.
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = "gemini-2.0-flash", max_workers: int = AI_MAX_CONCURRENT_CALLS):
+        import google.generativeai as genai
+
+        self._genai = genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini")
+
+    def _generate_sync(self, prompt: str, temperature: float, json_mode: bool, timeout: float) -> str:
+        config = self._genai.types.GenerationConfig(
+            temperature=temperature,
+            response_mime_type="application/json" if json_mode else "text/plain"
+        )
+        response = self.model.generate_content(
+            prompt,
+            generation_config=config,
+            request_options={"timeout": timeout}
+        )
+        return response.text
+
+    async def generate(self, prompt: str, temperature: float, json_mode: bool, timeout: float) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, self._generate_sync, prompt, temperature, json_mode, timeout
+        )
+
+    async def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Local fake model for tests and load tests.
+    Sleeps for `latency` seconds (non-blocking) and returns `response`, which may be
+    a string, a dict (serialized to JSON) or a callable taking the prompt.
+    """
+
+    name = "fake"
+
+    DEFAULT_RESPONSE = {
+        "intent": "greeting",
+        "understood": True,
+        "message": "أهلا وسهلا! 😊"
+    }
+
+    def __init__(
+        self,
+        response: Union[str, Dict[str, Any], Callable[[str], Union[str, Dict[str, Any]]], None] = None,
+        latency: float = 0.0
+    ):
+        self.response = response if response is not None else self.DEFAULT_RESPONSE
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def generate(self, prompt: str, temperature: float, json_mode: bool, timeout: float) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            response = self.response(prompt) if callable(self.response) else self.response
+            if isinstance(response, dict):
+                return json.dumps(response, ensure_ascii=False)
+            return response
+        finally:
+            self.in_flight -= 1
+
+
+class LLMExecutor:
+    """
+    Runs LLM calls with a concurrency cap and timeouts.
+
+    - At most `max_concurrency` calls are in flight; extra callers wait up to
+      `queue_timeout` seconds for a slot, then get LLMOverloadedError.
+    - Each call is bounded by `timeout` seconds; on expiry the call is cancelled
+      and LLMTimeoutError is raised.
+    - Cancelling the awaiting task cancels the backend call as well.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[LLMBackend],
+        max_concurrency: int = AI_MAX_CONCURRENT_CALLS,
+        timeout: float = AI_CALL_TIMEOUT_SECONDS,
+        queue_timeout: float = AI_QUEUE_TIMEOUT_SECONDS
+    ):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._stats = {
+            "calls": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "cancelled": 0,
+            "in_flight": 0,
+            "total_latency_ms": 0.0,
+        }
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Create the semaphore lazily so it binds to the running event loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def generate(
+        self,
+        prompt: str,
+        temperature: float = AI_TEMPERATURE,
+        json_mode: bool = True,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Generate a completion without blocking the event loop"""
+        if self.backend is None:
+            raise AIServiceError("No LLM backend configured")
+
+        timeout = timeout or self.timeout
+        semaphore = self._get_semaphore()
+        self._stats["calls"] += 1
+
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats["rejected"] += 1
+            logger.warning(f"LLM executor saturated ({self.max_concurrency} in flight), rejecting call")
+            raise LLMOverloadedError(self.max_concurrency)
+
+        self._stats["in_flight"] += 1
+        started = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(
+                self.backend.generate(prompt, temperature, json_mode, timeout),
+                timeout=timeout
+            )
+            self._stats["completed"] += 1
+            return text
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            logger.warning(f"LLM call timed out after {timeout}s ({self.backend.name})")
+            raise LLMTimeoutError(timeout)
+        except asyncio.CancelledError:
+            self._stats["cancelled"] += 1
+            raise
+        except AIServiceError:
+            self._stats["failed"] += 1
+            raise
+        except Exception as e:
+            self._stats["failed"] += 1
+            raise AIServiceError(f"LLM backend error: {e}") from e
+        finally:
+            self._stats["total_latency_ms"] += (time.perf_counter() - started) * 1000
+            self._stats["in_flight"] -= 1
+            semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Executor counters for health/metrics endpoints"""
+        stats = dict(self._stats)
+        finished = stats["completed"] + stats["failed"] + stats["timeouts"] + stats["cancelled"]
+        stats["avg_latency_ms"] = round(stats["total_latency_ms"] / finished, 2) if finished else 0.0
+        stats["max_concurrency"] = self.max_concurrency
+        stats["backend"] = self.backend.name if self.backend else None
+        return stats
+
+    async def close(self):
+        if self.backend:
+            await self.backend.close()
+
+
+def create_llm_backend(backend_name: str, api_key: Optional[str]) -> Optional[LLMBackend]:
+    """Build the configured backend. Returns None when AI is disabled."""
+    backend_name = (backend_name or "gemini").lower()
+    if backend_name == "fake":
+        return FakeLLMBackend()
+    if backend_name == "gemini":
+        if not api_key:
+            return None
+        return GeminiBackend(api_key)
+    raise ValueError(f"Unknown LLM backend: {backend_name}")
@@ -0,0 +1,146 @@
+"""
+Per-restaurant menu matcher.
+
+Precompiled from the catalog snapshot (items with eager-loaded variants) so
+AIService._match_menu_items resolves every requested item of a multi-item order
+without touching the database:
+
+    names:    normalized Arabic/English name -> item (first in menu order)
+    tokens:   name token -> names containing it
+    variants: item id -> {"small" | "medium" | "large": variant}
+
+Matchers are cached per restaurant and dropped when that restaurant's menu is
+invalidated in the catalog. While no catalog snapshot can be built, a matcher
+is built from that restaurant's rows in the database and not cached.
+"""
+from typing import Optional, Dict, Any, List, Tuple
+import logging
+
+from app.core.text_normalize import normalize_arabic, tokenize
+from app.services.catalog_service import catalog_service, CatalogSnapshot, CatalogWrites
+
+logger = logging.getLogger(__name__)
+
+# Keywords that identify a size in variant names, in priority order
+VARIANT_SIZE_KEYWORDS = {
+    "small": ["small", "s", "صغير", "صغيرة"],
+    "medium": ["medium", "m", "وسط", "متوسط"],
+    "large": ["large", "l", "كبير", "كبيرة"],
+}
+
+
+def _size_variants(variants: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Map each size to the first variant (display order) whose name mentions it"""
+    sizes: Dict[str, Dict[str, Any]] = {}
+    for size, keywords in VARIANT_SIZE_KEYWORDS.items():
+        for variant in variants:
+            text = f"{variant['name'] or ''} {variant['name_ar'] or ''}".lower()
+            words = set(tokenize(text))
+            # Single letters ("s", "m", "l") only count as whole words, so "Small" is not "l"
+            if any(kw in words if len(kw) == 1 else kw in text for kw in keywords):
+                sizes[size] = variant
+                break
+    return sizes
+
+
+class MenuMatcher:
+    """Name -> item / size -> variant lookups for one restaurant's available items"""
+
+    def __init__(self, restaurant_id: int, version: int, items: List[Dict[str, Any]]):
+        self.restaurant_id = restaurant_id
+        self.version = version
+        self.names: Dict[str, Dict[str, Any]] = {}
+        self.tokens: Dict[str, List[str]] = {}
+        self.variants: Dict[int, Dict[str, Dict[str, Any]]] = {}
+
+        for item in items:
+            for raw in (item["name_ar"] or item["name"], item["name"] if item["name_ar"] else None):
+                name = normalize_arabic(raw or "")
+                if name and name not in self.names:
+                    self.names[name] = item
+                    for token in set(tokenize(name)):
+                        self.tokens.setdefault(token, []).append(name)
+            if item["has_variants"] and item["variants"]:
+                self.variants[item["id"]] = _size_variants(item["variants"])
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CatalogSnapshot, restaurant_id: int) -> "MenuMatcher":
+        return cls(restaurant_id, snapshot.version, list(snapshot.iter_items(restaurant_id)))
+
+    def find_item(self, normalized_name: str) -> Optional[Dict[str, Any]]:
+        """Exact name, else the substring match sharing most tokens, else first substring match"""
+        if not normalized_name:
+            return None
+        item = self.names.get(normalized_name)
+        if item is not None:
+            return item
+
+        shared: Dict[str, int] = {}
+        for token in set(tokenize(normalized_name)):
+            for name in self.tokens.get(token, ()):
+                shared[name] = shared.get(name, 0) + 1
+        for name, _ in sorted(shared.items(), key=lambda kv: -kv[1]):
+            if normalized_name in name or name in normalized_name:
+                return self.names[name]
+
+        for name, item in self.names.items():
+            if normalized_name in name or name in normalized_name:
+                return item
+        return None
+
+    def find_variant(self, item: Dict[str, Any], size: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not size or not item["has_variants"]:
+            return None
+        return self.variants.get(item["id"], {}).get(size)
+
+    def match(self, normalized_name: str, size: Optional[str]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        item = self.find_item(normalized_name)
+        if item is None:
+            return None, None
+        return item, self.find_variant(item, size)
+
+
+class MenuMatcherCache:
+    """Per-restaurant MenuMatcher cache invalidated by catalog writes"""
+
+    def __init__(self):
+        self._matchers: Dict[int, MenuMatcher] = {}
+        self._writes = CatalogWrites(catalog_service)
+        self._stats = {"hits": 0, "builds": 0, "invalidations": 0, "db_fallbacks": 0}
+        catalog_service.add_listener(self.on_catalog_change)
+
+    def on_catalog_change(self, restaurant_id: Optional[int] = None):
+        self._stats["invalidations"] += 1
+        if restaurant_id is None:
+            self._matchers.clear()
+        else:
+            self._matchers.pop(restaurant_id, None)
+        self._writes.record(restaurant_id)
+
+    def _is_current(self, matcher: MenuMatcher) -> bool:
+        return self._writes.is_current(matcher.version, matcher.restaurant_id)
+
+    async def get(self, restaurant_id: int) -> MenuMatcher:
+        """Matcher for a restaurant; raises if neither the catalog nor the database is available"""
+        matcher = self._matchers.get(restaurant_id)
+        if matcher is not None and self._is_current(matcher):
+            self._stats["hits"] += 1
+            return matcher
+
+        snapshot = await catalog_service.get_snapshot()
+        if snapshot is None:
+            self._stats["db_fallbacks"] += 1
+            return MenuMatcher.from_snapshot(await catalog_service.load_uncached(restaurant_id), restaurant_id)
+        matcher = MenuMatcher.from_snapshot(snapshot, restaurant_id)
+        self._stats["builds"] += 1
+        if self._is_current(matcher):
+            self._matchers[restaurant_id] = matcher
+        return matcher
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["restaurants"] = len(self._matchers)
+        return stats
+
+
+menu_matcher_cache = MenuMatcherCache()
@@ -0,0 +1,84 @@
+"""
+WhatsApp message deduplication.
+
+Meta redelivers a webhook when it does not get a timely 200, so the same
+message id can arrive several times (on any node). Each id is claimed once:
+
+    local LRU   - ids this process already saw, answered without Redis
+    Redis       - SET dedup:wa:{id} NX EX ttl, shared by every node
+
+A repeated delivery is dropped before any state, DB or AI work happens.
+The claim is taken with a short pending TTL and only made to last the full
+TTL once the message is queued (or handled inline); if that fails it is
+released, so Meta's redelivery is processed instead of dropped.
+"""
+from typing import Optional, Dict, Any
+import logging
+
+from app.core.constants import (
+    MESSAGE_DEDUP_TTL_SECONDS, MESSAGE_DEDUP_PENDING_TTL_SECONDS, MESSAGE_DEDUP_LOCAL_SIZE,
+)
+from app.services.redis_service import redis_service, LRUCache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "dedup:wa:"
+
+
+class MessageDeduplicator:
+    """Claims WhatsApp message ids; a second claim of the same id is a duplicate"""
+
+    def __init__(self, redis=None, ttl: int = MESSAGE_DEDUP_TTL_SECONDS,
+                 pending_ttl: int = MESSAGE_DEDUP_PENDING_TTL_SECONDS, local_size: int = MESSAGE_DEDUP_LOCAL_SIZE):
+        self.redis = redis or redis_service
+        self.ttl = ttl
+        self.pending_ttl = min(pending_ttl, ttl)
+        self._seen = LRUCache(local_size)
+        self._stats = {
+            "checked": 0, "duplicates": 0, "local_duplicates": 0, "redis_duplicates": 0, "no_id": 0, "released": 0,
+        }
+
+    async def is_duplicate(self, message_id: Optional[str]) -> bool:
+        """True if the id was already claimed; otherwise claim it (pending) and return False"""
+        if not message_id:
+            self._stats["no_id"] += 1
+            return False
+        self._stats["checked"] += 1
+
+        if self._seen.get(message_id):
+            self._stats["duplicates"] += 1
+            self._stats["local_duplicates"] += 1
+            return True
+
+        claimed = await self.redis.set_if_absent(f"{KEY_PREFIX}{message_id}", "1", self.pending_ttl)
+        self._seen.set(message_id, True)
+        if not claimed:
+            self._stats["duplicates"] += 1
+            self._stats["redis_duplicates"] += 1
+            logger.info(f"Dropping redelivered WhatsApp message {message_id}")
+            return True
+        return False
+
+    async def confirm(self, message_id: Optional[str]):
+        """The message is queued or handled: remember its id for the full TTL"""
+        if message_id:
+            await self.redis.set(f"{KEY_PREFIX}{message_id}", "1", self.ttl)
+
+    async def release(self, message_id: Optional[str]):
+        """Queueing or handling failed: drop the claim so a redelivery is processed"""
+        if not message_id:
+            return
+        self._seen.pop(message_id, None)
+        self._stats["released"] += 1
+        try:
+            await self.redis.delete(f"{KEY_PREFIX}{message_id}")
+        except Exception as e:
+            logger.warning(f"Failed to release message claim {message_id}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["tracked"] = len(self._seen)
+        return stats
+
+
+message_deduplicator = MessageDeduplicator()
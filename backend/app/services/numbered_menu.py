@@ -0,0 +1,171 @@
+"""
+Numbered restaurant menus ("type 1 3 to order").
+
+Rendered from the catalog snapshot (one query with eager-loaded variants
+serves every restaurant) and cached per (restaurant, language):
+
+    chunks:     menu text split at category / line boundaries so every
+                chunk fits in one WhatsApp text message
+    items_map:  "number" -> {menu_item_id, variant_id, name, price, restaurant_id}
+
+Menus are dropped when that restaurant's menu is invalidated in the catalog,
+and expire after NUMBERED_MENU_TTL_SECONDS.
+"""
+from typing import Optional, Dict, Any, List, Tuple
+import logging
+import time
+
+from app.core.constants import WHATSAPP_MAX_TEXT_LENGTH, NUMBERED_MENU_TTL_SECONDS
+from app.services.catalog_service import catalog_service, CatalogSnapshot, CatalogWrites
+
+logger = logging.getLogger(__name__)
+
+
+def split_text(text: str, limit: int = WHATSAPP_MAX_TEXT_LENGTH) -> List[str]:
+    """Split text into chunks of at most `limit` chars, preferring blank lines, then lines"""
+    chunks: List[str] = []
+    current = ""
+    for block in text.split("\n\n"):
+        candidate = f"{current}\n\n{block}" if current else block
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        current = ""
+        for line in block.split("\n"):
+            candidate = f"{current}\n{line}" if current else line
+            if len(candidate) <= limit:
+                current = candidate
+                continue
+            if current:
+                chunks.append(current)
+            # A single line longer than the limit is hard-wrapped
+            while len(line) > limit:
+                chunks.append(line[:limit])
+                line = line[limit:]
+            current = line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class NumberedMenu:
+    """One restaurant's numbered menu in one language"""
+
+    def __init__(self, restaurant_id: int, lang: str, version: int, restaurant_name: str,
+                 chunks: List[str], items_map: Dict[str, Dict[str, Any]]):
+        self.restaurant_id = restaurant_id
+        self.lang = lang
+        self.version = version
+        self.restaurant_name = restaurant_name
+        self.chunks = chunks
+        self.items_map = items_map
+        self.built_at = time.time()
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CatalogSnapshot, restaurant_id: int, lang: str) -> Optional["NumberedMenu"]:
+        """None if the restaurant is not in the snapshot"""
+        restaurant = snapshot.restaurants.get(restaurant_id)
+        if restaurant is None:
+            return None
+        rest_name = restaurant["name_ar"] if lang == "ar" and restaurant["name_ar"] else restaurant["name"]
+
+        menu_text = f"📋 *مانيو {rest_name}*\n"
+        menu_text += "=" * 25 + "\n\n"
+        items_map: Dict[str, Dict[str, Any]] = {}
+
+        def add_line(name: str, price: float, price_str: str, item_id: int, variant_id: Optional[int] = None) -> str:
+            number = str(len(items_map) + 1)
+            items_map[number] = {
+                "menu_item_id": item_id,
+                "variant_id": variant_id,
+                "name": name,
+                "price": price,
+                "restaurant_id": restaurant_id
+            }
+            return f"  {number}. {name} - {price_str}\n"
+
+        current_category = None
+        for item in snapshot.iter_items(restaurant_id):
+            if not item["menu_is_active"]:
+                continue
+            if item["category_id"] != current_category:
+                if current_category is not None:
+                    menu_text += "\n"
+                current_category = item["category_id"]
+                cat_name = item["category_name_ar"] if lang == "ar" and item["category_name_ar"] else item["category_name"]
+                menu_text += f"🔸 *{cat_name}*\n"
+
+            item_name = item["name_ar"] if lang == "ar" and item["name_ar"] else item["name"]
+            if item["has_variants"] and item["variants"]:
+                for v in item["variants"]:
+                    v_name = v["name_ar"] if lang == "ar" and v["name_ar"] else v["name"]
+                    price = v["price"] or 0.0
+                    menu_text += add_line(f"{item_name} ({v_name})", price, f"${price:.2f}", item["id"], v["id"])
+            elif item["has_variants"]:
+                price = item["price"] or 0.0
+                menu_text += add_line(item_name, price, f"${price:.2f}", item["id"])
+            else:
+                price = item["price"] or 0.0
+                menu_text += add_line(item_name, price, f"${price:.2f}" if price > 0 else "-", item["id"])
+        if current_category is not None:
+            menu_text += "\n"
+
+        # Add instruction footer
+        if lang == "ar":
+            menu_text += "اكتب أرقام الأصناف يلي بدك ياها (مثلاً: 1 3) 👆\n"
+            menu_text += "أو اكتب *طلب* لعرض السلة 🛒"
+        else:
+            menu_text += "Type item numbers you want (e.g.: 1 3) 👆\n"
+            menu_text += "Or type *order* to view cart 🛒"
+
+        return cls(restaurant_id, lang, snapshot.version, rest_name, split_text(menu_text), items_map)
+
+
+class NumberedMenuCache:
+    """(restaurant id, lang) -> NumberedMenu, invalidated by catalog writes"""
+
+    def __init__(self, ttl_seconds: int = NUMBERED_MENU_TTL_SECONDS):
+        self._menus: Dict[Tuple[int, str], NumberedMenu] = {}
+        self._writes = CatalogWrites(catalog_service, ttl_seconds)
+        self._stats = {"hits": 0, "builds": 0, "invalidations": 0}
+        catalog_service.add_listener(self.on_catalog_change)
+
+    def on_catalog_change(self, restaurant_id: Optional[int] = None):
+        self._stats["invalidations"] += 1
+        if restaurant_id is None:
+            self._menus.clear()
+        else:
+            for key in [k for k in self._menus if k[0] == restaurant_id]:
+                del self._menus[key]
+        self._writes.record(restaurant_id)
+
+    def _is_current(self, menu: NumberedMenu) -> bool:
+        return self._writes.is_current(menu.version, menu.restaurant_id, menu.built_at)
+
+    async def get(self, restaurant_id: int, lang: str) -> Optional[NumberedMenu]:
+        """Numbered menu, or None if the restaurant (or the catalog) is unavailable"""
+        menu = self._menus.get((restaurant_id, lang))
+        if menu is not None and self._is_current(menu):
+            self._stats["hits"] += 1
+            return menu
+
+        snapshot = await catalog_service.get_snapshot()
+        if snapshot is None:
+            return None
+        menu = NumberedMenu.from_snapshot(snapshot, restaurant_id, lang)
+        if menu is None:
+            return None
+        self._stats["builds"] += 1
+        if self._is_current(menu):
+            self._menus[(restaurant_id, lang)] = menu
+        return menu
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["menus"] = len(self._menus)
+        return stats
+
+
+numbered_menu_cache = NumberedMenuCache()
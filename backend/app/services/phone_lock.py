@@ -0,0 +1,180 @@
+"""
+Per-phone message lock.
+
+BotController state and cart updates are read-modify-write, so two messages
+from one user (two quick button taps) must not be handled at the same time.
+Messages of different users never wait on each other.
+
+    local  - keyed asyncio.Lock (FIFO, so waiters are served in arrival order)
+    redis  - the local lock plus a Redis lease (SET NX PX with a random token,
+             renewed while held, released by compare-and-delete) so only one
+             node handles a user at a time
+
+Only the local lock holder competes for the lease, so each node has at most
+one contender per phone number.
+"""
+import asyncio
+import secrets
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any
+import logging
+
+from app.core.config import settings
+from app.core.constants import PHONE_LOCK_TIMEOUT_SECONDS, PHONE_LOCK_LEASE_MS, PHONE_LOCK_RETRY_MS
+from app.core.exceptions import MessageLockTimeoutError
+from app.services.redis_backends import MemoryRedisBackend, RedisScript
+from app.services.redis_service import redis_service
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "lock:phone:"
+
+
+def _local_release(backend: MemoryRedisBackend, keys, args):
+    if backend._cmd_get(keys[0]) == args[0]:
+        return backend._cmd_del(keys[0])
+    return 0
+
+
+def _local_renew(backend: MemoryRedisBackend, keys, args):
+    if backend._cmd_get(keys[0]) == args[0]:
+        return backend._cmd_pexpire(keys[0], args[1])
+    return 0
+
+
+LEASE_RELEASE = RedisScript("phone_lock_release", """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""", _local_release)
+
+LEASE_RENEW = RedisScript("phone_lock_renew", """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+""", _local_renew)
+
+
+class _KeyLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Holder plus waiters; the entry is dropped when this reaches 0
+        self.users = 0
+
+
+class PhoneLock:
+    """Serializes message handling per phone number"""
+
+    def __init__(self, mode: Optional[str] = None, redis=None, timeout: float = PHONE_LOCK_TIMEOUT_SECONDS,
+                 lease_ms: int = PHONE_LOCK_LEASE_MS, retry_ms: int = PHONE_LOCK_RETRY_MS):
+        self.redis = redis or redis_service
+        self.requested_mode = (mode or settings.PHONE_LOCK_BACKEND).lower()
+        self.timeout = timeout
+        self.lease_ms = lease_ms
+        self.retry_ms = retry_ms
+        self._locks: Dict[str, _KeyLock] = {}
+        self._stats = {
+            "acquired": 0, "contended": 0, "timeouts": 0, "lease_waits": 0, "lease_lost": 0,
+            "total_wait_ms": 0.0, "max_wait_ms": 0.0,
+        }
+
+    @property
+    def mode(self) -> str:
+        mode = self.requested_mode
+        if mode == "auto":
+            return "local" if self.redis.backend_name == "memory" else "redis"
+        return mode if mode in ("local", "redis") else "local"
+
+    # ==================== Redis lease ====================
+
+    async def _acquire_lease(self, key: str, token: str, deadline: float) -> bool:
+        waited = False
+        while True:
+            if await self.redis.set_if_absent(key, token, px=self.lease_ms):
+                if waited:
+                    self._stats["lease_waits"] += 1
+                return True
+            waited = True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(self.retry_ms / 1000)
+
+    async def _renew_lease(self, key: str, token: str):
+        while True:
+            await asyncio.sleep(self.lease_ms / 3000)
+            renewed = await self.redis.run_script(LEASE_RENEW, [key], [token, self.lease_ms])
+            if not renewed:
+                self._stats["lease_lost"] += 1
+                logger.warning(f"Lost message lock lease {key}")
+                return
+
+    # ==================== Acquire / release ====================
+
+    @asynccontextmanager
+    async def hold(self, phone_number: str):
+        """Hold the phone's lock for the body; raises MessageLockTimeoutError"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        entry = self._locks.get(phone_number)
+        if entry is None:
+            entry = self._locks[phone_number] = _KeyLock()
+        if entry.users:
+            self._stats["contended"] += 1
+        entry.users += 1
+
+        key = f"{KEY_PREFIX}{phone_number}"
+        token = None
+        renewer = None
+        try:
+            try:
+                await asyncio.wait_for(entry.lock.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self._timed_out(phone_number, started)
+
+            try:
+                if self.mode == "redis":
+                    token = secrets.token_hex(8)
+                    if not await self._acquire_lease(key, token, deadline):
+                        token = None
+                        self._timed_out(phone_number, started)
+                    renewer = asyncio.create_task(self._renew_lease(key, token))
+                self._record_wait(started)
+                yield
+            finally:
+                if renewer is not None:
+                    renewer.cancel()
+                if token is not None:
+                    try:
+                        await self.redis.run_script(LEASE_RELEASE, [key], [token])
+                    except Exception as e:
+                        logger.warning(f"Failed to release message lock {key}: {e}")
+                entry.lock.release()
+        finally:
+            entry.users -= 1
+            if entry.users == 0 and self._locks.get(phone_number) is entry:
+                del self._locks[phone_number]
+
+    def _timed_out(self, phone_number: str, started: float):
+        self._stats["timeouts"] += 1
+        raise MessageLockTimeoutError(phone_number, time.monotonic() - started)
+
+    def _record_wait(self, started: float):
+        wait_ms = (time.monotonic() - started) * 1000
+        self._stats["acquired"] += 1
+        self._stats["total_wait_ms"] += wait_ms
+        self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["mode"] = self.mode
+        stats["held_or_waiting"] = len(self._locks)
+        stats["avg_wait_ms"] = round(stats["total_wait_ms"] / stats["acquired"], 2) if stats["acquired"] else 0.0
+        return stats
+
+
+phone_lock = PhoneLock()
@@ -0,0 +1,499 @@
+"""
+Redis backends behind RedisService.
+
+    MemoryRedisBackend   per-process LRU store (dev/tests, and fallback for the others)
+    UpstashRestBackend   Upstash REST API over HTTPS (serverless deployments)
+    NativeRedisBackend   pooled redis.asyncio connection (self-hosted redis:7)
+
+All backends take raw commands ("SET", key, value, "EX", 60) and return
+decoded replies, so RedisService helpers do not care which one is active.
+Selected with settings.REDIS_BACKEND: "auto" keeps the historical behaviour
+(Upstash when configured, memory otherwise).
+"""
+import asyncio
+import fnmatch
+import math
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, AsyncIterator, Set, Callable
+import logging
+
+import httpx
+
+from app.core.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Maximum size for in-memory store (LRU eviction)
+MAX_MEMORY_STORE_SIZE = 10000
+
+# Earth radius Redis GEO commands use (meters), so memory distances match the server's
+GEO_EARTH_RADIUS_M = 6372797.560856
+GEO_UNITS = {"m": 1.0, "km": 1000.0, "mi": 1609.34, "ft": 0.3048}
+
+
+def geo_distance_m(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    """Haversine distance in meters (same formula as Redis geohashGetDistance)"""
+    lat1, lat2 = math.radians(lat1), math.radians(lat2)
+    u = math.sin((lat2 - lat1) / 2)
+    v = math.sin(math.radians(lng2 - lng1) / 2)
+    return 2 * GEO_EARTH_RADIUS_M * math.asin(math.sqrt(u * u + math.cos(lat1) * math.cos(lat2) * v * v))
+
+
+class LRUCache(OrderedDict):
+    """Simple LRU cache implementation for memory fallback"""
+
+    def __init__(self, max_size: int = MAX_MEMORY_STORE_SIZE):
+        super().__init__()
+        self.max_size = max_size
+
+    def get(self, key, default=None):
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        return default
+
+    def set(self, key, value):
+        if key in self:
+            self.move_to_end(key)
+        self[key] = value
+        while len(self) > self.max_size:
+            oldest = next(iter(self))
+            del self[oldest]
+            logger.debug(f"LRU evicted key: {oldest[:20]}...")
+
+
+class RedisBackend:
+    """Interface implemented by every backend"""
+
+    name = "base"
+    supports_pubsub = False
+
+    async def execute(self, *args) -> Any:
+        raise NotImplementedError
+
+    async def execute_batch(self, commands: List[List[Any]], transaction: bool = False) -> List[Any]:
+        """Run commands in one round trip; failed commands yield None"""
+        raise NotImplementedError
+
+    async def subscribe(self, *channels: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield {"channel", "data"} messages published on the channels"""
+        raise RedisError(f"{self.name} backend does not support subscriptions", operation="SUBSCRIBE")
+        yield  # pragma: no cover
+
+    async def close(self):
+        pass
+
+
+# ==================== In-memory ====================
+
+class MemoryRedisBackend(RedisBackend):
+    """
+    Per-process store with LRU eviction, key expiry and local pub/sub.
+    Implements the subset of commands RedisService uses.
+    """
+
+    name = "memory"
+    supports_pubsub = True
+
+    def __init__(self, max_size: int = MAX_MEMORY_STORE_SIZE):
+        self.store = LRUCache(max_size)
+        self.expiry: Dict[str, float] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def execute(self, *args) -> Any:
+        if not args:
+            return None
+        handler = getattr(self, f"_cmd_{str(args[0]).lower()}", None)
+        if handler is None:
+            logger.debug(f"Memory Redis: unsupported command {args[0]}")
+            return None
+        return handler(*args[1:])
+
+    async def execute_batch(self, commands: List[List[Any]], transaction: bool = False) -> List[Any]:
+        results = []
+        for command in commands:
+            try:
+                results.append(await self.execute(*command))
+            except Exception as e:
+                logger.error(f"Memory Redis command {command[0]} failed: {e}")
+                results.append(None)
+        return results
+
+    def _alive(self, key: str) -> bool:
+        deadline = self.expiry.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.store.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.store
+
+    def _get(self, key: str, default=None):
+        return self.store.get(key, default) if self._alive(key) else default
+
+    def _container(self, key: str, factory):
+        value = self._get(key)
+        if value is None:
+            value = factory()
+            self.store.set(key, value)
+        return value
+
+    # Strings
+    def _cmd_ping(self, *args):
+        return "PONG"
+
+    def _cmd_get(self, key):
+        value = self._get(key)
+        return value if isinstance(value, str) or value is None else None
+
+    def _cmd_set(self, key, value, *options):
+        options = [str(o).upper() for o in options]
+        exists = self._alive(key)
+        if ("NX" in options and exists) or ("XX" in options and not exists):
+            return None
+        self.store.set(key, str(value))
+        if "EX" in options:
+            self.expiry[key] = time.monotonic() + int(options[options.index("EX") + 1])
+        elif "PX" in options:
+            self.expiry[key] = time.monotonic() + int(options[options.index("PX") + 1]) / 1000
+        elif "KEEPTTL" not in options:
+            self.expiry.pop(key, None)
+        return "OK"
+
+    def _cmd_mget(self, *keys):
+        return [self._cmd_get(key) for key in keys]
+
+    def _cmd_incrby(self, key, amount):
+        value = int(self._get(key) or 0) + int(amount)
+        self.store.set(key, str(value))
+        return value
+
+    def _cmd_incr(self, key):
+        return self._cmd_incrby(key, 1)
+
+    def _cmd_decr(self, key):
+        return self._cmd_incrby(key, -1)
+
+    # Keys
+    def _cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += self._alive(key)
+            self.store.pop(key, None)
+            self.expiry.pop(key, None)
+        return removed
+
+    def _cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    def _cmd_expire(self, key, seconds):
+        if not self._alive(key):
+            return 0
+        self.expiry[key] = time.monotonic() + int(seconds)
+        return 1
+
+    def _cmd_pexpire(self, key, milliseconds):
+        if not self._alive(key):
+            return 0
+        self.expiry[key] = time.monotonic() + int(milliseconds) / 1000
+        return 1
+
+    def _cmd_ttl(self, key):
+        if not self._alive(key):
+            return -2
+        deadline = self.expiry.get(key)
+        return -1 if deadline is None else max(0, int(deadline - time.monotonic()))
+
+    def _cmd_keys(self, pattern):
+        return [key for key in list(self.store.keys()) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    # Hashes
+    def _cmd_hset(self, key, *pairs):
+        h = self._container(key, dict)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in h
+            h[field] = str(value)
+        return added
+
+    def _cmd_hget(self, key, field):
+        return self._get(key, {}).get(field)
+
+    def _cmd_hmget(self, key, *fields):
+        h = self._get(key, {})
+        return [h.get(field) for field in fields]
+
+    def _cmd_hdel(self, key, *fields):
+        h = self._get(key)
+        if not h:
+            return 0
+        removed = sum(1 for field in fields if h.pop(field, None) is not None)
+        if not h:
+            self._cmd_del(key)
+        return removed
+
+    def _cmd_hincrby(self, key, field, amount):
+        h = self._container(key, dict)
+        value = int(h.get(field, 0)) + int(amount)
+        h[field] = str(value)
+        return value
+
+    def _cmd_hgetall(self, key):
+        return dict(self._get(key, {}))
+
+    def _cmd_hlen(self, key):
+        return len(self._get(key, {}))
+
+    # Sets
+    def _cmd_sadd(self, key, *members):
+        s = self._container(key, set)
+        new = {str(m) for m in members} - s
+        s.update(new)
+        return len(new)
+
+    def _cmd_srem(self, key, *members):
+        s = self._get(key)
+        if not s:
+            return 0
+        removed = {str(m) for m in members} & s
+        s.difference_update(removed)
+        return len(removed)
+
+    def _cmd_smembers(self, key):
+        return set(self._get(key, set()))
+
+    def _cmd_scard(self, key):
+        return len(self._get(key, set()))
+
+    # Geo (a member -> (lng, lat) dict; Redis keeps these in a sorted set)
+    def _cmd_geoadd(self, key, *triples):
+        g = self._container(key, dict)
+        added = 0
+        for lng, lat, member in zip(triples[::3], triples[1::3], triples[2::3]):
+            added += str(member) not in g
+            g[str(member)] = (float(lng), float(lat))
+        return added
+
+    def _cmd_geopos(self, key, *members):
+        g = self._get(key, {})
+        return [[str(g[m][0]), str(g[m][1])] if m in g else None for m in map(str, members)]
+
+    def _cmd_geosearch(self, key, *args):
+        """GEOSEARCH key FROMLONLAT lng lat BYRADIUS r unit [ASC|DESC] [COUNT n] [WITHCOORD] [WITHDIST]"""
+        options = [str(a).upper() for a in args]
+        origin = options.index("FROMLONLAT")
+        lng, lat = float(args[origin + 1]), float(args[origin + 2])
+        radius = options.index("BYRADIUS")
+        unit = GEO_UNITS[str(args[radius + 2]).lower()]
+        limit_m = float(args[radius + 1]) * unit
+        found = []
+        for member, (member_lng, member_lat) in self._get(key, {}).items():
+            distance = geo_distance_m(lng, lat, member_lng, member_lat)
+            if distance <= limit_m:
+                found.append((distance, member))
+        if {"ASC", "DESC", "COUNT"} & set(options):
+            # COUNT alone implies ASC, as on the server
+            found.sort(reverse="DESC" in options)
+        if "COUNT" in options:
+            found = found[:int(args[options.index("COUNT") + 1])]
+        if "WITHDIST" not in options and "WITHCOORD" not in options:
+            return [member for _, member in found]
+        replies = []
+        for distance, member in found:
+            reply = [member]
+            if "WITHDIST" in options:
+                reply.append(f"{distance / unit:.4f}")
+            if "WITHCOORD" in options:
+                reply.append([str(c) for c in self.store[key][member]])
+            replies.append(reply)
+        return replies
+
+    def _cmd_zrem(self, key, *members):
+        g = self._get(key)
+        if not g:
+            return 0
+        removed = sum(1 for m in map(str, members) if g.pop(m, None) is not None)
+        if not g:
+            self._cmd_del(key)
+        return removed
+
+    def _cmd_zcard(self, key):
+        return len(self._get(key, {}))
+
+    # Pub/sub
+    def _cmd_publish(self, channel, message):
+        queues = self._subscribers.get(channel, ())
+        for queue in queues:
+            queue.put_nowait({"channel": channel, "data": message})
+        return len(queues)
+
+    async def subscribe(self, *channels: str) -> AsyncIterator[Dict[str, Any]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        for channel in channels:
+            self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            for channel in channels:
+                self._subscribers.get(channel, set()).discard(queue)
+
+
+# ==================== Upstash REST ====================
+
+class UpstashRestBackend(RedisBackend):
+    """Upstash REST API: one HTTPS request per command or per /pipeline batch"""
+
+    name = "upstash"
+
+    def __init__(self, base_url: str, token: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url
+        self.token = token
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get or create singleton httpx client"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=10.0, transport=self._transport)
+        return self._client
+
+    async def execute(self, *args) -> Any:
+        response = await self._get_client().post(self.base_url, headers=self.headers, json=list(args))
+        response.raise_for_status()
+        result = response.json()
+        if "error" in result:
+            logger.error(f"Upstash command {args[0]} failed: {result['error']}")
+        return result.get("result")
+
+    async def execute_batch(self, commands: List[List[Any]], transaction: bool = False) -> List[Any]:
+        endpoint = "multi-exec" if transaction else "pipeline"
+        response = await self._get_client().post(
+            f"{self.base_url.rstrip('/')}/{endpoint}",
+            headers=self.headers,
+            json=commands
+        )
+        response.raise_for_status()
+        body = response.json()
+        if isinstance(body, dict) and "error" in body:
+            # A failed transaction is rejected as a whole
+            raise RedisError(body["error"], operation=endpoint)
+
+        results = []
+        for command, item in zip(commands, body):
+            if "error" in item:
+                logger.error(f"Upstash {endpoint} command {command[0]} failed: {item['error']}")
+                results.append(None)
+            else:
+                results.append(item.get("result"))
+        return results
+
+    async def close(self):
+        """Close the httpx client"""
+        if self._client and not self._client.is_closed:
+            await self._client.aclose()
+
+
+# ==================== Native RESP ====================
+
+class NativeRedisBackend(RedisBackend):
+    """Pooled redis.asyncio client for a self-hosted Redis server"""
+
+    name = "redis"
+    supports_pubsub = True
+
+    def __init__(self, url: str, max_connections: int = 20, socket_timeout: float = 5.0, client=None):
+        self.url = url
+        self.max_connections = max_connections
+        self.socket_timeout = socket_timeout
+        self._client = client
+
+    def _get_client(self):
+        if self._client is None:
+            import redis.asyncio as aioredis
+            self._client = aioredis.from_url(
+                self.url,
+                max_connections=self.max_connections,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_timeout,
+                decode_responses=True,
+                health_check_interval=30,
+            )
+        return self._client
+
+    async def execute(self, *args) -> Any:
+        return await self._get_client().execute_command(*args)
+
+    async def execute_batch(self, commands: List[List[Any]], transaction: bool = False) -> List[Any]:
+        pipe = self._get_client().pipeline(transaction=transaction)
+        for command in commands:
+            pipe.execute_command(*command)
+        replies = await pipe.execute(raise_on_error=False)
+        results = []
+        for command, reply in zip(commands, replies):
+            if isinstance(reply, Exception):
+                logger.error(f"Redis pipeline command {command[0]} failed: {reply}")
+                results.append(None)
+            else:
+                results.append(reply)
+        return results
+
+    async def subscribe(self, *channels: str) -> AsyncIterator[Dict[str, Any]]:
+        pubsub = self._get_client().pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(*channels)
+        try:
+            async for message in pubsub.listen():
+                if message and message.get("type") == "message":
+                    yield {"channel": message["channel"], "data": message["data"]}
+        finally:
+            await pubsub.unsubscribe(*channels)
+            await pubsub.aclose()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def create_redis_backend(
+    backend_name: str,
+    redis_url: Optional[str] = None,
+    upstash_url: Optional[str] = None,
+    upstash_token: Optional[str] = None,
+    max_connections: int = 20,
+    socket_timeout: float = 5.0,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> RedisBackend:
+    """Backend for REDIS_BACKEND = auto | upstash | redis | memory"""
+    backend_name = (backend_name or "auto").lower()
+    if backend_name == "auto":
+        backend_name = "upstash" if upstash_url and upstash_token else "memory"
+
+    if backend_name == "upstash":
+        if not (upstash_url and upstash_token):
+            logger.warning("REDIS_BACKEND=upstash but Upstash is not configured, using memory")
+            return MemoryRedisBackend()
+        return UpstashRestBackend(upstash_url, upstash_token, transport=transport)
+    if backend_name == "redis":
+        return NativeRedisBackend(redis_url, max_connections=max_connections, socket_timeout=socket_timeout)
+    if backend_name != "memory":
+        logger.warning(f"Unknown REDIS_BACKEND '{backend_name}', using memory")
+    return MemoryRedisBackend()
+
+
+class RedisScript:
+    """
+    Server-side Lua script with an equivalent Python implementation that runs
+    against MemoryRedisBackend (which cannot execute Lua). Both must be atomic:
+    the Python version never awaits, so it runs without interleaving.
+
+        local(backend, keys, args) -> same reply shape as the Lua script
+    """
+
+    def __init__(self, name: str, lua: str, local: Callable[[MemoryRedisBackend, List[str], List[Any]], Any]):
+        self.name = name
+        self.lua = lua
+        self.local = local
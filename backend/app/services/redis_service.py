@@ -1,15 +1,23 @@
 import httpx
 from app.core.config import settings
+from app.services.redis_backends import (
+    RedisBackend, MemoryRedisBackend, RedisScript, LRUCache, MAX_MEMORY_STORE_SIZE, create_redis_backend
+)
+from app.services.cart_scripts import (
+    CART_ADD, CART_SET_QUANTITY, CART_REMOVE, CART_READ, CART_TOTALS,
+    cart_keys, line_key, price_cents, variant_arg, decode_summary, decode_totals, empty_summary,
+)
 from app.core.constants import (
     CART_EXPIRY_SECONDS, CONVERSATION_EXPIRY_SECONDS,
     USER_STATE_EXPIRY_SECONDS, PENDING_REVIEW_EXPIRY_SECONDS,
     ANALYTICS_RETENTION_SECONDS, AI_MAX_CONVERSATION_MESSAGES
 )
 import json
+from contextlib import contextmanager
+from contextvars import ContextVar
 from decimal import Decimal
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime
-from collections import OrderedDict
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,146 +35,166 @@ def json_dumps(obj):
     """JSON dumps with Decimal support"""
     return json.dumps(obj, cls=DecimalEncoder)
 
-# Maximum size for in-memory fallback store (LRU eviction)
-MAX_MEMORY_STORE_SIZE = 10000
-
-
-class LRUCache(OrderedDict):
-    """Simple LRU cache implementation for memory fallback"""
-
-    def __init__(self, max_size: int = MAX_MEMORY_STORE_SIZE):
-        super().__init__()
-        self.max_size = max_size
-
-    def get(self, key, default=None):
-        if key in self:
-            self.move_to_end(key)
-            return self[key]
-        return default
-
-    def set(self, key, value):
-        if key in self:
-            self.move_to_end(key)
-        self[key] = value
-        while len(self) > self.max_size:
-            oldest = next(iter(self))
-            del self[oldest]
-            logger.debug(f"LRU evicted key: {oldest[:20]}...")
 
+# Per-message cart summaries (phone -> summary), active inside cart_cache_scope()
+_cart_cache: ContextVar[Optional[Dict[str, Dict[str, Any]]]] = ContextVar("cart_cache", default=None)
 
 class RedisService:
     """
-    Redis Service using Upstash REST API.
-    Compatible with serverless environments like Cloud Run.
-    Falls back to LRU in-memory storage if Upstash not configured.
+    Redis access for the bot (state, carts, conversation, analytics).
+
+    Commands go to a pluggable backend selected by settings.REDIS_BACKEND:
+    Upstash REST (serverless, e.g. Cloud Run), a pooled native Redis
+    connection (self-hosted), or an in-memory LRU store. Remote backend
+    failures fall back to the in-memory store.
     """
 
-    def __init__(self):
-        self.base_url = settings.UPSTASH_REDIS_REST_URL
-        self.token = settings.UPSTASH_REDIS_REST_TOKEN
-        self.headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        token: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        backend: Optional[RedisBackend] = None,
+    ):
+        if backend is None:
+            backend_name = settings.REDIS_BACKEND
+            if base_url is not None or token is not None:
+                backend_name = "upstash"
+            backend = create_redis_backend(
+                backend_name,
+                redis_url=settings.get_redis_url(),
+                upstash_url=base_url if base_url is not None else settings.UPSTASH_REDIS_REST_URL,
+                upstash_token=token if token is not None else settings.UPSTASH_REDIS_REST_TOKEN,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                transport=transport,
+            )
+        self.backend = backend
         # Fallback to LRU in-memory storage with eviction
-        self._memory_store = LRUCache(MAX_MEMORY_STORE_SIZE)
-        self._client: Optional[httpx.AsyncClient] = None
-        self._using_fallback = not (self.base_url and self.token)
-    
-    def _get_client(self) -> httpx.AsyncClient:
-        """Get or create singleton httpx client"""
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(timeout=10.0)
-        return self._client
+        self._memory = backend if isinstance(backend, MemoryRedisBackend) else MemoryRedisBackend()
+        self._using_fallback = isinstance(backend, MemoryRedisBackend)
+        self._stats = {
+            "commands": 0, "round_trips": 0, "pipelined_commands": 0, "fallbacks": 0,
+            "cart_reads": 0, "cart_cache_hits": 0,
+        }
+        logger.info(f"Redis backend: {backend.name}")
+
+    @property
+    def backend_name(self) -> str:
+        return self.backend.name
 
     async def close(self):
-        """Close the httpx client"""
-        if self._client and not self._client.is_closed:
-            await self._client.aclose()
+        """Close backend connections"""
+        await self.backend.close()
 
     async def _execute(self, *args) -> Any:
-        """Execute Redis command via Upstash REST API"""
-        if not self.base_url or not self.token:
-            # Fallback to memory storage
-            return await self._memory_fallback(*args)
-        
+        """Execute a single Redis command"""
+        self._stats["commands"] += 1
+        if self._using_fallback:
+            return await self._memory.execute(*args)
+
         try:
-            client = self._get_client()
-            response = await client.post(
-                self.base_url,
-                headers=self.headers,
-                json=list(args)
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result.get("result")
+            self._stats["round_trips"] += 1
+            return await self.backend.execute(*args)
         except Exception as e:
-            logger.error(f"Upstash Redis error: {e}")
+            logger.error(f"{self.backend.name} Redis error: {e}")
             # Fallback to memory
-            return await self._memory_fallback(*args)
-    
-    async def _memory_fallback(self, *args) -> Any:
-        """In-memory fallback when Redis is unavailable (with LRU eviction)"""
-        if not args:
-            return None
-
-        command = args[0].upper()
-
-        if command == "SET":
-            key = args[1]
-            value = args[2]
-            self._memory_store.set(key, value)
-            return "OK"
-        elif command == "GET":
-            key = args[1]
-            return self._memory_store.get(key)
-        elif command == "DEL":
-            key = args[1]
-            if key in self._memory_store:
-                del self._memory_store[key]
-            return 1
-        elif command == "PUBLISH":
-            # Just log for memory mode
-            return 0
-        elif command == "HINCRBY":
-            # Hash increment
-            key = args[1]
-            field = args[2]
-            increment = int(args[3])
-            hash_data = self._memory_store.get(key) or {}
-            if isinstance(hash_data, str):
-                hash_data = json.loads(hash_data)
-            hash_data[field] = hash_data.get(field, 0) + increment
-            self._memory_store.set(key, json_dumps(hash_data))
-            return hash_data[field]
-        elif command == "HGETALL":
-            key = args[1]
-            hash_data = self._memory_store.get(key)
-            if hash_data and isinstance(hash_data, str):
-                return json.loads(hash_data)
-            return hash_data or {}
-        elif command == "SADD":
-            key = args[1]
-            value = args[2]
-            set_data = self._memory_store.get(key) or set()
-            if isinstance(set_data, str):
-                set_data = set(json.loads(set_data))
-            set_data.add(value)
-            self._memory_store.set(key, json_dumps(list(set_data)))
-            return 1
-        elif command == "SCARD":
-            key = args[1]
-            set_data = self._memory_store.get(key)
-            if set_data and isinstance(set_data, str):
-                return len(json.loads(set_data))
-            return 0
-        elif command == "EXPIRE":
-            # Ignore expiry in memory mode (items auto-evict via LRU)
-            return 1
-        elif command == "PING":
-            return "PONG"
+            self._stats["fallbacks"] += 1
+            return await self._memory.execute(*args)
 
-        return None
+    def pipeline(self) -> "RedisPipeline":
+        """Batch commands into one round trip (not atomic)"""
+        return RedisPipeline(self, transaction=False)
+
+    def multi(self) -> "RedisPipeline":
+        """Batch commands into one atomic round trip (MULTI/EXEC)"""
+        return RedisPipeline(self, transaction=True)
+
+    async def _execute_batch(self, commands: List[List[Any]], transaction: bool = False) -> List[Any]:
+        """Execute several commands in one round trip; results in command order"""
+        if not commands:
+            return []
+        self._stats["commands"] += len(commands)
+        if self._using_fallback:
+            return await self._memory.execute_batch(commands, transaction)
+
+        try:
+            self._stats["round_trips"] += 1
+            self._stats["pipelined_commands"] += len(commands)
+            return await self.backend.execute_batch(commands, transaction)
+        except Exception as e:
+            logger.error(f"{self.backend.name} Redis batch error: {e}")
+            # Fallback to memory
+            self._stats["fallbacks"] += 1
+            return await self._memory.execute_batch(commands, transaction)
+
+    async def run_script(self, script: RedisScript, keys: List[str], args: List[Any]) -> Any:
+        """Run a Lua script atomically (its Python twin on the memory backend)"""
+        self._stats["commands"] += 1
+        if self._using_fallback:
+            return script.local(self._memory, keys, args)
+
+        try:
+            self._stats["round_trips"] += 1
+            return await self.backend.execute("EVAL", script.lua, len(keys), *keys, *args)
+        except Exception as e:
+            logger.error(f"{self.backend.name} Redis script {script.name} error: {e}")
+            # Fallback to memory
+            self._stats["fallbacks"] += 1
+            return script.local(self._memory, keys, args)
+
+    async def subscribe(self, *channels: str) -> AsyncIterator[Dict[str, Any]]:
+        """Messages published on channels (memory and native backends only)"""
+        async for message in self.backend.subscribe(*channels):
+            yield message
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["backend"] = self.backend.name
+        stats["fallback"] = self._using_fallback
+        return stats
+
+    # ==================== Key/Value ====================
+    async def get(self, key: str) -> Optional[str]:
+        return await self._execute("GET", key)
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None):
+        if ex:
+            return await self._execute("SET", key, value, "EX", ex)
+        return await self._execute("SET", key, value)
+
+    async def delete(self, key: str):
+        return await self._execute("DEL", key)
+
+    async def set_if_absent(self, key: str, value: str, ex: Optional[int] = None, px: Optional[int] = None) -> bool:
+        """SET NX with EX (seconds) or PX (milliseconds); True if this call created the key"""
+        expiry = ["PX", px] if px else ["EX", ex]
+        return bool(await self._execute("SET", key, value, "NX", *expiry))
+
+    async def get_many(self, *keys: str) -> List[Optional[str]]:
+        """Values of several keys in one round trip (None for missing ones)"""
+        if not keys:
+            return []
+        return await self._execute("MGET", *keys) or [None] * len(keys)
+
+    # ==================== Geo ====================
+    async def geo_add(self, key: str, longitude: float, latitude: float, member: Any) -> int:
+        return await self._execute("GEOADD", key, longitude, latitude, member) or 0
+
+    async def geo_remove(self, key: str, *members: Any) -> int:
+        if not members:
+            return 0
+        return await self._execute("ZREM", key, *members) or 0
+
+    async def geo_search(
+        self, key: str, longitude: float, latitude: float, radius_km: float, count: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """(member, distance km) within radius_km of the point, nearest first"""
+        args = ["GEOSEARCH", key, "FROMLONLAT", longitude, latitude, "BYRADIUS", radius_km, "km", "ASC"]
+        if count:
+            args += ["COUNT", count]
+        replies = await self._execute(*args, "WITHDIST") or []
+        return [(str(member), float(distance)) for member, distance in replies]
 
     # ==================== User State Management ====================
     async def set_user_state(self, phone_number: str, state: str, data: dict = None):
@@ -193,76 +221,118 @@ class RedisService:
         await self._execute("DEL", key)
 
     # ==================== Cart Management ====================
-    async def add_to_cart(self, phone_number: str, item: dict):
-        """Add item to cart or update quantity if exists"""
-        key = f"cart:{phone_number}"
-        cart_items = await self.get_cart(phone_number)
-
-        # Check if item already exists in cart
-        existing_index = None
-        for i, cart_item in enumerate(cart_items):
-            if cart_item.get("menu_item_id") == item.get("menu_item_id"):
-                existing_index = i
-                break
-
-        if existing_index is not None:
-            # Update quantity
-            cart_items[existing_index]["quantity"] += item.get("quantity", 1)
-        else:
-            # Add new item
-            cart_items.append(item)
+    # Carts are Redis hashes updated by Lua scripts (see cart_scripts.py):
+    # every call below is one atomic round trip. Inside cart_cache_scope()
+    # (one incoming message) the cart is read at most once; writes patch
+    # the cached count/subtotal from the script reply.
+    @contextmanager
+    def cart_cache_scope(self):
+        """Cache cart summaries for the duration of one request/message"""
+        token = _cart_cache.set({})
+        try:
+            yield
+        finally:
+            _cart_cache.reset(token)
+
+    async def get_cart_summary(self, phone_number: str) -> Dict[str, Any]:
+        """Items, count, subtotal and restaurant_id in one read"""
+        cache = _cart_cache.get()
+        if cache is not None:
+            cached = cache.get(phone_number)
+            if cached is not None and cached["items"] is not None:
+                self._stats["cart_cache_hits"] += 1
+                return cached
+
+        self._stats["cart_reads"] += 1
+        reply = await self.run_script(CART_READ, cart_keys(phone_number), [CART_EXPIRY_SECONDS])
+        summary = decode_summary(reply)
+        if cache is not None:
+            cache[phone_number] = summary
+        return summary
+
+    def _cache_cart_totals(self, phone_number: str, count: int, subtotal: float, restaurant_id: Optional[int] = None):
+        """Record totals returned by a write; items must be re-read if needed"""
+        cache = _cart_cache.get()
+        if cache is None:
+            return
+        previous = cache.get(phone_number) or {}
+        cache[phone_number] = {
+            "items": None,
+            "count": count,
+            "subtotal": subtotal,
+            "restaurant_id": previous.get("restaurant_id") or restaurant_id,
+        }
 
-        await self._execute("SET", key, json_dumps(cart_items), "EX", CART_EXPIRY_SECONDS)
+    def _drop_cached_cart(self, phone_number: str):
+        cache = _cart_cache.get()
+        if cache is not None:
+            cache.pop(phone_number, None)
+
+    async def add_to_cart(self, phone_number: str, item: dict) -> Tuple[int, float]:
+        """Add item to cart or increase its quantity; returns (item count, subtotal)"""
+        meta = {k: v for k, v in item.items() if k != "quantity"}
+        reply = await self.run_script(CART_ADD, cart_keys(phone_number), [
+            CART_EXPIRY_SECONDS,
+            line_key(item.get("menu_item_id"), item.get("variant_id")),
+            json_dumps(meta),
+            int(item.get("quantity", 1)),
+            price_cents(item.get("price")),
+        ])
+        count, subtotal = decode_totals(reply)
+        self._cache_cart_totals(phone_number, count, subtotal, item.get("restaurant_id"))
+        return count, subtotal
 
     async def get_cart(self, phone_number: str) -> List[Dict]:
-        key = f"cart:{phone_number}"
-        cart = await self._execute("GET", key)
-        return json.loads(cart) if cart else []
-
-    async def update_cart_item_quantity(self, phone_number: str, menu_item_id: int, quantity: int) -> bool:
-        """Update quantity of specific item in cart"""
-        cart_items = await self.get_cart(phone_number)
-        
-        for item in cart_items:
-            if item.get("menu_item_id") == menu_item_id:
-                if quantity <= 0:
-                    cart_items.remove(item)
-                else:
-                    item["quantity"] = quantity
-                
-                key = f"cart:{phone_number}"
-                await self._execute("SET", key, json_dumps(cart_items), "EX", CART_EXPIRY_SECONDS)
-                return True
-        
-        return False
-
-    async def remove_from_cart(self, phone_number: str, menu_item_id: int) -> bool:
-        """Remove specific item from cart"""
-        cart_items = await self.get_cart(phone_number)
-        
-        original_length = len(cart_items)
-        cart_items = [item for item in cart_items if item.get("menu_item_id") != menu_item_id]
-        
-        if len(cart_items) < original_length:
-            key = f"cart:{phone_number}"
-            await self._execute("SET", key, json_dumps(cart_items), "EX", CART_EXPIRY_SECONDS)
-            return True
-        
-        return False
+        summary = await self.get_cart_summary(phone_number)
+        return [dict(item) for item in summary["items"]]
+
+    async def update_cart_item_quantity(self, phone_number: str, menu_item_id: int, quantity: int,
+                                        variant_id: Optional[int] = None) -> bool:
+        """Update quantity of specific item in cart (removes it when quantity <= 0)"""
+        self._drop_cached_cart(phone_number)
+        reply = await self.run_script(CART_SET_QUANTITY, cart_keys(phone_number), [
+            CART_EXPIRY_SECONDS, menu_item_id, variant_arg(variant_id), int(quantity),
+        ])
+        return bool(reply)
+
+    async def remove_from_cart(self, phone_number: str, menu_item_id: int, variant_id: Optional[int] = None) -> bool:
+        """Remove an item (every variant unless variant_id is given) from cart"""
+        self._drop_cached_cart(phone_number)
+        reply = await self.run_script(CART_REMOVE, cart_keys(phone_number), [
+            CART_EXPIRY_SECONDS, menu_item_id, variant_arg(variant_id),
+        ])
+        return bool(reply)
+
+    async def get_cart_totals(self, phone_number: str) -> Tuple[int, float]:
+        """(item count, subtotal) from the cached hash fields"""
+        cache = _cart_cache.get()
+        if cache is not None:
+            cached = cache.get(phone_number)
+            if cached is not None:
+                self._stats["cart_cache_hits"] += 1
+                return cached["count"], cached["subtotal"]
+            summary = await self.get_cart_summary(phone_number)
+            return summary["count"], summary["subtotal"]
+
+        self._stats["cart_reads"] += 1
+        reply = await self.run_script(CART_TOTALS, cart_keys(phone_number), [CART_EXPIRY_SECONDS])
+        return decode_totals(reply)
 
     async def get_cart_total(self, phone_number: str) -> float:
-        """Calculate cart total"""
-        cart_items = await self.get_cart(phone_number)
-        return sum(item.get("price", 0) * item.get("quantity", 1) for item in cart_items)
+        """Cart subtotal"""
+        _, total = await self.get_cart_totals(phone_number)
+        return total
 
     async def get_cart_count(self, phone_number: str) -> int:
         """Get total number of items in cart"""
-        cart_items = await self.get_cart(phone_number)
-        return sum(item.get("quantity", 1) for item in cart_items)
+        count, _ = await self.get_cart_totals(phone_number)
+        return count
 
     async def clear_cart(self, phone_number: str):
-        key = f"cart:{phone_number}"
-        await self._execute("DEL", key)
+        await self._execute("DEL", *cart_keys(phone_number))
+        cache = _cart_cache.get()
+        if cache is not None:
+            cache[phone_number] = empty_summary()
 
     # ==================== Pub/Sub for Real-time Updates ====================
     async def publish_order_update(self, order_id: int, data: dict):
@@ -280,6 +350,10 @@ class RedisService:
         channel = f"driver:{driver_id}:deliveries"
         await self._execute("PUBLISH", channel, json_dumps(data))
 
+    async def publish_catalog_change(self, restaurant_id: int, version: int):
+        """Publish a committed catalog version (see app.services.catalog_events)"""
+        await self._execute("PUBLISH", "catalog:changes", json_dumps({"restaurant_id": restaurant_id, "version": version}))
+
     # ==================== Conversation Memory ====================
     async def save_conversation_message(self, phone_number: str, role: str, content: str, context: dict = None):
         """Save a message to conversation history"""
@@ -387,25 +461,27 @@ class RedisService:
 
     # ==================== Analytics ====================
     async def track_ai_usage(self, phone_number: str, intent: str, success: bool):
-        """Track AI usage for analytics"""
+        """Track AI usage for analytics (one pipelined round trip)"""
         from datetime import datetime
         today = datetime.now().strftime("%Y-%m-%d")
-
-        # Track daily intent counts
-        key = f"analytics:intent:{today}"
-        await self._execute("HINCRBY", key, intent, 1)
-        await self._execute("EXPIRE", key, ANALYTICS_RETENTION_SECONDS)  # Keep for 7 days
-
-        # Track success rate
+        intent_key = f"analytics:intent:{today}"
+        status_key = f"analytics:status:{today}"
+        users_key = f"analytics:users:{today}"
         status = "success" if success else "error"
-        key = f"analytics:status:{today}"
-        await self._execute("HINCRBY", key, status, 1)
-        await self._execute("EXPIRE", key, ANALYTICS_RETENTION_SECONDS)
 
-        # Track user activity
-        key = f"analytics:users:{today}"
-        await self._execute("SADD", key, phone_number)
-        await self._execute("EXPIRE", key, ANALYTICS_RETENTION_SECONDS)
+        await (
+            self.pipeline()
+            # Track daily intent counts
+            .command("HINCRBY", intent_key, intent, 1)
+            .command("EXPIRE", intent_key, ANALYTICS_RETENTION_SECONDS)  # Keep for 7 days
+            # Track success rate
+            .command("HINCRBY", status_key, status, 1)
+            .command("EXPIRE", status_key, ANALYTICS_RETENTION_SECONDS)
+            # Track user activity
+            .command("SADD", users_key, phone_number)
+            .command("EXPIRE", users_key, ANALYTICS_RETENTION_SECONDS)
+            .execute()
+        )
 
     async def get_daily_analytics(self, date: str = None) -> Dict:
         """Get analytics for a specific date"""
@@ -413,24 +489,52 @@ class RedisService:
         if not date:
             date = datetime.now().strftime("%Y-%m-%d")
 
-        # Get intent distribution
-        intents_key = f"analytics:intent:{date}"
-        intents = await self._execute("HGETALL", intents_key)
-
-        # Get status counts
-        status_key = f"analytics:status:{date}"
-        status = await self._execute("HGETALL", status_key)
-
-        # Get unique users count
-        users_key = f"analytics:users:{date}"
-        users_count = await self._execute("SCARD", users_key)
+        intents, status, users_count = await (
+            self.pipeline()
+            .command("HGETALL", f"analytics:intent:{date}")
+            .command("HGETALL", f"analytics:status:{date}")
+            .command("SCARD", f"analytics:users:{date}")
+            .execute()
+        )
 
         return {
             "date": date,
-            "intents": intents or {},
-            "status": status or {},
+            "intents": _hash_to_dict(intents),
+            "status": _hash_to_dict(status),
             "unique_users": users_count or 0
         }
 
 
+def _hash_to_dict(value: Any) -> Dict[str, int]:
+    """HGETALL result as a dict (Upstash returns a flat [field, value, ...] list)"""
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        return {k: int(v) for k, v in value.items()}
+    return {value[i]: int(value[i + 1]) for i in range(0, len(value) - 1, 2)}
+
+
+class RedisPipeline:
+    """
+    Commands queued on a RedisService and sent in a single request.
+
+        results = await redis_service.pipeline().command("GET", a).command("GET", b).execute()
+    """
+
+    def __init__(self, service: RedisService, transaction: bool = False):
+        self._service = service
+        self.transaction = transaction
+        self.commands: List[List[Any]] = []
+
+    def command(self, *args) -> "RedisPipeline":
+        self.commands.append(list(args))
+        return self
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    async def execute(self) -> List[Any]:
+        commands, self.commands = self.commands, []
+        return await self._service._execute_batch(commands, transaction=self.transaction)
+
 redis_service = RedisService()
@@ -0,0 +1,215 @@
+"""
+Restaurant name resolver.
+
+Maps the restaurant name the LLM (or the user) produced to restaurant ids with a
+confidence score. Every active restaurant is indexed under several aliases:
+
+    - normalized Arabic / English names
+    - the same names without generic words ("مطعم", "restaurant", ...)
+    - a script-independent phonetic key, so "كينج كرواسون" meets "King Croissant"
+
+Aliases are broken into padded character trigrams; a query only scores the
+restaurants sharing a trigram with it (Dice similarity on trigrams, then a
+Levenshtein ratio on the phonetic key). The index is built from the catalog
+snapshot and rebuilt whenever the snapshot version changes; while no snapshot
+can be built, each lookup indexes the active restaurants read from the
+database.
+"""
+import asyncio
+from typing import Optional, Dict, Any, List, Set, Tuple
+import logging
+
+from app.core.text_normalize import normalize_arabic, tokenize, phonetic_key, levenshtein
+from app.services.catalog_service import catalog_service, CatalogSnapshot
+from app.services.redis_service import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Best candidate must reach this to be returned by resolve()
+MIN_CONFIDENCE = 0.6
+# Candidates below this are not returned at all
+MIN_CANDIDATE_CONFIDENCE = 0.35
+RESULT_CACHE_SIZE = 512
+
+GENERIC_WORDS = {
+    "مطعم", "مطاعم", "كافيه", "كافي", "سناك", "فرن", "ملحمه",
+    "restaurant", "resto", "cafe", "café", "snack", "the",
+}
+
+# Confidence for each match kind
+EXACT_CONFIDENCE = 1.0
+CONTAINS_CONFIDENCE = 0.85
+PHONETIC_WEIGHT = 0.95
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _strip_generic(text: str) -> str:
+    return " ".join(t for t in tokenize(text) if t not in GENERIC_WORDS)
+
+
+class _Alias:
+    __slots__ = ("restaurant_id", "text", "key", "sorted_key", "grams", "key_grams")
+
+    def __init__(self, restaurant_id: int, text: str):
+        self.restaurant_id = restaurant_id
+        self.text = text
+        self.key = phonetic_key(text)
+        self.sorted_key = " ".join(sorted(self.key.split()))
+        self.grams = _trigrams(text)
+        self.key_grams = _trigrams(self.sorted_key) if self.sorted_key else set()
+
+
+class RestaurantNameIndex:
+    """Trigram index over restaurant name aliases"""
+
+    def __init__(self, version: int = -1):
+        self.version = version
+        self.restaurants: Dict[int, Dict[str, Any]] = {}
+        self.aliases: List[_Alias] = []
+        self.postings: Dict[str, Set[int]] = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CatalogSnapshot) -> "RestaurantNameIndex":
+        index = cls(snapshot.version)
+        for restaurant in snapshot.restaurants.values():
+            if restaurant["is_active"]:
+                index.add_restaurant(restaurant["id"], restaurant["name"], restaurant["name_ar"])
+        return index
+
+    def add_restaurant(self, restaurant_id: int, name: str, name_ar: Optional[str] = None, aliases: Tuple[str, ...] = ()):
+        self.restaurants[restaurant_id] = {
+            "id": restaurant_id,
+            "name": name_ar or name,
+            "name_en": name,
+        }
+        texts = set()
+        for raw in (name, name_ar, *aliases):
+            normalized = normalize_arabic(raw or "")
+            if not normalized:
+                continue
+            texts.add(normalized)
+            stripped = _strip_generic(normalized)
+            if stripped:
+                texts.add(stripped)
+
+        for text in texts:
+            alias = _Alias(restaurant_id, text)
+            position = len(self.aliases)
+            self.aliases.append(alias)
+            for gram in alias.grams | alias.key_grams:
+                self.postings.setdefault(gram, set()).add(position)
+
+    def _score(self, alias: _Alias, text: str, grams: Set[str], key: str, sorted_key: str, key_grams: Set[str]) -> float:
+        if alias.text == text:
+            return EXACT_CONFIDENCE
+        if min(len(alias.text), len(text)) >= 3 and (text in alias.text or alias.text in text):
+            return CONTAINS_CONFIDENCE
+
+        score = _dice(grams, alias.grams)
+        if sorted_key and alias.sorted_key:
+            if alias.sorted_key == sorted_key:
+                return max(score, PHONETIC_WEIGHT)
+            phonetic = max(
+                _dice(key_grams, alias.key_grams),
+                1 - levenshtein(sorted_key, alias.sorted_key) / max(len(sorted_key), len(alias.sorted_key)),
+            )
+            score = max(score, phonetic * PHONETIC_WEIGHT)
+        return score
+
+    def candidates(self, name: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Restaurants ranked by confidence (0..1), best first"""
+        text = normalize_arabic(name)
+        if not text:
+            return []
+        text = _strip_generic(text) or text
+        grams = _trigrams(text)
+        key = phonetic_key(text)
+        sorted_key = " ".join(sorted(key.split()))
+        key_grams = _trigrams(sorted_key) if sorted_key else set()
+
+        positions: Set[int] = set()
+        for gram in grams | key_grams:
+            positions.update(self.postings.get(gram, ()))
+
+        best: Dict[int, float] = {}
+        for position in positions:
+            alias = self.aliases[position]
+            score = self._score(alias, text, grams, key, sorted_key, key_grams)
+            if score > best.get(alias.restaurant_id, 0.0):
+                best[alias.restaurant_id] = score
+
+        ranked = sorted(
+            (dict(self.restaurants[rid], confidence=round(score, 3))
+             for rid, score in best.items() if score >= MIN_CANDIDATE_CONFIDENCE),
+            key=lambda c: (-c["confidence"], c["id"]),
+        )
+        return ranked[:limit]
+
+
+class RestaurantResolver:
+    """Cached RestaurantNameIndex kept in step with the catalog snapshot"""
+
+    def __init__(self):
+        self._index: Optional[RestaurantNameIndex] = None
+        self._results = LRUCache(RESULT_CACHE_SIZE)
+        self._lock: Optional[asyncio.Lock] = None
+        self._stats = {"lookups": 0, "cache_hits": 0, "rebuilds": 0, "db_fallbacks": 0}
+
+    async def get_index(self) -> Optional[RestaurantNameIndex]:
+        snapshot = await catalog_service.get_snapshot()
+        if snapshot is None:
+            return None
+        if self._index is not None and self._index.version == snapshot.version:
+            return self._index
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._index is None or self._index.version != snapshot.version:
+                self._index = RestaurantNameIndex.from_snapshot(snapshot)
+                self._results.clear()
+                self._stats["rebuilds"] += 1
+                logger.debug(f"Restaurant name index built: {len(self._index.restaurants)} restaurants (v{snapshot.version})")
+            return self._index
+
+    async def candidates(self, name: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Ranked candidates; raises if neither the catalog nor the database is available"""
+        index = await self.get_index()
+        if index is None:
+            self._stats["db_fallbacks"] += 1
+            snapshot = await catalog_service.load_uncached(with_items=False)
+            return RestaurantNameIndex.from_snapshot(snapshot).candidates(name, limit)
+        self._stats["lookups"] += 1
+        cache_key = (name, limit)
+        cached = self._results.get(cache_key)
+        if cached is not None:
+            self._stats["cache_hits"] += 1
+            return cached
+        result = index.candidates(name, limit)
+        self._results.set(cache_key, result)
+        return result
+
+    async def resolve(self, name: str, min_confidence: float = MIN_CONFIDENCE) -> Optional[int]:
+        """Best matching restaurant id if confident enough"""
+        candidates = await self.candidates(name, limit=1)
+        if candidates and candidates[0]["confidence"] >= min_confidence:
+            return candidates[0]["id"]
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["restaurants"] = len(self._index.restaurants) if self._index else 0
+        return stats
+
+
+restaurant_resolver = RestaurantResolver()
@@ -0,0 +1,104 @@
+"""
+Restaurant URL slugs (/public/restaurants/slug/{slug}).
+
+Slugs are stored on Restaurant (unique, indexed), assigned on create and
+re-derived when the name changes, unless the slug was set by hand (published
+URLs keep working); a taken slug gets a -2, -3, ... suffix.
+Lookups go through a slug -> id map in memory, dropped for a restaurant
+when its catalog entry is invalidated.
+"""
+from typing import Optional, Dict, Any
+import logging
+import re
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.restaurant import Restaurant
+from app.services.catalog_service import catalog_service
+
+logger = logging.getLogger(__name__)
+
+
+def slugify(text: str) -> str:
+    """Generate a slug from text (same format the website has always linked to)"""
+    return text.lower().replace(" ", "-").replace("&", "and")
+
+
+def slug_derived_from(slug: Optional[str], name: Optional[str]) -> bool:
+    """True if the slug is what unique_slug gives for this name (base or base-N), not a custom one"""
+    if not slug:
+        return False
+    base = slugify(name or "") or "restaurant"
+    return slug == base or re.fullmatch(rf"{re.escape(base)}-\d+", slug) is not None
+
+
+async def unique_slug(db: AsyncSession, name: str, restaurant_id: Optional[int] = None) -> str:
+    """Slug for a name that no other restaurant uses: base, base-2, base-3, ..."""
+    base = slugify(name or "") or "restaurant"
+    query = select(Restaurant.slug).where(Restaurant.slug.startswith(base, autoescape=True))
+    if restaurant_id is not None:
+        query = query.where(Restaurant.id != restaurant_id)
+    result = await db.execute(query)
+    taken = set(result.scalars().all())
+    slug, n = base, 1
+    while slug in taken:
+        n += 1
+        slug = f"{base}-{n}"
+    return slug
+
+
+async def assign_slug(db: AsyncSession, restaurant: Restaurant, requested: Optional[str] = None):
+    """Set restaurant.slug from an explicit slug or its name, keeping it unique"""
+    restaurant.slug = await unique_slug(db, requested or restaurant.name, restaurant.id)
+
+
+async def backfill_slugs(db: AsyncSession) -> int:
+    """Give restaurants created without a slug one (in id order, so older ones keep the plain slug)"""
+    result = await db.execute(select(Restaurant).where(Restaurant.slug.is_(None)).order_by(Restaurant.id))
+    restaurants = result.scalars().all()
+    for restaurant in restaurants:
+        await assign_slug(db, restaurant)
+        await db.flush()
+    return len(restaurants)
+
+
+class RestaurantSlugCache:
+    """slug -> restaurant id, invalidated by catalog writes"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._stats = {"hits": 0, "lookups": 0, "invalidations": 0}
+        catalog_service.add_listener(self.on_catalog_change)
+
+    def on_catalog_change(self, restaurant_id: Optional[int] = None):
+        self._stats["invalidations"] += 1
+        if restaurant_id is None:
+            self._ids.clear()
+        else:
+            for slug in [s for s, rid in self._ids.items() if rid == restaurant_id]:
+                del self._ids[slug]
+
+    async def get_id(self, db: AsyncSession, slug: str) -> Optional[int]:
+        """Restaurant id for a slug (one indexed query on a miss), or None"""
+        restaurant_id = self._ids.get(slug)
+        if restaurant_id is not None:
+            self._stats["hits"] += 1
+            return restaurant_id
+
+        self._stats["lookups"] += 1
+        version = catalog_service.version
+        result = await db.execute(select(Restaurant.id).where(Restaurant.slug == slug))
+        restaurant_id = result.scalar_one_or_none()
+        # Skip caching if a catalog write landed while we were reading
+        if restaurant_id is not None and version == catalog_service.version:
+            self._ids[slug] = restaurant_id
+        return restaurant_id
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["slugs"] = len(self._ids)
+        return stats
+
+
+restaurant_slug_cache = RestaurantSlugCache()
@@ -0,0 +1,238 @@
+"""
+Normalized product search index.
+
+Inverted index over menu item names built from the catalog snapshot:
+    normalized token  -> item ids
+    char trigram      -> item ids
+    normalized name   -> item ids
+    item id           -> restaurant id
+
+Replaces the full menu scan in AIService._find_restaurants_with_product.
+Match semantics are the same as the scan ("query in name" or "name in query"
+on normalized names) plus order-insensitive token matches, and results are
+ranked instead of returned in table order.
+"""
+import asyncio
+from typing import Optional, Dict, Any, List, Set
+import logging
+
+from app.core.text_normalize import normalize_arabic, tokenize, char_ngrams
+from app.services.catalog_service import catalog_service, CatalogSnapshot
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+
+# Per-item match quality, best first
+SCORE_EXACT = 3
+SCORE_TOKENS = 2
+SCORE_SUBSTRING = 1
+
+
+class ProductSearchIndex:
+    """Inverted index of available items in active restaurants"""
+
+    def __init__(self):
+        self.version = -1
+        self.restaurants: Dict[int, Dict[str, Any]] = {}
+        self.item_restaurant: Dict[int, int] = {}
+        self.item_names: Dict[int, str] = {}
+        self.item_tokens: Dict[int, Set[str]] = {}
+        self.restaurant_item_ids: Dict[int, Set[int]] = {}
+        self.tokens: Dict[str, Set[int]] = {}
+        self.ngrams: Dict[str, Set[int]] = {}
+        self.names: Dict[str, Set[int]] = {}
+        self.name_lengths: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.item_names)
+
+    # ==================== Maintenance ====================
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CatalogSnapshot) -> "ProductSearchIndex":
+        index = cls()
+        index.version = snapshot.version
+        for restaurant_id in snapshot.restaurants:
+            index.reindex_restaurant(snapshot, restaurant_id)
+        return index
+
+    def reindex_restaurant(self, snapshot: CatalogSnapshot, restaurant_id: int):
+        """Replace one restaurant's postings with its current snapshot items"""
+        for item_id in list(self.restaurant_item_ids.get(restaurant_id, ())):
+            self.remove_item(item_id)
+        self.restaurants.pop(restaurant_id, None)
+
+        restaurant = snapshot.restaurants.get(restaurant_id)
+        if not restaurant or not restaurant["is_active"]:
+            return
+        self.restaurants[restaurant_id] = {
+            "id": restaurant_id,
+            "name": restaurant["name_ar"] or restaurant["name"],
+            "name_en": restaurant["name"],
+        }
+        for item in snapshot.iter_items(restaurant_id):
+            self.add_item(item["id"], restaurant_id, item["name_ar"] or item["name"])
+
+    def add_item(self, item_id: int, restaurant_id: int, name: str):
+        normalized = normalize_arabic(name)
+        if not normalized:
+            return
+        self.item_restaurant[item_id] = restaurant_id
+        self.item_names[item_id] = normalized
+        self.restaurant_item_ids.setdefault(restaurant_id, set()).add(item_id)
+        self.names.setdefault(normalized, set()).add(item_id)
+        self.name_lengths.add(len(normalized))
+
+        item_tokens = set(tokenize(normalized))
+        self.item_tokens[item_id] = item_tokens
+        for token in item_tokens:
+            self.tokens.setdefault(token, set()).add(item_id)
+        for gram in char_ngrams(normalized, NGRAM_SIZE):
+            self.ngrams.setdefault(gram, set()).add(item_id)
+
+    def remove_item(self, item_id: int):
+        normalized = self.item_names.pop(item_id, None)
+        if normalized is None:
+            return
+        restaurant_id = self.item_restaurant.pop(item_id)
+        self.restaurant_item_ids.get(restaurant_id, set()).discard(item_id)
+        self._discard(self.names, normalized, item_id)
+        for token in self.item_tokens.pop(item_id, ()):
+            self._discard(self.tokens, token, item_id)
+        for gram in char_ngrams(normalized, NGRAM_SIZE):
+            self._discard(self.ngrams, gram, item_id)
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[int]], key: str, item_id: int):
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(item_id)
+            if not ids:
+                del postings[key]
+
+    # ==================== Query ====================
+
+    def _items_containing(self, query: str) -> Set[int]:
+        """Items whose normalized name contains the query"""
+        grams = char_ngrams(query, NGRAM_SIZE)
+        if grams:
+            postings = sorted((self.ngrams.get(g, set()) for g in grams), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        else:
+            # Query shorter than one n-gram
+            candidates = self.item_names.keys()
+        return {i for i in candidates if query in self.item_names[i]}
+
+    def _items_contained_in(self, query: str) -> Set[int]:
+        """Items whose whole normalized name appears inside the query"""
+        found: Set[int] = set()
+        for length in self.name_lengths:
+            if length > len(query):
+                continue
+            for start in range(len(query) - length + 1):
+                ids = self.names.get(query[start:start + length])
+                if ids:
+                    found.update(ids)
+        return found
+
+    def _items_with_tokens(self, query_tokens: List[str]) -> Set[int]:
+        """Items containing every query token, in any order"""
+        postings = [self.tokens.get(t) for t in query_tokens]
+        if not postings or any(p is None for p in postings):
+            return set()
+        postings.sort(key=len)
+        return set(postings[0]).intersection(*postings[1:])
+
+    def search(self, product: str) -> List[Dict[str, Any]]:
+        """
+        Restaurants with items matching the product, ranked by best item
+        match (exact > all tokens > substring) then by number of matches.
+        """
+        query = normalize_arabic(product)
+        if not query:
+            return []
+
+        scores: Dict[int, int] = {}
+        for item_id in self._items_containing(query) | self._items_contained_in(query):
+            scores[item_id] = SCORE_SUBSTRING
+        query_tokens = tokenize(query)
+        if len(query_tokens) > 1:
+            for item_id in self._items_with_tokens(query_tokens):
+                scores[item_id] = SCORE_TOKENS
+        for item_id in scores:
+            if self.item_names[item_id] == query or (query_tokens and self.item_tokens[item_id] == set(query_tokens)):
+                scores[item_id] = SCORE_EXACT
+
+        matching: Dict[int, Dict[str, Any]] = {}
+        for item_id, score in scores.items():
+            restaurant_id = self.item_restaurant[item_id]
+            entry = matching.get(restaurant_id)
+            if entry is None:
+                entry = matching[restaurant_id] = dict(self.restaurants[restaurant_id], items_count=0, score=0)
+            entry["items_count"] += 1
+            entry["score"] = max(entry["score"], score)
+
+        return sorted(matching.values(), key=lambda r: (-r["score"], -r["items_count"], r["id"]))
+
+
+class ProductSearchService:
+    """Keeps a ProductSearchIndex in step with the catalog snapshot"""
+
+    def __init__(self):
+        self._index: Optional[ProductSearchIndex] = None
+        # restaurant id (None = everything) -> catalog version of the write
+        self._pending: Dict[Optional[int], int] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._stats = {"searches": 0, "full_builds": 0, "incremental_updates": 0}
+        catalog_service.add_listener(self.on_catalog_change)
+
+    def on_catalog_change(self, restaurant_id: Optional[int] = None):
+        """Catalog write hook: patch only the touched restaurant when known"""
+        self._pending[restaurant_id] = catalog_service.version
+
+    async def get_index(self) -> Optional[ProductSearchIndex]:
+        snapshot = await catalog_service.get_snapshot()
+        if snapshot is None:
+            return None
+        if self._index is not None and self._index.version == snapshot.version:
+            return self._index
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._index is not None and self._index.version == snapshot.version:
+                return self._index
+
+            # Only consume writes this snapshot already reflects
+            applied = [r for r, v in self._pending.items() if v <= snapshot.version]
+            for restaurant_id in applied:
+                del self._pending[restaurant_id]
+
+            if self._index is None or None in applied:
+                self._index = ProductSearchIndex.from_snapshot(snapshot)
+                self._stats["full_builds"] += 1
+                logger.info(f"Product search index built: {len(self._index)} items (v{snapshot.version})")
+            else:
+                for restaurant_id in applied:
+                    self._index.reindex_restaurant(snapshot, restaurant_id)
+                self._index.version = snapshot.version
+                self._stats["incremental_updates"] += 1
+                logger.debug(f"Product search index patched for restaurants {applied} (v{snapshot.version})")
+            return self._index
+
+    async def search(self, product: str) -> Optional[List[Dict[str, Any]]]:
+        """Ranked restaurants for a product, or None if the catalog is unavailable"""
+        index = await self.get_index()
+        if index is None:
+            return None
+        self._stats["searches"] += 1
+        return index.search(product)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["items"] = len(self._index) if self._index else 0
+        return stats
+
+
+product_search_service = ProductSearchService()
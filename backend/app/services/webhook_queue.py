@@ -0,0 +1,406 @@
+"""
+Webhook ingestion queue.
+
+POST /webhook acknowledges Meta immediately and only enqueues the message;
+a pool of async workers runs BotController.handle_message in the background.
+
+    stream  - XADD to a Redis stream, read through a consumer group and
+              XACKed once handled (entries left pending by a crashed
+              worker are reclaimed periodically by the live consumers;
+              a node reads ahead only as far as its queues have room and
+              never reclaims an entry it still holds). Over REST (Upstash)
+              there is no blocking read, so consumers poll every
+              WEBHOOK_REST_POLL_INTERVAL_MS instead
+    local   - in-process asyncio queues, not durable: a restart loses what
+              is queued (dev / memory backend, or when set explicitly)
+    inline  - no queue, handle before returning (debugging)
+
+Every message and status update of a delivery is dispatched (Meta batches
+several entries/changes/messages under load). Messages wait in per-phone
+queues served by a shared worker pool: one user's messages are handled
+strictly in arrival order, and a slow conversation holds one worker only,
+never the users queued behind it. Status updates are only logged, so they
+are handled inline and skip the queue.
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable, Awaitable, Iterator, Tuple, Deque, Set
+import logging
+
+from app.core.config import settings
+from app.core.constants import (
+    WEBHOOK_WORKERS, WEBHOOK_QUEUE_MAXSIZE, WEBHOOK_STREAM_MAXLEN,
+    WEBHOOK_READ_BATCH, WEBHOOK_POLL_INTERVAL_MS, WEBHOOK_CLAIM_IDLE_MS,
+    WEBHOOK_CLAIM_INTERVAL_MS, WEBHOOK_REST_POLL_INTERVAL_MS,
+)
+from app.services.redis_service import redis_service
+from app.services.message_dedup import message_deduplicator
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "webhook:messages"
+CONSUMER_GROUP = "bot-workers"
+
+EVENT_MESSAGE = "message"
+EVENT_STATUS = "status"
+
+MessageHandler = Callable[[str, dict], Awaitable[None]]
+
+
+def iter_webhook_events(body: Dict[str, Any]) -> Iterator[Tuple[str, str, dict]]:
+    """(kind, phone number, payload) for every message and status in a delivery"""
+    for entry in body.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            for message in value.get("messages") or []:
+                if message and message.get("from"):
+                    yield EVENT_MESSAGE, message["from"], message
+            for status in value.get("statuses") or []:
+                if status and status.get("recipient_id"):
+                    yield EVENT_STATUS, status["recipient_id"], status
+
+
+def _fields_to_dict(fields: Any) -> Dict[str, Any]:
+    if isinstance(fields, dict):
+        return fields
+    return {fields[i]: fields[i + 1] for i in range(0, len(fields) - 1, 2)}
+
+
+def parse_stream_reply(reply: Any) -> List[tuple]:
+    """[(entry id, fields)] from an XREADGROUP reply (raw or redis-py parsed)"""
+    entries = []
+    for stream in reply or []:
+        _, stream_entries = stream[0], stream[1]
+        for entry in stream_entries or []:
+            entry_id, fields = entry[0], entry[1]
+            if fields is None:
+                # Pending entry trimmed from the stream
+                entries.append((entry_id, None))
+            else:
+                entries.append((entry_id, _fields_to_dict(fields)))
+    return entries
+
+
+class WebhookQueue:
+    """Per-phone ordered, shared worker-pool processing of incoming WhatsApp messages"""
+
+    def __init__(self, mode: Optional[str] = None, workers: int = WEBHOOK_WORKERS,
+                 redis=None, stream_key: str = STREAM_KEY, group: str = CONSUMER_GROUP, dedup=None):
+        self.redis = redis or redis_service
+        self.dedup = dedup or message_deduplicator
+        self.requested_mode = (mode or settings.WEBHOOK_QUEUE_BACKEND).lower()
+        self.workers = max(1, workers)
+        self.stream_key = stream_key
+        self.group = group
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.mode = "inline"
+        self._handler: Optional[MessageHandler] = None
+        self._status_handler: Optional[MessageHandler] = None
+        # Events per phone; a phone is in _ready (or being handled) while it has any
+        self._backlog: Dict[str, Deque[tuple]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._capacity = WEBHOOK_QUEUE_MAXSIZE * self.workers
+        self._queued = 0
+        # Stream entries queued here or being handled; never reclaimed onto this node twice
+        self._inflight: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+        self._claim_cursor = "0-0"
+        self._stats = {
+            "enqueued": 0, "processed": 0, "failed": 0, "acked": 0,
+            "stream_enqueued": 0, "local_enqueued": 0, "redelivered": 0, "reclaim_skipped": 0,
+            "batches": 0, "batch_events": 0, "max_batch_size": 0, "statuses": 0, "duplicates_dropped": 0,
+            "total_latency_ms": 0.0, "max_latency_ms": 0.0,
+            "total_queue_wait_ms": 0.0, "max_queue_wait_ms": 0.0,
+        }
+
+    # ==================== Lifecycle ====================
+
+    def _resolve_mode(self) -> str:
+        mode = self.requested_mode
+        if mode == "auto":
+            # The 200 is sent before handling, so the event must survive a
+            # restart: the stream wherever there is a real Redis
+            mode = "local" if self.redis.backend_name == "memory" else "stream"
+        if mode == "stream" and self.redis.backend_name == "memory":
+            logger.warning("Webhook stream queue needs Redis, using local queue")
+            mode = "local"
+        if mode not in ("stream", "local", "inline"):
+            logger.warning(f"Unknown WEBHOOK_QUEUE_BACKEND '{mode}', using local")
+            mode = "local"
+        return mode
+
+    async def start(self, handler: MessageHandler, status_handler: Optional[MessageHandler] = None):
+        """Start the workers (and the stream reader) with the event handlers"""
+        if self._running:
+            return
+        self._handler = handler
+        self._status_handler = status_handler
+        self.mode = self._resolve_mode()
+        if self.mode == "inline":
+            logger.info("Webhook messages handled inline")
+            return
+
+        self._running = True
+        self._open_queues()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.mode == "stream":
+            await self._ensure_group()
+            self._tasks.append(asyncio.create_task(self._read_stream()))
+        logger.info(f"Webhook queue started: {self.mode}, {self.workers} workers")
+
+    async def stop(self, timeout: float = 10.0):
+        """Drain in-process queues, then cancel workers"""
+        if not self._running:
+            return
+        self._running = False
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Webhook queue stop timed out with messages still queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ==================== Producer ====================
+
+    def _open_queues(self):
+        self._backlog = {}
+        self._ready = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self._capacity)
+        self._queued = 0
+        self._inflight = set()
+
+    async def _put(self, item: tuple):
+        """Append (entry id, kind, phone, payload, queued at) to its phone's queue"""
+        await self._slots.acquire()
+        self._queued += 1
+        if item[0] is not None:
+            self._inflight.add(item[0])
+        phone_number = item[2]
+        backlog = self._backlog.get(phone_number)
+        if backlog is None:
+            self._backlog[phone_number] = deque([item])
+            self._ready.put_nowait(phone_number)
+        else:
+            backlog.append(item)
+
+    async def dispatch(self, body: Dict[str, Any]) -> int:
+        """Queue every message and status of a webhook delivery; returns the event count"""
+        events = list(iter_webhook_events(body))
+        if events:
+            self._stats["batches"] += 1
+            self._stats["batch_events"] += len(events)
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(events))
+        for kind, phone_number, payload in events:
+            if kind == EVENT_STATUS:
+                # Only logged: queueing it would delay messages behind it
+                await self._handle(kind, phone_number, payload, time.time())
+                continue
+            message_id = payload.get("id")
+            # Redelivered messages stop here, before any state/DB/AI work
+            if message_id and await self.dedup.is_duplicate(message_id):
+                self._stats["duplicates_dropped"] += 1
+                continue
+            try:
+                accepted = await self.enqueue(phone_number, payload, kind)
+            except Exception:
+                await self.dedup.release(message_id)
+                raise
+            if accepted:
+                await self.dedup.confirm(message_id)
+            else:
+                await self.dedup.release(message_id)
+        return len(events)
+
+    async def enqueue(self, phone_number: str, payload: dict, kind: str = EVENT_MESSAGE) -> bool:
+        """Hand an event to the workers; True once it is queued (or, inline, handled without error)"""
+        self._stats["enqueued"] += 1
+        queued_at = time.time()
+        if not self._running:
+            # Not started (inline mode, tests, scripts): handle directly
+            return await self._handle(kind, phone_number, payload, queued_at)
+
+        if self.mode == "stream":
+            entry_id = await self.redis._execute(
+                "XADD", self.stream_key, "MAXLEN", "~", WEBHOOK_STREAM_MAXLEN, "*",
+                "kind", kind, "phone", phone_number, "ts", queued_at, "message", json.dumps(payload),
+            )
+            if entry_id:
+                self._stats["stream_enqueued"] += 1
+                return True
+            logger.warning("Webhook stream unavailable, queueing event locally")
+
+        self._stats["local_enqueued"] += 1
+        await self._put((None, kind, phone_number, payload, queued_at))
+        return True
+
+    # ==================== Stream consumer ====================
+
+    async def _ensure_group(self):
+        # Straight to the backend: BUSYGROUP (group exists) is expected, not a
+        # reason to fall back to memory
+        try:
+            await self.redis.backend.execute("XGROUP", "CREATE", self.stream_key, self.group, "$", "MKSTREAM")
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                logger.warning(f"Webhook consumer group setup failed: {e}")
+
+    def _free_slots(self) -> int:
+        return self._capacity - self._queued
+
+    async def _read(self, start_id: str, block: bool, count: int = WEBHOOK_READ_BATCH) -> List[tuple]:
+        args = ["XREADGROUP", "GROUP", self.group, self.consumer, "COUNT", count]
+        if block and self.redis.backend_name == "redis":
+            args += ["BLOCK", WEBHOOK_POLL_INTERVAL_MS]
+        args += ["STREAMS", self.stream_key, start_id]
+        return parse_stream_reply(await self.redis._execute(*args))
+
+    async def _dispatch_entries(self, entries: List[tuple]):
+        for entry_id, fields in entries:
+            if entry_id in self._inflight:
+                # Reclaimed while still queued or handled here
+                self._stats["reclaim_skipped"] += 1
+                continue
+            if not fields or "phone" not in fields:
+                await self._ack(entry_id)
+                continue
+            try:
+                message = json.loads(fields["message"])
+            except (TypeError, ValueError):
+                logger.error(f"Dropping malformed webhook entry {entry_id}")
+                await self._ack(entry_id)
+                continue
+            kind = fields.get("kind", EVENT_MESSAGE)
+            queued_at = float(fields.get("ts") or time.time())
+            await self._put((entry_id, kind, fields["phone"], message, queued_at))
+
+    async def _claim_pending(self):
+        """Take over entries read but never acked by a consumer that died"""
+        count = min(WEBHOOK_READ_BATCH, self._free_slots())
+        if count <= 0:
+            return
+        try:
+            reply = await self.redis._execute(
+                "XAUTOCLAIM", self.stream_key, self.group, self.consumer,
+                WEBHOOK_CLAIM_IDLE_MS, self._claim_cursor, "COUNT", count,
+            )
+            if reply:
+                # Resume the scan where it stopped; "0-0" means it wrapped
+                self._claim_cursor = reply[0] or "0-0"
+                pending = parse_stream_reply([[self.stream_key, reply[1]]])
+                self._stats["redelivered"] += len(pending)
+                await self._dispatch_entries(pending)
+        except Exception as e:
+            logger.error(f"Webhook queue pending claim failed: {e}")
+
+    async def _read_stream(self):
+        # Blocking reads only on native Redis; REST backends poll, less often
+        blocking = self.redis.backend_name == "redis"
+        idle_wait = (WEBHOOK_POLL_INTERVAL_MS if blocking else WEBHOOK_REST_POLL_INTERVAL_MS) / 1000
+        next_claim = 0.0
+        while self._running:
+            started = time.monotonic()
+            if started >= next_claim:
+                await self._claim_pending()
+                next_claim = started + WEBHOOK_CLAIM_INTERVAL_MS / 1000
+            # Read ahead only as far as there is room: entries waiting here
+            # unacked would otherwise age towards WEBHOOK_CLAIM_IDLE_MS
+            count = min(WEBHOOK_READ_BATCH, self._free_slots())
+            if count <= 0:
+                await asyncio.sleep(idle_wait)
+                continue
+            try:
+                entries = await self._read(">", block=True, count=count)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook queue read failed: {e}")
+                entries = []
+            if entries:
+                await self._dispatch_entries(entries)
+            elif time.monotonic() - started < idle_wait / 2:
+                # Non-blocking backend or failed read: poll instead of spinning
+                await asyncio.sleep(idle_wait)
+
+    async def _ack(self, entry_id: str):
+        await self.redis._execute("XACK", self.stream_key, self.group, entry_id)
+        self._stats["acked"] += 1
+
+    # ==================== Workers ====================
+
+    async def _handle(self, kind: str, phone_number: str, payload: dict, queued_at: float) -> bool:
+        """Run the event's handler; False if it raised"""
+        if self._handler is None:
+            from app.controllers.bot_controller import bot_controller
+            self._handler = bot_controller.handle_message
+            self._status_handler = bot_controller.handle_status
+
+        if kind == EVENT_STATUS:
+            self._stats["statuses"] += 1
+            handler = self._status_handler
+            if handler is None:
+                return True
+        else:
+            handler = self._handler
+
+        started = time.time()
+        wait_ms = max(0.0, (started - queued_at) * 1000)
+        self._stats["total_queue_wait_ms"] += wait_ms
+        self._stats["max_queue_wait_ms"] = max(self._stats["max_queue_wait_ms"], wait_ms)
+        try:
+            await handler(phone_number, payload)
+            self._stats["processed"] += 1
+            return True
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.error(f"Error handling {kind} from {phone_number}: {e}", exc_info=True)
+            return False
+        finally:
+            latency_ms = (time.time() - started) * 1000
+            self._stats["total_latency_ms"] += latency_ms
+            self._stats["max_latency_ms"] = max(self._stats["max_latency_ms"], latency_ms)
+
+    async def _worker(self):
+        while True:
+            phone_number = await self._ready.get()
+            backlog = self._backlog[phone_number]
+            entry_id, kind, _, payload, queued_at = backlog.popleft()
+            try:
+                await self._handle(kind, phone_number, payload, queued_at)
+                if entry_id is not None:
+                    await self._ack(entry_id)
+            except Exception as e:
+                logger.error(f"Webhook worker error: {e}")
+            finally:
+                self._slots.release()
+                self._queued -= 1
+                self._inflight.discard(entry_id)
+                # One event per turn: a busy phone goes to the back of the line
+                if backlog:
+                    self._ready.put_nowait(phone_number)
+                else:
+                    del self._backlog[phone_number]
+                self._ready.task_done()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["mode"] = self.mode
+        stats["workers"] = self.workers
+        stats["queued"] = sum(len(backlog) for backlog in self._backlog.values())
+        stats["queued_phones"] = len(self._backlog)
+        handled = stats["processed"] + stats["failed"]
+        stats["avg_latency_ms"] = round(stats["total_latency_ms"] / handled, 2) if handled else 0.0
+        stats["avg_queue_wait_ms"] = round(stats["total_queue_wait_ms"] / handled, 2) if handled else 0.0
+        stats["avg_batch_size"] = round(stats["batch_events"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["dedup"] = self.dedup.get_stats()
+        return stats
+
+
+webhook_queue = WebhookQueue()
@@ -0,0 +1,164 @@
+"""
+Rate shaping for outbound WhatsApp messages.
+
+    TokenBucket    - per sender number throughput limit (Graph API enforces
+                     messages/second per phone number id); a sender-wide
+                     rate-limit reply pauses the whole bucket for Retry-After,
+                     a pair rate limit (131056) only that recipient
+    backoff_delay  - full-jitter exponential backoff
+    OutboundQueue  - fire-and-forget sends (notifications, broadcasts)
+                     drained by workers; one recipient always maps to the
+                     same worker so their messages keep their order
+"""
+import asyncio
+import random
+import time
+import zlib
+from typing import Optional, List, Callable, Awaitable
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Graph API error codes meaning "slow down" (sent with HTTP 400 as well as 429)
+RATE_LIMIT_ERROR_CODES = {4, 80007, 130429, 131048}
+
+# Too many messages from this sender to one recipient; other recipients are fine
+PAIR_RATE_LIMIT_ERROR_CODES = {131056}
+
+SCOPE_SENDER = "sender"
+SCOPE_RECIPIENT = "recipient"
+
+
+class TokenBucket:
+    """Async token bucket; waiters are served in arrival order"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float):
+        """Hold every sender back, e.g. for a 429 Retry-After"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> float:
+        """Take one token; returns the seconds spent waiting"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return time.monotonic() - started
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full jitter: uniform(0, min(cap, base * 2^attempt))"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Retry-After header in seconds (numeric form), if present"""
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _error_code(response: httpx.Response) -> Optional[int]:
+    try:
+        return response.json().get("error", {}).get("code")
+    except (ValueError, AttributeError):
+        return None
+
+
+def rate_limit_scope(response: httpx.Response) -> Optional[str]:
+    """SCOPE_RECIPIENT for a pair rate limit, SCOPE_SENDER for other throttling, else None"""
+    if response.status_code not in (400, 429):
+        return None
+    code = _error_code(response)
+    if code in PAIR_RATE_LIMIT_ERROR_CODES:
+        return SCOPE_RECIPIENT
+    if response.status_code == 429 or code in RATE_LIMIT_ERROR_CODES:
+        return SCOPE_SENDER
+    return None
+
+
+def is_rate_limited(response: httpx.Response) -> bool:
+    return rate_limit_scope(response) is not None
+
+
+SendFunc = Callable[[str, dict], Awaitable[Optional[dict]]]
+
+
+class OutboundQueue:
+    """Background send queue sharded by recipient"""
+
+    def __init__(self, send: SendFunc, workers: int):
+        self._send = send
+        self.workers = max(1, workers)
+        self._shards: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if not self._tasks or self._loop is not loop:
+            # First use, or a new loop (Celery tasks run one per call)
+            self._loop = loop
+            self._shards = [asyncio.Queue() for _ in range(self.workers)]
+            self._tasks = [asyncio.create_task(self._worker(shard)) for shard in self._shards]
+
+    def put(self, to: str, message_data: dict) -> "asyncio.Future[Optional[dict]]":
+        """Queue a send; the future resolves to the API response (or None)"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        shard = self._shards[zlib.crc32(to.encode()) % len(self._shards)]
+        shard.put_nowait((to, message_data, future))
+        return future
+
+    async def _worker(self, shard: asyncio.Queue):
+        while True:
+            to, message_data, future = await shard.get()
+            try:
+                result = await self._send(to, message_data)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Queued WhatsApp send to {to} failed: {e}")
+                if not future.done():
+                    future.set_result(None)
+            finally:
+                shard.task_done()
+
+    def qsize(self) -> int:
+        return sum(shard.qsize() for shard in self._shards)
+
+    async def drain(self):
+        await asyncio.gather(*(shard.join() for shard in self._shards))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._shards = []
@@ -1,53 +1,138 @@
 import httpx
 from app.core.config import settings
-from app.core.exceptions import WhatsAppAPIError
+from app.core.constants import (
+    WHATSAPP_API_VERSION, WHATSAPP_SEND_RATE_PER_SECOND, WHATSAPP_SEND_BURST,
+    WHATSAPP_MAX_CONCURRENT_SENDS, WHATSAPP_SEND_WORKERS,
+    WHATSAPP_MAX_RETRIES, WHATSAPP_RETRY_BASE_SECONDS, WHATSAPP_RETRY_MAX_SECONDS,
+)
+from app.services.whatsapp_sender import (
+    TokenBucket, OutboundQueue, backoff_delay, retry_after_seconds, rate_limit_scope, SCOPE_RECIPIENT,
+)
 import logging
 import json
 import asyncio
-from typing import Optional
+import time
+from typing import Optional, Dict, List, Tuple
 
 logger = logging.getLogger(__name__)
 
 # Retry configuration
-MAX_RETRIES = 3
-RETRY_DELAY_SECONDS = 1
+MAX_RETRIES = WHATSAPP_MAX_RETRIES
+RETRY_DELAY_SECONDS = WHATSAPP_RETRY_BASE_SECONDS
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def interactive_list(body_text: str, button_text: str, sections: list) -> dict:
+    """The `interactive` object of a list message"""
+    return {
+        "type": "list",
+        "body": {"text": body_text},
+        "action": {
+            "button": button_text,
+            "sections": sections
+        }
+    }
+
 
 class WhatsAppService:
-    def __init__(self):
-        self.api_token = settings.WHATSAPP_API_TOKEN
-        self.phone_number_id = settings.WHATSAPP_PHONE_NUMBER_ID
-        self.base_url = f"https://graph.facebook.com/v18.0/{self.phone_number_id}/messages"
+    def __init__(
+        self,
+        api_token: Optional[str] = None,
+        phone_number_id: Optional[str] = None,
+        api_base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_token = api_token if api_token is not None else settings.WHATSAPP_API_TOKEN
+        self.phone_number_id = phone_number_id if phone_number_id is not None else settings.WHATSAPP_PHONE_NUMBER_ID
+        api_base_url = (api_base_url or settings.WHATSAPP_API_BASE_URL).rstrip("/")
+        self.base_url = f"{api_base_url}/{WHATSAPP_API_VERSION}/{self.phone_number_id}/messages"
         self.headers = {
             "Authorization": f"Bearer {self.api_token}",
             "Content-Type": "application/json",
         }
+        self._transport = transport
         self._client: Optional[httpx.AsyncClient] = None
+        # Sender number -> throughput bucket
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Recipient -> monotonic time their pair rate limit ends
+        self._recipient_paused: Dict[str, float] = {}
+        self._queue = OutboundQueue(self.send_message, WHATSAPP_SEND_WORKERS)
+        self._stats = {
+            "sent": 0, "failed": 0, "retries": 0, "rate_limited": 0, "pair_rate_limited": 0,
+            "total_send_ms": 0.0, "total_throttle_ms": 0.0,
+        }
 
     def _get_client(self) -> httpx.AsyncClient:
-        """Get or create singleton httpx client"""
+        """Get or create the shared httpx client (pooled, HTTP/2 when available)"""
         if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(timeout=30.0)
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                http2=HTTP2_AVAILABLE and self._transport is None,
+                limits=httpx.Limits(
+                    max_connections=WHATSAPP_MAX_CONCURRENT_SENDS,
+                    max_keepalive_connections=WHATSAPP_MAX_CONCURRENT_SENDS,
+                ),
+                transport=self._transport,
+            )
         return self._client
 
+    def _bucket(self) -> TokenBucket:
+        bucket = self._buckets.get(self.phone_number_id)
+        if bucket is None:
+            bucket = self._buckets[self.phone_number_id] = TokenBucket(
+                WHATSAPP_SEND_RATE_PER_SECOND, WHATSAPP_SEND_BURST
+            )
+        return bucket
+
     async def close(self):
-        """Close the httpx client"""
+        """Stop queued sends and close the httpx client"""
+        await self._queue.close()
         if self._client and not self._client.is_closed:
             await self._client.aclose()
 
-    async def send_message(self, to: str, message_data: dict, retry_count: int = 0):
+    async def _wait_for_recipient(self, to: str):
+        """Hold sends to a recipient under a pair rate limit (other recipients go ahead)"""
+        until = self._recipient_paused.get(to)
+        if until is None:
+            return
+        delay = until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._recipient_paused.get(to) == until:
+            del self._recipient_paused[to]
+
+    def _pause_recipient(self, to: str, seconds: float):
+        self._recipient_paused[to] = max(self._recipient_paused.get(to, 0.0), time.monotonic() + seconds)
+
+    async def _post(self, content: bytes) -> httpx.Response:
+        """One rate-shaped, concurrency-limited Graph API request"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(WHATSAPP_MAX_CONCURRENT_SENDS)
+        self._stats["total_throttle_ms"] += await self._bucket().acquire() * 1000
+        async with self._semaphore:
+            return await self._get_client().post(self.base_url, headers=self.headers, content=content)
+
+    async def send_message(self, to: str, message_data: dict):
         """
-        Send message with retry logic for transient failures.
+        Send message, retrying timeouts, 5xx and rate limits.
+
+        Rate-limited replies (429 or Graph throughput error codes) wait for
+        Retry-After when given and pause the sender's bucket, or only this
+        recipient for a pair rate limit; everything else retries with
+        jittered exponential backoff.
 
         Args:
             to: Recipient phone number
             message_data: Message payload
-            retry_count: Current retry attempt (internal use)
 
         Returns:
             API response dict or None on failure
-
-        Raises:
-            WhatsAppAPIError: On permanent failures after all retries
         """
         if not self.api_token:
             logger.warning("WhatsApp API Token not set. Skipping message send.")
@@ -59,43 +144,95 @@ class WhatsAppService:
             "to": to,
             **message_data
         }
+        return await self._send_content(to, json.dumps(payload).encode())
 
-        try:
-            client = self._get_client()
-            logger.debug(f"Sending WhatsApp message to {to}...")
-            response = await client.post(self.base_url, headers=self.headers, json=payload)
-            logger.debug(f"WhatsApp API Response Status: {response.status_code}")
-            if settings.DEBUG:
-                logger.debug(f"WhatsApp API Response Body: {response.text}")
-            response.raise_for_status()
-            return response.json()
-        except httpx.TimeoutException as e:
-            # Retry on timeout
-            if retry_count < MAX_RETRIES:
-                logger.warning(f"WhatsApp timeout, retrying ({retry_count + 1}/{MAX_RETRIES})...")
-                await asyncio.sleep(RETRY_DELAY_SECONDS * (retry_count + 1))
-                return await self.send_message(to, message_data, retry_count + 1)
-            logger.error(f"WhatsApp timeout after {MAX_RETRIES} retries: {e}")
-            return None
-        except httpx.HTTPStatusError as e:
-            # Don't retry on 4xx errors (client errors)
-            if 400 <= e.response.status_code < 500:
-                error_msg = f"WhatsApp API client error: {e.response.status_code}"
-                logger.error(f"{error_msg} - Response: {e.response.text}")
-                return None
-            # Retry on 5xx errors (server errors)
-            if retry_count < MAX_RETRIES:
-                logger.warning(f"WhatsApp server error, retrying ({retry_count + 1}/{MAX_RETRIES})...")
-                await asyncio.sleep(RETRY_DELAY_SECONDS * (retry_count + 1))
-                return await self.send_message(to, message_data, retry_count + 1)
-            logger.error(f"WhatsApp server error after {MAX_RETRIES} retries: {e}")
-            return None
-        except httpx.HTTPError as e:
-            logger.error(f"Failed to send WhatsApp message: {e}")
-            if hasattr(e, 'response') and e.response:
-                logger.error(f"Response: {e.response.text}")
+    async def send_interactive_payload(self, to: str, interactive_json: str):
+        """
+        Send an interactive message whose `interactive` object is already
+        serialized (see app.services.interactive_cache).
+        """
+        if not self.api_token:
+            logger.warning("WhatsApp API Token not set. Skipping message send.")
             return None
 
+        content = (
+            '{"messaging_product":"whatsapp","recipient_type":"individual","to":'
+            f'{json.dumps(to)},"type":"interactive","interactive":{interactive_json}}}'
+        )
+        return await self._send_content(to, content.encode())
+
+    async def _send_content(self, to: str, content: bytes):
+        started = time.monotonic()
+        for attempt in range(MAX_RETRIES + 1):
+            retry_in = None
+            try:
+                logger.debug(f"Sending WhatsApp message to {to}...")
+                await self._wait_for_recipient(to)
+                response = await self._post(content)
+                logger.debug(f"WhatsApp API Response Status: {response.status_code}")
+                if settings.DEBUG:
+                    logger.debug(f"WhatsApp API Response Body: {response.text}")
+
+                if response.is_success:
+                    self._stats["sent"] += 1
+                    self._stats["total_send_ms"] += (time.monotonic() - started) * 1000
+                    return response.json()
+                scope = rate_limit_scope(response)
+                if scope is not None:
+                    self._stats["rate_limited"] += 1
+                    retry_in = retry_after_seconds(response)
+                    if retry_in is None:
+                        retry_in = backoff_delay(attempt, RETRY_DELAY_SECONDS, WHATSAPP_RETRY_MAX_SECONDS)
+                    if scope == SCOPE_RECIPIENT:
+                        self._stats["pair_rate_limited"] += 1
+                        self._pause_recipient(to, retry_in)
+                    else:
+                        self._bucket().pause(retry_in)
+                    logger.warning(f"WhatsApp rate limited ({scope}), retrying in {retry_in:.2f}s")
+                elif 400 <= response.status_code < 500:
+                    # Don't retry other 4xx errors (client errors)
+                    error_msg = f"WhatsApp API client error: {response.status_code}"
+                    logger.error(f"{error_msg} - Response: {response.text}")
+                    break
+                else:
+                    logger.warning(f"WhatsApp server error {response.status_code} "
+                                   f"({attempt + 1}/{MAX_RETRIES + 1})")
+            except httpx.TimeoutException as e:
+                logger.warning(f"WhatsApp timeout ({attempt + 1}/{MAX_RETRIES + 1}): {e}")
+            except httpx.HTTPError as e:
+                logger.error(f"Failed to send WhatsApp message: {e}")
+                break
+
+            if attempt == MAX_RETRIES:
+                logger.error(f"WhatsApp send to {to} failed after {MAX_RETRIES} retries")
+                break
+            self._stats["retries"] += 1
+            if retry_in is None:
+                retry_in = backoff_delay(attempt, RETRY_DELAY_SECONDS, WHATSAPP_RETRY_MAX_SECONDS)
+            await asyncio.sleep(retry_in)
+
+        self._stats["failed"] += 1
+        return None
+
+    def queue_message(self, to: str, message_data: dict) -> "asyncio.Future":
+        """Send in the background (per-recipient order kept); resolves to the API response"""
+        return self._queue.put(to, message_data)
+
+    def queue_text(self, to: str, text: str) -> "asyncio.Future":
+        """Text message in the background (notifications); resolves to the API response"""
+        return self.queue_message(to, {"type": "text", "text": {"body": text}})
+
+    async def send_bulk(self, messages: List[Tuple[str, dict]]) -> List[Optional[dict]]:
+        """Send many messages concurrently within the rate limit, results in input order"""
+        return await asyncio.gather(*(self.queue_message(to, data) for to, data in messages))
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["http2"] = HTTP2_AVAILABLE and self._transport is None
+        stats["avg_send_ms"] = round(stats["total_send_ms"] / stats["sent"], 2) if stats["sent"] else 0.0
+        return stats
+
     async def send_text(self, to: str, text: str):
         return await self.send_message(to, {
             "type": "text",
@@ -128,14 +265,7 @@ class WhatsAppService:
         """
         return await self.send_message(to, {
             "type": "interactive",
-            "interactive": {
-                "type": "list",
-                "body": {"text": body_text},
-                "action": {
-                    "button": button_text,
-                    "sections": sections
-                }
-            }
+            "interactive": interactive_list(body_text, button_text, sections)
         })
 
 whatsapp_service = WhatsAppService()
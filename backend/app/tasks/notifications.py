@@ -39,7 +39,7 @@ def notify_restaurant_new_order(order_id: int, restaurant_phone: str):
 You have a new order!
 Please open the app to view details and accept.
 """
-        await whatsapp_service.send_text(restaurant_phone, message)
+        await whatsapp_service.queue_text(restaurant_phone, message)
         logger.info(f"Notified restaurant {restaurant_phone} about order {order_id}")
     
     try:
@@ -73,7 +73,7 @@ def notify_driver_new_delivery(order_id: int, driver_phone: str, pickup_address:
 
 Please open the app to start delivery.
 """
-        await whatsapp_service.send_text(driver_phone, message)
+        await whatsapp_service.queue_text(driver_phone, message)
         logger.info(f"Notified driver {driver_phone} about delivery {order_id}")
     
     try:
@@ -149,7 +149,7 @@ def notify_customer_order_status(order_id: int, customer_phone: str, status: str
             else:
                 full_message += f"\n⏱️ Estimated: ~{estimated_time} min"
 
-        await whatsapp_service.send_text(customer_phone, full_message)
+        await whatsapp_service.queue_text(customer_phone, full_message)
         logger.info(f"Notified customer {customer_phone} about order {order_id} status: {status}")
     
     try:
@@ -4,12 +4,14 @@ Order Processing Tasks - Background tasks for order management
 from celery import shared_task
 from app.db.session import AsyncSessionLocal
 from app.models.order import Order, OrderStatus
-from app.models.user import User, UserRole
 from app.services.redis_service import redis_service
-from sqlalchemy import select, and_
+from app.services.phone_lock import LEASE_RELEASE
+from app.core.constants import DISPATCH_WINDOW_SECONDS
+from sqlalchemy import select
 from datetime import datetime, timedelta
 import asyncio
 import logging
+import secrets
 
 logger = logging.getLogger(__name__)
 
@@ -23,35 +25,38 @@ def run_async(coro):
 @shared_task(name="app.tasks.order_processing.auto_assign_driver")
 def auto_assign_driver(order_id: int, restaurant_lat: float, restaurant_lng: float):
     """
-    Automatically assign the nearest available driver to an order.
+    Assign the best available driver near the restaurant to one order
+    (DriverAssignmentService scoring; batch rounds use dispatch_orders).
     """
     async def _assign():
+        from app.services.driver_assignment_service import DriverAssignmentService
+        
         async with AsyncSessionLocal() as db:
-            # Get available drivers (simplified - in production would use location)
-            result = await db.execute(
-                select(User)
-                .where(User.role == UserRole.DRIVER)
-                .where(User.is_active == True)
-                .limit(1)
-            )
-            driver = result.scalars().first()
-            
-            if not driver:
-                logger.warning(f"No available drivers for order {order_id}")
-                return {"success": False, "reason": "no_drivers_available"}
-            
-            # Assign driver to order
+            # Lock the order so a concurrent dispatch round cannot assign it too
             order_result = await db.execute(
-                select(Order).where(Order.id == order_id)
+                select(Order).where(Order.id == order_id).with_for_update(skip_locked=True)
             )
             order = order_result.scalars().first()
             
             if not order:
                 return {"success": False, "reason": "order_not_found"}
+            if order.driver_id:
+                return {"success": False, "reason": "already_assigned", "driver_id": order.driver_id}
+            
+            service = DriverAssignmentService(db)
+            driver = await service.find_best_driver(
+                restaurant_lat,
+                restaurant_lng,
+                order_value=float(order.total_amount),
+                priority="high" if order.total_amount > 100 else "normal",
+            )
+            
+            if not driver:
+                logger.warning(f"No available drivers for order {order_id}")
+                return {"success": False, "reason": "no_drivers_available"}
             
-            order.driver_id = driver.id
-            order.status = OrderStatus.OUT_FOR_DELIVERY
-            db.add(order)
+            # Assign driver to order
+            await service.assign(order, driver.id, OrderStatus.OUT_FOR_DELIVERY)
             await db.commit()
             
             # Notify driver
@@ -70,6 +75,42 @@ def auto_assign_driver(order_id: int, restaurant_lat: float, restaurant_lng: flo
         return {"success": False, "error": str(e)}
 
 
+@shared_task(name="app.tasks.order_processing.dispatch_orders")
+def dispatch_orders():
+    """
+    Batch dispatch: assign every unassigned delivery order collected since the
+    last round in one optimal matching (runs every DISPATCH_WINDOW_SECONDS).
+    """
+    async def _dispatch():
+        from app.services.dispatch_service import DispatchService
+        
+        # One round at a time across workers, so two rounds never book the same driver
+        # (owner token: a round that outlives the TTL must not release its successor's lock)
+        lock_key = "dispatch:round"
+        token = secrets.token_hex(8)
+        if not await redis_service.set_if_absent(lock_key, token, ex=DISPATCH_WINDOW_SECONDS * 4):
+            return {"success": False, "reason": "round_in_progress"}
+        try:
+            async with AsyncSessionLocal() as db:
+                assignments = await DispatchService(db).run_round()
+        finally:
+            await redis_service.run_script(LEASE_RELEASE, [lock_key], [token])
+        
+        for order_id, driver_id in assignments:
+            await redis_service.publish_driver_notification(driver_id, {
+                "type": "new_delivery",
+                "order_id": order_id
+            })
+        
+        return {"success": True, "assigned": len(assignments)}
+    
+    try:
+        return run_async(_dispatch())
+    except Exception as e:
+        logger.error(f"Failed to dispatch orders: {e}")
+        return {"success": False, "error": str(e)}
+
+
 @shared_task(name="app.tasks.order_processing.check_stuck_orders")
 def check_stuck_orders():
     """
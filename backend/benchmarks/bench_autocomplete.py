@@ -0,0 +1,40 @@
+"""
+Autocomplete: prefix index build, cold and memoized lookups, incremental update.
+
+    python -m benchmarks.bench_autocomplete [restaurants] [items_per_restaurant]
+"""
+import random
+import sys
+
+from benchmarks.common import make_catalog_rows, timeit, report
+from app.services.autocomplete import AutocompleteIndex, Popularity
+from app.services.catalog_service import build_snapshot
+
+PREFIXES = ["ش", "شاو", "شاورما د", "كناف", "item 42", "مطعم 12", "xyz"]
+
+
+def main():
+    restaurants = int(sys.argv[1]) if len(sys.argv) > 1 else 1250
+    per_restaurant = int(sys.argv[2]) if len(sys.argv) > 2 else 80
+    restaurant_rows, category_rows, item_rows = make_catalog_rows(restaurants, per_restaurant)
+    snapshot = build_snapshot(0, restaurant_rows, category_rows, item_rows)
+    rng = random.Random(7)
+    popularity = Popularity(items={item.id: rng.randint(0, 500) for item, _, _ in item_rows})
+
+    report("index build", timeit(lambda: AutocompleteIndex.from_snapshot(snapshot, popularity), repeat=3))
+    index = AutocompleteIndex.from_snapshot(snapshot, popularity)
+    print(f"{len(index)} entries, {index.key_count} prefix keys")
+
+    for prefix in PREFIXES:
+        def cold():
+            index._results.clear()
+            return index.complete(prefix)
+        print(f"\nprefix {prefix!r}: {len(index.complete(prefix))} suggestions")
+        report("  cold (walk + rank)", timeit(cold, repeat=50))
+        report("  memoized", timeit(lambda: index.complete(prefix), repeat=2000))
+
+    report("\nreindex one restaurant", timeit(lambda: index.reindex_restaurant(snapshot, restaurants // 2), repeat=20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Menu item search on Postgres: legacy ILIKE '%q%' vs tsvector + pg_trgm.
+
+Builds a synthetic catalog (default 1250 restaurants x 80 items = 100k items)
+in a scratch schema, runs both queries and prints latencies and plans.
+Needs a reachable Postgres (DATABASE_URL / POSTGRES_* settings) where pg_trgm
+can be created; the scratch schema is dropped afterwards.
+
+    python -m benchmarks.bench_catalog_search [restaurants] [items_per_restaurant]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from benchmarks.common import make_catalog_rows
+from sqlalchemy import select, or_, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.base import Base
+from app.db.session import get_engine_url
+from app.models.menu import MenuItem
+from app.services.catalog_search import SEARCH_DDL, menu_item_search_query
+
+SCHEMA = "bench_catalog_search"
+QUERIES = ["شاورما", "شاورما دجاج", "شاورمآ", "كنافه", "زنجر حار", "Item 4242", "xyz"]
+PAGE = 30
+
+
+def legacy_query(q: str):
+    """Same filter as the old /search/menu-items (ILIKE on name and description)"""
+    return (
+        select(MenuItem)
+        .where(MenuItem.is_available == True, or_(MenuItem.name.ilike(f"%{q}%"), MenuItem.description.ilike(f"%{q}%")))
+        .order_by(MenuItem.name)
+        .limit(PAGE)
+    )
+
+
+async def load_catalog(conn, restaurants: int, per_restaurant: int):
+    restaurant_rows, _, item_rows = make_catalog_rows(restaurants, per_restaurant)
+    await conn.execute(
+        text("INSERT INTO restaurant (id, name, name_ar, is_active, subscription_tier, commission_rate) "
+             "VALUES (:id, :name, :name_ar, :is_active, 'basic', 0)"),
+        [{"id": r.id, "name": r.name, "name_ar": r.name_ar, "is_active": r.is_active} for r, _ in restaurant_rows],
+    )
+    await conn.execute(
+        text("INSERT INTO menu (id, restaurant_id, name, is_active, \"order\") VALUES (:id, :id, 'Menu', true, 0)"),
+        [{"id": r.id} for r, _ in restaurant_rows],
+    )
+    await conn.execute(
+        text("INSERT INTO category (id, menu_id, name, name_ar, \"order\") VALUES (:id, :id, 'Main', 'رئيسي', 0)"),
+        [{"id": r.id} for r, _ in restaurant_rows],
+    )
+    await conn.execute(
+        text("INSERT INTO menuitem (id, category_id, name, name_ar, price, has_variants, is_available, \"order\") "
+             "VALUES (:id, :category_id, :name, :name_ar, :price, false, :is_available, :order)"),
+        [
+            {"id": item.id, "category_id": category.id, "name": item.name, "name_ar": item.name_ar,
+             "price": item.price, "is_available": item.is_available, "order": item.order}
+            for item, category, _ in item_rows
+        ],
+    )
+    await conn.execute(text("ANALYZE"))
+    return len(item_rows)
+
+
+async def timed(conn, statement, repeat: int):
+    samples = []
+    rows = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = (await conn.execute(statement)).all()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return rows, statistics.fmean(samples), samples[len(samples) // 2]
+
+
+async def main():
+    restaurants = int(sys.argv[1]) if len(sys.argv) > 1 else 1250
+    per_restaurant = int(sys.argv[2]) if len(sys.argv) > 2 else 80
+    engine = create_async_engine(
+        get_engine_url(),
+        connect_args={"server_settings": {"search_path": f"{SCHEMA},public"}},
+    )
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+            for statement in SEARCH_DDL:
+                await conn.execute(text(statement))
+            start = time.perf_counter()
+            count = await load_catalog(conn, restaurants, per_restaurant)
+            print(f"{count} items in {restaurants} restaurants loaded in {time.perf_counter() - start:.1f} s")
+
+        async with engine.connect() as conn:
+            for q in QUERIES:
+                legacy_rows, legacy_mean, legacy_p50 = await timed(conn, legacy_query(q), repeat=10)
+                new_rows, new_mean, new_p50 = await timed(conn, menu_item_search_query(q, limit=PAGE), repeat=50)
+                print(f"\nquery {q!r}: legacy {len(legacy_rows)} rows, search {len(new_rows) - (len(new_rows) > PAGE)} rows")
+                print(f"  legacy ILIKE   mean {legacy_mean:8.2f} ms   p50 {legacy_p50:8.2f} ms")
+                print(f"  tsvector+trgm  mean {new_mean:8.2f} ms   p50 {new_p50:8.2f} ms")
+
+            q = QUERIES[0]
+            for label, statement in (("legacy", legacy_query(q)), ("search", menu_item_search_query(q, limit=PAGE))):
+                compiled = statement.compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+                plan = (await conn.exec_driver_sql(f"EXPLAIN ANALYZE {compiled}")).scalars().all()
+                print(f"\n{label} plan for {q!r}:")
+                print("\n".join(f"  {line}" for line in plan))
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+"""
+Driver dispatch: greedy order-by-order vs batch rounds (Hungarian).
+
+A small discrete-time simulator of a lunch peak: orders arrive as a Poisson
+stream at restaurants around Beirut, drivers carry up to
+MAX_ACTIVE_ORDERS_PER_DRIVER orders one after another at a constant speed.
+Both policies use DriverAssignmentService's scoring; they differ only in
+when and how orders meet drivers:
+
+    greedy        each order takes the best driver the moment it arrives
+                  (what auto_assign_order does), retried every second if none
+    batch Ns      orders wait for the next round every N seconds, then one
+                  plan_dispatch over all pending orders and all drivers
+
+Then plan_dispatch alone is timed on larger synthetic batches.
+
+    python -m benchmarks.bench_dispatch [orders_per_minute] [drivers] [minutes]
+"""
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+from benchmarks.common import timeit, report
+from app.services.dispatch_service import PendingOrder, plan_dispatch
+from app.services.driver_assignment_service import DriverAssignmentService
+from app.services.geo_index import haversine_km
+
+SPEED_KM_PER_S = 25 / 3600
+PREP_SECONDS = 10 * 60
+HANDOVER_SECONDS = 120
+RESTAURANTS = 150
+
+
+def make_world(orders_per_minute: float, drivers: int, minutes: int, seed: int = 11):
+    """Synthetic order stream [(t, restaurant point, customer point, value)] and driver start points"""
+    rng = random.Random(seed)
+    restaurants = [(rng.gauss(33.89, 0.03), rng.gauss(35.50, 0.03)) for _ in range(RESTAURANTS)]
+    weights = [1 / (rank + 1) for rank in range(RESTAURANTS)]  # a few popular places
+    stream, t = [], 0.0
+    while True:
+        t += rng.expovariate(orders_per_minute / 60)
+        if t >= minutes * 60:
+            break
+        pickup = rng.choices(restaurants, weights)[0]
+        customer = (pickup[0] + rng.uniform(-0.03, 0.03), pickup[1] + rng.uniform(-0.03, 0.03))
+        stream.append((int(t), pickup, customer, rng.choice([15, 25, 40, 80, 120])))
+    fleet = [
+        (rng.gauss(33.89, 0.04), rng.gauss(35.50, 0.04), round(rng.uniform(3.5, 5.0), 1))
+        for _ in range(drivers)
+    ]
+    return stream, fleet
+
+
+class Simulation:
+    """Drivers as sequential queues of deliveries; positions are where each queue ends"""
+
+    def __init__(self, fleet):
+        self.drivers = [
+            SimpleNamespace(id=i, last_latitude=lat, last_longitude=lng, average_rating=rating,
+                            free_at=0.0, dropoffs=[], delivered=0)
+            for i, (lat, lng, rating) in enumerate(fleet)
+        ]
+        self.results = []  # (assignment wait s, delivery time s, deadhead km)
+
+    def rows(self, now: float):
+        """(driver, active orders, deliveries today) as the candidate query would return them"""
+        rows = []
+        for driver in self.drivers:
+            driver.dropoffs = [t for t in driver.dropoffs if t > now]
+            rows.append((driver, len(driver.dropoffs), driver.delivered))
+        return rows
+
+    def assign(self, now: float, order, driver):
+        created, pickup, customer, _ = order
+        deadhead = haversine_km(driver.last_latitude, driver.last_longitude, *pickup)
+        start = max(now, driver.free_at)
+        at_restaurant = max(start + deadhead / SPEED_KM_PER_S, created + PREP_SECONDS)
+        dropoff = at_restaurant + haversine_km(*pickup, *customer) / SPEED_KM_PER_S + HANDOVER_SECONDS
+        driver.free_at = dropoff
+        driver.dropoffs.append(dropoff)
+        driver.delivered += 1
+        driver.last_latitude, driver.last_longitude = customer
+        self.results.append((now - created, dropoff - created, deadhead))
+
+
+def run_greedy(service, stream, fleet, minutes):
+    sim = Simulation(fleet)
+    pending, arrivals = [], iter(stream)
+    upcoming = next(arrivals, None)
+    for now in range(minutes * 60 + 1800):
+        while upcoming and upcoming[0] <= now:
+            pending.append(upcoming)
+            upcoming = next(arrivals, None)
+        if not pending:
+            continue
+        rows = sim.rows(now)
+        waiting = []
+        for order in pending:
+            _, pickup, _, value = order
+            distances = [haversine_km(*pickup, d.last_latitude, d.last_longitude) for d, _, _ in rows]
+            scores = service.score_candidates(
+                distances, [d.average_rating for d, _, _ in rows], [a for _, a, _ in rows],
+                [t for _, _, t in rows], value, "high" if value > 100 else "normal",
+            )
+            best = max(range(len(scores)), key=scores.__getitem__)
+            if scores[best] > 0:
+                sim.assign(now, order, rows[best][0])
+                rows[best] = (rows[best][0], rows[best][1] + 1, rows[best][2] + 1)
+            else:
+                waiting.append(order)
+        pending = waiting
+    return sim, [], len(pending)
+
+
+def run_batch(service, stream, fleet, minutes, window: int):
+    sim = Simulation(fleet)
+    pending, arrivals = [], iter(stream)
+    upcoming = next(arrivals, None)
+    solve_ms = []
+    for now in range(0, minutes * 60 + 1800, window):
+        while upcoming and upcoming[0] <= now:
+            pending.append(upcoming)
+            upcoming = next(arrivals, None)
+        if not pending:
+            continue
+        orders = [
+            PendingOrder(index, *order[1], order_value=order[3], priority="high" if order[3] > 100 else "normal")
+            for index, order in enumerate(pending)
+        ]
+        start = time.perf_counter()
+        plan = plan_dispatch(service, orders, sim.rows(now))
+        solve_ms.append((time.perf_counter() - start) * 1000)
+        assigned = set()
+        for order, driver, _ in plan:
+            sim.assign(now, pending[order.order_id], driver)
+            assigned.add(order.order_id)
+        pending = [order for index, order in enumerate(pending) if index not in assigned]
+    return sim, solve_ms, len(pending)
+
+
+def summarize(label: str, sim, solve_ms, left: int):
+    waits, deliveries, deadheads = zip(*sim.results) if sim.results else ((0,), (0,), (0,))
+    p90 = sorted(deliveries)[int(len(deliveries) * 0.9) - 1]
+    line = (f"{label:<10} served {len(sim.results):5d}  left {left:4d}  "
+            f"assign wait {statistics.fmean(waits):6.1f} s  "
+            f"delivery mean {statistics.fmean(deliveries) / 60:5.1f} min  p90 {p90 / 60:5.1f} min  "
+            f"deadhead {statistics.fmean(deadheads):5.2f} km")
+    if solve_ms:
+        line += f"  solve mean {statistics.fmean(solve_ms):6.2f} ms  max {max(solve_ms):7.2f} ms"
+    print(line)
+
+
+def main():
+    orders_per_minute = float(sys.argv[1]) if len(sys.argv) > 1 else 8
+    drivers = int(sys.argv[2]) if len(sys.argv) > 2 else 80
+    minutes = int(sys.argv[3]) if len(sys.argv) > 3 else 60
+    service = DriverAssignmentService(db=None)
+    stream, fleet = make_world(orders_per_minute, drivers, minutes)
+    print(f"{len(stream)} orders over {minutes} min ({orders_per_minute}/min), {drivers} drivers\n")
+
+    summarize("greedy", *run_greedy(service, stream, fleet, minutes))
+    for window in (10, 20, 30):
+        summarize(f"batch {window}s", *run_batch(service, stream, fleet, minutes, window))
+
+    print("\nplan_dispatch on one batch (all drivers idle, random pickups):")
+    rng = random.Random(5)
+    for batch, fleet_size in ((25, 200), (50, 500), (100, 1000), (200, 2000)):
+        orders = [PendingOrder(i, rng.gauss(33.89, 0.04), rng.gauss(35.50, 0.04)) for i in range(batch)]
+        rows = [
+            (SimpleNamespace(id=i, last_latitude=rng.gauss(33.89, 0.05), last_longitude=rng.gauss(35.50, 0.05),
+                             average_rating=4.5), rng.randint(0, 2), rng.randint(0, 10))
+            for i in range(fleet_size)
+        ]
+        report(f"  {batch} orders x {fleet_size} drivers",
+               timeit(lambda: plan_dispatch(service, orders, rows), repeat=3))
+
+
+if __name__ == "__main__":
+    main()
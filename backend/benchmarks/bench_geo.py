@@ -0,0 +1,156 @@
+"""
+Nearby drivers: load-everything + Python haversine vs the geospatial index.
+
+Simulates a fleet of drivers around Lebanon (denser in Beirut) and times a
+pickup-radius search three ways:
+
+    legacy        every driver row scanned with haversine (the old endpoints)
+    redis GEO     GEOSEARCH on the live position set through RedisService
+                  (REDIS_BACKEND=redis for a real server; the memory backend
+                  only emulates GEOSEARCH in Python)
+    postgres      with --postgres: drivers in a scratch schema, legacy full load
+                  vs GeoIndex.nearby_drivers on the GiST index, plus the plan
+
+    python -m benchmarks.bench_geo [drivers] [--postgres]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from benchmarks import common  # noqa: F401  (settings env defaults)
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.db.base import Base
+from app.db.session import get_engine_url
+from app.models.user import User, UserRole
+from app.services.geo_index import GeoIndex, DRIVER_POSITIONS_KEY, haversine_km, spatial_terms
+from app.services.redis_service import RedisService
+
+SCHEMA = "bench_geo"
+PICKUPS = [(33.8938, 35.5018, 3), (33.8938, 35.5018, 10), (34.4367, 35.8497, 5), (33.2700, 35.2000, 10)]
+REPEAT = 30
+
+
+def make_drivers(count: int, seed: int = 7):
+    """(id, lat, lng) - 60% around Beirut, the rest anywhere in the country"""
+    rng = random.Random(seed)
+    drivers = []
+    for driver_id in range(1, count + 1):
+        if rng.random() < 0.6:
+            lat, lng = rng.gauss(33.89, 0.05), rng.gauss(35.50, 0.05)
+        else:
+            lat, lng = rng.uniform(33.1, 34.6), rng.uniform(35.1, 36.5)
+        drivers.append((driver_id, lat, lng))
+    return drivers
+
+
+def legacy_nearby(drivers, lat: float, lng: float, radius_km: float):
+    nearby = []
+    for driver_id, driver_lat, driver_lng in drivers:
+        distance = haversine_km(lat, lng, driver_lat, driver_lng)
+        if distance <= radius_km:
+            nearby.append((driver_id, distance))
+    nearby.sort(key=lambda row: row[1])
+    return nearby
+
+
+async def timed(fn, repeat: int = REPEAT):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return result, statistics.fmean(samples), samples[len(samples) // 2]
+
+
+def line(label: str, rows, mean: float, p50: float):
+    print(f"  {label:<22} {len(rows):6d} drivers   mean {mean:8.3f} ms   p50 {p50:8.3f} ms")
+
+
+async def bench_redis(drivers):
+    redis = RedisService()
+    geo = GeoIndex(redis=redis)
+    print(f"redis backend: {redis.backend_name}")
+    start = time.perf_counter()
+    for chunk in range(0, len(drivers), 500):
+        pipe = redis.pipeline()
+        for driver_id, lat, lng in drivers[chunk:chunk + 500]:
+            pipe.command("SET", f"driver_location:{driver_id}", "{}", "EX", 300)
+            pipe.command("GEOADD", DRIVER_POSITIONS_KEY, lng, lat, driver_id)
+        await pipe.execute()
+    print(f"{len(drivers)} live positions written in {time.perf_counter() - start:.2f} s")
+
+    for lat, lng, radius in PICKUPS:
+        async def legacy():
+            return legacy_nearby(drivers, lat, lng, radius)
+        print(f"\npickup ({lat}, {lng}) radius {radius} km")
+        line("legacy haversine", *await timed(legacy))
+        line("GEOSEARCH", *await timed(lambda: geo.nearby_live_drivers(lat, lng, radius)))
+        line("GEOSEARCH nearest 10", *await timed(lambda: geo.nearby_live_drivers(lat, lng, radius, limit=10)))
+
+    await redis.pipeline().command("DEL", DRIVER_POSITIONS_KEY).execute()
+    await redis.close()
+
+
+async def bench_postgres(drivers):
+    engine = create_async_engine(
+        get_engine_url(),
+        connect_args={"server_settings": {"search_path": f"{SCHEMA},public"}},
+    )
+    geo = GeoIndex()
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [
+                {"id": driver_id, "phone_number": f"+9617{driver_id:07d}", "full_name": f"Driver {driver_id}",
+                 "role": UserRole.DRIVER, "is_active": True, "last_latitude": lat, "last_longitude": lng}
+                for driver_id, lat, lng in drivers
+            ])
+            backend = await geo.ensure(conn)
+            await conn.execute(text("ANALYZE"))
+        print(f"\npostgres spatial backend: {backend or 'none (bounding-box fallback)'}")
+
+        async with AsyncSession(engine) as db:
+            for lat, lng, radius in PICKUPS:
+                async def legacy():
+                    result = await db.execute(GeoIndex.drivers_query().where(User.last_latitude.isnot(None)))
+                    rows = [(d.id, d.last_latitude, d.last_longitude) for d in result.scalars().all()]
+                    return legacy_nearby(rows, lat, lng, radius)
+                print(f"\npickup ({lat}, {lng}) radius {radius} km")
+                line("legacy full load", *await timed(legacy, repeat=10))
+                line("spatial index", *await timed(lambda: geo.nearby_drivers(db, lat, lng, radius)))
+                line("spatial nearest 10", *await timed(lambda: geo.nearby_drivers(db, lat, lng, radius, limit=10)))
+                db.expunge_all()
+
+            if backend:
+                lat, lng, radius = PICKUPS[0]
+                distance, within, nearest = spatial_terms(backend, User.last_latitude, User.last_longitude, lat, lng, radius)
+                statement = GeoIndex.drivers_query().add_columns(distance).where(within).order_by(nearest).limit(10)
+                compiled = statement.compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+                conn = await db.connection()
+                plan = (await conn.exec_driver_sql(f"EXPLAIN ANALYZE {compiled}")).scalars().all()
+                print("\nnearest-10 plan:")
+                print("\n".join(f"  {row}" for row in plan))
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+async def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    drivers = make_drivers(int(args[0]) if args else 5000)
+    await bench_redis(drivers)
+    if "--postgres" in sys.argv:
+        await bench_postgres(drivers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
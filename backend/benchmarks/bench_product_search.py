@@ -0,0 +1,57 @@
+"""
+Product -> restaurant lookup: legacy full scan vs ProductSearchIndex.
+
+    python -m benchmarks.bench_product_search [restaurants] [items_per_restaurant]
+"""
+import sys
+
+from benchmarks.common import make_catalog_rows, timeit, report
+from app.core.text_normalize import normalize_arabic
+from app.services.catalog_service import build_snapshot
+from app.services.search_index import ProductSearchIndex
+
+QUERIES = ["شاورما", "شاورما دجاج", "بدي زنجر حار", "كنافه", "قهوة", "xyz"]
+
+
+def legacy_scan(rows, product: str):
+    """Same loop as the old AIService._find_restaurants_with_product (rows pre-fetched)"""
+    product_lower = normalize_arabic(product)
+    matching = {}
+    for rest, item in rows:
+        item_name = normalize_arabic(item.name_ar or item.name)
+        if product_lower in item_name or item_name in product_lower:
+            if rest.id not in matching:
+                matching[rest.id] = {"id": rest.id, "name": rest.name_ar or rest.name, "name_en": rest.name, "items_count": 0}
+            matching[rest.id]["items_count"] += 1
+    return list(matching.values())
+
+
+def main():
+    restaurants = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    per_restaurant = int(sys.argv[2]) if len(sys.argv) > 2 else 80
+    restaurant_rows, category_rows, item_rows = make_catalog_rows(restaurants, per_restaurant)
+    snapshot = build_snapshot(0, restaurant_rows, category_rows, item_rows)
+
+    rest_by_id = {r.id: r for r, _ in restaurant_rows}
+    scan_rows = [
+        (rest_by_id[menu.restaurant_id], item)
+        for item, _, menu in item_rows
+        if rest_by_id[menu.restaurant_id].is_active and item.is_available
+    ]
+
+    build = timeit(lambda: ProductSearchIndex.from_snapshot(snapshot), repeat=5)
+    index = ProductSearchIndex.from_snapshot(snapshot)
+    print(f"{len(scan_rows)} searchable items in {restaurants} restaurants")
+    report("index build", build)
+
+    for query in QUERIES:
+        legacy = {r["id"]: r["items_count"] for r in legacy_scan(scan_rows, query)}
+        indexed = {r["id"]: r["items_count"] for r in index.search(query)}
+        missing = set(legacy) - set(indexed)
+        print(f"\nquery {query!r}: {len(indexed)} restaurants (legacy {len(legacy)}, missing {len(missing)})")
+        report("  legacy scan (no DB)", timeit(lambda: legacy_scan(scan_rows, query), repeat=20))
+        report("  index", timeit(lambda: index.search(query)))
+
+
+if __name__ == "__main__":
+    main()
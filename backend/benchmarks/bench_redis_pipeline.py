@@ -0,0 +1,63 @@
+"""
+Upstash round trips: one request per command vs /pipeline.
+
+Uses the fake Upstash transport from tests/ with a simulated network RTT.
+
+    python -m benchmarks.bench_redis_pipeline [rtt_ms]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from benchmarks import common  # noqa: F401  (settings env defaults)
+from app.core.constants import ANALYTICS_RETENTION_SECONDS
+from app.services.redis_service import RedisService
+from tests.fake_upstash import FakeUpstash
+
+REPEAT = 30
+
+
+async def legacy_track_ai_usage(service: RedisService, phone_number: str, intent: str, success: bool):
+    """The previous track_ai_usage: one request per command"""
+    today = time.strftime("%Y-%m-%d")
+    for key, field in ((f"analytics:intent:{today}", intent), (f"analytics:status:{today}", "success" if success else "error")):
+        await service._execute("HINCRBY", key, field, 1)
+        await service._execute("EXPIRE", key, ANALYTICS_RETENTION_SECONDS)
+    key = f"analytics:users:{today}"
+    await service._execute("SADD", key, phone_number)
+    await service._execute("EXPIRE", key, ANALYTICS_RETENTION_SECONDS)
+
+
+async def legacy_get_daily_analytics(service: RedisService):
+    date = time.strftime("%Y-%m-%d")
+    await service._execute("HGETALL", f"analytics:intent:{date}")
+    await service._execute("HGETALL", f"analytics:status:{date}")
+    await service._execute("SCARD", f"analytics:users:{date}")
+
+
+async def measure(label: str, fn):
+    samples = []
+    for i in range(REPEAT):
+        start = time.perf_counter()
+        await fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<34} mean {statistics.fmean(samples):7.2f} ms   p50 {statistics.median(samples):7.2f} ms")
+
+
+async def main():
+    rtt_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    fake = FakeUpstash(latency=rtt_ms / 1000)
+    service = RedisService(base_url=fake.url, token=fake.token, transport=fake.transport)
+    print(f"simulated RTT {rtt_ms} ms, {REPEAT} calls each\n")
+
+    await measure("track_ai_usage (per command)", lambda i: legacy_track_ai_usage(service, f"+961{i}", "order_item", True))
+    await measure("track_ai_usage (pipeline)", lambda i: service.track_ai_usage(f"+961{i}", "order_item", True))
+    await measure("get_daily_analytics (per command)", lambda i: legacy_get_daily_analytics(service))
+    await measure("get_daily_analytics (pipeline)", lambda i: service.get_daily_analytics())
+    print(f"\nstats: {service.get_stats()}")
+    await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
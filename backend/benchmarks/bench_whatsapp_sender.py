@@ -0,0 +1,40 @@
+"""
+Outbound WhatsApp burst against the mock Graph API.
+
+Sends a burst (e.g. order confirmations / a broadcast) through
+WhatsAppService.send_bulk and reports throughput, 429s seen and retries.
+
+    python -m benchmarks.bench_whatsapp_sender [messages] [mock_rate_per_second]
+"""
+import asyncio
+import sys
+import time
+
+import httpx
+
+from benchmarks import common  # noqa: F401  (settings env defaults)
+from benchmarks.mock_graph_api import MockGraphAPI
+from app.services.whatsapp_service import WhatsAppService
+
+
+async def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    mock_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 80
+    mock = MockGraphAPI(rate_per_second=mock_rate, latency_ms=30)
+    service = WhatsAppService(api_token="bench", phone_number_id="1", transport=httpx.ASGITransport(app=mock.app))
+
+    batch = [(f"+9617{i:07d}", {"type": "text", "text": {"body": f"Order #{i} confirmed"}}) for i in range(messages)]
+    start = time.perf_counter()
+    results = await service.send_bulk(batch)
+    elapsed = time.perf_counter() - start
+
+    delivered = sum(1 for r in results if r)
+    print(f"{messages} messages, mock limit {mock_rate:.0f}/s, 30 ms latency")
+    print(f"delivered {delivered} in {elapsed:.2f}s  ->  {delivered / elapsed:.1f} msg/s")
+    print(f"mock: {mock.stats}")
+    print(f"sender: {service.get_stats()}")
+    await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""
+Shared helpers for the micro-benchmarks in this directory.
+Run from backend/:  python -m benchmarks.<name>
+"""
+import os
+import random
+import statistics
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+# Settings must import even without a .env file
+os.environ.setdefault("POSTGRES_PASSWORD", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+os.environ.setdefault("FIRST_SUPERUSER_PASSWORD", "Bench!mark#2024")
+
+DISHES = [
+    "شاورما", "فلافل", "برغر", "بيتزا", "كريب", "منقوشة", "زنجر", "فاهيتا", "كباب", "طاووق",
+    "بطاطا", "سلطة", "حمص", "فتوش", "تبولة", "عصير", "كوكتيل", "قهوة", "شاي", "كنافة",
+]
+QUALIFIERS = ["دجاج", "لحمة", "جبنة", "حار", "عادي", "سوبر", "عائلي", "كبير", "صغير", "مشكل", "بالفطر", "خضار"]
+
+
+def make_catalog_rows(restaurants: int = 300, items_per_restaurant: int = 80, seed: int = 7):
+    """Synthetic (restaurant_rows, category_rows, item_rows) for build_snapshot"""
+    rng = random.Random(seed)
+    restaurant_rows, item_rows = [], []
+    item_id = 1
+    for rest_id in range(1, restaurants + 1):
+        restaurant = SimpleNamespace(
+            id=rest_id, name=f"Restaurant {rest_id}", name_ar=f"مطعم {rest_id}",
+            description=None, description_ar=None, is_active=rest_id % 20 != 0, category_id=None,
+        )
+        restaurant_rows.append((restaurant, None))
+        menu = SimpleNamespace(id=rest_id, restaurant_id=rest_id, is_active=True)
+        category = SimpleNamespace(id=rest_id, name="Main", name_ar="رئيسي", order=0)
+        for _ in range(items_per_restaurant):
+            name_ar = f"{rng.choice(DISHES)} {rng.choice(QUALIFIERS)}"
+            item = SimpleNamespace(
+                id=item_id, name=f"Item {item_id}", name_ar=name_ar, description=None, description_ar=None,
+                price=5, price_min=None, price_max=None, has_variants=False,
+                is_available=rng.random() > 0.05, order=item_id, variants=[],
+            )
+            item_rows.append((item, category, menu))
+            item_id += 1
+    return restaurant_rows, [], item_rows
+
+
+def timeit(fn: Callable[[], object], repeat: int = 200) -> Dict[str, float]:
+    """Per-call latency stats in milliseconds"""
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p99_ms": samples[int(len(samples) * 0.99) - 1],
+    }
+
+
+def report(label: str, stats: Dict[str, float]):
+    print(f"{label:<28} mean {stats['mean_ms']:8.3f} ms   p50 {stats['p50_ms']:8.3f} ms   p99 {stats['p99_ms']:8.3f} ms")
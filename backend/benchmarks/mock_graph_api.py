@@ -0,0 +1,80 @@
+"""
+Mock WhatsApp Cloud (Graph) API for offline load tests.
+
+Accepts POST /{version}/{phone_number_id}/messages, answers like the real API
+after a simulated latency, and enforces a messages/second limit per sender
+number with 429 + Retry-After (error code 130429) like Meta's throttling.
+
+Standalone:
+    uvicorn benchmarks.mock_graph_api:app --port 9000
+    WHATSAPP_API_BASE_URL=http://localhost:9000 WHATSAPP_API_TOKEN=x ...
+
+In process:
+    mock = MockGraphAPI(rate_per_second=80)
+    WhatsAppService(api_token="x", phone_number_id="1", transport=httpx.ASGITransport(app=mock.app))
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Deque, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class MockGraphAPI:
+    def __init__(self, rate_per_second: float = 80, latency_ms: float = 30, error_rate: float = 0.0, seed: int = 7):
+        self.rate_per_second = rate_per_second
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.windows: Dict[str, Deque[float]] = {}
+        self.stats = {"accepted": 0, "throttled": 0, "errors": 0, "in_flight": 0, "peak_in_flight": 0}
+        self.app = FastAPI(title="Mock Graph API")
+        self.app.post("/{version}/{phone_number_id}/messages")(self.send)
+        self.app.get("/stats")(self.get_stats)
+
+    def _throttled(self, phone_number_id: str) -> bool:
+        now = time.monotonic()
+        window = self.windows.setdefault(phone_number_id, deque())
+        while window and window[0] <= now - 1:
+            window.popleft()
+        if len(window) >= self.rate_per_second:
+            return True
+        window.append(now)
+        return False
+
+    async def send(self, version: str, phone_number_id: str, request: Request):
+        payload = await request.json()
+        if self._throttled(phone_number_id):
+            self.stats["throttled"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"Retry-After": "1"},
+                content={"error": {"code": 130429, "message": "Rate limit hit", "type": "OAuthException"}},
+            )
+
+        self.stats["in_flight"] += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.stats["in_flight"] -= 1
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {"code": 2, "message": "Service temporarily unavailable"}})
+
+        self.stats["accepted"] += 1
+        return {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": payload.get("to"), "wa_id": payload.get("to")}],
+            "messages": [{"id": f"wamid.mock{self.stats['accepted']}"}],
+        }
+
+    async def get_stats(self):
+        return self.stats
+
+
+app = MockGraphAPI().app
@@ -101,6 +101,12 @@ async def lifespan(app: FastAPI):
             await conn.execute(text("""
                 ALTER TABLE restaurant ADD COLUMN IF NOT EXISTS commission_rate FLOAT DEFAULT 0.0;
             """))
+            await conn.execute(text("""
+                ALTER TABLE restaurant ADD COLUMN IF NOT EXISTS slug VARCHAR;
+            """))
+            await conn.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS ix_restaurant_slug ON restaurant (slug);
+            """))
             
             # Menu migrations
             await conn.execute(text("""
@@ -123,6 +129,36 @@ async def lifespan(app: FastAPI):
         logger.info("Migration: Database columns ensured")
     except Exception as e:
         logger.debug(f"Migration note: {e}")
+
+    # Search columns and indexes (pg_trgm may need a superuser the first time;
+    # without them catalog search falls back to ILIKE)
+    try:
+        from app.services.catalog_search import ensure_search_columns
+        async with engine.begin() as conn:
+            ranked = await ensure_search_columns(conn)
+        logger.info(f"Migration: search columns ensured ({'ranked' if ranked else 'ILIKE fallback'})")
+    except Exception as e:
+        logger.warning(f"Search migration note: {e}")
+
+    # Spatial indexes on driver / branch coordinates (PostGIS, else cube + earthdistance)
+    try:
+        from app.services.geo_index import geo_index
+        async with engine.begin() as conn:
+            backend = await geo_index.ensure(conn)
+        logger.info(f"Migration: spatial indexes ensured ({backend or 'no extension, bounding-box fallback'})")
+    except Exception as e:
+        logger.warning(f"Spatial migration note: {e}")
+
+    # Slugs for restaurants created before the slug column existed
+    try:
+        from app.services.restaurant_slugs import backfill_slugs
+        async with AsyncSessionLocal() as db:
+            filled = await backfill_slugs(db)
+            await db.commit()
+        if filled:
+            logger.info(f"Migration: assigned slugs to {filled} restaurants")
+    except Exception as e:
+        logger.debug(f"Slug backfill note: {e}")
     
     # Create superuser if not exists
     try:
@@ -148,6 +184,21 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error creating superuser: {e}")
 
+    # Start webhook workers
+    from app.services.webhook_queue import webhook_queue
+    from app.controllers.bot_controller import bot_controller
+    try:
+        await webhook_queue.start(bot_controller.handle_message, bot_controller.handle_status)
+    except Exception as e:
+        logger.error(f"Error starting webhook queue: {e}")
+
+    # Follow catalog changes made on other nodes
+    from app.services.catalog_events import catalog_feed
+    try:
+        await catalog_feed.start()
+    except Exception as e:
+        logger.error(f"Error starting catalog feed: {e}")
+
     yield
 
     # Shutdown with proper error handling
@@ -155,6 +206,18 @@ async def lifespan(app: FastAPI):
     from app.services.redis_service import redis_service
     from app.services.whatsapp_service import whatsapp_service
 
+    try:
+        await webhook_queue.stop()
+        logger.debug("Webhook queue stopped")
+    except Exception as e:
+        logger.warning(f"Error stopping webhook queue: {e}")
+
+    try:
+        await catalog_feed.stop()
+        logger.debug("Catalog feed stopped")
+    except Exception as e:
+        logger.warning(f"Error stopping catalog feed: {e}")
+
     try:
         await redis_service.close()
         logger.debug("Redis service closed")
@@ -167,6 +230,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Error closing WhatsApp service: {e}")
 
+    try:
+        from app.services.ai_service import ai_service
+        await ai_service.close()
+        logger.debug("AI service closed")
+    except Exception as e:
+        logger.warning(f"Error closing AI service: {e}")
+
     try:
         await engine.dispose()
         logger.debug("Database engine disposed")
@@ -257,22 +327,88 @@ async def health_check():
         "version": "0.1.0",
         "services": {},
         "pool_stats": {},
+        "message_stats": {},
+        "catalog_stats": {},
+        "geo_stats": {},
     }
 
-    # Check database and get pool stats
+    # Check database
     try:
         async with AsyncSessionLocal() as db:
             await db.execute(text("SELECT 1"))
         health_status["services"]["database"] = "healthy"
-        # Add connection pool statistics
-        try:
-            health_status["pool_stats"] = get_pool_stats()
-        except Exception:
-            pass  # Pool stats are optional
     except Exception as e:
         health_status["services"]["database"] = f"unhealthy: {str(e)[:50]}"
         health_status["status"] = "degraded"
 
+    # Connection pool and in-process statistics (available even when the DB is down);
+    # each one is guarded on its own so a failing stat does not hide the rest
+    try:
+        health_status["pool_stats"] = get_pool_stats()
+    except Exception as e:
+        logger.warning(f"Health stats pool_stats unavailable: {e}")
+
+    # Message handling
+    try:
+        from app.controllers.message_context import get_message_stats
+        health_status["message_stats"].update(get_message_stats())
+    except Exception as e:
+        logger.warning(f"Health stats message_context unavailable: {e}")
+    try:
+        from app.services.webhook_queue import webhook_queue
+        health_status["message_stats"]["webhook_queue"] = webhook_queue.get_stats()
+    except Exception as e:
+        logger.warning(f"Health stats webhook_queue unavailable: {e}")
+    try:
+        from app.services.phone_lock import phone_lock
+        health_status["message_stats"]["phone_lock"] = phone_lock.get_stats()
+    except Exception as e:
+        logger.warning(f"Health stats phone_lock unavailable: {e}")
+    try:
+        from app.services.whatsapp_service import whatsapp_service
+        health_status["message_stats"]["outbound"] = whatsapp_service.get_stats()
+    except Exception as e:
+        logger.warning(f"Health stats outbound unavailable: {e}")
+    try:
+        from app.services.interactive_cache import interactive_cache
+        health_status["message_stats"]["screens"] = interactive_cache.get_stats()
+    except Exception as e:
+        logger.warning(f"Health stats screens unavailable: {e}")
+    try:
+        from app.services.numbered_menu import numbered_menu_cache
+        health_status["message_stats"]["numbered_menus"] = numbered_menu_cache.get_stats()
+    except Exception as e:
+        logger.warning(f"Health stats numbered_menus unavailable: {e}")
+
+    # Catalog reads and invalidation
+    try:
+        from app.services.catalog_events import catalog_feed
+        health_status["catalog_stats"]["catalog_feed"] = catalog_feed.get_stats()
+    except Exception as e:
+        logger.warning(f"Health stats catalog_feed unavailable: {e}")
+    try:
+        from app.core.http_cache import public_response_cache
+        health_status["catalog_stats"]["public_cache"] = public_response_cache.get_stats()
+    except Exception as e:
+        logger.warning(f"Health stats public_cache unavailable: {e}")
+    try:
+        from app.services.restaurant_slugs import restaurant_slug_cache
+        health_status["catalog_stats"]["restaurant_slugs"] = restaurant_slug_cache.get_stats()
+    except Exception as e:
+        logger.warning(f"Health stats restaurant_slugs unavailable: {e}")
+    try:
+        from app.services.autocomplete import autocomplete_service
+        health_status["catalog_stats"]["autocomplete"] = autocomplete_service.get_stats()
+    except Exception as e:
+        logger.warning(f"Health stats autocomplete unavailable: {e}")
+
+    # Spatial lookups
+    try:
+        from app.services.geo_index import geo_index
+        health_status["geo_stats"] = geo_index.get_stats()
+    except Exception as e:
+        logger.warning(f"Health stats geo unavailable: {e}")
+
     # Check Redis
     try:
         from app.services.redis_service import redis_service
@@ -301,7 +437,7 @@ async def verify_webhook_root(
 
     return PlainTextResponse(content="Verification failed", status_code=403)
 
-from app.controllers.bot_controller import bot_controller
+from app.services.webhook_queue import webhook_queue
 
 @app.post("/webhook")
 async def handle_webhook_root(request: Request):
@@ -311,18 +447,8 @@ async def handle_webhook_root(request: Request):
         if settings.DEBUG:
             logger.debug(f"Webhook received: {body}")
 
-        entries = body.get("entry", [])
-        if entries:
-            entry = entries[0]
-            changes = entry.get("changes", [])
-            if changes:
-                value = changes[0].get("value", {})
-                messages = value.get("messages", [])
-                if messages:
-                    message = messages[0]
-                    phone_number = message.get("from")
-                    if phone_number:
-                        await bot_controller.handle_message(phone_number, message)
+        # Acknowledge now; workers handle every message/status in per-phone order
+        await webhook_queue.dispatch(body)
 
         return {"status": "received"}
     except Exception as e:
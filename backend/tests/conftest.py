@@ -0,0 +1,14 @@
+"""
+Shared pytest configuration.
+
+Settings are validated at import time, so provide safe defaults for the required
+values before any test module imports app.core.config. Every model is then
+registered, so mappers configure whichever test file runs first.
+"""
+import os
+
+os.environ.setdefault("POSTGRES_PASSWORD", "test-password")
+os.environ.setdefault("FIRST_SUPERUSER_PASSWORD", "Test-Superuser-Pass-9")
+os.environ.setdefault("SECRET_KEY", "test-secret-key-with-at-least-32-characters")
+
+import app.db.base  # noqa: E402,F401
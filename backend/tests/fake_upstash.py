@@ -0,0 +1,181 @@
+"""
+In-process stand-in for the Upstash Redis REST API.
+
+Serves POST /, /pipeline and /multi-exec through an httpx.MockTransport so
+RedisService can be exercised end to end without network access:
+
+    fake = FakeUpstash(latency=0.002)
+    service = RedisService(base_url=fake.url, token="test", transport=fake.transport)
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+class FakeUpstash:
+    url = "https://fake-upstash.test"
+
+    def __init__(self, latency: float = 0.0, token: str = "test"):
+        self.latency = latency
+        self.token = token
+        self.data: Dict[str, Any] = {}
+        self.expiry: Dict[str, float] = {}
+        self.requests: List[str] = []
+        self.transport = httpx.MockTransport(self._handle)
+
+    # ==================== HTTP ====================
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if request.headers.get("authorization") != f"Bearer {self.token}":
+            return httpx.Response(401, json={"error": "Unauthorized"})
+
+        body = httpx.Response(200, content=request.content).json()
+        path = request.url.path.rstrip("/")
+        if path == "":
+            return httpx.Response(200, json=self._run(body))
+        if path == "/pipeline":
+            return httpx.Response(200, json=[self._run(cmd) for cmd in body])
+        if path == "/multi-exec":
+            results = [self._run(cmd) for cmd in body]
+            return httpx.Response(200, json=results)
+        return httpx.Response(404, json={"error": "Not found"})
+
+    def _run(self, command: List[Any]) -> Dict[str, Any]:
+        try:
+            return {"result": self.execute(*command)}
+        except Exception as e:
+            return {"error": f"ERR {e}"}
+
+    # ==================== Commands ====================
+
+    def _alive(self, key: str) -> bool:
+        deadline = self.expiry.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.data
+
+    def execute(self, name: str, *args) -> Any:
+        handler = getattr(self, f"cmd_{name.lower().replace('.', '_')}", None)
+        if handler is None:
+            raise ValueError(f"unknown command '{name}'")
+        return handler(*args)
+
+    def cmd_ping(self):
+        return "PONG"
+
+    def cmd_get(self, key):
+        return self.data.get(key) if self._alive(key) else None
+
+    def cmd_set(self, key, value, *options):
+        options = [str(o).upper() for o in options]
+        if "NX" in options and self._alive(key):
+            return None
+        if "XX" in options and not self._alive(key):
+            return None
+        self.data[key] = str(value)
+        if "EX" in options:
+            self.expiry[key] = time.monotonic() + int(options[options.index("EX") + 1])
+        elif "KEEPTTL" not in options:
+            self.expiry.pop(key, None)
+        return "OK"
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    def cmd_expire(self, key, seconds):
+        if not self._alive(key):
+            return 0
+        self.expiry[key] = time.monotonic() + int(seconds)
+        return 1
+
+    def cmd_ttl(self, key):
+        if not self._alive(key):
+            return -2
+        deadline = self.expiry.get(key)
+        return -1 if deadline is None else int(deadline - time.monotonic())
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, 1)
+
+    def cmd_incrby(self, key, amount):
+        value = int(self.cmd_get(key) or 0) + int(amount)
+        self.data[key] = str(value)
+        return value
+
+    def _hash(self, key) -> Dict[str, str]:
+        if not self._alive(key):
+            self.data[key] = {}
+        return self.data[key]
+
+    def cmd_hset(self, key, *pairs):
+        h = self._hash(key)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in h
+            h[field] = str(value)
+        return added
+
+    def cmd_hget(self, key, field):
+        return self.data[key].get(field) if self._alive(key) else None
+
+    def cmd_hdel(self, key, *fields):
+        if not self._alive(key):
+            return 0
+        h = self.data[key]
+        removed = sum(1 for f in fields if h.pop(f, None) is not None)
+        if not h:
+            self.cmd_del(key)
+        return removed
+
+    def cmd_hincrby(self, key, field, amount):
+        h = self._hash(key)
+        value = int(h.get(field, 0)) + int(amount)
+        h[field] = str(value)
+        return value
+
+    def cmd_hgetall(self, key):
+        if not self._alive(key):
+            return []
+        flat: List[str] = []
+        for field, value in self.data[key].items():
+            flat.extend([field, value])
+        return flat
+
+    def cmd_hlen(self, key):
+        return len(self.data[key]) if self._alive(key) else 0
+
+    def _set(self, key) -> set:
+        if not self._alive(key):
+            self.data[key] = set()
+        return self.data[key]
+
+    def cmd_sadd(self, key, *members):
+        s = self._set(key)
+        added = len(set(map(str, members)) - s)
+        s.update(map(str, members))
+        return added
+
+    def cmd_scard(self, key):
+        return len(self.data[key]) if self._alive(key) else 0
+
+    def cmd_publish(self, channel, message):
+        return 0
+
+    def value(self, key: str) -> Optional[Any]:
+        """Direct access for assertions"""
+        return self.data.get(key) if self._alive(key) else None
@@ -0,0 +1,112 @@
+import pytest
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from app.services.autocomplete import AutocompleteIndex, AutocompleteService, Popularity, name_terms
+from app.services.catalog_service import CatalogService, build_snapshot
+
+
+def make_restaurant(id, name, name_ar, is_active=True):
+    return SimpleNamespace(
+        id=id, name=name, name_ar=name_ar, description=None, description_ar=None,
+        is_active=is_active, category_id=None,
+    )
+
+
+def make_item(id, name, name_ar=None, is_available=True):
+    return SimpleNamespace(
+        id=id, name=name, name_ar=name_ar, description=None, description_ar=None,
+        price=Decimal("5.00"), price_min=None, price_max=None, has_variants=False,
+        is_available=is_available, order=id, variants=[],
+    )
+
+
+def make_snapshot(version=0, extra_items=()):
+    restaurants = [
+        make_restaurant(1, "Shawarma House", "بيت الشاورما"),
+        make_restaurant(2, "Pizza Hut", "بيتزا هت"),
+        make_restaurant(3, "Closed Shawarma", "شاورما مغلق", is_active=False),
+    ]
+    category = SimpleNamespace(id=100, name="Main", name_ar=None, order=0)
+    items = [
+        (make_item(11, "Chicken Shawarma", "شاورما دجاج"), 1),
+        (make_item(12, "Meat Shawarma", "شاورمآ لحمة"), 1),
+        (make_item(13, "Pepsi", is_available=False), 1),
+        (make_item(21, "Pizza Margherita", "بيتزا مارغريتا"), 2),
+        (make_item(31, "Shawarma Plate", "صحن شاورما"), 3),
+        *extra_items,
+    ]
+    menus = {rid: SimpleNamespace(id=rid, restaurant_id=rid, is_active=True) for rid in (1, 2, 3)}
+    return build_snapshot(
+        version,
+        [(r, None) for r in restaurants],
+        [],
+        [(item, category, menus[rid]) for item, rid in items],
+    )
+
+
+class TestAutocompleteIndex:
+    """Unit tests for the sorted-array prefix index."""
+
+    def test_name_terms_start_at_each_word(self):
+        """Test every word start of the normalized name is indexed."""
+        assert name_terms("شاورمآ  لحمة") == (("شاورما لحمه", True), ("لحمه", False))
+        assert name_terms("بيت الشاورما") == (("بيت الشاورما", True), ("الشاورما", False), ("شاورما", False))
+        assert name_terms(None) == ()
+
+    def test_prefix_matches_both_languages_and_later_words(self):
+        """Test Arabic, English and mid-name prefixes; inactive / unavailable are skipped."""
+        index = AutocompleteIndex.from_snapshot(make_snapshot())
+
+        assert {(s["type"], s["id"]) for s in index.complete("شاورم")} == {("item", 11), ("item", 12), ("restaurant", 1)}
+        assert [s["id"] for s in index.complete("margh")] == [21]
+        assert [s["id"] for s in index.complete("PEP")] == []
+        assert index.complete("   ") == []
+
+    def test_ranked_by_whole_name_then_popularity(self):
+        """Test whole-name prefixes beat later-word matches, then order counts decide."""
+        popularity = Popularity(restaurants={1: 3}, items={12: 40, 11: 5})
+        index = AutocompleteIndex.from_snapshot(make_snapshot(), popularity)
+
+        assert [(s["type"], s["id"]) for s in index.complete("sha")] == [("restaurant", 1), ("item", 12), ("item", 11)]
+        assert [(s["type"], s["id"]) for s in index.complete("شاورما")] == [("item", 12), ("item", 11), ("restaurant", 1)]
+        assert len(index.complete("sha", limit=1)) == 1
+
+    def test_reindex_restaurant_replaces_its_names(self):
+        """Test an incremental update adds and removes only that restaurant's names."""
+        index = AutocompleteIndex.from_snapshot(make_snapshot())
+        assert index.complete("falafel") == []
+
+        updated = make_snapshot(1, extra_items=[(make_item(14, "Falafel Wrap", "فلافل"), 1)])
+        index.reindex_restaurant(updated, 1)
+        assert [s["id"] for s in index.complete("falafel")] == [14]
+
+        index.reindex_restaurant(make_snapshot(2), 1)
+        assert index.complete("falafel") == []
+        rebuilt = AutocompleteIndex.from_snapshot(make_snapshot(2))
+        assert {c: keys for c, keys in index.shards.items() if keys} == rebuilt.shards
+        assert {p: keys for p, keys in index.heads.items() if keys} == rebuilt.heads
+
+
+class TestAutocompleteService:
+    """Unit tests for keeping the index in step with catalog writes."""
+
+    @pytest.mark.asyncio
+    async def test_restaurant_write_patches_index(self):
+        """Test a restaurant write re-indexes incrementally without reloading popularity."""
+        catalog = CatalogService(ttl_seconds=300)
+        snapshots = [make_snapshot(0), make_snapshot(1, extra_items=[(make_item(22, "Pizza Pepperoni"), 2)])]
+        with patch("app.services.autocomplete.catalog_service", catalog):
+            service = AutocompleteService()
+            service._load_popularity = AsyncMock(return_value=Popularity(items={21: 2}))
+            with patch.object(catalog, "_load", AsyncMock(side_effect=snapshots)):
+                assert [s["id"] for s in await service.complete("pizza")] == [21, 2]
+
+                catalog.invalidate(2)
+                assert [s["id"] for s in await service.complete("pizza")] == [21, 2, 22]
+
+        stats = service.get_stats()
+        assert stats["full_builds"] == 1
+        assert stats["incremental_updates"] == 1
+        assert service._load_popularity.await_count == 1
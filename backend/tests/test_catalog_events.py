@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.services import catalog_events
+from app.services.catalog_events import CatalogFeed, PENDING_KEY, bump_catalog_version
+from app.services.catalog_service import CatalogService
+from app.services.redis_service import RedisService
+
+
+@pytest.fixture
+def catalog():
+    catalog = CatalogService(ttl_seconds=300)
+    with patch("app.services.catalog_events.catalog_service", catalog):
+        yield catalog
+
+
+def make_feed():
+    feed = CatalogFeed(redis=RedisService(base_url="", token=""), poll_seconds=0.01)
+    feed.sync_from_db = AsyncMock()
+    return feed
+
+
+class TestCatalogVersionBump:
+    """Unit tests for transactional catalog version bumps."""
+
+    @pytest.mark.asyncio
+    async def test_bump_is_an_upsert_recorded_on_the_session(self):
+        """Test the bump runs INSERT .. ON CONFLICT in the session and remembers the version."""
+        db = SimpleNamespace(execute=AsyncMock(return_value=SimpleNamespace(scalar_one=lambda: 7)), info={})
+
+        assert await bump_catalog_version(db, 5) == 7
+        assert await bump_catalog_version(db, None) == 7
+
+        sql = str(db.execute.call_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (restaurant_id) DO UPDATE" in sql
+        assert db.info[PENDING_KEY] == {5: 7, 0: 7}
+
+    def test_changes_applied_only_after_commit(self, catalog):
+        """Test commit applies pending versions and rollback discards them."""
+        with patch.object(catalog_events, "catalog_feed", make_feed()) as feed:
+            catalog_events._after_rollback(SimpleNamespace(info={PENDING_KEY: {5: 1}}))
+            assert catalog.version == 0
+
+            catalog_events._after_commit(SimpleNamespace(info={PENDING_KEY: {5: 1}}))
+
+        assert catalog.version == 1
+        assert feed.get_version(5) == 1
+
+
+class TestCatalogFeed:
+    """Unit tests for distributing catalog versions between nodes."""
+
+    def test_each_version_applied_once(self, catalog):
+        """Test repeats and older versions do not invalidate again."""
+        feed = make_feed()
+        seen = []
+        catalog.add_listener(seen.append)
+
+        feed.on_message('{"restaurant_id": 3, "version": 2}')
+        feed.on_message('{"restaurant_id": 3, "version": 2}')
+        feed.on_message('{"restaurant_id": 3, "version": 1}')
+        feed.on_message('{"restaurant_id": 0, "version": 1}')
+        feed.on_message("not json")
+
+        assert seen == [3, None]
+        stats = feed.get_stats()
+        assert (stats["received"], stats["applied"], stats["errors"]) == (5, 2, 1)
+
+    @pytest.mark.asyncio
+    async def test_commit_on_one_node_invalidates_the_other(self, catalog):
+        """Test a committed version is published and applied by a subscribed node."""
+        writer, reader = make_feed(), make_feed()
+        reader.redis = writer.redis
+        await reader.start()
+        await asyncio.sleep(0)
+
+        writer.on_commit({4: 9})
+        await writer.flush()
+        for _ in range(20):
+            if reader.get_version(4):
+                break
+            await asyncio.sleep(0.01)
+        await reader.stop()
+
+        assert reader.get_version(4) == 9
+        assert writer.get_stats()["published"] == 1
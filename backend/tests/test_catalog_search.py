@@ -0,0 +1,86 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.services import catalog_search
+from app.services.catalog_search import (
+    prefix_tsquery, encode_cursor, decode_cursor, restaurant_search_query, menu_item_search_query,
+)
+from app.core.text_normalize import normalize_arabic
+
+
+def sql(statement) -> str:
+    return str(statement.compile(dialect=asyncpg.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+class TestCatalogSearch:
+    """Unit tests for the Postgres search query builder."""
+
+    def test_prefix_tsquery_from_normalized_text(self):
+        """Test every token becomes a prefix term, after Arabic normalization."""
+        assert prefix_tsquery(normalize_arabic("شاورمآ دجاج")) == "شاورما:* & دجاج:*"
+        assert prefix_tsquery(normalize_arabic("Pizza  ١٢")) == "pizza:* & 12:*"
+        assert prefix_tsquery("!!") is None
+
+    def test_cursor_round_trip(self):
+        """Test a cursor decodes to the (rank, id) it was made from, junk is rejected."""
+        assert decode_cursor(encode_cursor(0.30000001192092896, 42)) == (0.30000001192092896, 42)
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_restaurant_query_uses_search_columns(self):
+        """Test the match goes through the tsvector and trigram columns, best rank first."""
+        query = sql(restaurant_search_query("برغر", limit=20, category_id=3))
+
+        assert "restaurant.search_vector @@ to_tsquery('simple'::regconfig, 'برغر:*')" in query
+        assert "'برغر' <% restaurant.search_name" in query
+        assert "ILIKE" not in query
+        assert "restaurant.category_id = 3" in query
+        assert "DESC, restaurant.id DESC" in query
+        assert query.rstrip().endswith("LIMIT 21")
+
+    def test_menu_item_keyset_page(self):
+        """Test a cursor adds a (rank, id) < (...) condition instead of an OFFSET."""
+        query = sql(menu_item_search_query("kebab", limit=30, cursor=encode_cursor(0.5, 900), restaurant_id=7))
+
+        assert "menuitem.id) < (0.5, 900)" in query
+        assert "menu.restaurant_id = 7" in query
+        assert "OFFSET" not in query
+
+    def test_filters_and_offset_applied_to_ranked_query(self):
+        """Test skip and the listing filters also narrow a text search."""
+        restaurants = sql(restaurant_search_query("برغر", limit=20, category="Burgers", is_active=False, offset=40))
+        items = sql(menu_item_search_query("kebab", limit=30, is_available=False, offset=30, category="Grill"))
+
+        assert "restaurant.is_active = false" in restaurants
+        assert "restaurant_category.name = 'Burgers'" in restaurants
+        assert restaurants.rstrip().endswith("LIMIT 21 OFFSET 40")
+        assert "menuitem.is_available = false" in items
+        assert "category.name = 'Grill'" in items
+        assert items.rstrip().endswith("LIMIT 31 OFFSET 30")
+
+    def test_ilike_fallback_without_search_columns(self):
+        """Test an unranked query never touches the generated columns or pg_trgm."""
+        restaurants = sql(restaurant_search_query("برغر", limit=20, category_id=3, ranked=False))
+        items = sql(menu_item_search_query("kebab", limit=30, cursor=encode_cursor(0.0, 900), ranked=False))
+
+        for query in (restaurants, items):
+            assert "search_name" not in query
+            assert "search_vector" not in query
+            assert "similarity" not in query
+        assert "restaurant.name_ar ILIKE '%برغر%'" in restaurants
+        assert "restaurant.category_id = 3" in restaurants
+        assert "menuitem.id) < (0.0, 900)" in items
+
+    @pytest.mark.asyncio
+    async def test_search_columns_detected_once(self, monkeypatch):
+        """Test the columns / pg_trgm lookup runs once and a miss selects the fallback."""
+        monkeypatch.setattr(catalog_search, "_columns_ready", None)
+        result = MagicMock()
+        result.scalar.return_value = False
+        db = AsyncMock()
+        db.execute.return_value = result
+
+        assert await catalog_search.search_columns_ready(db) is False
+        assert await catalog_search.search_columns_ready(db) is False
+        assert db.execute.await_count == 1
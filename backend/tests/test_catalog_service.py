@@ -0,0 +1,128 @@
+import pytest
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from app.services.catalog_service import CatalogService, build_snapshot
+
+
+def make_restaurant(id, name, name_ar=None, is_active=True, category_id=None):
+    return SimpleNamespace(
+        id=id, name=name, name_ar=name_ar, description=None, description_ar=None,
+        is_active=is_active, category_id=category_id,
+    )
+
+
+def make_item(id, name, name_ar=None, price=None, has_variants=False, price_min=None,
+              price_max=None, is_available=True, variants=None):
+    return SimpleNamespace(
+        id=id, name=name, name_ar=name_ar, description=None, description_ar=None,
+        price=price, price_min=price_min, price_max=price_max, has_variants=has_variants,
+        is_available=is_available, order=0, variants=variants or [],
+    )
+
+
+@pytest.fixture
+def snapshot():
+    shawarma_cat = SimpleNamespace(id=1, name="Shawarma", name_ar="شاورما", icon="🌯", order=0)
+    menu1 = SimpleNamespace(id=10, restaurant_id=1, is_active=True)
+    menu2 = SimpleNamespace(id=20, restaurant_id=2, is_active=True)
+    cat1 = SimpleNamespace(id=100, name="Sandwiches", name_ar="سندويش", order=0)
+    cat2 = SimpleNamespace(id=200, name="Drinks", name_ar="مشروبات", order=0)
+    variants = [
+        SimpleNamespace(id=7, name="Large", name_ar="كبير", price=Decimal("6.00"), order=1),
+        SimpleNamespace(id=6, name="Small", name_ar="صغير", price=Decimal("4.00"), order=0),
+    ]
+    return build_snapshot(
+        1,
+        [
+            (make_restaurant(1, "Ghasan", "غسان", category_id=1), shawarma_cat),
+            (make_restaurant(2, "Closed Cafe", is_active=False), None),
+        ],
+        [shawarma_cat],
+        [
+            (make_item(1001, "Chicken Shawarma", "شاورما دجاج", has_variants=True,
+                       price_min=Decimal("4.00"), price_max=Decimal("6.00"), variants=variants), cat1, menu1),
+            (make_item(1002, "Fries", "بطاطا", price=Decimal("2.50")), cat1, menu1),
+            (make_item(1003, "Pepsi", price=Decimal("1.00"), is_available=False), cat1, menu1),
+            (make_item(2001, "Coffee", price=Decimal("3.00")), cat2, menu2),
+        ],
+    )
+
+
+class TestCatalogSnapshot:
+    """Unit tests for the in-memory catalog snapshot."""
+
+    def test_product_line_format(self, snapshot):
+        """Test prompt lines match the legacy format."""
+        assert snapshot.product_lines[1001] == "- شاورما دجاج ($4.00-$6.00) @ غسان [ID:1001]"
+        assert snapshot.product_lines[1002] == "- بطاطا ($2.50) @ غسان [ID:1002]"
+
+    def test_unavailable_items_excluded(self, snapshot):
+        """Test unavailable items never reach the prompt."""
+        assert 1003 not in snapshot.product_lines
+        assert "Pepsi" not in snapshot.products_context(1)
+
+    def test_restaurant_fragment(self, snapshot):
+        """Test per-restaurant fragment contains only that restaurant's items."""
+        fragment = snapshot.products_context(restaurant_id=1)
+        assert "[ID:1001]" in fragment
+        assert "[ID:2001]" not in fragment
+
+    def test_keyword_filter_skips_inactive_restaurants(self, snapshot):
+        """Test keyword strategy matches names and ignores inactive restaurants."""
+        assert "[ID:1001]" in snapshot.products_context(query="بدي شاورما")
+        assert "[ID:2001]" not in snapshot.products_context(query="coffee")
+
+    def test_restaurants_and_categories_context(self, snapshot):
+        """Test restaurant and category prompt sections."""
+        assert snapshot.restaurants_context == "- غسان (ID:1) [Shawarma]"
+        assert snapshot.categories_context == "- Shawarma / شاورما"
+
+    def test_variants_sorted_by_order(self, snapshot):
+        """Test variants are stored in display order."""
+        assert [v["id"] for v in snapshot.items[1001]["variants"]] == [6, 7]
+
+
+class TestCatalogService:
+    """Unit tests for snapshot caching and invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_cached_until_invalidated(self, snapshot):
+        """Test the DB is hit once per version."""
+        service = CatalogService(ttl_seconds=300)
+        with patch.object(service, "_load", AsyncMock(return_value=snapshot)) as load:
+            await service.get_snapshot()
+            await service.get_snapshot()
+            assert load.await_count == 1
+
+            service.invalidate(1)
+            await service.get_snapshot()
+            assert load.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_rebuild_serves_last_snapshot(self, snapshot):
+        """Test a DB error keeps serving the previous snapshot."""
+        service = CatalogService(ttl_seconds=300)
+        with patch.object(service, "_load", AsyncMock(return_value=snapshot)):
+            await service.get_snapshot()
+
+        service.invalidate()
+        with patch.object(service, "_load", AsyncMock(side_effect=RuntimeError("db down"))):
+            assert await service.get_snapshot() is snapshot
+
+    @pytest.mark.asyncio
+    async def test_ttl_rebuild_bumps_version(self, snapshot):
+        """Test an expired snapshot is reloaded under a new version and listeners hear of it."""
+        service = CatalogService(ttl_seconds=300)
+        changed = []
+        service.add_listener(changed.append)
+        with patch.object(service, "_load", AsyncMock(return_value=snapshot)) as load:
+            await service.get_snapshot()
+            version = service.version
+            snapshot.built_at -= 301
+            await service.get_snapshot()
+
+        assert load.await_count == 2
+        assert load.call_args.args == (version + 1,)
+        assert changed == [None]
@@ -0,0 +1,106 @@
+import itertools
+import json
+import random
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.dispatch_service import (
+    DispatchService, PendingOrder, hungarian, max_score_assignment, plan_dispatch,
+)
+import app.db.base  # noqa: F401  (registers every model, so the mappers configure)
+from app.models.order import OrderStatus
+from app.services.driver_assignment_service import DriverAssignmentService
+
+BEIRUT = (33.8938, 35.5018)
+
+
+def driver(driver_id: int, lat: float, lng: float, rating: float = 4.5):
+    return SimpleNamespace(id=driver_id, last_latitude=lat, last_longitude=lng, average_rating=rating)
+
+
+class TestAssignmentSolver:
+    """Unit tests for the Hungarian solver."""
+
+    def test_hungarian_matches_brute_force(self):
+        """Test the solver finds the minimum total cost on random rectangular matrices."""
+        rng = random.Random(3)
+        for rows, columns in ((3, 3), (3, 5), (4, 6), (5, 5)):
+            cost = [[rng.randint(0, 50) for _ in range(columns)] for _ in range(rows)]
+            assignment = hungarian(cost)
+            best = min(
+                sum(cost[i][j] for i, j in enumerate(perm))
+                for perm in itertools.permutations(range(columns), rows)
+            )
+            assert len(set(assignment)) == rows
+            assert sum(cost[i][j] for i, j in enumerate(assignment)) == best
+
+    def test_serves_more_orders_before_higher_scores(self):
+        """Test the greedy trap: the best single pair is given up so both orders get a driver."""
+        scores = [
+            [90.0, 80.0],  # order 0 is fine with either driver
+            [85.0, 0.0],   # order 1 can only use driver 0
+        ]
+        assert sorted(max_score_assignment(scores)) == [(0, 1), (1, 0)]
+
+    def test_more_orders_than_drivers(self):
+        """Test a tall matrix leaves the worst order unmatched, never a zero-score pair."""
+        scores = [[50.0], [70.0], [0.0]]
+        assert max_score_assignment(scores) == [(1, 0)]
+
+
+class TestPlanDispatch:
+    """Unit tests for the batch dispatch planner."""
+
+    @pytest.fixture
+    def service(self):
+        return DriverAssignmentService(db=None)
+
+    def test_plan_beats_greedy_order_by_order(self, service):
+        """Test the first order no longer takes the only driver the second order can reach."""
+        orders = [
+            PendingOrder(1, 33.8938, 35.5018),   # Beirut: both drivers in range
+            PendingOrder(2, 33.8200, 35.5900),   # south-east: only driver 20 in range
+        ]
+        # One free slot each (2 of 3 orders already carried)
+        drivers = [
+            (driver(10, 33.9500, 35.5200), 2, 0),   # ~6.5 km from order 1, out of range of order 2
+            (driver(20, 33.8700, 35.5400), 2, 0),   # closest to order 1 as well
+        ]
+        plan = {order.order_id: assigned.id for order, assigned, _ in plan_dispatch(service, orders, drivers)}
+        assert plan == {1: 10, 2: 20}
+
+    def test_free_capacity_is_split_into_slots(self, service):
+        """Test a driver takes up to its free capacity, and at capacity takes nothing."""
+        orders = [PendingOrder(i, *BEIRUT) for i in range(1, 4)]
+        drivers = [
+            (driver(10, 33.8950, 35.5020), 1, 0),   # 2 free slots
+            (driver(20, 33.8940, 35.5019), 3, 0),   # at capacity
+        ]
+        plan = plan_dispatch(service, orders, drivers)
+        assert [assigned.id for _, assigned, _ in plan] == [10, 10]
+        first, second = sorted((score for _, _, score in plan), reverse=True)
+        assert first > second > 0
+
+    @pytest.mark.asyncio
+    async def test_run_round_assigns_and_commits_once(self):
+        """Test a round loads everything in bulk, sets driver ids, audits each one and commits once."""
+        db = MagicMock()
+        db.commit = AsyncMock()
+        db.flush = AsyncMock()
+        dispatch = DispatchService(db)
+        orders = [SimpleNamespace(id=i, total_amount=40, driver_id=None, status=OrderStatus.PREPARING) for i in (1, 2)]
+        candidates = [(driver(10, 33.8950, 35.5020), 0, 0, 0.1), (driver(20, 33.9000, 35.5100), 0, 0, 1.0)]
+
+        with patch.object(dispatch, "pending_orders", AsyncMock(return_value=orders)), \
+                patch.object(dispatch.assigner, "get_pickup_points",
+                             AsyncMock(return_value={1: BEIRUT, 2: (33.9010, 35.5110)})), \
+                patch.object(dispatch.assigner, "get_candidates", AsyncMock(return_value=candidates)) as lookup:
+            assignments = await dispatch.run_round()
+
+        assert sorted(assignments) == [(1, 10), (2, 20)]
+        assert [order.driver_id for order in orders] == [10, 20]
+        assert lookup.await_count == 1
+        audits = [call.args[0] for call in db.add.call_args_list]
+        assert [(audit.entity_id, json.loads(audit.new_values)["driver_id"]) for audit in audits] == [(1, 10), (2, 20)]
+        db.commit.assert_awaited_once()
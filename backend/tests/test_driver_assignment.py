@@ -1,8 +1,10 @@
 import pytest
-from unittest.mock import AsyncMock, MagicMock
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime
 
 from app.services.driver_assignment_service import DriverAssignmentService
+from app.services.geo_index import geo_index
 
 
 class TestDriverAssignmentService:
@@ -56,7 +58,7 @@ class TestDriverAssignmentService:
 
         # Mock active orders count
         mock_result = MagicMock()
-        mock_result.scalar.return_value = 0
+        mock_result.one.return_value = (0, 0)
         mock_db.execute = AsyncMock(return_value=mock_result)
 
         score = await service._calculate_driver_score(
@@ -81,7 +83,7 @@ class TestDriverAssignmentService:
 
         # Mock: No active orders, no deliveries today
         mock_result = MagicMock()
-        mock_result.scalar.return_value = 0
+        mock_result.one.return_value = (0, 0)
         mock_db.execute = AsyncMock(return_value=mock_result)
 
         score = await service._calculate_driver_score(
@@ -106,7 +108,7 @@ class TestDriverAssignmentService:
 
         # Mock: 3 active orders (at capacity)
         mock_result = MagicMock()
-        mock_result.scalar.return_value = 3  # MAX_ACTIVE_ORDERS_PER_DRIVER
+        mock_result.one.return_value = (3, 0)  # MAX_ACTIVE_ORDERS_PER_DRIVER
         mock_db.execute = AsyncMock(return_value=mock_result)
 
         score = await service._calculate_driver_score(
@@ -129,7 +131,7 @@ class TestDriverAssignmentService:
         mock_driver.id = 1
 
         mock_result = MagicMock()
-        mock_result.scalar.return_value = 0
+        mock_result.one.return_value = (0, 0)
         mock_db.execute = AsyncMock(return_value=mock_result)
 
         normal_score = await service._calculate_driver_score(
@@ -152,6 +154,48 @@ class TestDriverAssignmentService:
         assert urgent_score == pytest.approx(normal_score * 1.2, rel=0.01)
 
 
+class TestSetBasedScoring:
+    """Test candidates are scored together from one workload query."""
+
+    @pytest.fixture
+    def service(self):
+        return DriverAssignmentService(AsyncMock())
+
+    def test_score_candidates_matches_single_driver_scoring(self, service):
+        """Test column scoring gives the per-driver formula, 0 when too far or at capacity."""
+        scores = service.score_candidates(
+            distances=[1.0, 12.0, 2.0, 0.0],
+            ratings=[5.0, 5.0, None, 4.0],
+            active_orders=[0, 0, 3, 1],
+            today_deliveries=[0, 0, 0, 4],
+        )
+        assert scores[0] == pytest.approx(90 * 0.4 + 100 * 0.25 + 100 * 0.2 + 100 * 0.15)
+        assert scores[1] == 0 and scores[2] == 0
+        assert scores[3] == pytest.approx(100 * 0.4 + 80 * 0.25 + (100 - 100 / 3) * 0.2 + 80 * 0.15)
+
+    @pytest.mark.asyncio
+    async def test_find_best_driver_uses_one_candidate_query(self, service):
+        """Test no per-driver COUNT queries run, and the best score wins over the nearest."""
+        busy = SimpleNamespace(id=1, average_rating=4.0)
+        free = SimpleNamespace(id=2, average_rating=4.8)
+        candidates = [(busy, 2, 15, 0.5), (free, 0, 1, 3.0)]
+
+        with patch.object(geo_index, "driver_candidates", AsyncMock(return_value=candidates)) as lookup:
+            best = await service.find_best_driver(33.8938, 35.5018, order_value=50)
+
+        assert best is free
+        assert lookup.await_count == 1
+        assert "today_deliveries" in str(lookup.call_args.kwargs["query"])
+        service.db.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_find_best_driver_none_when_all_at_capacity(self, service):
+        """Test candidates that are all at capacity yield no driver."""
+        candidates = [(SimpleNamespace(id=1, average_rating=5.0), 3, 0, 0.2)]
+        with patch.object(geo_index, "driver_candidates", AsyncMock(return_value=candidates)):
+            assert await service.find_best_driver(33.8938, 35.5018) is None
+
+
 class TestDriverAssignmentWeights:
     """Test the scoring weight configuration."""
 
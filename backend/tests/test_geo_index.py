@@ -0,0 +1,107 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects.postgresql import asyncpg
+
+import app.db.base  # noqa: F401  (registers every model, so the mappers configure)
+from app.models.user import User
+from app.services.geo_index import (
+    GeoIndex, DRIVER_POSITIONS_KEY, POSTGIS, EARTHDISTANCE, haversine_km, bounding_box, spatial_terms,
+)
+from app.services.redis_service import RedisService
+
+BEIRUT = (33.8938, 35.5018)
+
+
+def sql(clause) -> str:
+    return str(clause.compile(dialect=asyncpg.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def rows_result(entities):
+    result = MagicMock()
+    result.all.return_value = [(entity,) for entity in entities]
+    return result
+
+
+@pytest.fixture
+def geo():
+    return GeoIndex(redis=RedisService(base_url="", token=""))
+
+
+class TestGeoIndex:
+    """Unit tests for the driver / branch geospatial lookups."""
+
+    def test_bounding_box_encloses_radius(self):
+        """Test points on the circle edge fall inside the box, and the box is not much larger."""
+        min_lat, max_lat, min_lng, max_lng = bounding_box(*BEIRUT, 5)
+        assert haversine_km(*BEIRUT, max_lat, BEIRUT[1]) == pytest.approx(5, rel=1e-6)
+        assert haversine_km(*BEIRUT, BEIRUT[0], max_lng) == pytest.approx(5, rel=1e-3)
+        assert min_lat < BEIRUT[0] < max_lat and min_lng < BEIRUT[1] < max_lng
+
+    def test_spatial_sql_matches_index_expressions(self):
+        """Test radius filters use the indexed expressions and the partial index predicate."""
+        _, within, nearest = spatial_terms(EARTHDISTANCE, User.last_latitude, User.last_longitude, *BEIRUT, 5)
+        assert "earth_box(ll_to_earth(33.8938, 35.5018), 5000.0) @> " \
+               "ll_to_earth(\"user\".last_latitude, \"user\".last_longitude)" in sql(within)
+        assert '"user".last_latitude IS NOT NULL' in sql(within)
+        assert sql(nearest).startswith('ll_to_earth("user".last_latitude, "user".last_longitude) <->')
+
+        _, within, _ = spatial_terms(POSTGIS, User.last_latitude, User.last_longitude, *BEIRUT, 5)
+        assert 'ST_DWithin(CAST(ST_SetSRID(ST_MakePoint("user".last_longitude, "user".last_latitude), 4326) ' \
+               'AS geography)' in sql(within)
+
+    @pytest.mark.asyncio
+    async def test_live_search_returns_fresh_drivers_nearest_first(self, geo):
+        """Test GEOSEARCH answers only drivers in the radius, and stale positions are pruned."""
+        await geo.update_driver_position(1, 33.9000, 35.5100)   # ~1 km
+        await geo.update_driver_position(2, 33.8940, 35.5020)   # ~0 km
+        await geo.update_driver_position(3, 34.4367, 35.8497)   # Tripoli, ~70 km
+        await geo.update_driver_position(4, 33.8950, 35.5030)
+        await geo._redis.delete("driver_location:4")            # position expired
+
+        nearby = await geo.nearby_live_drivers(*BEIRUT, radius_km=5)
+
+        assert [driver_id for driver_id, _ in nearby] == [2, 1]
+        assert nearby[1][1] == pytest.approx(haversine_km(*BEIRUT, 33.9000, 35.5100), rel=1e-3)
+        assert await geo._redis._execute("ZCARD", DRIVER_POSITIONS_KEY) == 3
+        assert geo.get_stats()["stale_pruned"] == 1
+
+    @pytest.mark.asyncio
+    async def test_candidates_fall_back_to_bounding_box_query(self, geo):
+        """Test without live positions or a spatial extension, SQL rows are trimmed to the radius."""
+        geo.backend, geo._detected = None, True
+        near = SimpleNamespace(id=1, last_latitude=33.9000, last_longitude=35.5100)
+        corner = SimpleNamespace(id=2, last_latitude=33.9250, last_longitude=35.5400)  # inside the 4 km box, ~5 km away
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=rows_result([corner, near]))
+
+        candidates = await geo.driver_candidates(db, *BEIRUT, radius_km=4)
+
+        assert [(driver.id, round(km, 2)) for driver, km in candidates] == [(1, 1.02)]
+        query = sql(db.execute.call_args.args[0])
+        assert '"user".last_latitude BETWEEN' in query and '"user".last_longitude BETWEEN' in query
+
+    @pytest.mark.asyncio
+    async def test_candidates_merge_live_and_persisted(self, geo):
+        """Test live drivers win over their stored coordinates, others are found by them, limit applies last."""
+        geo.backend, geo._detected = None, True
+        await geo.update_driver_position(7, 33.8960, 35.5050)
+        await geo.update_driver_position(8, 33.8940, 35.5020)
+        await geo.update_driver_position(9, 33.8945, 35.5025)
+        await geo.update_driver_position(10, 34.4367, 35.8497)  # reporting from Tripoli
+        live = [SimpleNamespace(id=7), SimpleNamespace(id=8)]  # 9 went inactive
+        stored = [
+            SimpleNamespace(id=8, last_latitude=33.9000, last_longitude=35.5100),
+            SimpleNamespace(id=10, last_latitude=33.8939, last_longitude=35.5019),  # stale row
+            SimpleNamespace(id=11, last_latitude=33.8950, last_longitude=35.5030),  # no live position
+        ]
+        db = MagicMock()
+        db.execute = AsyncMock(side_effect=[rows_result(live), rows_result(stored)])
+
+        candidates = await geo.driver_candidates(db, *BEIRUT, radius_km=2)
+
+        assert [driver.id for driver, _ in candidates] == [8, 11, 7]
+        assert '"user".id IN (8, 9, 7)' in sql(db.execute.call_args_list[0].args[0])
+
+        db.execute = AsyncMock(side_effect=[rows_result(live), rows_result(stored)])
+        assert [driver.id for driver, _ in await geo.driver_candidates(db, *BEIRUT, radius_km=2, limit=2)] == [8, 11]
@@ -0,0 +1,103 @@
+import pytest
+from unittest.mock import patch
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.core.http_cache import PublicResponseCache, etag_matches
+from app.services.catalog_events import CatalogFeed
+from app.services.redis_service import RedisService
+
+
+@pytest.fixture
+def feed():
+    feed = CatalogFeed(redis=RedisService(base_url="", token=""))
+    with patch("app.core.http_cache.catalog_feed", feed):
+        yield feed
+
+
+@pytest.fixture
+def client(feed):
+    cache = PublicResponseCache(max_age=60)
+    app = FastAPI()
+    app.state.renders = 0
+
+    @app.get("/restaurants/{restaurant_id}/menu")
+    async def menu(request: Request, restaurant_id: int):
+        async def render():
+            if restaurant_id == 404:
+                raise HTTPException(status_code=404, detail="Restaurant not found")
+            app.state.renders += 1
+            return {"restaurant_id": restaurant_id, "name": "غسان", "render": app.state.renders}
+        return await cache.respond(request, render, restaurant_id)
+
+    @app.get("/restaurants/")
+    async def restaurants(request: Request):
+        async def render():
+            app.state.renders += 1
+            return {"restaurants": [], "render": app.state.renders}
+        return await cache.respond(request, render)
+
+    client = TestClient(app)
+    client.cache = cache
+    return client
+
+
+class TestPublicResponseCache:
+    """Unit tests for ETag / 304 caching of public catalog responses."""
+
+    def test_etag_and_cache_control_then_304(self, client):
+        """Test the first hit renders, a conditional repeat gets 304 without rendering."""
+        first = client.get("/restaurants/1/menu")
+        etag = first.headers["etag"]
+
+        assert first.status_code == 200
+        assert first.json()["name"] == "غسان"
+        assert etag.startswith('"') and not etag.startswith("W/")
+        assert first.headers["cache-control"].startswith("public, max-age=60")
+
+        second = client.get("/restaurants/1/menu", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.headers["etag"] == etag
+        assert client.cache.get_stats() == {"hits": 1, "misses": 1, "bypassed": 0, "not_modified": 1, "responses": 1}
+
+    def test_catalog_write_changes_key(self, client, feed):
+        """Test a newer version of the restaurant re-renders; other restaurants stay cached."""
+        old = client.get("/restaurants/1/menu").headers["etag"]
+        client.get("/restaurants/2/menu")
+
+        feed.versions[1] = 3
+
+        fresh = client.get("/restaurants/1/menu", headers={"If-None-Match": old})
+        assert fresh.status_code == 200 and fresh.json()["render"] == 3
+        assert client.get("/restaurants/2/menu").json()["render"] == 2
+
+        # List routes depend on every restaurant
+        client.get("/restaurants/")
+        feed.versions[2] = 1
+        assert client.get("/restaurants/").json()["render"] == 5
+
+    def test_query_order_normalized_and_errors_not_cached(self, client):
+        """Test reordered query params share an entry and 404s are rendered each time."""
+        client.get("/restaurants/?sort=name&limit=5")
+        assert client.get("/restaurants/?limit=5&sort=name").json()["render"] == 1
+
+        assert client.get("/restaurants/404/menu").status_code == 404
+        assert client.get("/restaurants/404/menu").status_code == 404
+        assert client.cache.get_stats()["responses"] == 1
+
+    def test_search_requests_not_stored(self, client):
+        """Test free-text searches render every time and never take an LRU slot."""
+        assert client.get("/restaurants/?search=piz").json()["render"] == 1
+        assert client.get("/restaurants/?search=piz").json()["render"] == 2
+        assert client.get("/restaurants/?search=").json()["render"] == 3
+
+        stats = client.cache.get_stats()
+        assert (stats["bypassed"], stats["misses"], stats["responses"]) == (2, 1, 1)
+
+    def test_if_none_match_parsing(self):
+        """Test lists, weak validators and * are honored."""
+        assert etag_matches('"a", W/"b"', '"b"')
+        assert etag_matches("*", '"b"')
+        assert not etag_matches('"a"', '"b"')
+        assert not etag_matches(None, '"b"')
@@ -0,0 +1,116 @@
+import json
+import pytest
+from unittest.mock import patch
+
+import httpx
+
+from app.services.catalog_service import CatalogService
+from app.services.interactive_cache import InteractiveCache
+from app.services.whatsapp_service import WhatsAppService, interactive_list
+
+
+def screen(title="Restaurants"):
+    return interactive_list("Pick one", "View", [{"title": title, "rows": [{"id": "rest_1", "title": "غسان", "description": ""}]}])
+
+
+def make_renderer(calls, restaurant_id=None, meta=None):
+    async def render():
+        calls.append(1)
+        return screen(), restaurant_id, meta or {}
+    return render
+
+
+@pytest.fixture
+def catalog():
+    catalog = CatalogService(ttl_seconds=300)
+    with patch("app.services.interactive_cache.catalog_service", catalog):
+        yield catalog
+
+
+class TestInteractiveCache:
+    """Unit tests for the pre-rendered browsing screen cache."""
+
+    @pytest.mark.asyncio
+    async def test_second_tap_served_from_cache(self, catalog):
+        """Test a screen renders once and later taps reuse the serialized body."""
+        cache = InteractiveCache()
+        calls = []
+
+        first = await cache.get_or_render(("restaurants", None, 0, "ar"), make_renderer(calls))
+        second = await cache.get_or_render(("restaurants", None, 0, "ar"), make_renderer(calls))
+
+        assert second is first and len(calls) == 1
+        assert json.loads(first.body) == screen()
+        assert cache.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_restaurant_write_drops_its_screens_and_global_lists(self, catalog):
+        """Test invalidating one restaurant keeps other restaurants' screens."""
+        cache = InteractiveCache()
+        calls = []
+        await cache.get_or_render(("restaurants", None, 0, "ar"), make_renderer(calls))
+        await cache.get_or_render(("categories", 1, 0, "ar"), make_renderer(calls, 1))
+        await cache.get_or_render(("categories", 2, 0, "ar"), make_renderer(calls, 2))
+
+        catalog.invalidate(1)
+
+        assert cache.get(("restaurants", None, 0, "ar")) is None
+        assert cache.get(("categories", 1, 0, "ar")) is None
+        assert cache.get(("categories", 2, 0, "ar")) is not None
+
+    @pytest.mark.asyncio
+    async def test_write_during_render_not_cached(self, catalog):
+        """Test a screen rendered across a catalog write is sent but not kept."""
+        cache = InteractiveCache()
+
+        async def render():
+            catalog.invalidate(1)
+            return screen(), 1, {"restaurant_name": "Ghasan"}
+
+        payload = await cache.get_or_render(("categories", 1, 0, "en"), render)
+
+        assert payload.meta == {"restaurant_name": "Ghasan"}
+        assert cache.get(("categories", 1, 0, "en")) is None
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_show_not_cached(self, catalog):
+        """Test a renderer returning None (user already answered) caches nothing."""
+        cache = InteractiveCache()
+
+        async def render():
+            return None
+
+        assert await cache.get_or_render(("menu_items", 5, 0, "ar"), render) is None
+        assert cache.get_stats()["screens"] == 0
+
+    @pytest.mark.asyncio
+    async def test_expired_screen_rerendered(self, catalog):
+        """Test entries older than the TTL are rendered again."""
+        cache = InteractiveCache(ttl_seconds=0)
+        calls = []
+        await cache.get_or_render(("restaurants", None, 0, "ar"), make_renderer(calls))
+        await cache.get_or_render(("restaurants", None, 0, "ar"), make_renderer(calls))
+
+        assert len(calls) == 2
+
+
+class TestSendInteractivePayload:
+    """Unit tests for sending a pre-serialized interactive body."""
+
+    @pytest.mark.asyncio
+    async def test_matches_send_interactive_list(self, catalog):
+        """Test the cached send posts the same message as send_interactive_list."""
+        bodies = []
+
+        def handler(request):
+            bodies.append(json.loads(request.content))
+            return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+
+        service = WhatsAppService(api_token="token", phone_number_id="1", transport=httpx.MockTransport(handler))
+        payload = await InteractiveCache().get_or_render(("restaurants", None, 0, "ar"), make_renderer([]))
+
+        await service.send_interactive_list("+961", "Pick one", "View", screen()["action"]["sections"])
+        await service.send_interactive_payload("+961", payload.body)
+        await service.close()
+
+        assert bodies[0] == bodies[1]
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+
+from app.core.exceptions import AIServiceError
+from app.services.llm_service import (
+    LLMExecutor, FakeLLMBackend, LLMTimeoutError, LLMOverloadedError, LLMBackend
+)
+
+
+class TestLLMExecutor:
+    """Unit tests for the async LLM execution layer."""
+
+    @pytest.mark.asyncio
+    async def test_generate_returns_backend_text(self):
+        """Test dict responses are serialized to JSON text."""
+        executor = LLMExecutor(FakeLLMBackend(response={"intent": "greeting"}))
+
+        text = await executor.generate("hello")
+
+        assert '"intent": "greeting"' in text
+        assert executor.get_stats()["completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self):
+        """Test no more than max_concurrency calls run at once."""
+        backend = FakeLLMBackend(latency=0.02)
+        executor = LLMExecutor(backend, max_concurrency=3, timeout=1, queue_timeout=1)
+
+        await asyncio.gather(*[executor.generate("x") for _ in range(10)])
+
+        assert backend.calls == 10
+        assert backend.peak_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_timeout_raises(self):
+        """Test slow calls are cancelled with LLMTimeoutError."""
+        backend = FakeLLMBackend(latency=1.0)
+        executor = LLMExecutor(backend, timeout=0.05)
+
+        with pytest.raises(LLMTimeoutError):
+            await executor.generate("x")
+
+        assert backend.in_flight == 0
+        assert executor.get_stats()["timeouts"] == 1
+        assert executor.get_stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_overloaded_when_queue_wait_exceeded(self):
+        """Test callers are rejected when no slot frees up in time."""
+        executor = LLMExecutor(FakeLLMBackend(latency=0.2), max_concurrency=1, timeout=1, queue_timeout=0.01)
+
+        results = await asyncio.gather(
+            executor.generate("a"), executor.generate("b"), return_exceptions=True
+        )
+
+        assert any(isinstance(r, LLMOverloadedError) for r in results)
+        assert executor.get_stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_backend_error_wrapped(self):
+        """Test backend exceptions surface as AIServiceError."""
+        class BrokenBackend(LLMBackend):
+            name = "broken"
+
+            async def generate(self, prompt, temperature, json_mode, timeout):
+                raise RuntimeError("boom")
+
+        executor = LLMExecutor(BrokenBackend())
+
+        with pytest.raises(AIServiceError):
+            await executor.generate("x")
+
+    @pytest.mark.asyncio
+    async def test_no_backend(self):
+        """Test disabled AI raises instead of hanging."""
+        executor = LLMExecutor(None)
+
+        assert not executor.available
+        with pytest.raises(AIServiceError):
+            await executor.generate("x")
+
+    def test_backend_must_implement_generate(self):
+        """Test a backend without generate() cannot be instantiated."""
+        class Incomplete(LLMBackend):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
@@ -0,0 +1,137 @@
+import pytest
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.catalog_service import CatalogService, build_snapshot
+from app.services.menu_matcher import MenuMatcher, MenuMatcherCache
+
+
+def make_item(id, name, name_ar=None, price=None, has_variants=False, is_available=True, variants=None):
+    return SimpleNamespace(
+        id=id, name=name, name_ar=name_ar, description=None, description_ar=None,
+        price=price, price_min=None, price_max=None, has_variants=has_variants,
+        is_available=is_available, order=id, variants=variants or [],
+    )
+
+
+def make_snapshot(version=0):
+    restaurant = SimpleNamespace(
+        id=1, name="Ghasan", name_ar="غسان", description=None, description_ar=None,
+        is_active=True, category_id=None,
+    )
+    menu = SimpleNamespace(id=10, restaurant_id=1, is_active=True)
+    category = SimpleNamespace(id=100, name="Main", name_ar=None, order=0)
+    variants = [
+        SimpleNamespace(id=51, name="Small", name_ar="صغير", price=Decimal("4.00"), order=0),
+        SimpleNamespace(id=52, name="Large", name_ar="كبير", price=Decimal("6.00"), order=1),
+    ]
+    items = [
+        make_item(1, "Chicken Shawarma", "شاورما دجاج", has_variants=True, variants=variants),
+        make_item(2, "Meat Shawarma", "شاورما لحمة", price=Decimal("5.00")),
+        make_item(3, "Fries", "بطاطا", price=Decimal("2.50")),
+        make_item(4, "Pepsi", price=Decimal("1.00"), is_available=False),
+    ]
+    return build_snapshot(version, [(restaurant, None)], [], [(i, category, menu) for i in items])
+
+
+@pytest.fixture
+def matcher():
+    return MenuMatcher.from_snapshot(make_snapshot(), 1)
+
+
+class TestMenuMatcher:
+    """Unit tests for the precompiled per-restaurant matcher."""
+
+    def test_exact_arabic_and_english(self, matcher):
+        """Test both names of an item resolve exactly."""
+        assert matcher.find_item("بطاطا")["id"] == 3
+        assert matcher.find_item("fries")["id"] == 3
+
+    def test_partial_prefers_shared_tokens(self, matcher):
+        """Test substring matches are ranked by shared tokens."""
+        assert matcher.find_item("شاورما لحمه حاره")["id"] == 2
+
+    def test_size_maps_to_variant(self, matcher):
+        """Test size keywords resolve to precomputed variants."""
+        item, variant = matcher.match("شاورما دجاج", "large")
+        assert item["id"] == 1
+        assert variant["id"] == 52
+
+    def test_unavailable_item_not_matched(self, matcher):
+        """Test unavailable items are not indexed."""
+        assert matcher.find_item("pepsi") is None
+
+
+class TestMenuMatcherCache:
+    """Unit tests for matcher caching and invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_cached_until_restaurant_invalidated(self):
+        """Test matchers are reused and rebuilt after a menu edit."""
+        catalog = CatalogService(ttl_seconds=300)
+        with patch("app.services.menu_matcher.catalog_service", catalog), \
+                patch.object(catalog, "_load", AsyncMock(side_effect=lambda v: make_snapshot(v))):
+            cache = MenuMatcherCache()
+            first = await cache.get(1)
+            assert await cache.get(1) is first
+
+            catalog.invalidate(2)
+            assert await cache.get(1) is first
+
+            catalog.invalidate(1)
+            rebuilt = await cache.get(1)
+
+        assert rebuilt is not first
+        assert rebuilt.version == catalog.version
+        assert cache.get_stats()["builds"] == 2
+
+
+    @pytest.mark.asyncio
+    async def test_db_fallback_without_snapshot(self):
+        """Test a restaurant-only matcher is read from the DB while the snapshot can't be built."""
+        catalog = CatalogService(ttl_seconds=300)
+
+        async def load(version, restaurant_id=None, with_items=True):
+            if restaurant_id is None:
+                raise RuntimeError("snapshot build failed")
+            return make_snapshot(version)
+
+        with patch("app.services.menu_matcher.catalog_service", catalog), \
+                patch.object(catalog, "_load", AsyncMock(side_effect=load)) as loader:
+            cache = MenuMatcherCache()
+            matcher = await cache.get(1)
+
+        assert matcher.find_item("بطاطا")["id"] == 3
+        assert loader.await_args.args[1:] == (1, True)
+        assert cache.get_stats()["db_fallbacks"] == 1 and cache.get_stats()["restaurants"] == 0
+
+
+class TestMatchMenuItems:
+    """Unit tests for AIService._match_menu_items on the cached matcher."""
+
+    @pytest.mark.asyncio
+    async def test_multi_item_order_without_db(self, matcher):
+        """Test a multi-item order resolves with zero DB sessions."""
+        from app.services.ai_service import AIService
+
+        service = AIService(backend=None)
+        session_factory = MagicMock(side_effect=AssertionError("DB should not be used"))
+        with patch("app.services.ai_service.menu_matcher_cache.get", AsyncMock(return_value=matcher)), \
+                patch("app.services.ai_service.AsyncSessionLocal", session_factory):
+            result = await service._match_menu_items(
+                {"items": [
+                    {"name": "شاورما دجاج كبير", "quantity": 2},
+                    {"name": "بطاطا", "quantity": 1},
+                    {"name": "سوشي", "quantity": 1},
+                ]},
+                restaurant_id=1,
+            )
+
+        shawarma, fries = result["items"]
+        assert shawarma["variant_id"] == 52
+        assert shawarma["price"] == 6.0
+        assert shawarma["name"] == "شاورما دجاج (كبير)"
+        assert fries["price"] == 2.5
+        assert result["unmatched"] == ["سوشي"]
+        session_factory.assert_not_called()
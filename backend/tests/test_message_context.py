@@ -0,0 +1,132 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.controllers import message_context as mc
+from app.controllers.message_context import (
+    message_context, message_session, load_user, remember_user, current_message_context,
+)
+
+
+def _result(row):
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = row
+    return result
+
+
+@pytest.fixture
+def session():
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=_result(SimpleNamespace(id=7, phone_number="+961")))
+    db.rollback = AsyncMock()
+    db.commit = AsyncMock()
+    db.close = AsyncMock()
+    db.in_transaction = MagicMock(return_value=True)
+    db.new, db.dirty, db.deleted = [], [], []
+    with patch.object(mc, "AsyncSessionLocal", MagicMock(return_value=db)) as factory:
+        factory.db = db
+        yield factory
+
+
+class TestMessageContext:
+    """Unit tests for the per-message BotController context."""
+
+    @pytest.mark.asyncio
+    async def test_handlers_share_one_session(self, session):
+        """Test every message_session() inside a context is the same session."""
+        async with message_context("+961") as ctx:
+            async with message_session() as first:
+                async with message_session() as second:
+                    assert first is second is ctx.session
+
+        assert session.call_count == 1
+        session.db.close.assert_awaited_once()
+        assert current_message_context() is None
+
+    @pytest.mark.asyncio
+    async def test_user_loaded_once(self, session):
+        """Test repeated sender lookups run a single query."""
+        async with message_context("+961"):
+            async with message_session() as db:
+                first = await load_user(db, "+961")
+                second = await load_user(db, "+961")
+
+        assert first is second
+        assert session.db.execute.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_other_phone_not_memoized(self, session):
+        """Test lookups for another phone number always hit the database."""
+        async with message_context("+961"):
+            async with message_session() as db:
+                await load_user(db, "+962")
+                await load_user(db, "+962")
+
+        assert session.db.execute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_created_user_remembered(self, session):
+        """Test a user created by a handler replaces the memoized miss."""
+        session.db.execute.return_value = _result(None)
+        async with message_context("+961"):
+            async with message_session() as db:
+                assert await load_user(db, "+961") is None
+                created = SimpleNamespace(id=9, phone_number="+961")
+                remember_user("+961", created)
+                assert await load_user(db, "+961") is created
+
+        assert session.db.execute.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_statement_rolls_back(self, session):
+        """Test a database error resets the shared session and memoized rows."""
+        async with message_context("+961") as ctx:
+            async with message_session() as db:
+                await load_user(db, "+961")
+            with pytest.raises(SQLAlchemyError):
+                async with message_session():
+                    raise SQLAlchemyError("boom")
+            session.db.rollback.assert_awaited_once()
+            await ctx.get_user()
+
+        assert session.db.execute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_transaction_released_after_each_handler(self, session):
+        """Test the connection is given back when the outermost handler block ends, rows kept."""
+        async with message_context("+961") as ctx:
+            async with message_session() as db:
+                async with message_session():
+                    await load_user(db, "+961")
+                session.db.commit.assert_not_awaited()
+            session.db.commit.assert_awaited_once()
+
+            async with message_session():
+                await ctx.get_user()
+            assert session.db.execute.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_uncommitted_changes_discarded_on_release(self, session):
+        """Test a handler's uncommitted changes are rolled back, not committed by the next one."""
+        async with message_context("+961") as ctx:
+            async with message_session() as db:
+                await load_user(db, "+961")
+                db.dirty = [ctx._user]
+            session.db.rollback.assert_awaited_once()
+            session.db.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_queries_counted_per_message(self, session):
+        """Test statements run inside a context are attributed to it."""
+        before = mc.get_message_stats()
+        async with message_context("+961") as ctx:
+            for _ in range(3):
+                mc._count_query(None, None, "SELECT 1", None, None, False)
+        mc._count_query(None, None, "SELECT 1", None, None, False)
+
+        stats = mc.get_message_stats()
+        assert ctx.queries == 3
+        assert stats["messages"] == before["messages"] + 1
+        assert stats["queries"] == before["queries"] + 3
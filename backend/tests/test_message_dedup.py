@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from app.services.message_dedup import MessageDeduplicator
+from app.services.redis_service import RedisService
+
+
+@pytest.fixture
+def redis():
+    return RedisService(base_url="", token="")
+
+
+class TestMessageDeduplicator:
+    """Unit tests for WhatsApp message id deduplication."""
+
+    @pytest.mark.asyncio
+    async def test_second_claim_is_duplicate(self, redis):
+        """Test only the first delivery of an id passes."""
+        dedup = MessageDeduplicator(redis=redis)
+
+        assert not await dedup.is_duplicate("wamid.1")
+        assert await dedup.is_duplicate("wamid.1")
+        assert not await dedup.is_duplicate("wamid.2")
+
+        stats = dedup.get_stats()
+        assert (stats["checked"], stats["duplicates"], stats["local_duplicates"]) == (3, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_local_front_skips_redis(self, redis):
+        """Test ids seen by this process are answered without a Redis call."""
+        dedup = MessageDeduplicator(redis=redis)
+        await dedup.is_duplicate("wamid.1")
+        commands = redis.get_stats()["commands"]
+
+        await dedup.is_duplicate("wamid.1")
+
+        assert redis.get_stats()["commands"] == commands
+
+    @pytest.mark.asyncio
+    async def test_claim_shared_across_nodes(self, redis):
+        """Test an id claimed by another node is a duplicate here."""
+        other_node = MessageDeduplicator(redis=redis)
+        this_node = MessageDeduplicator(redis=redis)
+
+        assert not await other_node.is_duplicate("wamid.1")
+        assert await this_node.is_duplicate("wamid.1")
+        assert this_node.get_stats()["redis_duplicates"] == 1
+
+    @pytest.mark.asyncio
+    async def test_claim_uses_set_nx_with_ttl(self):
+        """Test the Redis claim is SET NX EX pending TTL, extended to the full TTL on confirm."""
+        redis = AsyncMock()
+        redis.set_if_absent.return_value = True
+        dedup = MessageDeduplicator(redis=redis, ttl=600, pending_ttl=60)
+
+        await dedup.is_duplicate("wamid.9")
+        await dedup.confirm("wamid.9")
+
+        redis.set_if_absent.assert_awaited_once_with("dedup:wa:wamid.9", "1", 60)
+        redis.set.assert_awaited_once_with("dedup:wa:wamid.9", "1", 600)
+
+    @pytest.mark.asyncio
+    async def test_released_claim_accepts_redelivery(self, redis):
+        """Test a released id (handling failed) is processed when Meta delivers it again."""
+        dedup = MessageDeduplicator(redis=redis)
+        other_node = MessageDeduplicator(redis=redis)
+        assert not await dedup.is_duplicate("wamid.1")
+
+        await dedup.release("wamid.1")
+
+        assert not await dedup.is_duplicate("wamid.1")
+        await dedup.release("wamid.1")
+        assert not await other_node.is_duplicate("wamid.1")
+
+    @pytest.mark.asyncio
+    async def test_missing_id_never_dropped(self, redis):
+        """Test messages without an id are always processed."""
+        dedup = MessageDeduplicator(redis=redis)
+
+        assert not await dedup.is_duplicate(None)
+        assert not await dedup.is_duplicate("")
+        assert dedup.get_stats()["no_id"] == 2
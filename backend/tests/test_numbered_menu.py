@@ -0,0 +1,102 @@
+import pytest
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from app.services.catalog_service import CatalogService, build_snapshot
+from app.services.numbered_menu import NumberedMenu, NumberedMenuCache, split_text
+
+
+def make_snapshot(version=0, extra_items=0):
+    restaurant = SimpleNamespace(
+        id=1, name="Ghasan", name_ar="غسان", description=None, description_ar=None,
+        is_active=True, category_id=None,
+    )
+    menu = SimpleNamespace(id=10, restaurant_id=1, is_active=True)
+    mains = SimpleNamespace(id=100, name="Main", name_ar="رئيسي", order=0)
+    drinks = SimpleNamespace(id=101, name="Drinks", name_ar=None, order=1)
+    variants = [
+        SimpleNamespace(id=52, name="Large", name_ar="كبير", price=Decimal("6.00"), order=1),
+        SimpleNamespace(id=51, name="Small", name_ar="صغير", price=Decimal("4.00"), order=0),
+    ]
+
+    def item(id, name, name_ar=None, price=None, has_variants=False, is_available=True, variants=None):
+        return SimpleNamespace(
+            id=id, name=name, name_ar=name_ar, description=None, description_ar=None,
+            price=price, price_min=None, price_max=None, has_variants=has_variants,
+            is_available=is_available, order=id, variants=variants or [],
+        )
+
+    rows = [
+        (item(1, "Chicken Shawarma", "شاورما دجاج", has_variants=True, variants=variants), mains, menu),
+        (item(2, "Fries", "بطاطا", price=Decimal("2.50")), mains, menu),
+    ]
+    rows += [(item(10 + i, f"Dish number {i}", price=Decimal("3.00")), mains, menu) for i in range(extra_items)]
+    rows += [
+        (item(3, "Pepsi", price=Decimal("1.00"), is_available=False), drinks, menu),
+        (item(4, "Water", price=None), drinks, menu),
+    ]
+    return build_snapshot(version, [(restaurant, None)], [], rows)
+
+
+class TestNumberedMenu:
+    """Unit tests for the prebuilt numbered menu."""
+
+    def test_numbers_variants_and_skips_unavailable(self):
+        """Test variants get their own numbers and unavailable items are left out."""
+        menu = NumberedMenu.from_snapshot(make_snapshot(), 1, "ar")
+
+        assert menu.restaurant_name == "غسان"
+        assert [v["name"] for v in menu.items_map.values()] == [
+            "شاورما دجاج (صغير)", "شاورما دجاج (كبير)", "بطاطا", "Water",
+        ]
+        assert menu.items_map["1"] == {
+            "menu_item_id": 1, "variant_id": 51, "name": "شاورما دجاج (صغير)", "price": 4.0, "restaurant_id": 1,
+        }
+        text = "".join(menu.chunks)
+        assert "🔸 *رئيسي*" in text and "🔸 *Drinks*" in text
+        assert "  4. Water - -" in text and "Pepsi" not in text
+
+    def test_large_menu_split_to_message_limit(self):
+        """Test a big menu is split into chunks that each fit one WhatsApp message."""
+        menu = NumberedMenu.from_snapshot(make_snapshot(extra_items=300), 1, "en")
+
+        assert len(menu.chunks) > 1
+        assert all(len(chunk) <= 4096 for chunk in menu.chunks)
+        assert "  300. Dish number 296 - $3.00" in "\n".join(menu.chunks)
+
+    def test_split_text_prefers_blank_lines(self):
+        """Test blocks are kept whole when they fit, and long lines are hard-wrapped."""
+        assert split_text("aaaa\n\nbbbb", limit=6) == ["aaaa", "bbbb"]
+        assert split_text("aa\nbb\ncc", limit=5) == ["aa\nbb", "cc"]
+        assert split_text("x" * 7, limit=3) == ["xxx", "xxx", "x"]
+
+    @pytest.mark.asyncio
+    async def test_cache_rebuilds_only_after_menu_change(self):
+        """Test menus are cached per restaurant/lang until that restaurant is invalidated."""
+        catalog = CatalogService(ttl_seconds=300)
+        with patch("app.services.numbered_menu.catalog_service", catalog), \
+                patch.object(catalog, "_load", AsyncMock(side_effect=lambda v: make_snapshot(v))):
+            cache = NumberedMenuCache()
+            first = await cache.get(1, "ar")
+            assert await cache.get(1, "ar") is first
+            assert await cache.get(1, "en") is not first
+
+            catalog.invalidate(2)
+            assert await cache.get(1, "ar") is first
+
+            catalog.invalidate(1)
+            rebuilt = await cache.get(1, "ar")
+
+        assert rebuilt is not first and rebuilt.version == catalog.version
+        assert await cache.get(99, "ar") is None
+
+    @pytest.mark.asyncio
+    async def test_cache_expires_after_ttl(self):
+        """Test menus older than the TTL are rebuilt even without a catalog write."""
+        catalog = CatalogService(ttl_seconds=300)
+        with patch("app.services.numbered_menu.catalog_service", catalog), \
+                patch.object(catalog, "_load", AsyncMock(side_effect=lambda v: make_snapshot(v))):
+            cache = NumberedMenuCache(ttl_seconds=0)
+            first = await cache.get(1, "ar")
+            assert await cache.get(1, "ar") is not first
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.controllers.bot_controller import BotController
+
+from app.core.exceptions import MessageLockTimeoutError
+from app.services.phone_lock import PhoneLock
+from app.services.redis_service import RedisService
+
+
+@pytest.fixture
+def redis():
+    return RedisService(base_url="", token="")
+
+
+class TestPhoneLock:
+    """Unit tests for per-phone message serialization."""
+
+    @pytest.mark.asyncio
+    async def test_same_phone_serialized_in_arrival_order(self, redis):
+        """Test one phone's holders never overlap and are served FIFO."""
+        lock = PhoneLock(mode="local", redis=redis)
+        order, active = [], []
+
+        async def handle(n):
+            async with lock.hold("+961"):
+                assert not active
+                active.append(n)
+                await asyncio.sleep(0.005)
+                order.append(n)
+                active.pop()
+
+        await asyncio.gather(*(handle(n) for n in range(5)))
+
+        assert order == list(range(5))
+        stats = lock.get_stats()
+        assert stats["acquired"] == 5 and stats["contended"] == 4
+        assert stats["held_or_waiting"] == 0
+
+    @pytest.mark.asyncio
+    async def test_different_phones_do_not_wait(self, redis):
+        """Test holding one phone's lock never blocks another phone."""
+        lock = PhoneLock(mode="local", redis=redis)
+
+        async with lock.hold("+9611"):
+            await asyncio.wait_for(self._enter(lock, "+9612"), 0.1)
+
+        assert lock.get_stats()["contended"] == 0
+
+    @staticmethod
+    async def _enter(lock, phone):
+        async with lock.hold(phone):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_timeout_raises_and_frees_waiter(self, redis):
+        """Test a waiter gives up after the timeout and is not left registered."""
+        lock = PhoneLock(mode="local", redis=redis, timeout=0.05)
+
+        async with lock.hold("+961"):
+            with pytest.raises(MessageLockTimeoutError):
+                await self._enter(lock, "+961")
+
+        assert lock.get_stats()["timeouts"] == 1
+        await asyncio.wait_for(self._enter(lock, "+961"), 0.1)
+
+    @pytest.mark.asyncio
+    async def test_redis_lease_excludes_other_nodes(self, redis):
+        """Test a second node waits for the lease and gets it after release."""
+        node_a = PhoneLock(mode="redis", redis=redis, retry_ms=5)
+        node_b = PhoneLock(mode="redis", redis=redis, retry_ms=5, timeout=1)
+        events = []
+
+        async def a():
+            async with node_a.hold("+961"):
+                events.append("a-in")
+                await asyncio.sleep(0.03)
+                events.append("a-out")
+
+        async def b():
+            await asyncio.sleep(0.005)
+            async with node_b.hold("+961"):
+                events.append("b-in")
+
+        await asyncio.gather(a(), b())
+
+        assert events == ["a-in", "a-out", "b-in"]
+        assert node_b.get_stats()["lease_waits"] == 1
+        assert await redis.get("lock:phone:+961") is None
+
+    @pytest.mark.asyncio
+    async def test_lease_timeout(self, redis):
+        """Test a lease held elsewhere past the timeout raises."""
+        await redis.set_if_absent("lock:phone:+961", "other-node", px=10_000)
+        lock = PhoneLock(mode="redis", redis=redis, timeout=0.05, retry_ms=5)
+
+        with pytest.raises(MessageLockTimeoutError):
+            await self._enter(lock, "+961")
+
+        assert await redis.get("lock:phone:+961") == "other-node"
+
+    @pytest.mark.asyncio
+    async def test_bot_asks_to_resend_on_timeout(self, redis):
+        """Test a message that times out on the lock is not handled unserialized."""
+        lock = PhoneLock(mode="local", redis=redis, timeout=0.02)
+        bot = BotController()
+        with patch("app.controllers.bot_controller.phone_lock", lock), \
+                patch.object(bot, "_handle_locked", AsyncMock()) as handle, \
+                patch("app.controllers.bot_controller.redis_service.get_user_state",
+                      AsyncMock(return_value={"state": "MAIN_MENU", "data": {"lang": "en"}})), \
+                patch("app.controllers.bot_controller.whatsapp_service.send_text", AsyncMock()) as send:
+            async with lock.hold("+961"):
+                await bot.handle_message("+961", {"type": "text", "text": {"body": "hi"}})
+
+        handle.assert_not_awaited()
+        assert send.await_args.args[1].startswith("⏳ Still working")
@@ -0,0 +1,326 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.redis_backends import (
+    create_redis_backend, MemoryRedisBackend, UpstashRestBackend, NativeRedisBackend
+)
+from app.controllers.bot_controller import BotController
+from app.services.redis_service import RedisService
+from tests.fake_upstash import FakeUpstash
+
+
+@pytest.fixture
+def fake():
+    return FakeUpstash()
+
+
+@pytest.fixture
+def service(fake):
+    return RedisService(base_url=fake.url, token=fake.token, transport=fake.transport)
+
+
+class TestRedisPipeline:
+    """Unit tests for batched Upstash commands."""
+
+    @pytest.mark.asyncio
+    async def test_pipeline_single_round_trip(self, service, fake):
+        """Test queued commands go out in one /pipeline request."""
+        results = await (
+            service.pipeline()
+            .command("SET", "a", "1")
+            .command("INCR", "a")
+            .command("GET", "a")
+            .execute()
+        )
+
+        assert results == ["OK", 2, "2"]
+        assert fake.requests == ["/pipeline"]
+
+    @pytest.mark.asyncio
+    async def test_multi_uses_transaction_endpoint(self, service, fake):
+        """Test multi() posts to /multi-exec."""
+        await service.multi().command("SET", "a", "1").command("SET", "b", "2").execute()
+
+        assert fake.requests == ["/multi-exec"]
+        assert fake.value("b") == "2"
+
+    @pytest.mark.asyncio
+    async def test_command_error_yields_none(self, service):
+        """Test one failing command does not discard the others."""
+        results = await service.pipeline().command("NOPE").command("PING").execute()
+
+        assert results == [None, "PONG"]
+
+    @pytest.mark.asyncio
+    async def test_memory_fallback(self):
+        """Test pipelines work without Upstash configured."""
+        service = RedisService(base_url="", token="")
+
+        results = await service.pipeline().command("SET", "a", "1").command("GET", "a").execute()
+
+        assert results == ["OK", "1"]
+
+
+class TestRedisAnalytics:
+    """Unit tests for analytics helpers on the pipeline API."""
+
+    @pytest.mark.asyncio
+    async def test_track_ai_usage_one_round_trip(self, service, fake):
+        """Test six analytics commands cost one request."""
+        await service.track_ai_usage("+96170000001", "order_item", True)
+        await service.track_ai_usage("+96170000002", "order_item", False)
+
+        assert fake.requests == ["/pipeline", "/pipeline"]
+
+        analytics = await service.get_daily_analytics()
+
+        assert analytics["intents"] == {"order_item": 2}
+        assert analytics["status"] == {"success": 1, "error": 1}
+        assert analytics["unique_users"] == 2
+        assert len(fake.requests) == 3
+
+    @pytest.mark.asyncio
+    async def test_analytics_memory_fallback(self):
+        """Test analytics still aggregate in memory mode."""
+        service = RedisService(base_url="", token="")
+
+        await service.track_ai_usage("+96170000001", "greeting", True)
+
+        analytics = await service.get_daily_analytics()
+        assert analytics["intents"] == {"greeting": 1}
+        assert analytics["unique_users"] == 1
+
+
+class TestRedisCart:
+    """Unit tests for hash-based atomic carts (memory backend runs the Python twins)."""
+
+    @pytest.fixture
+    def memory(self):
+        return RedisService(base_url="", token="")
+
+    @pytest.mark.asyncio
+    async def test_add_merges_lines_and_keeps_totals(self, memory):
+        """Test repeated adds merge per item/variant and totals are cached."""
+        phone = "+96170000001"
+        item = {"menu_item_id": 1, "name": "Fries", "price": 2.5, "quantity": 1}
+        await memory.add_to_cart(phone, dict(item))
+        count, subtotal = await memory.add_to_cart(phone, dict(item, quantity=2))
+        await memory.add_to_cart(phone, {"menu_item_id": 2, "variant_id": 7, "name": "Shawarma (L)", "price": 6, "quantity": 1})
+
+        assert (count, subtotal) == (3, 7.5)
+        assert await memory.get_cart_totals(phone) == (4, 13.5)
+        cart = await memory.get_cart(phone)
+        assert [(i["menu_item_id"], i["quantity"]) for i in cart] == [(1, 3), (2, 1)]
+        assert cart[1]["variant_id"] == 7
+
+    @pytest.mark.asyncio
+    async def test_variants_are_separate_lines(self, memory):
+        """Test two sizes of one item keep their own prices."""
+        phone = "+96170000002"
+        await memory.add_to_cart(phone, {"menu_item_id": 5, "variant_id": 1, "price": 4, "quantity": 1})
+        await memory.add_to_cart(phone, {"menu_item_id": 5, "variant_id": 2, "price": 6, "quantity": 1})
+
+        assert await memory.get_cart_total(phone) == 10.0
+        assert await memory.update_cart_item_quantity(phone, 5, 3, variant_id=2)
+        assert await memory.get_cart_total(phone) == 22.0
+
+    @pytest.mark.asyncio
+    async def test_ai_cart_edit_targets_the_variant_line(self, memory):
+        """Test "one less large shawarma" changes that size only, leaving the other size alone."""
+        phone = "+96170000009"
+        await memory.add_to_cart(phone, {"menu_item_id": 5, "variant_id": 1, "name": "Shawarma (S)", "price": 4, "quantity": 1})
+        await memory.add_to_cart(phone, {"menu_item_id": 5, "variant_id": 2, "name": "Shawarma (L)", "price": 6, "quantity": 3})
+        ai_result = {"items": [{"action": "decrease", "name": "shawarma (l)", "quantity": 1}], "message": "ok"}
+
+        with patch("app.controllers.bot_controller.redis_service", memory), \
+                patch("app.controllers.bot_controller.whatsapp_service.send_text", AsyncMock()):
+            await BotController()._handle_cart_modification(phone, ai_result, "en")
+
+        cart = await memory.get_cart(phone)
+        assert [(i["variant_id"], i["quantity"]) for i in cart] == [(1, 1), (2, 2)]
+
+    @pytest.mark.asyncio
+    async def test_update_and_remove(self, memory):
+        """Test quantity updates adjust totals and removal empties the cart."""
+        phone = "+96170000003"
+        await memory.add_to_cart(phone, {"menu_item_id": 1, "price": 2.5, "quantity": 1})
+
+        assert await memory.update_cart_item_quantity(phone, 1, 4)
+        assert await memory.get_cart_count(phone) == 4
+        assert not await memory.update_cart_item_quantity(phone, 99, 1)
+        assert await memory.remove_from_cart(phone, 1)
+        assert await memory.get_cart(phone) == []
+        assert await memory.get_cart_totals(phone) == (0, 0.0)
+
+    @pytest.mark.asyncio
+    async def test_zero_quantity_removes_line(self, memory):
+        """Test setting quantity to 0 drops the line."""
+        phone = "+96170000004"
+        await memory.add_to_cart(phone, {"menu_item_id": 1, "price": 1, "quantity": 2})
+        await memory.add_to_cart(phone, {"menu_item_id": 2, "price": 3, "quantity": 1})
+
+        await memory.update_cart_item_quantity(phone, 1, 0)
+
+        assert [i["menu_item_id"] for i in await memory.get_cart(phone)] == [2]
+        assert await memory.get_cart_total(phone) == 3.0
+
+    @pytest.mark.asyncio
+    async def test_legacy_json_cart_migrated(self, memory):
+        """Test a JSON cart under the old key is converted on first access."""
+        phone = "+96170000005"
+        legacy = [{"menu_item_id": 3, "name": "Burger", "price": 5.0, "quantity": 2, "variant_id": None}]
+        await memory.set(f"cart:{phone}", json.dumps(legacy))
+
+        await memory.add_to_cart(phone, {"menu_item_id": 3, "price": 5.0, "quantity": 1})
+
+        assert await memory.get(f"cart:{phone}") is None
+        cart = await memory.get_cart(phone)
+        assert cart[0]["name"] == "Burger"
+        assert cart[0]["quantity"] == 3
+        assert await memory.get_cart_total(phone) == 15.0
+
+    @pytest.mark.asyncio
+    async def test_remote_backend_uses_eval(self):
+        """Test remote backends run the Lua script in a single round trip."""
+        client = MagicMock()
+        client.execute_command = AsyncMock(return_value=[2, 500])
+        service = RedisService(backend=NativeRedisBackend("redis://test", client=client))
+
+        totals = await service.add_to_cart("+961", {"menu_item_id": 1, "price": 2.5, "quantity": 2})
+
+        assert totals == (2, 5.0)
+        args = client.execute_command.await_args.args
+        assert args[0] == "EVAL"
+        assert args[2:5] == (2, "cart:v2:+961", "cart:+961")
+        assert service.get_stats()["round_trips"] == 1
+
+
+class TestRedisCartCache:
+    """Unit tests for cart summaries and the per-message cart cache."""
+
+    @pytest.fixture
+    def memory(self):
+        return RedisService(base_url="", token="")
+
+    @pytest.mark.asyncio
+    async def test_summary_in_one_read(self, memory):
+        """Test the summary carries items, count, subtotal and restaurant."""
+        phone = "+96170000011"
+        await memory.add_to_cart(phone, {"menu_item_id": 1, "price": 2.5, "quantity": 2, "restaurant_id": 4})
+
+        summary = await memory.get_cart_summary(phone)
+
+        assert summary["count"] == 2
+        assert summary["subtotal"] == 5.0
+        assert summary["restaurant_id"] == 4
+        assert [i["menu_item_id"] for i in summary["items"]] == [1]
+        assert memory.get_stats()["cart_reads"] == 1
+
+    @pytest.mark.asyncio
+    async def test_scope_reads_cart_once(self, memory):
+        """Test repeated cart reads inside one scope hit Redis once."""
+        phone = "+96170000012"
+        await memory.add_to_cart(phone, {"menu_item_id": 1, "price": 3, "quantity": 1})
+
+        with memory.cart_cache_scope():
+            await memory.get_cart(phone)
+            assert await memory.get_cart_totals(phone) == (1, 3.0)
+            assert await memory.get_cart_count(phone) == 1
+            await memory.get_cart(phone)
+
+        stats = memory.get_stats()
+        assert stats["cart_reads"] == 1
+        assert stats["cart_cache_hits"] == 3
+
+    @pytest.mark.asyncio
+    async def test_writes_keep_scope_consistent(self, memory):
+        """Test adds, updates and clears inside a scope are never served stale."""
+        phone = "+96170000013"
+        with memory.cart_cache_scope():
+            assert await memory.get_cart(phone) == []
+            await memory.add_to_cart(phone, {"menu_item_id": 1, "price": 2, "quantity": 1})
+            assert await memory.get_cart_totals(phone) == (1, 2.0)
+            assert [i["menu_item_id"] for i in await memory.get_cart(phone)] == [1]
+
+            await memory.update_cart_item_quantity(phone, 1, 3)
+            assert await memory.get_cart_total(phone) == 6.0
+
+            await memory.clear_cart(phone)
+            assert await memory.get_cart(phone) == []
+            assert await memory.get_cart_count(phone) == 0
+
+    @pytest.mark.asyncio
+    async def test_no_caching_outside_scope(self, memory):
+        """Test reads outside a scope always go to Redis."""
+        phone = "+96170000014"
+        await memory.get_cart(phone)
+        await memory.get_cart(phone)
+
+        assert memory.get_stats()["cart_reads"] == 2
+        assert memory.get_stats()["cart_cache_hits"] == 0
+
+
+class TestRedisBackends:
+    """Unit tests for backend selection and the memory/native backends."""
+
+    def test_backend_selection(self):
+        """Test REDIS_BACKEND picks the expected implementation."""
+        assert isinstance(create_redis_backend("auto"), MemoryRedisBackend)
+        assert isinstance(create_redis_backend("auto", upstash_url="https://x", upstash_token="t"), UpstashRestBackend)
+        assert isinstance(create_redis_backend("redis", redis_url="redis://localhost:6379"), NativeRedisBackend)
+        assert isinstance(create_redis_backend("upstash"), MemoryRedisBackend)
+
+    @pytest.mark.asyncio
+    async def test_memory_expiry_and_nx(self):
+        """Test SET NX/EX semantics in the memory backend."""
+        backend = MemoryRedisBackend()
+
+        assert await backend.execute("SET", "k", "1", "NX", "PX", 20) == "OK"
+        assert await backend.execute("SET", "k", "2", "NX") is None
+        await asyncio.sleep(0.03)
+        assert await backend.execute("GET", "k") is None
+
+    @pytest.mark.asyncio
+    async def test_memory_pubsub(self):
+        """Test local publish reaches subscribers."""
+        service = RedisService(base_url="", token="")
+
+        async def first_message():
+            async for message in service.subscribe("events"):
+                return message
+
+        task = asyncio.create_task(first_message())
+        await asyncio.sleep(0)
+        await service._execute("PUBLISH", "events", "hello")
+
+        assert await asyncio.wait_for(task, 1) == {"channel": "events", "data": "hello"}
+
+    @pytest.mark.asyncio
+    async def test_native_pipeline_translation(self):
+        """Test the native backend maps batches onto a redis-py pipeline."""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[True, ValueError("WRONGTYPE"), 3])
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+        service = RedisService(backend=NativeRedisBackend("redis://test", client=client))
+
+        results = await service.multi().command("SET", "a", 1).command("HGET", "a", "f").command("INCR", "n").execute()
+
+        client.pipeline.assert_called_once_with(transaction=True)
+        assert pipe.execute_command.call_count == 3
+        assert results == [True, None, 3]
+        assert service.get_stats()["round_trips"] == 1
+
+    @pytest.mark.asyncio
+    async def test_remote_failure_falls_back_to_memory(self):
+        """Test a broken backend degrades to the in-memory store."""
+        client = MagicMock()
+        client.execute_command = AsyncMock(side_effect=ConnectionError("down"))
+        service = RedisService(backend=NativeRedisBackend("redis://test", client=client))
+
+        await service.set("k", "v")
+
+        assert await service.get("k") == "v"
+        assert service.get_stats()["fallbacks"] == 2
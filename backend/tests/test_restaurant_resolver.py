@@ -0,0 +1,116 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from app.core.text_normalize import phonetic_key
+from app.services.catalog_service import CatalogService, build_snapshot
+from app.services.restaurant_resolver import RestaurantNameIndex, RestaurantResolver
+
+
+def make_restaurant(id, name, name_ar=None, is_active=True):
+    return SimpleNamespace(
+        id=id, name=name, name_ar=name_ar, description=None, description_ar=None,
+        is_active=is_active, category_id=None,
+    )
+
+
+def make_snapshot(version=0):
+    return build_snapshot(
+        version,
+        [
+            (make_restaurant(1, "King Croissant", "كينج كرواسون"), None),
+            (make_restaurant(2, "Abu Ali Shawarma", "شاورما أبو علي"), None),
+            (make_restaurant(3, "Al Safadi Restaurant"), None),
+            (make_restaurant(4, "Pizza Hut", "بيتزا هت"), None),
+            (make_restaurant(5, "Closed Burger", "برغر مسكر", is_active=False), None),
+        ],
+        [],
+        [],
+    )
+
+
+@pytest.fixture
+def index():
+    return RestaurantNameIndex.from_snapshot(make_snapshot())
+
+
+class TestPhoneticKey:
+    """Unit tests for script-independent name keys."""
+
+    def test_arabic_and_english_share_key(self):
+        """Test transliterated names reduce to the same skeleton."""
+        assert phonetic_key("ماكدونالدز") == phonetic_key("McDonalds")
+        assert phonetic_key("كرسبي تشيكن") == phonetic_key("Crispy Chicken")
+        assert phonetic_key("الصفدي") == phonetic_key("Al-Safadi")
+
+
+class TestRestaurantNameIndex:
+    """Unit tests for ranked restaurant name resolution."""
+
+    def test_exact_arabic_name(self, index):
+        """Test an exact normalized name has full confidence."""
+        best = index.candidates("شاورما ابو علي")[0]
+        assert best["id"] == 2
+        assert best["confidence"] == 1.0
+
+    def test_transliterated_name(self, index):
+        """Test Arabic spelling of an English-only name resolves."""
+        best = index.candidates("كنج كرواسان")[0]
+        assert best["id"] == 1
+        assert best["confidence"] >= 0.6
+
+    def test_arabic_query_for_english_only_restaurant(self, index):
+        """Test restaurants without name_ar still resolve from Arabic."""
+        assert index.candidates("مطعم الصفدي")[0]["id"] == 3
+
+    def test_partial_name_contained(self, index):
+        """Test the legacy substring behaviour is kept."""
+        assert index.candidates("pizza")[0]["id"] == 4
+
+    def test_inactive_and_unrelated(self, index):
+        """Test closed restaurants and unrelated text yield nothing confident."""
+        assert all(c["id"] != 5 for c in index.candidates("برغر مسكر"))
+        candidates = index.candidates("zzzz")
+        assert not candidates or candidates[0]["confidence"] < 0.6
+
+    def test_candidates_ranked(self, index):
+        """Test candidates are sorted by confidence."""
+        confidences = [c["confidence"] for c in index.candidates("شاورما")]
+        assert confidences == sorted(confidences, reverse=True)
+
+
+class TestRestaurantResolver:
+    """Unit tests for caching and refresh."""
+
+    @pytest.mark.asyncio
+    async def test_index_rebuilt_on_catalog_change(self):
+        """Test a restaurant update refreshes the index and result cache."""
+        catalog = CatalogService(ttl_seconds=300)
+        resolver = RestaurantResolver()
+        with patch("app.services.restaurant_resolver.catalog_service", catalog), \
+                patch.object(catalog, "_load", AsyncMock(side_effect=lambda v: make_snapshot(v))):
+            assert await resolver.resolve("King Croissant") == 1
+            assert await resolver.resolve("King Croissant") == 1
+            assert resolver.get_stats()["cache_hits"] == 1
+
+            catalog.invalidate(1)
+            assert await resolver.resolve("King Croissant") == 1
+
+        assert resolver.get_stats()["rebuilds"] == 2
+
+    @pytest.mark.asyncio
+    async def test_db_fallback_without_snapshot(self):
+        """Test lookups index restaurants read from the DB while the snapshot can't be built."""
+        catalog = CatalogService(ttl_seconds=300)
+        resolver = RestaurantResolver()
+
+        async def load(version, restaurant_id=None, with_items=True):
+            if with_items:
+                raise RuntimeError("snapshot build failed")
+            return make_snapshot(version)
+
+        with patch("app.services.restaurant_resolver.catalog_service", catalog), \
+                patch.object(catalog, "_load", AsyncMock(side_effect=load)):
+            assert await resolver.resolve("King Croissant") == 1
+
+        assert resolver.get_stats()["db_fallbacks"] == 1
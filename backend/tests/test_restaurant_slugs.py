@@ -0,0 +1,89 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.catalog_service import CatalogService
+from app.services.restaurant_slugs import (
+    slugify, slug_derived_from, unique_slug, assign_slug, RestaurantSlugCache,
+)
+
+
+def db_returning(values):
+    """AsyncSession stub whose execute() returns the given slugs / id"""
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = values
+    result.scalar_one_or_none.return_value = values
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+@pytest.fixture
+def catalog():
+    catalog = CatalogService(ttl_seconds=300)
+    with patch("app.services.restaurant_slugs.catalog_service", catalog):
+        yield catalog
+
+
+class TestSlugs:
+    """Unit tests for slug generation and collision handling."""
+
+    def test_slugify_keeps_website_format(self):
+        """Test slugs match the format the website already links to."""
+        assert slugify("Burger & Co") == "burger-and-co"
+        assert slugify("Pizza Hut") == "pizza-hut"
+
+    @pytest.mark.asyncio
+    async def test_unique_slug_adds_suffix_on_collision(self):
+        """Test a taken slug gets the next free numeric suffix."""
+        assert await unique_slug(db_returning([]), "Pizza Hut") == "pizza-hut"
+        assert await unique_slug(db_returning(["pizza-hut", "pizza-hut-2", "pizza-hut-express"]), "Pizza Hut") == "pizza-hut-3"
+        assert await unique_slug(db_returning([]), "") == "restaurant"
+
+    @pytest.mark.asyncio
+    async def test_assign_slug_prefers_requested(self):
+        """Test an explicit slug wins over the name."""
+        restaurant = SimpleNamespace(id=7, name="Pizza Hut", slug=None)
+        await assign_slug(db_returning([]), restaurant, "Hut Saida")
+        assert restaurant.slug == "hut-saida"
+
+    def test_slug_derived_from_name(self):
+        """Test only base / base-N slugs count as derived; custom slugs are kept on rename."""
+        assert slug_derived_from("pizza-hut", "Pizza Hut")
+        assert slug_derived_from("pizza-hut-3", "Pizza Hut")
+        assert not slug_derived_from("hut-saida", "Pizza Hut")
+        assert not slug_derived_from("pizza-hut-express", "Pizza Hut")
+        assert not slug_derived_from(None, "Pizza Hut")
+
+
+class TestRestaurantSlugCache:
+    """Unit tests for the in-memory slug -> id map."""
+
+    @pytest.mark.asyncio
+    async def test_lookup_cached_until_restaurant_changes(self, catalog):
+        """Test one query per slug, repeated after the restaurant is invalidated."""
+        cache = RestaurantSlugCache()
+        db = db_returning(5)
+
+        assert await cache.get_id(db, "pizza-hut") == 5
+        assert await cache.get_id(db, "pizza-hut") == 5
+        assert db.execute.await_count == 1
+
+        catalog.invalidate(6)
+        assert await cache.get_id(db, "pizza-hut") == 5
+        assert db.execute.await_count == 1
+
+        catalog.invalidate(5)
+        assert await cache.get_id(db, "pizza-hut") == 5
+        assert db.execute.await_count == 2
+        assert cache.get_stats()["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_unknown_slug_not_cached(self, catalog):
+        """Test a miss returns None and is not remembered."""
+        cache = RestaurantSlugCache()
+        db = db_returning(None)
+
+        assert await cache.get_id(db, "nope") is None
+        assert await cache.get_id(db, "nope") is None
+        assert db.execute.await_count == 2
@@ -0,0 +1,149 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.catalog_service import CatalogService, build_snapshot
+from app.services.search_index import ProductSearchIndex, ProductSearchService
+
+
+def make_restaurant(id, name, name_ar=None, is_active=True):
+    return SimpleNamespace(
+        id=id, name=name, name_ar=name_ar, description=None, description_ar=None,
+        is_active=is_active, category_id=None,
+    )
+
+
+def make_item(id, name, name_ar=None, is_available=True):
+    return SimpleNamespace(
+        id=id, name=name, name_ar=name_ar, description=None, description_ar=None,
+        price=None, price_min=None, price_max=None, has_variants=False,
+        is_available=is_available, order=0, variants=[],
+    )
+
+
+def make_snapshot(version=0, items=None, closed=False):
+    menus = {r: SimpleNamespace(id=r * 10, restaurant_id=r, is_active=True) for r in (1, 2, 3)}
+    category = SimpleNamespace(id=1, name="Main", name_ar=None, order=0)
+    if items is None:
+        items = [
+            (1, 101, "Chicken Shawarma", "شاورما دجاج"),
+            (1, 102, "Meat Shawarma", "شاورما لحمة"),
+            (2, 201, "Shawarma", "شاورمآ"),
+            (2, 202, "Fries", "بطاطا"),
+            (3, 301, "Chicken Shawarma", "دجاج شاورما"),
+        ]
+    return build_snapshot(
+        version,
+        [
+            (make_restaurant(1, "Ghasan", "غسان"), None),
+            (make_restaurant(2, "Abu Ali", "أبو علي"), None),
+            (make_restaurant(3, "Closed", is_active=not closed), None),
+        ],
+        [],
+        [(make_item(item_id, name, name_ar), category, menus[rest_id]) for rest_id, item_id, name, name_ar in items],
+    )
+
+
+class TestProductSearchIndex:
+    """Unit tests for the inverted product index."""
+
+    def test_substring_match_with_counts(self):
+        """Test 'query in name' matches and counts items per restaurant."""
+        index = ProductSearchIndex.from_snapshot(make_snapshot())
+
+        results = {r["id"]: r for r in index.search("شاورما")}
+
+        assert results[1]["items_count"] == 2
+        assert results[1]["name"] == "غسان"
+        assert results[1]["name_en"] == "Ghasan"
+        assert 3 in results
+
+    def test_exact_match_ranked_first(self):
+        """Test an exact (normalized) name match outranks substring matches."""
+        index = ProductSearchIndex.from_snapshot(make_snapshot())
+
+        results = index.search("شاورما")
+
+        assert results[0]["id"] == 2
+
+    def test_name_contained_in_query(self):
+        """Test 'name in query' matches like the legacy scan."""
+        index = ProductSearchIndex.from_snapshot(make_snapshot())
+
+        assert [r["id"] for r in index.search("بدي بطاطا كبيرة")] == [2]
+
+    def test_token_order_insensitive(self):
+        """Test multi-word queries match reordered item names."""
+        index = ProductSearchIndex.from_snapshot(make_snapshot())
+
+        results = index.search("شاورما دجاج")
+
+        assert {r["id"] for r in results} >= {1, 3}
+        assert results[0]["score"] == 3
+
+    def test_inactive_restaurant_excluded(self):
+        """Test closed restaurants are not indexed."""
+        index = ProductSearchIndex.from_snapshot(make_snapshot(closed=True))
+
+        assert 3 not in {r["id"] for r in index.search("شاورما")}
+
+    def test_reindex_restaurant_is_incremental(self):
+        """Test patching one restaurant leaves no stale postings."""
+        index = ProductSearchIndex.from_snapshot(make_snapshot())
+        updated = make_snapshot(1, items=[(2, 203, "Burger", "برغر")])
+
+        index.reindex_restaurant(updated, 2)
+
+        assert 2 not in {r["id"] for r in index.search("شاورما")}
+        assert [r["id"] for r in index.search("برغر")] == [2]
+        assert 1 in {r["id"] for r in index.search("شاورما")}
+        assert "بطاطا" not in index.names
+
+
+class TestProductSearchService:
+    """Unit tests for keeping the index in step with the catalog."""
+
+    @pytest.mark.asyncio
+    async def test_patches_only_invalidated_restaurant(self):
+        """Test a restaurant-scoped invalidation patches instead of rebuilding."""
+        catalog = CatalogService(ttl_seconds=300)
+        with patch("app.services.search_index.catalog_service", catalog):
+            service = ProductSearchService()
+            with patch.object(catalog, "_load", AsyncMock(side_effect=lambda v: make_snapshot(v))):
+                await service.search("شاورما")
+                catalog.invalidate(2)
+                await service.search("شاورما")
+
+        stats = service.get_stats()
+        assert stats["full_builds"] == 1
+        assert stats["incremental_updates"] == 1
+
+    @pytest.mark.asyncio
+    async def test_no_snapshot_returns_none(self):
+        """Test callers can fall back when the catalog is unavailable."""
+        catalog = CatalogService(ttl_seconds=300)
+        with patch("app.services.search_index.catalog_service", catalog):
+            service = ProductSearchService()
+            with patch.object(catalog, "_load", AsyncMock(side_effect=RuntimeError("db down"))):
+                assert await service.search("شاورما") is None
+
+
+class TestFindRestaurantsWithProduct:
+    """Unit tests for AIService._find_restaurants_with_product."""
+
+    @pytest.mark.asyncio
+    async def test_uncached_snapshot_without_index(self):
+        """Test a missing snapshot is answered from a one-off catalog read, not a session scan."""
+        from app.services.ai_service import AIService
+
+        service = AIService(backend=None)
+        session_factory = MagicMock(side_effect=AssertionError("no direct DB scan"))
+        with patch("app.services.ai_service.product_search_service.search", AsyncMock(return_value=None)), \
+                patch("app.services.ai_service.catalog_service.load_uncached",
+                      AsyncMock(return_value=make_snapshot())) as load_uncached, \
+                patch("app.services.ai_service.AsyncSessionLocal", session_factory):
+            results = await service._find_restaurants_with_product("شاورما")
+
+        load_uncached.assert_awaited_once_with()
+        assert results[0]["id"] == 2
+        assert {r["id"] for r in results} == {1, 2, 3}
@@ -0,0 +1,317 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from app.services.message_dedup import MessageDeduplicator
+from app.services.redis_service import RedisService
+from app.services.webhook_queue import WebhookQueue, parse_stream_reply, iter_webhook_events, _fields_to_dict
+
+
+def _redis(backend_name="upstash", execute=None):
+    return SimpleNamespace(
+        backend_name=backend_name,
+        backend=SimpleNamespace(execute=AsyncMock()),
+        _execute=execute or AsyncMock(return_value=None),
+    )
+
+
+class TestWebhookQueueLocal:
+    """Unit tests for in-process webhook processing."""
+
+    @pytest.mark.asyncio
+    async def test_same_phone_in_order_other_phones_in_parallel(self):
+        """Test one phone's messages never overlap while other phones proceed."""
+        queue = WebhookQueue(mode="local", workers=4, redis=_redis("memory"))
+        active = {}
+        seen = []
+
+        async def handler(phone, message):
+            assert not active.get(phone), "messages of one phone overlapped"
+            active[phone] = True
+            await asyncio.sleep(0.01)
+            seen.append((phone, message["n"]))
+            active[phone] = False
+
+        await queue.start(handler)
+        for n in range(5):
+            for phone in ("+9611", "+9612", "+9613"):
+                await queue.enqueue(phone, {"n": n})
+        await queue.stop()
+
+        for phone in ("+9611", "+9612", "+9613"):
+            assert [n for p, n in seen if p == phone] == list(range(5))
+        assert queue.get_stats()["processed"] == 15
+
+    @pytest.mark.asyncio
+    async def test_enqueue_returns_before_handling(self):
+        """Test the producer is not held up by a slow handler."""
+        queue = WebhookQueue(mode="local", workers=1, redis=_redis("memory"))
+        release = asyncio.Event()
+        handled = []
+
+        async def handler(phone, message):
+            await release.wait()
+            handled.append(message)
+
+        await queue.start(handler)
+        await asyncio.wait_for(queue.enqueue("+961", {"id": "a"}), 0.1)
+        assert handled == []
+        release.set()
+        await queue.stop()
+
+        assert handled == [{"id": "a"}]
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_do_not_stop_worker(self):
+        """Test a failing message is counted and the next one still runs."""
+        queue = WebhookQueue(mode="local", workers=1, redis=_redis("memory"))
+        handler = AsyncMock(side_effect=[RuntimeError("boom"), None])
+
+        await queue.start(handler)
+        await queue.enqueue("+961", {"id": "a"})
+        await queue.enqueue("+961", {"id": "b"})
+        await queue.stop()
+
+        stats = queue.get_stats()
+        assert (stats["failed"], stats["processed"]) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_slow_phone_does_not_block_others(self):
+        """Test a stuck conversation holds one worker, not every phone queued after it."""
+        queue = WebhookQueue(mode="local", workers=2, redis=_redis("memory"))
+        release = asyncio.Event()
+        handled = []
+
+        async def handler(phone, message):
+            if phone == "+961slow":
+                await release.wait()
+            handled.append((phone, message["n"]))
+
+        await queue.start(handler)
+        await queue.enqueue("+961slow", {"n": 0})
+        await queue.enqueue("+961slow", {"n": 1})
+        for phone in ("+9611", "+9612", "+9613"):
+            await queue.enqueue(phone, {"n": 0})
+        await asyncio.sleep(0.01)
+
+        assert handled == [("+9611", 0), ("+9612", 0), ("+9613", 0)]
+        release.set()
+        await queue.stop()
+        assert handled[3:] == [("+961slow", 0), ("+961slow", 1)]
+
+    @pytest.mark.asyncio
+    async def test_not_started_handles_inline(self):
+        """Test messages are handled directly when no workers run."""
+        queue = WebhookQueue(mode="local", redis=_redis("memory"))
+        queue._handler = AsyncMock()
+
+        await queue.enqueue("+961", {"id": "a"})
+
+        queue._handler.assert_awaited_once()
+
+
+def _delivery(*values):
+    """Webhook body with one entry per list of change values"""
+    return {"entry": [{"changes": [{"value": value} for value in entry]} for entry in values]}
+
+
+class TestWebhookBatches:
+    """Unit tests for batch-aware webhook dispatch."""
+
+    def test_every_entry_change_message_and_status(self):
+        """Test nothing past entry[0].changes[0].messages[0] is dropped."""
+        body = _delivery(
+            [{"messages": [{"id": "m1", "from": "+9611"}, {"id": "m2", "from": "+9612"}]},
+             {"statuses": [{"id": "s1", "recipient_id": "+9611", "status": "read"}]}],
+            [{"messages": [{"id": "m3", "from": "+9613"}]}],
+        )
+
+        events = [(kind, phone, payload["id"]) for kind, phone, payload in iter_webhook_events(body)]
+
+        assert events == [
+            ("message", "+9611", "m1"), ("message", "+9612", "m2"),
+            ("status", "+9611", "s1"), ("message", "+9613", "m3"),
+        ]
+
+    def test_malformed_parts_skipped(self):
+        """Test missing keys and sender-less messages are ignored."""
+        body = {"entry": [{}, {"changes": [{}, {"value": {"messages": [{"id": "x"}, None]}}]}]}
+
+        assert list(iter_webhook_events(body)) == []
+        assert list(iter_webhook_events({})) == []
+
+    @pytest.mark.asyncio
+    async def test_dispatch_routes_and_records_batch(self):
+        """Test messages and statuses reach their handlers with batch metrics."""
+        dedup = MessageDeduplicator(redis=RedisService(base_url="", token=""))
+        queue = WebhookQueue(mode="local", workers=2, redis=_redis("memory"), dedup=dedup)
+        on_message, on_status = AsyncMock(), AsyncMock()
+        body = _delivery([
+            {"messages": [{"id": "m1", "from": "+9611"}, {"id": "m2", "from": "+9611"}],
+             "statuses": [{"id": "s1", "recipient_id": "+9612", "status": "delivered"}]},
+        ])
+
+        await queue.start(on_message, on_status)
+        assert await queue.dispatch(body) == 3
+        await queue.stop()
+
+        assert [c.args[1]["id"] for c in on_message.await_args_list] == ["m1", "m2"]
+        on_status.assert_awaited_once()
+        stats = queue.get_stats()
+        assert stats["local_enqueued"] == 2  # statuses are handled inline
+        assert (stats["batches"], stats["max_batch_size"], stats["statuses"]) == (1, 3, 1)
+        assert stats["avg_batch_size"] == 3.0
+        assert stats["max_latency_ms"] >= stats["avg_latency_ms"] >= 0
+
+
+    @pytest.mark.asyncio
+    async def test_redelivered_batch_dropped(self):
+        """Test a retried delivery does not reach the bot a second time."""
+        dedup = MessageDeduplicator(redis=RedisService(base_url="", token=""))
+        queue = WebhookQueue(mode="local", workers=1, redis=_redis("memory"), dedup=dedup)
+        on_message = AsyncMock()
+        body = _delivery([{"messages": [{"id": "wamid.1", "from": "+9611"}]}])
+
+        await queue.start(on_message)
+        await queue.dispatch(body)
+        await queue.dispatch(body)
+        await queue.stop()
+
+        on_message.assert_awaited_once()
+        assert queue.get_stats()["duplicates_dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_inline_handling_releases_claim(self):
+        """Test a message whose handler failed is not dropped as a duplicate on redelivery."""
+        dedup = MessageDeduplicator(redis=RedisService(base_url="", token=""))
+        queue = WebhookQueue(mode="inline", redis=_redis("memory"), dedup=dedup)
+        on_message = AsyncMock(side_effect=[RuntimeError("llm down"), None])
+        body = _delivery([{"messages": [{"id": "wamid.1", "from": "+9611"}]}])
+
+        await queue.start(on_message)
+        await queue.dispatch(body)
+        await queue.dispatch(body)
+        await queue.dispatch(body)
+
+        assert on_message.await_count == 2
+        assert queue.get_stats()["duplicates_dropped"] == 1
+
+
+class TestWebhookQueueStream:
+    """Unit tests for Redis stream ingestion."""
+
+    def test_parse_raw_and_parsed_replies(self):
+        """Test REST (flat fields) and redis-py (dict fields) replies decode alike."""
+        raw = [["webhook:messages", [["1-0", ["phone", "+961", "message", "{}"]]]]]
+        parsed = [["webhook:messages", [("1-0", {"phone": "+961", "message": "{}"})]]]
+
+        assert parse_stream_reply(raw) == parse_stream_reply(parsed) == [("1-0", {"phone": "+961", "message": "{}"})]
+        assert parse_stream_reply(None) == []
+
+    def test_auto_mode_picks_backend(self):
+        """Test auto keeps ingestion durable on any real Redis and uses local queues on memory only."""
+        assert WebhookQueue(mode="auto", redis=_redis("redis"))._resolve_mode() == "stream"
+        assert WebhookQueue(mode="auto", redis=_redis("upstash"))._resolve_mode() == "stream"
+        assert WebhookQueue(mode="local", redis=_redis("upstash"))._resolve_mode() == "local"
+        assert WebhookQueue(mode="auto", redis=_redis("memory"))._resolve_mode() == "local"
+        assert WebhookQueue(mode="stream", redis=_redis("memory"))._resolve_mode() == "local"
+
+    @pytest.mark.asyncio
+    async def test_enqueue_adds_to_stream(self):
+        """Test enqueue is a single XADD when the stream accepts it."""
+        redis = _redis(execute=AsyncMock(return_value="1-0"))
+        queue = WebhookQueue(mode="stream", workers=1, redis=redis)
+        queue._running, queue.mode = True, "stream"
+        queue._open_queues()
+
+        await queue.enqueue("+961", {"id": "a"})
+
+        args = redis._execute.await_args.args
+        assert args[0] == "XADD" and args[1] == "webhook:messages"
+        assert json.loads(args[-1]) == {"id": "a"}
+        assert args[args.index("kind") + 1] == "message"
+        assert not queue._backlog
+
+    @pytest.mark.asyncio
+    async def test_stream_unavailable_falls_back_to_local(self):
+        """Test a failed XADD still gets the message processed."""
+        queue = WebhookQueue(mode="stream", workers=1, redis=_redis(execute=AsyncMock(return_value=None)))
+        queue._running, queue.mode = True, "stream"
+        queue._open_queues()
+
+        await queue.enqueue("+961", {"id": "a"})
+
+        assert queue._backlog["+961"][0][:4] == (None, "message", "+961", {"id": "a"})
+
+    @pytest.mark.asyncio
+    async def test_entries_handled_then_acked(self):
+        """Test stream entries reach the handler and are XACKed afterwards."""
+        redis = _redis()
+        queue = WebhookQueue(mode="stream", workers=2, redis=redis)
+        handler = AsyncMock()
+        queue._handler = handler
+        queue._running = True
+        queue._open_queues()
+        workers = [asyncio.create_task(queue._worker()) for _ in range(2)]
+
+        await queue._dispatch_entries([
+            ("1-0", {"phone": "+961", "message": json.dumps({"id": "a"})}),
+            ("2-0", None),
+        ])
+        await queue._ready.join()
+        for task in workers:
+            task.cancel()
+
+        handler.assert_awaited_once_with("+961", {"id": "a"})
+        acked = [c.args[3] for c in redis._execute.await_args_list if c.args[0] == "XACK"]
+        assert sorted(acked) == ["1-0", "2-0"]
+
+    @pytest.mark.asyncio
+    async def test_pending_claim_resumes_cursor(self):
+        """Test each periodic XAUTOCLAIM continues the scan and dispatches what it claims."""
+        reply = ["5-0", [["3-0", ["phone", "+961", "message", json.dumps({"id": "a"})]]]]
+        redis = _redis(execute=AsyncMock(side_effect=[reply, ["0-0", []]]))
+        queue = WebhookQueue(mode="stream", workers=1, redis=redis)
+        queue._open_queues()
+
+        await queue._claim_pending()
+        await queue._claim_pending()
+
+        cursors = [c.args[5] for c in redis._execute.await_args_list]
+        assert cursors == ["0-0", "5-0"] and queue._claim_cursor == "0-0"
+        assert queue._backlog["+961"][0][:3] == ("3-0", "message", "+961")
+        assert queue.get_stats()["redelivered"] == 1
+
+    @pytest.mark.asyncio
+    async def test_claim_skips_entries_still_queued_here(self):
+        """Test an entry reclaimed while it waits in this node's queue is not queued twice."""
+        fields = ["phone", "+961", "message", json.dumps({"id": "a"})]
+        redis = _redis(execute=AsyncMock(return_value=["0-0", [["3-0", fields]]]))
+        queue = WebhookQueue(mode="stream", workers=1, redis=redis)
+        queue._open_queues()
+        await queue._dispatch_entries([("3-0", _fields_to_dict(fields))])
+
+        await queue._claim_pending()
+
+        assert len(queue._backlog["+961"]) == 1
+        assert queue.get_stats()["reclaim_skipped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_no_read_ahead_when_local_queues_full(self):
+        """Test the reader neither reads nor claims entries it has no room to queue."""
+        redis = _redis()
+        queue = WebhookQueue(mode="stream", workers=1, redis=redis)
+        queue._capacity = 1
+        queue._open_queues()
+        await queue._put((None, "message", "+961", {}, 0.0))
+        queue._running = True
+
+        reader = asyncio.create_task(queue._read_stream())
+        await asyncio.sleep(0.01)
+        queue._running = False
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+
+        redis._execute.assert_not_awaited()
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+import httpx
+import pytest
+
+from app.services import whatsapp_service as ws
+from app.services.whatsapp_sender import (
+    TokenBucket, backoff_delay, is_rate_limited, rate_limit_scope, retry_after_seconds, SCOPE_RECIPIENT, SCOPE_SENDER,
+)
+from app.services.whatsapp_service import WhatsAppService
+
+
+def _service(handler):
+    return WhatsAppService(api_token="token", phone_number_id="1", transport=httpx.MockTransport(handler))
+
+
+def _ok(request):
+    return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(ws, "RETRY_DELAY_SECONDS", 0.001)
+
+
+class TestRateShaping:
+    """Unit tests for the token bucket and retry helpers."""
+
+    @pytest.mark.asyncio
+    async def test_bucket_limits_rate_after_burst(self):
+        """Test the burst is immediate and later tokens follow the rate."""
+        bucket = TokenBucket(rate=100, burst=5)
+        start = time.monotonic()
+        for _ in range(10):
+            await bucket.acquire()
+
+        assert time.monotonic() - start >= 0.04
+
+    @pytest.mark.asyncio
+    async def test_pause_holds_senders(self):
+        """Test a pause (Retry-After) delays the next token."""
+        bucket = TokenBucket(rate=1000, burst=10)
+        bucket.pause(0.05)
+
+        assert await bucket.acquire() >= 0.04
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Test delays stay within [0, min(cap, base * 2^attempt)]."""
+        delays = [backoff_delay(attempt, 1.0, 5.0) for attempt in range(6) for _ in range(20)]
+
+        assert all(0 <= d <= 5.0 for d in delays)
+        assert len(set(delays)) > 1
+
+    def test_rate_limit_detection(self):
+        """Test 429s and Graph throughput error codes count as rate limits."""
+        assert is_rate_limited(httpx.Response(429))
+        assert is_rate_limited(httpx.Response(400, json={"error": {"code": 130429}}))
+        assert rate_limit_scope(httpx.Response(400, json={"error": {"code": 131056}})) == SCOPE_RECIPIENT
+        assert rate_limit_scope(httpx.Response(429)) == SCOPE_SENDER
+        assert not is_rate_limited(httpx.Response(400, json={"error": {"code": 100}}))
+        assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "2"})) == 2.0
+        assert retry_after_seconds(httpx.Response(429)) is None
+
+
+class TestWhatsAppSend:
+    """Unit tests for WhatsAppService.send_message retries."""
+
+    @pytest.mark.asyncio
+    async def test_retry_after_honored(self):
+        """Test a 429 waits for Retry-After, then the send succeeds."""
+        calls = []
+
+        def handler(request):
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                return httpx.Response(429, headers={"Retry-After": "0.05"})
+            return _ok(request)
+
+        service = _service(handler)
+        result = await service.send_text("+961", "hi")
+
+        assert result == {"messages": [{"id": "wamid.1"}]}
+        assert calls[1] - calls[0] >= 0.045
+        stats = service.get_stats()
+        assert (stats["rate_limited"], stats["retries"], stats["sent"]) == (1, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_server_errors_retried_then_give_up(self):
+        """Test 5xx replies are retried MAX_RETRIES times before failing."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        service = _service(handler)
+
+        assert await service.send_text("+961", "hi") is None
+        assert len(calls) == ws.MAX_RETRIES + 1
+        assert service.get_stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_client_errors_not_retried(self):
+        """Test a plain 4xx fails immediately."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(400, json={"error": {"code": 100}})
+
+        assert await _service(handler).send_text("+961", "hi") is None
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_bulk_keeps_per_recipient_order(self):
+        """Test queued sends to one recipient go out in order, results in input order."""
+        seen = []
+
+        def handler(request):
+            payload = json.loads(request.content)
+            seen.append((payload["to"], int(payload["text"]["body"])))
+            return _ok(request)
+
+        service = _service(handler)
+        batch = [("+9611" if i % 2 else "+9612", {"type": "text", "text": {"body": str(i)}}) for i in range(10)]
+
+        results = await service.send_bulk(batch)
+        await service.close()
+
+        assert len(results) == 10 and all(results)
+        for phone in ("+9611", "+9612"):
+            order = [n for to, n in seen if to == phone]
+            assert order == sorted(order)
+
+    @pytest.mark.asyncio
+    async def test_pair_rate_limit_pauses_only_that_recipient(self):
+        """Test 131056 backs off the one recipient while others keep the sender bucket."""
+        calls = []
+
+        def handler(request):
+            to = json.loads(request.content)["to"]
+            calls.append((to, time.monotonic()))
+            if to == "+9611" and len(calls) == 1:
+                return httpx.Response(400, json={"error": {"code": 131056}}, headers={"Retry-After": "0.1"})
+            return _ok(request)
+
+        service = _service(handler)
+        first = service.queue_text("+9611", "a")
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        assert await service.send_text("+9612", "b")
+        other_elapsed = time.monotonic() - started
+        assert await first
+        await service.close()
+
+        assert other_elapsed < 0.05
+        assert calls[-1][0] == "+9611" and calls[-1][1] - calls[0][1] >= 0.09
+        assert service._bucket().paused_until == 0.0
+        assert service.get_stats()["pair_rate_limited"] == 1